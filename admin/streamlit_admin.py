@@ -183,6 +183,8 @@ def main():
     
     if st.button("🚀 Сохранить", type="primary", use_container_width=True):
         new_instruction_data = {
+            # Остальные разделы (например, quick_replies) сохраняются как есть
+            **instruction_data,
             "system_instruction": system_instruction,
             "welcome_message": welcome_message,
             "last_updated": datetime.now().isoformat()
@@ -1,9 +1,11 @@
 """
 Упрощенный Intelligent Agent с прямым LLM-анализом намерений
 """
+import asyncio
 import json
 import logging
-from typing import List, Dict, Any, Optional, TYPE_CHECKING
+import time
+from typing import List, Dict, Any, Optional, Iterable, TYPE_CHECKING
 from openai import AsyncOpenAI
 from datetime import datetime
 
@@ -13,6 +15,34 @@ from .models import (
     YouTubeAnalysisParams, ToolType
 )
 from .intents import Intent
+from .tool_stats import tool_call_stats
+from .model_cascade import ModelCascade, TIER_LOCAL, TIER_FAST, TIER_STRONG, cascade_stats
+from ..tools.renderers import render_tool_result, direct_render_stats
+
+# Потоковая отправка ответа доступна, когда агент работает внутри бота
+# (без окружения бота bot.core.config падает с ValueError)
+try:
+    from bot.reply_stream import current_reply_stream
+except (ImportError, ValueError):
+    def current_reply_stream():
+        return None
+
+# Упаковка контекста в бюджет токенов (вне бота - последние сообщения как есть)
+try:
+    from bot.services.context_packer import TokenCounter, context_packer
+    estimate_tokens = TokenCounter.estimate
+except (ImportError, ValueError):
+    context_packer = None
+
+    def estimate_tokens(text: str) -> int:
+        """Оценка числа токенов без токенизатора (~4 байта UTF-8 на токен)"""
+        return (len(text.encode("utf-8")) + 3) // 4
+
+try:
+    from bot.core.logging import annotate_request
+except (ImportError, ValueError):
+    def annotate_request(**fields):
+        pass
 
 if TYPE_CHECKING:
     from ..tools.base import BaseTool
@@ -23,16 +53,48 @@ logger = logging.getLogger(__name__)
 class IntelligentAgent:
     """Упрощенный интеллектуальный агент с прямым LLM-анализом"""
     
-    def __init__(self, api_key: str, model: str = "gpt-4o"):
+    # Renderer'ы встроенных функций (как ToolMetadata.renderer у инструментов)
+    FUNCTION_RENDERERS = {
+        "echo_tool": "echo",
+        "claude_code_direct": "mcp",
+        "analyze_youtube_video": "youtube"
+    }
+    
+    # Таймауты встроенных функций (секунды), остальные - tool_timeout
+    TOOL_TIMEOUTS = {
+        "claude_code_direct": 90.0
+    }
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o",
+        direct_render: bool = True,
+        direct_render_exclude: Optional[Iterable[str]] = None,
+        tool_timeout: float = 30.0,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        cascade: Optional[ModelCascade] = None
+    ):
         """
         Инициализация агента
         
         Args:
             api_key: OpenAI API ключ
             model: Модель для использования (по умолчанию gpt-4o)
+            direct_render: Отвечать готовым результатом инструмента без второго запроса к LLM
+            direct_render_exclude: Функции, результат которых всегда формулирует LLM
+            tool_timeout: Таймаут вызова инструмента по умолчанию (секунды)
+            tool_timeouts: Таймауты отдельных функций (дополняют TOOL_TIMEOUTS)
+            cascade: Каскад моделей (без него все запросы идут в model)
         """
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.client: AsyncOpenAI = self._create_client(api_key)
         self.model = model
+        self.direct_render = direct_render
+        self.direct_render_exclude = set(direct_render_exclude or ())
+        self.tool_timeout = tool_timeout
+        self.tool_timeouts = {**self.TOOL_TIMEOUTS, **(tool_timeouts or {})}
+        self.cascade = cascade
+        self.model_stats = cascade.stats if cascade else cascade_stats
         self.conversation_history = []
         
         self.logger = logger
@@ -42,9 +104,20 @@ class IntelligentAgent:
         
         # Доступные функции
         self.available_functions = self._get_available_functions()
+        self.function_names = {function["function"]["name"] for function in self.available_functions}
         
         logger.info(f"✅ Упрощенный IntelligentAgent инициализирован с моделью {model}")
     
+    @staticmethod
+    def _create_client(api_key: str) -> AsyncOpenAI:
+        """Берет клиента из общего пула соединений бота (отдельный клиент вне бота)"""
+        try:
+            from bot.llm_clients import llm_clients
+            return llm_clients.openai(api_key)
+        except Exception as e:
+            logger.warning(f"⚠️ Общий пул LLM клиентов недоступен, создаем отдельный клиент: {e}")
+            return AsyncOpenAI(api_key=api_key)
+    
     def _init_claude_code_service(self) -> None:
         """Инициализирует Claude Code Service для прямых вызовов"""
         try:
@@ -200,44 +273,62 @@ class IntelligentAgent:
         try:
             logger.info(f"🤖 Простая обработка сообщения: '{message[:50]}...' от пользователя {user_id}")
             
-            # Упрощенная подготовка сообщений - LLM сам выберет инструмент
-            messages = self._prepare_simple_messages(message, context)
+            # Уровень каскада: локальный движок, быстрая или большая модель
+            decision = self.cascade.route(message) if self.cascade else None
+            tier = decision.tier if decision else TIER_STRONG
+            model = decision.model if decision else self.model
             
-            # Вызываем OpenAI с function calling
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=self.available_functions,
-                tool_choice="auto"
-            )
+            # Упрощенная подготовка сообщений - LLM сам выберет инструмент
+            messages = self._prepare_simple_messages(message, context, model)
             
-            # Получаем ответ
-            assistant_message = response.choices[0].message
+            if tier == TIER_LOCAL:
+                assistant_message = self.cascade.local_tool_call(decision, message, user_id)
+            else:
+                # Вызываем OpenAI с function calling
+                assistant_message = await self._select_tools(messages, model, tier)
+                if tier == TIER_FAST:
+                    _, escalation = self.cascade.assess(decision, assistant_message, self.function_names)
+                    if escalation:
+                        tier, model = TIER_STRONG, self.cascade.strong_model
+                        annotate_request(model_escalation=escalation)
+                        assistant_message = await self._select_tools(messages, model, tier)
+            annotate_request(model_tier=tier, model=model)
             
             # Проверяем, нужно ли вызвать функцию
             if assistant_message.tool_calls:
-                logger.info(f"🔧 LLM выбрал инструмент: {assistant_message.tool_calls[0].function.name}")
+                function_names = [call.function.name for call in assistant_message.tool_calls]
+                logger.info(f"🔧 LLM выбрал инструменты: {', '.join(function_names)}")
                 
-                # Обрабатываем вызовы функций
-                tool_response = await self._handle_tool_calls(
+                # Выполняем все вызовы параллельно
+                tool_responses = await self._handle_tool_calls(
                     assistant_message.tool_calls,
                     user_id
                 )
+                tool_response = tool_responses[0]
                 
-                # Определяем тип использованного инструмента
-                tool_type = self._get_tool_type_from_call(assistant_message.tool_calls[0])
-                
-                # Получаем финальный ответ с результатами функций
-                final_response = await self._get_final_response(
-                    messages,
-                    assistant_message,
-                    tool_response
-                )
+                # Готовые результаты инструментов отправляем как есть, иначе ответ формулирует LLM
+                final_tokens = self._estimate_final_tokens(messages, assistant_message, tool_responses)
+                final_response = self._render_directly(function_names, tool_responses, final_tokens)
+                if final_response is None:
+                    started = time.perf_counter()
+                    final_response = await self._get_final_response(
+                        messages,
+                        assistant_message,
+                        tool_responses,
+                        model
+                    )
+                    latency_ms = (time.perf_counter() - started) * 1000
+                    self.model_stats.record_call(tier, model, latency_ms, final_tokens, estimate_tokens(final_response))
+                    tokens = (final_tokens + estimate_tokens(final_response)) // len(function_names)
+                    for function_name in function_names:
+                        direct_render_stats.record_llm_render(function_name, latency_ms, tokens)
+                    annotate_request(tool_render="llm")
                 
                 return AgentResponse(
                     message=final_response,
                     tool_used=tool_response.metadata.get("tool_type") if tool_response.metadata else None,
                     tool_response=tool_response,
+                    tool_responses=tool_responses,
                     confidence=0.9,  # Высокая уверенность - LLM сам выбрал инструмент
                     requires_confirmation=False
                 )
@@ -262,7 +353,8 @@ class IntelligentAgent:
     def _prepare_simple_messages(
         self, 
         message: str, 
-        context: Optional[List[Dict[str, str]]] = None
+        context: Optional[List[Dict[str, str]]] = None,
+        model: Optional[str] = None
     ) -> List[Dict[str, str]]:
         """Упрощенная подготовка сообщений с прямыми инструкциями для LLM"""
         system_prompt = """Ты - умный AI ассистент Артём Интегратор с доступом к инструментам.
@@ -302,8 +394,7 @@ class IntelligentAgent:
         
         # Добавляем контекст если есть
         if context:
-            for ctx_msg in context[-5:]:  # Берем последние 5 сообщений
-                messages.append(ctx_msg)
+            messages.extend(self._pack_context(context, system_prompt, message, model, limit=5))
         
         # Добавляем текущее сообщение
         messages.append({"role": "user", "content": message})
@@ -334,21 +425,113 @@ class IntelligentAgent:
         
         # Добавляем контекст если есть
         if context:
-            messages.extend(context)
+            messages.extend(self._pack_context(context, system_prompt, message))
         
         # Добавляем текущее сообщение
         messages.append({"role": "user", "content": message})
         
         return messages
     
+    def _pack_context(
+        self,
+        context: List[Dict[str, str]],
+        system_prompt: str,
+        message: str,
+        model: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Новые сообщения истории в пределах бюджета токенов модели
+
+        Без упаковки (CONTEXT_PACKING=false или вне бота) берутся последние
+        limit сообщений (вся история, если limit не задан).
+        """
+        if context_packer is None or not context_packer.settings.enabled:
+            return context[-limit:] if limit else context
+        return context_packer.pack(context, model or self.model, system_prompt, message).messages
+    
+    async def _select_tools(self, messages: List[Dict[str, str]], model: str, tier: str):
+        """Запрос выбора инструмента к модели уровня каскада"""
+        started = time.perf_counter()
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            tools=self.available_functions,
+            tool_choice="auto"
+        )
+        latency_ms = (time.perf_counter() - started) * 1000
+        
+        assistant_message = response.choices[0].message
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "prompt_tokens", None):
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        else:
+            prompt_tokens = sum(estimate_tokens(str(item.get("content") or "")) for item in messages)
+            completion_tokens = estimate_tokens(assistant_message.content or "") + sum(
+                estimate_tokens(call.function.arguments or "") for call in assistant_message.tool_calls or []
+            )
+        self.model_stats.record_call(tier, model, latency_ms, prompt_tokens, completion_tokens)
+        return assistant_message
+    
     async def _handle_tool_calls(
         self, 
         tool_calls, 
         user_id: str
-    ) -> ToolResponse:
-        """Обрабатывает вызовы инструментов"""
-        # Для простоты обрабатываем только первый вызов
-        tool_call = tool_calls[0]
+    ) -> List[ToolResponse]:
+        """
+        Выполняет все вызовы инструментов из ответа модели параллельно
+        
+        Returns:
+            Результаты в порядке tool_calls (ошибка или таймаут одного
+            вызова не влияет на остальные)
+        """
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._run_tool_call(call, user_id) for call in tool_calls))
+        critical_path_ms = (time.perf_counter() - started) * 1000
+        
+        walls = [(call.function.name, wall_ms) for call, (_, wall_ms) in zip(tool_calls, results)]
+        tool_call_stats.record_batch(walls, critical_path_ms)
+        annotate_request(
+            tool_calls=len(tool_calls),
+            tool_wall_ms={name: round(wall_ms, 1) for name, wall_ms in walls},
+            tool_critical_path_ms=round(critical_path_ms, 1)
+        )
+        if len(tool_calls) > 1:
+            logger.info(
+                f"🔧 {len(tool_calls)} инструментов за {critical_path_ms:.0f} мс "
+                f"(последовательно было бы {sum(wall for _, wall in walls):.0f} мс)"
+            )
+        return [response for response, _ in results]
+    
+    async def _run_tool_call(self, tool_call, user_id: str):
+        """Один вызов инструмента со своим таймаутом; возвращает (результат, время в мс)"""
+        function_name = tool_call.function.name
+        timeout = self.tool_timeouts.get(function_name, self.tool_timeout)
+        timed_out = False
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self._execute_tool_call(tool_call, user_id), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            logger.warning(f"⏱️ {function_name}: нет ответа за {timeout:.0f} с")
+            response = ToolResponse(
+                success=False,
+                error=f"Инструмент {function_name} не ответил за {timeout:.0f} с",
+                metadata={"tool_type": self._get_tool_type_from_call(tool_call), "timeout": True}
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка вызова {function_name}: {e}", exc_info=True)
+            response = ToolResponse(
+                success=False,
+                error=f"Ошибка: {str(e)}",
+                metadata={"tool_type": self._get_tool_type_from_call(tool_call)}
+            )
+        wall_ms = (time.perf_counter() - started) * 1000
+        tool_call_stats.record_call(function_name, wall_ms, response.success, timed_out)
+        return response, wall_ms
+    
+    async def _execute_tool_call(self, tool_call, user_id: str) -> ToolResponse:
+        """Выполняет один вызов инструмента"""
         function_name = tool_call.function.name
         function_args = json.loads(tool_call.function.arguments)
         
@@ -462,13 +645,68 @@ class IntelligentAgent:
             metadata={"tool_type": ToolType.YOUTUBE_ANALYZER}
         )
     
+    def _render_directly(
+        self,
+        function_names: List[str],
+        tool_responses: List[ToolResponse],
+        final_tokens: int
+    ) -> Optional[str]:
+        """
+        Ответ из результатов инструментов без второго запроса к LLM
+        
+        Несколько результатов выводятся подряд, если каждый из них готов
+        для пользователя. None - нужен запрос к LLM.
+        """
+        if not self.direct_render:
+            return None
+        texts = []
+        for function_name, tool_response in zip(function_names, tool_responses):
+            if function_name in self.direct_render_exclude:
+                return None
+            text = render_tool_result(self.FUNCTION_RENDERERS.get(function_name), tool_response)
+            if text is None:
+                return None
+            texts.append(text)
+        
+        text = "\n\n".join(texts)
+        tokens_saved = final_tokens + estimate_tokens(text)
+        latency_saved = 0.0
+        for function_name in function_names:
+            latency_saved = max(
+                latency_saved,
+                direct_render_stats.record_direct_render(function_name, tokens_saved // len(function_names))
+            )
+        annotate_request(tool_render="direct", tool_render_saved_tokens=tokens_saved)
+        logger.info(
+            f"⚡ {', '.join(function_names)}: ответ без второго запроса к LLM "
+            f"(~{tokens_saved} токенов, ~{latency_saved:.0f} мс)"
+        )
+        return text
+    
+    @staticmethod
+    def _estimate_final_tokens(
+        messages: List[Dict[str, str]],
+        assistant_message,
+        tool_responses: List[ToolResponse]
+    ) -> int:
+        """Оценка токенов запроса, который отправился бы в LLM после инструментов (без ответа)"""
+        tokens = sum(estimate_tokens(str(item.get("content") or "")) for item in messages)
+        tokens += sum(estimate_tokens(call.function.arguments or "") for call in assistant_message.tool_calls)
+        tokens += sum(
+            estimate_tokens(json.dumps(response.dict(), ensure_ascii=False, default=str))
+            for response in tool_responses
+        )
+        return tokens
+    
     async def _get_final_response(
         self,
         messages: List[Dict[str, str]],
         assistant_message,
-        tool_response: ToolResponse
+        tool_responses: List[ToolResponse],
+        model: Optional[str] = None
     ) -> str:
-        """Получает финальный ответ после выполнения инструмента"""
+        """Получает финальный ответ после выполнения инструментов"""
+        model = model or self.model
         # Добавляем сообщение ассистента с tool_calls
         messages.append({
             "role": "assistant",
@@ -476,17 +714,33 @@ class IntelligentAgent:
             "tool_calls": assistant_message.tool_calls
         })
         
-        # Добавляем результат выполнения функции
-        tool_call = assistant_message.tool_calls[0]
-        messages.append({
-            "role": "tool",
-            "content": json.dumps(tool_response.dict(), ensure_ascii=False),
-            "tool_call_id": tool_call.id
-        })
+        # Каждому вызову - свое сообщение с результатом
+        for tool_call, tool_response in zip(assistant_message.tool_calls, tool_responses):
+            messages.append({
+                "role": "tool",
+                "content": json.dumps(tool_response.dict(), ensure_ascii=False, default=str),
+                "tool_call_id": tool_call.id
+            })
+        
+        # Получаем финальный ответ (потоком, если обработчик ждет ответ по частям)
+        stream = current_reply_stream()
+        if stream is not None:
+            stream.begin()
+            chunks = await self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True
+            )
+            parts = []
+            async for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    stream.push(chunk.choices[0].delta.content)
+            stream.complete()
+            return "".join(parts) or "Операция выполнена"
         
-        # Получаем финальный ответ
         final_response = await self.client.chat.completions.create(
-            model=self.model,
+            model=model,
             messages=messages
         )
         
@@ -556,6 +810,7 @@ class IntelligentAgent:
         function_to_type = {
             "echo_tool": ToolType.ECHO,
             "execute_mcp_command": ToolType.MCP,
+            "claude_code_direct": ToolType.MCP,
             "generate_image": ToolType.IMAGE_GENERATOR,
             "analyze_youtube_video": ToolType.YOUTUBE_ANALYZER
         }
@@ -0,0 +1,290 @@
+"""
+Каскад моделей IntelligentAgent
+
+Агент отправлял в gpt-4o и выбор инструмента, и итоговый ответ, хотя
+большинство сообщений администратора - обычный разговор или очевидная
+MCP команда. Каскад распределяет сообщения по уровням:
+- local: явная MCP команда (/mcp, /db или короткое "покажи приложения")
+  выполняется без запроса к модели;
+- fast: дешевая быстрая модель выбирает инструмент и отвечает на
+  простые сообщения;
+- strong: большая модель - длинные и сложные запросы, а также эскалация,
+  когда ответ быстрой модели вызывает сомнения (неизвестный инструмент,
+  битые аргументы, расхождение с локальным движком, неуверенный ответ).
+"""
+import re
+import json
+import uuid
+import logging
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from .tool_stats import SAMPLES, percentile
+
+# Локальный движок намерений доступен, когда агент работает внутри бота
+try:
+    from bot.services.intent_engine import intent_engine
+except (ImportError, ValueError):
+    intent_engine = None
+
+logger = logging.getLogger(__name__)
+
+TIER_LOCAL = "local"
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+
+# Цены за 1M токенов: модель -> (вход, выход), USD
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6)
+}
+
+# Запросы, которым нужны рассуждения большой модели
+COMPLEX_MARKERS = re.compile(
+    r"\b(?:сравни|проанализируй|объясни|почему|спланируй|спроектируй|оптимизируй|пошагов\w*|"
+    r"стратеги\w*|архитектур\w*|напиши (?:код|скрипт|функци\w*)|"
+    r"compare|explain|why|analy[sz]e|design|plan|step by step)\b",
+    re.IGNORECASE
+)
+
+# Сообщения, которые целиком являются MCP командой. Правила движка намерений
+# для этого слишком широкие ("get me a poem" содержит get...app), поэтому
+# без модели выполняются только явные команды и короткие запросы списков
+LOCAL_COMMAND = re.compile(
+    r"^\s*(?:"
+    r"/(?:mcp|db)(?:@\w+)?\s+\S[^\n]*"
+    r"|(?:покажи|показать|список|list|show)\s+(?:мои\s+|все\s+|my\s+|all\s+)?"
+    r"(?:приложения|приложений|apps|applications|деплои|деплоев|deployments|базы данных|базы|databases)"
+    r"|(?:статус|status)\s+(?:приложений|приложения|apps|деплоя|деплоев|deployments?)"
+    r")\s*[.!?]?\s*$",
+    re.IGNORECASE
+)
+
+# Признаки того, что быстрая модель не справилась
+UNCERTAINTY_MARKERS = re.compile(
+    r"не уверен|не могу|не знаю|затрудняюсь|уточните|not sure|i can't|i cannot|i don't know",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class RouteDecision:
+    """Выбранный уровень каскада"""
+    tier: str
+    model: str
+    reason: str
+    # Инструмент, который ожидает локальный движок намерений (для fast и strong - только подсказка)
+    expected_tool: Optional[str] = None
+
+
+class CascadeStats:
+    """Маршрутизация, эскалации, задержка и стоимость по уровням"""
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.prices: Dict[str, Tuple[float, float]] = dict(prices or DEFAULT_PRICES)
+        self.routes: Counter = Counter()
+        self.escalations: Counter = Counter()
+        self.requests = 0
+        self.tiers: Dict[str, Dict[str, Any]] = {}
+
+    def _tier(self, tier: str) -> Dict[str, Any]:
+        stats = self.tiers.get(tier)
+        if stats is None:
+            stats = self.tiers[tier] = {
+                "models": Counter(),
+                "calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cost_usd": 0.0,
+                "total_ms": 0.0,
+                "samples": deque(maxlen=SAMPLES)
+            }
+        return stats
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Стоимость запроса в USD (0 для модели без цены)"""
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+    def record_route(self, decision: RouteDecision):
+        self.requests += 1
+        self.routes[f"{decision.tier}:{decision.reason}"] += 1
+        self._tier(decision.tier)
+
+    def record_escalation(self, reason: str):
+        self.escalations[reason] += 1
+
+    def record_call(self, tier: str, model: str, latency_ms: float, prompt_tokens: int, completion_tokens: int):
+        """Один запрос к модели уровня"""
+        stats = self._tier(tier)
+        stats["models"][model] += 1
+        stats["calls"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats["cost_usd"] += self.cost(model, prompt_tokens, completion_tokens)
+        stats["total_ms"] += latency_ms
+        stats["samples"].append(latency_ms)
+
+    def get_stats(self, strong_model: Optional[str] = None) -> Dict[str, Any]:
+        tiers = {}
+        total_cost = 0.0
+        strong_only_cost = 0.0
+        for tier, stats in sorted(self.tiers.items()):
+            total_cost += stats["cost_usd"]
+            if strong_model:
+                strong_only_cost += self.cost(strong_model, stats["prompt_tokens"], stats["completion_tokens"])
+            tiers[tier] = {
+                "models": dict(stats["models"]),
+                "calls": stats["calls"],
+                "prompt_tokens": stats["prompt_tokens"],
+                "completion_tokens": stats["completion_tokens"],
+                "cost_usd": round(stats["cost_usd"], 6),
+                "avg_ms": round(stats["total_ms"] / stats["calls"], 1) if stats["calls"] else 0.0,
+                "p50_ms": round(percentile(stats["samples"], 50), 1),
+                "p95_ms": round(percentile(stats["samples"], 95), 1)
+            }
+        escalated = sum(self.escalations.values())
+        result = {
+            "requests": self.requests,
+            "routes": dict(self.routes),
+            "escalations": escalated,
+            "escalation_rate": round(escalated / self.requests, 3) if self.requests else 0.0,
+            "escalation_reasons": dict(self.escalations),
+            "cost_usd": round(total_cost, 6),
+            "tiers": tiers
+        }
+        if strong_model:
+            # Те же токены, если бы все запросы шли в большую модель
+            result["strong_only_cost_usd"] = round(strong_only_cost, 6)
+            result["saved_usd"] = round(max(0.0, strong_only_cost - total_cost), 6)
+        return result
+
+
+class ModelCascade:
+    """Маршрутизация сообщений по уровням моделей"""
+
+    def __init__(
+        self,
+        fast_model: str = "gpt-4o-mini",
+        strong_model: str = "gpt-4o",
+        min_confidence: float = 0.7,
+        max_fast_chars: int = 400,
+        local_tools: bool = True,
+        stats: Optional[CascadeStats] = None
+    ):
+        """
+        Args:
+            fast_model: Дешевая модель для выбора инструмента и простых ответов
+            strong_model: Большая модель для сложных запросов и эскалации
+            min_confidence: Ниже этой уверенности ответ быстрой модели эскалируется
+            max_fast_chars: Сообщения длиннее сразу идут в большую модель
+            local_tools: Выполнять явные MCP команды (LOCAL_COMMAND) без запроса к модели
+            stats: Метрики (по умолчанию глобальные cascade_stats)
+        """
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.min_confidence = min_confidence
+        self.max_fast_chars = max_fast_chars
+        self.local_tools = local_tools and intent_engine is not None
+        self.stats = stats or cascade_stats
+
+    def route(self, message: str) -> RouteDecision:
+        """Выбирает уровень для сообщения до запроса к модели"""
+        expected_tool = self._expected_tool(message)
+        if len(message) > self.max_fast_chars:
+            decision = RouteDecision(TIER_STRONG, self.strong_model, "long_message", expected_tool)
+        elif COMPLEX_MARKERS.search(message):
+            decision = RouteDecision(TIER_STRONG, self.strong_model, "complex", expected_tool)
+        elif self.local_tools and LOCAL_COMMAND.match(message):
+            decision = RouteDecision(TIER_LOCAL, self.fast_model, "mcp_command", "claude_code_direct")
+        else:
+            decision = RouteDecision(TIER_FAST, self.fast_model, "default", expected_tool)
+        self.stats.record_route(decision)
+        return decision
+
+    @staticmethod
+    def _expected_tool(message: str) -> Optional[str]:
+        """Инструмент, который очевиден по правилам движка намерений"""
+        if intent_engine is None:
+            return None
+        scan = intent_engine.scan(message)
+        if scan.url and scan.url[0] == "youtube":
+            return "analyze_youtube_video"
+        if "mcp_command" in intent_engine.specialized_intents(scan):
+            return "claude_code_direct"
+        return None
+
+    @staticmethod
+    def local_tool_call(decision: RouteDecision, message: str, user_id: str) -> ChatCompletionMessage:
+        """Ответ "модели" с вызовом инструмента, выбранного локальным движком"""
+        return ChatCompletionMessage(
+            role="assistant",
+            content=None,
+            tool_calls=[ChatCompletionMessageToolCall(
+                id=f"call_local_{uuid.uuid4().hex[:12]}",
+                type="function",
+                function=Function(
+                    name=decision.expected_tool,
+                    arguments=json.dumps({"message": message, "user_id": user_id}, ensure_ascii=False)
+                )
+            )]
+        )
+
+    def assess(
+        self,
+        decision: RouteDecision,
+        assistant_message,
+        functions: Iterable[str]
+    ) -> Tuple[float, Optional[str]]:
+        """
+        Уверенность в ответе быстрой модели
+
+        Returns:
+            (уверенность, причина эскалации или None)
+        """
+        confidence, reason = self._confidence(decision, assistant_message, set(functions))
+        if confidence >= self.min_confidence:
+            return confidence, None
+        self.stats.record_escalation(reason)
+        logger.info(f"⬆️ Эскалация в {self.strong_model}: {reason} (уверенность {confidence:.2f})")
+        return confidence, reason
+
+    @staticmethod
+    def _confidence(decision: RouteDecision, assistant_message, functions) -> Tuple[float, str]:
+        tool_calls = assistant_message.tool_calls or []
+        if tool_calls:
+            for call in tool_calls:
+                if call.function.name not in functions:
+                    return 0.0, "unknown_tool"
+                try:
+                    json.loads(call.function.arguments or "{}")
+                except ValueError:
+                    return 0.0, "invalid_arguments"
+            if decision.expected_tool is None:
+                return 0.8, "tool_call"
+            if decision.expected_tool in {call.function.name for call in tool_calls}:
+                return 0.95, "tool_call"
+            return 0.5, "tool_mismatch"
+
+        content = (assistant_message.content or "").strip()
+        if not content:
+            return 0.0, "empty_answer"
+        if decision.expected_tool:
+            # Движок уверен, что нужен инструмент, а модель ответила текстом
+            return 0.3, "missed_tool"
+        if UNCERTAINTY_MARKERS.search(content):
+            return 0.4, "uncertain_answer"
+        return 0.8, "answer"
+
+
+# Глобальные метрики каскада (пишутся и без каскада - как уровень strong)
+cascade_stats = CascadeStats()
+
+
+def get_model_cascade_stats(strong_model: Optional[str] = None) -> Dict[str, Any]:
+    """Метрики каскада моделей"""
+    return cascade_stats.get_stats(strong_model)
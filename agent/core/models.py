@@ -92,6 +92,7 @@ class AgentResponse(BaseModel):
     message: str
     tool_used: Optional[ToolType] = None
     tool_response: Optional[ToolResponse] = None
+    tool_responses: List[ToolResponse] = Field(default_factory=list)
     requires_confirmation: bool = False
     confidence: float = Field(ge=0.0, le=1.0)
     intent: Optional[Intent] = None
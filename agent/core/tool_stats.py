@@ -0,0 +1,110 @@
+"""
+Метрики выполнения инструментов агента
+
+Все вызовы инструментов из одного ответа модели выполняются
+параллельно, поэтому пользователь ждет не сумму их времени, а самый
+долгий вызов (критический путь). Метрики показывают время каждого
+инструмента и сколько дает параллельное выполнение пачки.
+"""
+from collections import deque
+from typing import Dict, Any, Deque, Iterable, Tuple
+
+# Общий перцентиль бота; вне бота (нет пакета или окружения) - та же формула локально
+try:
+    from bot.core.utils import percentile
+except (ImportError, ValueError):
+    def percentile(samples: Iterable[float], percent: float) -> float:
+        ordered = sorted(samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+# Сколько последних замеров хранить для перцентилей
+SAMPLES = 500
+
+
+class ToolCallStats:
+    """Время вызовов инструментов и критический путь пачек"""
+
+    def __init__(self):
+        self.tools: Dict[str, Dict[str, Any]] = {}
+        self.batches = 0
+        self.multi_tool_batches = 0
+        self.max_batch_size = 0
+        self.sequential_ms = 0.0
+        self.critical_path_ms = 0.0
+        self.critical_path_samples: Deque[float] = deque(maxlen=SAMPLES)
+
+    def _tool(self, name: str) -> Dict[str, Any]:
+        stats = self.tools.get(name)
+        if stats is None:
+            stats = self.tools[name] = {
+                "calls": 0,
+                "errors": 0,
+                "timeouts": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "samples": deque(maxlen=SAMPLES)
+            }
+        return stats
+
+    def record_call(self, name: str, wall_ms: float, success: bool, timed_out: bool = False):
+        """Один вызов инструмента"""
+        stats = self._tool(name)
+        stats["calls"] += 1
+        stats["total_ms"] += wall_ms
+        stats["max_ms"] = max(stats["max_ms"], wall_ms)
+        stats["samples"].append(wall_ms)
+        if timed_out:
+            stats["timeouts"] += 1
+        elif not success:
+            stats["errors"] += 1
+
+    def record_batch(self, walls: Iterable[Tuple[str, float]], critical_path_ms: float):
+        """
+        Пачка вызовов из одного ответа модели
+
+        Args:
+            walls: Имя инструмента и его время для каждого вызова
+            critical_path_ms: Фактическое время всей пачки
+        """
+        walls = list(walls)
+        self.batches += 1
+        if len(walls) > 1:
+            self.multi_tool_batches += 1
+        self.max_batch_size = max(self.max_batch_size, len(walls))
+        self.sequential_ms += sum(wall for _, wall in walls)
+        self.critical_path_ms += critical_path_ms
+        self.critical_path_samples.append(critical_path_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        tools = {}
+        for name, stats in sorted(self.tools.items()):
+            tools[name] = {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "timeouts": stats["timeouts"],
+                "avg_ms": round(stats["total_ms"] / stats["calls"], 1) if stats["calls"] else 0.0,
+                "p50_ms": round(percentile(stats["samples"], 50), 1),
+                "p95_ms": round(percentile(stats["samples"], 95), 1),
+                "max_ms": round(stats["max_ms"], 1)
+            }
+        return {
+            "batches": self.batches,
+            "multi_tool_batches": self.multi_tool_batches,
+            "max_batch_size": self.max_batch_size,
+            "critical_path_p50_ms": round(percentile(self.critical_path_samples, 50), 1),
+            "critical_path_p95_ms": round(percentile(self.critical_path_samples, 95), 1),
+            # Сколько времени сэкономило параллельное выполнение по сравнению с последовательным
+            "parallel_saved_ms": round(max(0.0, self.sequential_ms - self.critical_path_ms), 1),
+            "tools": tools
+        }
+
+
+# Глобальный экземпляр
+tool_call_stats = ToolCallStats()
+
+
+def get_tool_call_stats() -> Dict[str, Any]:
+    """Метрики выполнения инструментов"""
+    return tool_call_stats.get_stats()
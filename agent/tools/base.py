@@ -7,6 +7,7 @@ from pydantic import BaseModel
 import logging
 
 from ..core.models import BaseToolParams, ToolResponse, ToolType
+from .renderers import render_tool_result
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,8 @@ class ToolMetadata(BaseModel):
     author: str = "Intelligent Agent"
     requires_confirmation: bool = False
     estimated_time: Optional[str] = None
+    # Renderer результата (agent/tools/renderers.py): ответ без второго запроса к LLM
+    renderer: Optional[str] = None
     
     class Config:
         arbitrary_types_allowed = True
@@ -118,6 +121,18 @@ class BaseTool(ABC):
                 metadata={"tool_name": self.metadata.name}
             )
     
+    def render(self, response: ToolResponse) -> Optional[str]:
+        """
+        Готовый ответ пользователю без второго запроса к LLM
+        
+        Args:
+            response: Результат выполнения инструмента
+            
+        Returns:
+            Текст ответа или None, если результат должна сформулировать LLM
+        """
+        return render_tool_result(self.metadata.renderer, response)
+    
     def get_confirmation_message(self, params: BaseToolParams) -> Optional[str]:
         """
         Возвращает сообщение для подтверждения действия
@@ -20,7 +20,8 @@ class EchoTool(BaseTool):
             name="echo_tool",
             description="Простой инструмент для тестирования, который возвращает эхо сообщения",
             version="1.0.0",
-            requires_confirmation=False
+            requires_confirmation=False,
+            renderer="echo"
         )
     
     def get_openai_schema(self) -> Dict[str, Any]:
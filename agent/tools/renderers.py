@@ -0,0 +1,189 @@
+"""
+Прямой вывод результатов инструментов без второго запроса к LLM
+
+После вызова инструмента агент отправляет результат обратно в OpenAI,
+чтобы модель сформулировала ответ. Для части инструментов результат
+уже готов для пользователя: список приложений MCP форматирует
+ClaudeCodeService, эхо возвращает текст, статистику YouTube видео
+форматирует TelegramFormatter. Такие инструменты объявляют renderer в
+ToolMetadata, и ответ собирается локально - без второй completion.
+
+Renderer возвращает None, если результат не подходит для прямого вывода
+(ошибка, сырой JSON, субтитры, которые нужно пересказать) - тогда агент
+делает обычный второй запрос к LLM.
+"""
+import logging
+from typing import Dict, Any, Optional, Callable
+
+from ..core.models import ToolResponse
+
+# Форматтеры бота доступны, когда агент работает внутри бота
+try:
+    from bot.formatters.mcp_formatter import MCPFormatter
+    from bot.formatters.telegram_formatter import TelegramFormatter
+except (ImportError, ValueError):
+    MCPFormatter = None
+    TelegramFormatter = None
+
+logger = logging.getLogger(__name__)
+
+# Ответ ClaudeCodeService, когда MCP не вернул текста
+MCP_EMPTY_RESPONSE = "Команда выполнена"
+
+
+def render_echo(data: Dict[str, Any]) -> Optional[str]:
+    """Эхо - текст как есть"""
+    return data.get("echo") or None
+
+
+def render_mcp(data: Dict[str, Any]) -> Optional[str]:
+    """Ответ MCP, уже отформатированный ClaudeCodeService, или MCPFormatter"""
+    response = data.get("response")
+    if isinstance(response, str) and response.strip() and response != MCP_EMPTY_RESPONSE:
+        return response
+
+    mcp_response = data.get("mcp_response")
+    if not mcp_response or MCPFormatter is None:
+        return None
+    if isinstance(mcp_response, dict) and not any(
+        key in mcp_response for key in ("message", "content", "apps", "servers")
+    ):
+        # Сырой JSON пользователю не показываем - пусть его объяснит LLM
+        return None
+    return MCPFormatter().format_mcp_response(mcp_response, "MCP")
+
+
+def render_youtube(data: Dict[str, Any]) -> Optional[str]:
+    """Статистика YouTube видео через TelegramFormatter (простой текст - ответ уходит без parse_mode)"""
+    metadata = data.get("metadata")
+    if not metadata or TelegramFormatter is None:
+        return None
+    if (data.get("subtitles") or {}).get("text"):
+        # Текст субтитров нужно пересказать - это работа для LLM
+        return None
+
+    statistics = metadata.get("statistics") or {}
+    return TelegramFormatter.format_youtube_video_plain({
+        "title": metadata.get("title"),
+        "channel": metadata.get("channel"),
+        "views": statistics.get("views", 0),
+        "likes": statistics.get("likes", 0),
+        "comments": statistics.get("comments", 0),
+        "duration": metadata.get("duration"),
+        "published_at": metadata.get("published_at") or "",
+        "url": data.get("url", "")
+    })
+
+
+# Доступные renderer'ы (значение ToolMetadata.renderer)
+RENDERERS: Dict[str, Callable[[Dict[str, Any]], Optional[str]]] = {
+    "echo": render_echo,
+    "mcp": render_mcp,
+    "youtube": render_youtube
+}
+
+
+def render_tool_result(renderer: Optional[str], response: ToolResponse) -> Optional[str]:
+    """
+    Готовый ответ пользователю из результата инструмента
+
+    Args:
+        renderer: Имя renderer'а (None - инструмент не поддерживает прямой вывод)
+        response: Результат инструмента
+
+    Returns:
+        Optional[str]: Текст ответа или None, если нужен второй запрос к LLM
+    """
+    render = RENDERERS.get(renderer) if renderer else None
+    if render is None or not response.success or not isinstance(response.data, dict):
+        return None
+    try:
+        text = render(response.data)
+    except Exception as e:
+        logger.warning(f"⚠️ Ошибка прямого вывода ({renderer}): {e}")
+        return None
+    return text if text and text.strip() else None
+
+
+class DirectRenderStats:
+    """Метрики прямого вывода по инструментам"""
+
+    def __init__(self):
+        self.tools: Dict[str, Dict[str, float]] = {}
+
+    def _tool(self, tool: str) -> Dict[str, float]:
+        stats = self.tools.get(tool)
+        if stats is None:
+            stats = self.tools[tool] = {
+                "direct_renders": 0,
+                "llm_renders": 0,
+                "llm_latency_ms": 0.0,
+                "llm_tokens": 0,
+                "latency_saved_ms": 0.0,
+                "tokens_saved": 0
+            }
+        return stats
+
+    def record_llm_render(self, tool: str, latency_ms: float, tokens: int):
+        """Второй запрос к LLM выполнен (его стоимость - база для оценки экономии)"""
+        stats = self._tool(tool)
+        stats["llm_renders"] += 1
+        stats["llm_latency_ms"] += latency_ms
+        stats["llm_tokens"] += tokens
+
+    def record_direct_render(self, tool: str, tokens_saved: int) -> float:
+        """
+        Ответ собран без LLM
+
+        Args:
+            tool: Имя инструмента
+            tokens_saved: Оценка токенов несостоявшегося запроса
+
+        Returns:
+            float: Оценка сэкономленной задержки (средняя длительность второго
+            запроса для этого инструмента, иначе - по всем инструментам)
+        """
+        stats = self._tool(tool)
+        latency_saved = self._average_llm_latency(tool)
+        stats["direct_renders"] += 1
+        stats["latency_saved_ms"] += latency_saved
+        stats["tokens_saved"] += tokens_saved
+        return latency_saved
+
+    def _average_llm_latency(self, tool: str) -> float:
+        stats = self.tools[tool]
+        if stats["llm_renders"]:
+            return stats["llm_latency_ms"] / stats["llm_renders"]
+        renders = sum(item["llm_renders"] for item in self.tools.values())
+        if renders:
+            return sum(item["llm_latency_ms"] for item in self.tools.values()) / renders
+        return 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        tools = {}
+        for tool, stats in sorted(self.tools.items()):
+            calls = stats["direct_renders"] + stats["llm_renders"]
+            tools[tool] = {
+                "direct_renders": stats["direct_renders"],
+                "llm_renders": stats["llm_renders"],
+                "direct_ratio": round(stats["direct_renders"] / calls, 3) if calls else 0.0,
+                "llm_avg_ms": round(stats["llm_latency_ms"] / stats["llm_renders"], 1) if stats["llm_renders"] else 0.0,
+                "latency_saved_ms": round(stats["latency_saved_ms"], 1),
+                "tokens_saved": stats["tokens_saved"]
+            }
+        return {
+            "direct_renders": sum(item["direct_renders"] for item in tools.values()),
+            "llm_renders": sum(item["llm_renders"] for item in tools.values()),
+            "latency_saved_ms": round(sum(item["latency_saved_ms"] for item in tools.values()), 1),
+            "tokens_saved": sum(item["tokens_saved"] for item in tools.values()),
+            "tools": tools
+        }
+
+
+# Глобальный экземпляр
+direct_render_stats = DirectRenderStats()
+
+
+def get_direct_render_stats() -> Dict[str, Any]:
+    """Метрики прямого вывода результатов инструментов"""
+    return direct_render_stats.get_stats()
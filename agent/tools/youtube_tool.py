@@ -12,6 +12,18 @@ from pathlib import Path
 from .base import BaseTool, ToolMetadata
 from ..core.models import BaseToolParams, ToolResponse, YouTubeAnalysisParams, ToolType
 
+# Одинаковые одновременные запросы к YouTube API объединяются, когда агент работает внутри бота
+# (bot.core импортирует конфигурацию, которая без окружения бота падает с ValueError)
+try:
+    from bot.core.single_flight import single_flight
+except (ImportError, ValueError):
+    def single_flight(name, key):
+        return lambda func: func
+
+
+def _analysis_key(self, video_id: str, params: YouTubeAnalysisParams):
+    return (video_id, params.include_metadata, params.extract_subtitles, params.subtitle_language)
+
 
 class YouTubeAnalyzerTool(BaseTool):
     """Инструмент для анализа YouTube видео"""
@@ -37,7 +49,8 @@ class YouTubeAnalyzerTool(BaseTool):
             description="Анализирует YouTube видео: извлекает информацию, субтитры и метаданные",
             version="1.0.0",
             requires_confirmation=False,
-            estimated_time="5-15 секунд"
+            estimated_time="5-15 секунд",
+            renderer="youtube"
         )
     
     def get_openai_schema(self) -> Dict[str, Any]:
@@ -133,6 +146,7 @@ class YouTubeAnalyzerTool(BaseTool):
         
         return None
     
+    @single_flight("youtube_video", key=_analysis_key)
     async def _analyze_with_api(self, video_id: str, params: YouTubeAnalysisParams) -> ToolResponse:
         """Реальный анализ через YouTube Data API"""
         async with aiohttp.ClientSession() as session:
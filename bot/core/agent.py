@@ -13,9 +13,14 @@ from .interfaces import (
 )
 from .config import config
 from .decorators import measure_time, handle_errors
+from .logging import request_stage
 from ..services.memory_manager import ZepMemoryManager, InMemoryManager
+from ..services.tiered_memory import TieredMemoryManager
+from ..services.sqlite_memory import SqliteMemoryManager
 from ..services.response_generator import HybridResponseGenerator, SimpleResponseGenerator
-from ..services.intent_detector import IntentDetector
+from ..services.intent_detector import intent_detector
+from ..services.response_cache import response_cache, instructions_version
+from ..services.quick_replies import quick_replies
 
 
 logger = logging.getLogger(__name__)
@@ -31,6 +36,11 @@ class ArtemAgent:
         # Инициализируем менеджер памяти
         if config.zep.enabled:
             self.memory_manager = ZepMemoryManager()
+            if config.memory_tier.enabled:
+                self.memory_manager = TieredMemoryManager(self.memory_manager)
+        elif config.memory_store.backend == "sqlite":
+            logger.warning("⚠️ Zep отключен, используем SQLite хранилище")
+            self.memory_manager = SqliteMemoryManager()
         else:
             logger.warning("⚠️ Zep отключен, используем InMemory хранилище")
             self.memory_manager = InMemoryManager()
@@ -43,11 +53,19 @@ class ArtemAgent:
             self.response_generator = SimpleResponseGenerator()
         
         # Инициализируем детектор намерений
-        self.intent_detector = IntentDetector()
+        self.intent_detector = intent_detector
         
         # Загружаем инструкции
         self.instructions = self._load_instructions()
         
+        # Семантический кеш ответов (только перед AI генератором)
+        self.response_cache = response_cache if (
+            response_cache.enabled and isinstance(self.response_generator, HybridResponseGenerator)
+        ) else None
+        
+        # Шаблонные ответы на тривиальные сообщения
+        self.quick_replies = quick_replies if quick_replies.enabled else None
+        
         logger.info("✅ Artem Agent инициализирован")
     
     @measure_time
@@ -63,21 +81,42 @@ class ArtemAgent:
         """
         try:
             # Определяем намерение
-            intent = await self.intent_detector.detect(message)
-            logger.debug(f"🎯 Намерение: {intent['type']} (уверенность: {intent['confidence']})")
+            with request_stage("intent"):
+                intent = await self.intent_detector.detect(message)
+            logger.debug("🎯 Намерение: %s (уверенность: %s)", intent['type'], intent['confidence'])
+            
+            # Приветствие, благодарность, прощание - ответ по шаблону без памяти и LLM
+            if self.quick_replies is not None:
+                response = self.quick_replies.reply(message, intent, self.instructions)
+                if response is not None:
+                    return response
             
             # Получаем контекст разговора
-            context = await self.memory_manager.get_context(message.user.id)
+            with request_stage("memory_context"):
+                context = await self.memory_manager.get_context(message.user.id)
+            
+            # Ищем готовый ответ на такой же вопрос
+            cache_key = None
+            response = None
+            if self.response_cache is not None:
+                with request_stage("response_cache"):
+                    cache_key = self.response_cache.make_key(message, context, intent)
+                    response = self.response_cache.get(cache_key, self.instructions_version)
             
             # Генерируем ответ
-            response = await self.response_generator.generate(message, context)
+            if response is None:
+                with request_stage("llm"):
+                    response = await self.response_generator.generate(message, context)
+                if cache_key is not None:
+                    self.response_cache.put(cache_key, response, self.instructions_version, message.user, context)
             
             # Сохраняем в память
-            await self.memory_manager.add_message(
-                user_id=message.user.id,
-                message=message,
-                response=response
-            )
+            with request_stage("memory_save"):
+                await self.memory_manager.add_message(
+                    user_id=message.user.id,
+                    message=message,
+                    response=response
+                )
             
             # Добавляем метаданные об обработке
             response.metadata = response.metadata or {}
@@ -141,6 +180,8 @@ class ArtemAgent:
             "memory_manager": type(self.memory_manager).__name__,
             "response_generator": type(self.response_generator).__name__,
             "intent_detector": type(self.intent_detector).__name__,
+            "response_cache": self.response_cache is not None,
+            "quick_replies": self.quick_replies is not None,
             "services": {
                 "openai": config.openai.enabled,
                 "anthropic": config.anthropic.enabled,
@@ -169,6 +210,7 @@ class ArtemAgent:
         }
         
         instructions = FileUtils.safe_json_load(instruction_file, default_instructions)
+        self.instructions_version = instructions_version(instructions)
         logger.info(f"📝 Загружены инструкции агента из {instruction_file}")
         
         return instructions
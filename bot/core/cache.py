@@ -0,0 +1,304 @@
+"""
+Асинхронный кеш с ограничением размера и TTL
+
+Заменяет CacheUtils.ttl_cache и memoize:
+- ttl_cache никогда не удалял записи (кеш рос бесконечно), ключ - md5 от
+  json с self внутри, инвалидации не было, поэтому ZepMemoryManager
+  отдавал контекст до 60 с устаревшим сразу после add_message;
+- memoize строил ключ через str(args) и вытеснял записи list.pop(0) за O(n).
+
+AsyncCache:
+- LRU на OrderedDict (вытеснение за O(1)) + TTL для каждой записи;
+- инвалидация по ключу и по префиксу ключа (ключи - кортежи, например
+  (user_id, limit) - префикс (user_id,) сбрасывает все лимиты пользователя);
+- заполнение через single-flight: одинаковые одновременные промахи
+  выполняют один вызов; результат вызова, начатого до инвалидации, не
+  сохраняется;
+- опциональное negative caching: "пустые" результаты (не найдено, ошибка)
+  хранятся меньше (negative_ttl) или не хранятся вовсе;
+- метрики попаданий, промахов, вытеснений и инвалидаций.
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Any, Optional, Callable, Hashable, Awaitable, Tuple
+
+from .single_flight import get_flight_group
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def make_key(args: tuple, kwargs: Dict[str, Any]) -> Hashable:
+    """Хешируемый ключ из аргументов вызова (словари и списки - как кортежи)"""
+    return (_freeze(args), _freeze(kwargs)) if kwargs else _freeze(args)
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class AsyncCache:
+    """LRU кеш с TTL, инвалидацией и single-flight заполнением"""
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int = 1024,
+        ttl: Optional[float] = 300.0,
+        negative_ttl: Optional[float] = None,
+        is_negative: Optional[Callable[[Any], bool]] = None
+    ):
+        """
+        Args:
+            name: Имя кеша (для метрик и группы single-flight)
+            max_size: Максимум записей (дальше вытесняются давно не использованные)
+            ttl: Время жизни записи в секундах (None - без ограничения)
+            negative_ttl: Время жизни "пустого" результата (None - не кешировать)
+            is_negative: Признак "пустого" результата (по умолчанию None или пустая коллекция)
+        """
+        self.name = name
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.is_negative = is_negative or _is_empty
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._flight = get_flight_group(name)
+        # Увеличивается при инвалидации: заполнения, начатые раньше, не сохраняются
+        self._epoch = 0
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "fills": 0,
+            "negative_stored": 0,
+            "stale_fills_dropped": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    # ------------------------------------------------------------------
+    # Чтение и запись
+    # ------------------------------------------------------------------
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Значение из кеша или default"""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any):
+        """Сохраняет значение (TTL выбирается по is_negative)"""
+        if self.is_negative(value):
+            if self.negative_ttl is None:
+                return
+            ttl = self.negative_ttl
+            self.stats["negative_stored"] += 1
+        else:
+            ttl = self.ttl
+
+        self._entries[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_or_fill(self, key: Hashable, fill: Callable[[], Awaitable[Any]]) -> Any:
+        """Значение из кеша; при промахе - один вызов fill на всех ожидающих"""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        return await self._flight.do(key, self._fill, key, fill)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Синхронный вариант get_or_fill"""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        self.stats["fills"] += 1
+        self.set(key, value)
+        return value
+
+    async def _fill(self, key: Hashable, fill: Callable[[], Awaitable[Any]]) -> Any:
+        epoch = self._epoch
+        value = await fill()
+        self.stats["fills"] += 1
+        if epoch == self._epoch:
+            self.set(key, value)
+        else:
+            # Данные изменились, пока шел вызов - результат отдаем, но не кешируем
+            self.stats["stale_fills_dropped"] += 1
+        return value
+
+    def _lookup(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return _MISSING
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return _MISSING
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    # ------------------------------------------------------------------
+    # Инвалидация
+    # ------------------------------------------------------------------
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Удаляет запись; идущее заполнение этого ключа не сохранится"""
+        self._epoch += 1
+        self._flight.forget(key)
+        self.stats["invalidations"] += 1
+        return self._entries.pop(key, _MISSING) is not _MISSING
+
+    def invalidate_prefix(self, prefix: Hashable) -> int:
+        """
+        Удаляет записи, ключ которых начинается с prefix
+
+        Для кортежей - по первым элементам ((user_id,) для (user_id, limit)),
+        для строк - по началу строки.
+        """
+        matches = _prefix_matcher(prefix)
+        self._epoch += 1
+        self._flight.forget_matching(matches)
+        keys = [key for key in self._entries if matches(key)]
+        for key in keys:
+            del self._entries[key]
+        self.stats["invalidations"] += 1
+        return len(keys)
+
+    def clear(self):
+        """Удаляет все записи"""
+        self._epoch += 1
+        self._flight.forget_matching(lambda key: True)
+        self._entries.clear()
+        self.stats["invalidations"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # Метрики
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            # Промахи, дождавшиеся чужого заполнения
+            "shared_fills": self._flight.stats["shared"]
+        }
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (list, dict, tuple, set, str)) and not value)
+
+
+def _prefix_matcher(prefix: Hashable) -> Callable[[Hashable], bool]:
+    if isinstance(prefix, tuple):
+        size = len(prefix)
+        return lambda key: isinstance(key, tuple) and key[:size] == prefix
+    if isinstance(prefix, str):
+        return lambda key: isinstance(key, str) and key.startswith(prefix)
+    return lambda key: key == prefix
+
+
+# Кеши процесса
+_caches: Dict[str, AsyncCache] = {}
+
+
+def get_cache(name: str, **settings) -> AsyncCache:
+    """Возвращает кеш по имени (создает с settings при первом обращении)"""
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches[name] = AsyncCache(name, **settings)
+    return cache
+
+
+def cached(
+    name: str,
+    ttl: Optional[float] = 300.0,
+    max_size: int = 1024,
+    key: Optional[Callable[..., Optional[Hashable]]] = None,
+    negative_ttl: Optional[float] = None,
+    is_negative: Optional[Callable[[Any], bool]] = None
+):
+    """
+    Декоратор: результат функции в кеше name
+
+    Args:
+        name: Имя кеша
+        ttl: Время жизни записи в секундах
+        max_size: Максимум записей
+        key: Функция от аргументов вызова, возвращающая ключ (None - без кеша);
+             по умолчанию - все аргументы (для методов лучше задать без self)
+        negative_ttl: Время жизни "пустого" результата (None - не кешировать)
+        is_negative: Признак "пустого" результата
+
+    У обертки есть атрибут cache (AsyncCache) для инвалидации.
+    """
+    cache = get_cache(name, max_size=max_size, ttl=ttl, negative_ttl=negative_ttl, is_negative=is_negative)
+    key_func = key or (lambda *args, **kwargs: make_key(args, kwargs))
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                call_key = key_func(*args, **kwargs)
+                if call_key is None:
+                    return await func(*args, **kwargs)
+                return await cache.get_or_fill(call_key, lambda: func(*args, **kwargs))
+
+            async_wrapper.cache = cache
+            return async_wrapper
+
+        @wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            call_key = key_func(*args, **kwargs)
+            if call_key is None:
+                return func(*args, **kwargs)
+            return cache.get_or_compute(call_key, lambda: func(*args, **kwargs))
+
+        sync_wrapper.cache = cache
+        return sync_wrapper
+    return decorator
+
+
+def clear_all_caches() -> int:
+    """Очищает все кеши процесса; возвращает число удаленных записей"""
+    removed = 0
+    for cache in _caches.values():
+        removed += len(cache)
+        cache.clear()
+    return removed
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Метрики всех кешей"""
+    return {name: cache.get_stats() for name, cache in sorted(_caches.items())}
@@ -7,7 +7,7 @@
 import os
 import sys
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
@@ -41,6 +41,10 @@ class TelegramConfig:
     bot_id: int
     bot_username: str
     webhook_url: Optional[str] = None
+    # Лимиты исходящих сообщений (см. bot/send_scheduler.py)
+    global_rate_limit: float = 30.0
+    chat_rate_limit: float = 1.0
+    group_rate_limit_per_minute: float = 20.0
     
     @classmethod
     def from_env(cls) -> 'TelegramConfig':
@@ -69,7 +73,10 @@ class TelegramConfig:
             token=token,
             bot_id=bot_id,
             bot_username=os.getenv('BOT_USERNAME', 'artem_integrator_bot'),
-            webhook_url=os.getenv('WEBHOOK_URL')
+            webhook_url=os.getenv('WEBHOOK_URL'),
+            global_rate_limit=float(os.getenv('TELEGRAM_GLOBAL_RATE_LIMIT', '30')),
+            chat_rate_limit=float(os.getenv('TELEGRAM_CHAT_RATE_LIMIT', '1')),
+            group_rate_limit_per_minute=float(os.getenv('TELEGRAM_GROUP_RATE_LIMIT_PER_MINUTE', '20'))
         )
 
 
@@ -145,6 +152,196 @@ class AnthropicConfig:
         )
 
 
+@dataclass
+class LLMHttpConfig:
+    """Общий пул HTTP соединений для клиентов OpenAI и Anthropic"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = True
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+    
+    @classmethod
+    def from_env(cls) -> 'LLMHttpConfig':
+        """Создает конфигурацию из переменных окружения"""
+        return cls(
+            max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '100')),
+            max_keepalive_connections=int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', '20')),
+            keepalive_expiry=float(os.getenv('LLM_KEEPALIVE_EXPIRY', '60')),
+            http2=os.getenv('LLM_HTTP2', 'true').lower() == 'true',
+            timeout=float(os.getenv('LLM_TIMEOUT', '60')),
+            connect_timeout=float(os.getenv('LLM_CONNECT_TIMEOUT', '10'))
+        )
+
+
+@dataclass
+class StreamingConfig:
+    """Потоковая отправка ответов LLM (первое сообщение + редактирование)"""
+    enabled: bool = False
+    first_chars: int = 10
+    edit_interval: float = 1.5
+    min_chars: int = 40
+    
+    @classmethod
+    def from_env(cls) -> 'StreamingConfig':
+        """Создает конфигурацию из переменных окружения"""
+        return cls(
+            enabled=os.getenv('LLM_STREAMING', 'false').lower() == 'true',
+            first_chars=int(os.getenv('LLM_STREAMING_FIRST_CHARS', '10')),
+            edit_interval=float(os.getenv('LLM_STREAMING_EDIT_INTERVAL', '1.5')),
+            min_chars=int(os.getenv('LLM_STREAMING_MIN_CHARS', '40'))
+        )
+
+
+@dataclass
+class ContextConfig:
+    """Упаковка контекста разговора в бюджет токенов"""
+    enabled: bool = True
+    history_tokens: int = 2000
+    turn_max_tokens: int = 600
+    model_budgets: Dict[str, int] = field(default_factory=dict)
+    
+    @classmethod
+    def from_env(cls) -> 'ContextConfig':
+        """Создает конфигурацию из переменных окружения"""
+        # Формат CONTEXT_MODEL_BUDGETS: "gpt-4o=4000,claude-3-5-sonnet=6000"
+        model_budgets = {}
+        for item in os.getenv('CONTEXT_MODEL_BUDGETS', '').split(','):
+            model, _, budget = item.partition('=')
+            if model.strip() and budget.strip().isdigit():
+                model_budgets[model.strip()] = int(budget)
+        return cls(
+            enabled=os.getenv('CONTEXT_PACKING', 'true').lower() == 'true',
+            history_tokens=int(os.getenv('CONTEXT_HISTORY_TOKENS', '2000')),
+            turn_max_tokens=int(os.getenv('CONTEXT_TURN_MAX_TOKENS', '600')),
+            model_budgets=model_budgets
+        )
+
+
+@dataclass
+class ResponseCacheConfig:
+    """Семантический кеш ответов основного агента"""
+    enabled: bool = False
+    threshold: float = 0.85
+    max_entries: int = 1000
+    ttl: int = 86400
+    max_chars: int = 200
+    
+    @classmethod
+    def from_env(cls) -> 'ResponseCacheConfig':
+        """Создает конфигурацию из переменных окружения"""
+        return cls(
+            enabled=os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true',
+            threshold=float(os.getenv('RESPONSE_CACHE_THRESHOLD', '0.85')),
+            max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000')),
+            ttl=int(os.getenv('RESPONSE_CACHE_TTL', '86400')),
+            max_chars=int(os.getenv('RESPONSE_CACHE_MAX_CHARS', '200'))
+        )
+
+
+@dataclass
+class QuickReplyConfig:
+    """Ответы по шаблонам на тривиальные сообщения (без памяти и LLM)"""
+    enabled: bool = False
+    intents: List[str] = field(default_factory=lambda: ["greeting", "gratitude", "farewell", "help"])
+    min_confidence: float = 0.9
+    max_extra_words: int = 1
+    personalize: bool = True
+    
+    @classmethod
+    def from_env(cls) -> 'QuickReplyConfig':
+        """Создает конфигурацию из переменных окружения"""
+        # Формат QUICK_REPLIES_INTENTS: "greeting,gratitude,farewell,help"
+        intents = os.getenv('QUICK_REPLIES_INTENTS', 'greeting,gratitude,farewell,help')
+        return cls(
+            enabled=os.getenv('QUICK_REPLIES_ENABLED', 'false').lower() == 'true',
+            intents=[intent.strip() for intent in intents.split(',') if intent.strip()],
+            min_confidence=float(os.getenv('QUICK_REPLIES_MIN_CONFIDENCE', '0.9')),
+            max_extra_words=int(os.getenv('QUICK_REPLIES_MAX_EXTRA_WORDS', '1')),
+            personalize=os.getenv('QUICK_REPLIES_PERSONALIZE', 'true').lower() == 'true'
+        )
+
+
+@dataclass
+class DirectRenderConfig:
+    """Ответ готовым результатом инструмента без второго запроса к LLM"""
+    enabled: bool = True
+    exclude: List[str] = field(default_factory=list)
+    
+    @classmethod
+    def from_env(cls) -> 'DirectRenderConfig':
+        """Создает конфигурацию из переменных окружения"""
+        # Формат AGENT_DIRECT_RENDER_EXCLUDE: "claude_code_direct,echo_tool"
+        exclude = [name.strip() for name in os.getenv('AGENT_DIRECT_RENDER_EXCLUDE', '').split(',') if name.strip()]
+        return cls(
+            enabled=os.getenv('AGENT_DIRECT_RENDER', 'true').lower() == 'true',
+            exclude=exclude
+        )
+
+
+@dataclass
+class ToolCallConfig:
+    """Параллельное выполнение инструментов агента"""
+    timeout: float = 30.0
+    timeouts: Dict[str, float] = field(default_factory=dict)
+    
+    @classmethod
+    def from_env(cls) -> 'ToolCallConfig':
+        """Создает конфигурацию из переменных окружения"""
+        # Формат AGENT_TOOL_TIMEOUTS: "claude_code_direct=90,analyze_youtube_video=20"
+        timeouts = {}
+        for item in os.getenv('AGENT_TOOL_TIMEOUTS', '').split(','):
+            name, _, timeout = item.partition('=')
+            try:
+                timeouts[name.strip()] = float(timeout)
+            except ValueError:
+                continue
+        return cls(
+            timeout=float(os.getenv('AGENT_TOOL_TIMEOUT', '30')),
+            timeouts=timeouts
+        )
+
+
+@dataclass
+class ModelCascadeConfig:
+    """Каскад моделей админского агента: быстрая модель, большая - по эскалации"""
+    enabled: bool = False
+    fast_model: str = "gpt-4o-mini"
+    strong_model: str = "gpt-4o"
+    min_confidence: float = 0.7
+    max_fast_chars: int = 400
+    local_tools: bool = True
+    # Цены за 1M токенов: модель -> (вход, выход), USD
+    prices: Dict[str, Tuple[float, float]] = field(default_factory=lambda: {
+        "gpt-4o": (2.5, 10.0),
+        "gpt-4o-mini": (0.15, 0.6)
+    })
+    
+    @classmethod
+    def from_env(cls) -> 'ModelCascadeConfig':
+        """Создает конфигурацию из переменных окружения"""
+        settings = cls()
+        # Формат AGENT_MODEL_PRICES: "gpt-4o=2.5/10,gpt-4o-mini=0.15/0.6"
+        prices = dict(settings.prices)
+        for item in os.getenv('AGENT_MODEL_PRICES', '').split(','):
+            model, _, price = item.partition('=')
+            input_price, _, output_price = price.partition('/')
+            try:
+                prices[model.strip()] = (float(input_price), float(output_price))
+            except ValueError:
+                continue
+        return cls(
+            enabled=os.getenv('AGENT_CASCADE_ENABLED', 'false').lower() == 'true',
+            fast_model=os.getenv('AGENT_FAST_MODEL', settings.fast_model),
+            strong_model=os.getenv('AGENT_STRONG_MODEL', settings.strong_model),
+            min_confidence=float(os.getenv('AGENT_CASCADE_MIN_CONFIDENCE', '0.7')),
+            max_fast_chars=int(os.getenv('AGENT_CASCADE_MAX_FAST_CHARS', '400')),
+            local_tools=os.getenv('AGENT_CASCADE_LOCAL_TOOLS', 'true').lower() == 'true',
+            prices=prices
+        )
+
+
 @dataclass
 class ZepConfig:
     """Конфигурация Zep памяти"""
@@ -163,14 +360,107 @@ class ZepConfig:
         )
 
 
+@dataclass
+class MemoryWriteConfig:
+    """Отложенная (write-behind) запись разговоров в Zep"""
+    enabled: bool = True
+    flush_interval: float = 1.0
+    max_batch_messages: int = 30
+    max_queue_messages: int = 5000
+    max_attempts: int = 5
+    
+    @classmethod
+    def from_env(cls) -> 'MemoryWriteConfig':
+        """Создает конфигурацию из переменных окружения"""
+        return cls(
+            enabled=os.getenv('ZEP_WRITE_BEHIND', 'true').lower() == 'true',
+            flush_interval=float(os.getenv('ZEP_WRITE_FLUSH_INTERVAL', '1.0')),
+            max_batch_messages=int(os.getenv('ZEP_WRITE_MAX_BATCH', '30')),
+            max_queue_messages=int(os.getenv('ZEP_WRITE_MAX_QUEUE', '5000')),
+            max_attempts=int(os.getenv('ZEP_WRITE_MAX_ATTEMPTS', '5'))
+        )
+
+
+@dataclass
+class MemoryTierConfig:
+    """Локальный горячий уровень контекста перед Zep"""
+    enabled: bool = True
+    # Последних сообщений на пользователя (больший limit читается из Zep)
+    max_messages: int = 50
+    # Пользователей в горячем уровне (дальше вытесняются давно не писавшие)
+    max_users: int = 10000
+    
+    @classmethod
+    def from_env(cls) -> 'MemoryTierConfig':
+        """Создает конфигурацию из переменных окружения"""
+        return cls(
+            enabled=os.getenv('MEMORY_HOT_TIER', 'true').lower() == 'true',
+            max_messages=int(os.getenv('MEMORY_HOT_MAX_MESSAGES', '50')),
+            max_users=int(os.getenv('MEMORY_HOT_MAX_USERS', '10000'))
+        )
+
+
+@dataclass
+class MemoryStoreConfig:
+    """Локальное хранилище памяти, когда Zep отключен"""
+    # sqlite - постоянное хранилище, memory - InMemoryManager (теряется при рестарте)
+    backend: str = "sqlite"
+    # Путь к SQLite файлу (пусто - data/memory.db)
+    path: str = ""
+    max_messages_per_user: int = 1000
+    # Удалять реплики старше N дней (0 - без ограничения)
+    retention_days: int = 0
+    # InMemoryManager: общий бюджет на всех пользователей (0 - без ограничения),
+    # при превышении вытесняются давно неактивные пользователи
+    inmemory_max_turns: int = 200000
+    inmemory_max_bytes: int = 64 * 1024 * 1024
+    
+    @classmethod
+    def from_env(cls) -> 'MemoryStoreConfig':
+        """Создает конфигурацию из переменных окружения"""
+        return cls(
+            backend=os.getenv('MEMORY_BACKEND', 'sqlite').lower(),
+            path=os.getenv('MEMORY_DB_PATH', ''),
+            max_messages_per_user=int(os.getenv('MEMORY_MAX_MESSAGES_PER_USER', '1000')),
+            retention_days=int(os.getenv('MEMORY_RETENTION_DAYS', '0')),
+            inmemory_max_turns=int(os.getenv('MEMORY_INMEMORY_MAX_TURNS', '200000')),
+            inmemory_max_bytes=int(os.getenv('MEMORY_INMEMORY_MAX_BYTES', str(64 * 1024 * 1024)))
+        )
+
+
 @dataclass
 class WebhookConfig:
     """Конфигурация webhook"""
     base_url: str = ""
     secret_token: str = ""
+    # Проверять X-Telegram-Bot-Api-Secret-Token на входящих updates
+    verify_secret: bool = True
     auto_setup: bool = True
     allowed_updates: List[str] = None
     max_connections: int = 40
+    # Источник updates: webhook или polling (getUpdates)
+    ingestion_mode: str = "webhook"
+    polling_limit: int = 100
+    polling_timeout: int = 30
+    # Режим обработки: sync - ответ после обработки, queue - быстрый 200 OK и фоновая очередь
+    processing_mode: str = "sync"
+    queue_max_size: int = 1000
+    queue_workers: int = 8
+    queue_overflow_policy: str = "reject"
+    queue_spill_path: str = ""
+    # Диспетчер: порядок обработки внутри чата, параллельность между чатами
+    dispatcher_enabled: bool = True
+    dispatcher_max_concurrency: int = 32
+    dispatcher_max_active_keys: int = 10000
+    dispatcher_max_pending: int = 1000
+    # Дедупликация повторных доставок updates
+    dedup_enabled: bool = True
+    dedup_max_size: int = 10000
+    dedup_ttl: int = 3600
+    dedup_persist_path: str = ""
+    # Лог обработки update: доля полных дампов update и порог медленного запроса
+    request_log_sample_rate: float = 0.01
+    request_log_slow_ms: int = 3000
     
     def __post_init__(self):
         if self.allowed_updates is None:
@@ -198,10 +488,39 @@ class WebhookConfig:
         # Логируем конфигурацию для диагностики
         logger.info(f"🔧 Webhook config: base_url='{base_url}', webhook_url_env='{webhook_url}', railway_domain='{os.getenv('RAILWAY_PUBLIC_DOMAIN')}'")
         
+        secret_token = os.getenv('TELEGRAM_WEBHOOK_SECRET', '')
+        verify_secret = os.getenv('WEBHOOK_VERIFY_SECRET', 'true').lower() == 'true'
+        if verify_secret and not secret_token:
+            # Проверка с общеизвестным токеном по умолчанию ничего не защищает - отключаем ее явно
+            logger.warning(
+                "⚠️ TELEGRAM_WEBHOOK_SECRET не задан: проверка secret token ОТКЛЮЧЕНА, "
+                "webhook принимает updates от любого отправителя"
+            )
+            verify_secret = False
+        
         return cls(
             base_url=base_url,
-            secret_token=os.getenv('TELEGRAM_WEBHOOK_SECRET', 'default-secret-token'),
-            auto_setup=os.getenv('AUTO_SETUP_WEBHOOK', 'true').lower() == 'true'
+            secret_token=secret_token,
+            verify_secret=verify_secret,
+            auto_setup=os.getenv('AUTO_SETUP_WEBHOOK', 'true').lower() == 'true',
+            ingestion_mode=os.getenv('TELEGRAM_INGESTION_MODE', 'webhook').lower(),
+            polling_limit=int(os.getenv('POLLING_LIMIT', '100')),
+            polling_timeout=int(os.getenv('POLLING_TIMEOUT', '30')),
+            processing_mode=os.getenv('WEBHOOK_PROCESSING_MODE', 'sync').lower(),
+            queue_max_size=int(os.getenv('UPDATE_QUEUE_MAX_SIZE', '1000')),
+            queue_workers=int(os.getenv('UPDATE_QUEUE_WORKERS', '8')),
+            queue_overflow_policy=os.getenv('UPDATE_QUEUE_OVERFLOW', 'reject').lower(),
+            queue_spill_path=os.getenv('UPDATE_QUEUE_SPILL_PATH', ''),
+            dispatcher_enabled=os.getenv('UPDATE_DISPATCHER_ENABLED', 'true').lower() == 'true',
+            dispatcher_max_concurrency=int(os.getenv('UPDATE_DISPATCHER_CONCURRENCY', '32')),
+            dispatcher_max_active_keys=int(os.getenv('UPDATE_DISPATCHER_MAX_KEYS', '10000')),
+            dispatcher_max_pending=int(os.getenv('UPDATE_DISPATCHER_MAX_PENDING', '1000')),
+            dedup_enabled=os.getenv('UPDATE_DEDUP_ENABLED', 'true').lower() == 'true',
+            dedup_max_size=int(os.getenv('UPDATE_DEDUP_MAX_SIZE', '10000')),
+            dedup_ttl=int(os.getenv('UPDATE_DEDUP_TTL', '3600')),
+            dedup_persist_path=os.getenv('UPDATE_DEDUP_PERSIST_PATH', ''),
+            request_log_sample_rate=float(os.getenv('REQUEST_LOG_SAMPLE_RATE', '0.01')),
+            request_log_slow_ms=int(os.getenv('REQUEST_LOG_SLOW_MS', '3000'))
         )
 
 
@@ -316,10 +635,21 @@ class AppConfig:
     openai: OpenAIConfig
     anthropic: AnthropicConfig
     zep: ZepConfig
+    memory_write: MemoryWriteConfig
+    memory_tier: MemoryTierConfig
+    memory_store: MemoryStoreConfig
     webhook: WebhookConfig
     voice: VoiceConfig
     social_media: SocialMediaConfig
     mcp: MCPConfig
+    llm_http: LLMHttpConfig
+    streaming: StreamingConfig
+    response_cache: ResponseCacheConfig
+    context: ContextConfig
+    quick_replies: QuickReplyConfig
+    direct_render: DirectRenderConfig
+    tool_calls: ToolCallConfig
+    model_cascade: ModelCascadeConfig
     
     # Пути
     base_dir: Path
@@ -358,10 +688,21 @@ class AppConfig:
             openai=OpenAIConfig.from_env(),
             anthropic=AnthropicConfig.from_env(),
             zep=ZepConfig.from_env(),
+            memory_write=MemoryWriteConfig.from_env(),
+            memory_tier=MemoryTierConfig.from_env(),
+            memory_store=MemoryStoreConfig.from_env(),
             webhook=WebhookConfig.from_env(),
             voice=VoiceConfig.from_env(),
             social_media=SocialMediaConfig.from_env(),
             mcp=MCPConfig.from_env(),
+            llm_http=LLMHttpConfig.from_env(),
+            streaming=StreamingConfig.from_env(),
+            response_cache=ResponseCacheConfig.from_env(),
+            context=ContextConfig.from_env(),
+            quick_replies=QuickReplyConfig.from_env(),
+            direct_render=DirectRenderConfig.from_env(),
+            tool_calls=ToolCallConfig.from_env(),
+            model_cascade=ModelCascadeConfig.from_env(),
             base_dir=base_dir,
             data_dir=data_dir,
             logs_dir=logs_dir,
@@ -385,6 +726,9 @@ class AppConfig:
             
         if self.mcp.enabled and not (self.openai.enabled or self.anthropic.enabled):
             warnings.append("⚠️ MCP включен, но нет доступных AI провайдеров")
+        
+        if self.webhook.ingestion_mode == "webhook" and not self.webhook.verify_secret:
+            warnings.append("⚠️ Проверка secret token webhook отключена (TELEGRAM_WEBHOOK_SECRET)")
             
         return warnings
     
@@ -421,14 +765,31 @@ class AppConfig:
                 "bot_id": self.telegram.bot_id,
                 "bot_username": self.telegram.bot_username,
                 "webhook_url": self.telegram.webhook_url,
-                "token_configured": bool(self.telegram.token and self.telegram.token != 'dummy:token_for_streamlit_cloud')
+                "token_configured": bool(self.telegram.token and self.telegram.token != 'dummy:token_for_streamlit_cloud'),
+                "global_rate_limit": self.telegram.global_rate_limit,
+                "chat_rate_limit": self.telegram.chat_rate_limit,
+                "group_rate_limit_per_minute": self.telegram.group_rate_limit_per_minute
             },
             "webhook": {
                 "base_url": self.webhook.base_url,
                 "auto_setup": self.webhook.auto_setup,
                 "allowed_updates": self.webhook.allowed_updates,
                 "max_connections": self.webhook.max_connections,
-                "secret_configured": bool(self.webhook.secret_token)
+                "secret_configured": bool(self.webhook.secret_token),
+                "verify_secret": self.webhook.verify_secret,
+                "ingestion_mode": self.webhook.ingestion_mode,
+                "processing_mode": self.webhook.processing_mode,
+                "queue_max_size": self.webhook.queue_max_size,
+                "queue_workers": self.webhook.queue_workers,
+                "queue_overflow_policy": self.webhook.queue_overflow_policy,
+                "dispatcher_enabled": self.webhook.dispatcher_enabled,
+                "dispatcher_max_concurrency": self.webhook.dispatcher_max_concurrency,
+                "dispatcher_max_active_keys": self.webhook.dispatcher_max_active_keys,
+                "dedup_enabled": self.webhook.dedup_enabled,
+                "dedup_ttl": self.webhook.dedup_ttl,
+                "dedup_persistent": bool(self.webhook.dedup_persist_path),
+                "request_log_sample_rate": self.webhook.request_log_sample_rate,
+                "request_log_slow_ms": self.webhook.request_log_slow_ms
             },
             "admin": {
                 "user_ids_count": len(self.admin.user_ids),
@@ -447,6 +808,77 @@ class AppConfig:
                     "model": self.anthropic.model,
                     "api_key_configured": bool(self.anthropic.api_key)
                 },
+                "llm_http": {
+                    "max_connections": self.llm_http.max_connections,
+                    "max_keepalive_connections": self.llm_http.max_keepalive_connections,
+                    "keepalive_expiry": self.llm_http.keepalive_expiry,
+                    "http2": self.llm_http.http2,
+                    "timeout": self.llm_http.timeout,
+                    "connect_timeout": self.llm_http.connect_timeout
+                },
+                "streaming": {
+                    "enabled": self.streaming.enabled,
+                    "first_chars": self.streaming.first_chars,
+                    "edit_interval": self.streaming.edit_interval,
+                    "min_chars": self.streaming.min_chars
+                },
+                "response_cache": {
+                    "enabled": self.response_cache.enabled,
+                    "threshold": self.response_cache.threshold,
+                    "max_entries": self.response_cache.max_entries,
+                    "ttl": self.response_cache.ttl,
+                    "max_chars": self.response_cache.max_chars
+                },
+                "context": {
+                    "enabled": self.context.enabled,
+                    "history_tokens": self.context.history_tokens,
+                    "turn_max_tokens": self.context.turn_max_tokens,
+                    "model_budgets": self.context.model_budgets
+                },
+                "quick_replies": {
+                    "enabled": self.quick_replies.enabled,
+                    "intents": self.quick_replies.intents,
+                    "min_confidence": self.quick_replies.min_confidence,
+                    "max_extra_words": self.quick_replies.max_extra_words,
+                    "personalize": self.quick_replies.personalize
+                },
+                "direct_render": {
+                    "enabled": self.direct_render.enabled,
+                    "exclude": self.direct_render.exclude
+                },
+                "tool_calls": {
+                    "timeout": self.tool_calls.timeout,
+                    "timeouts": self.tool_calls.timeouts
+                },
+                "model_cascade": {
+                    "enabled": self.model_cascade.enabled,
+                    "fast_model": self.model_cascade.fast_model,
+                    "strong_model": self.model_cascade.strong_model,
+                    "min_confidence": self.model_cascade.min_confidence,
+                    "max_fast_chars": self.model_cascade.max_fast_chars,
+                    "local_tools": self.model_cascade.local_tools,
+                    "prices": self.model_cascade.prices
+                },
+                "memory_write": {
+                    "enabled": self.memory_write.enabled,
+                    "flush_interval": self.memory_write.flush_interval,
+                    "max_batch_messages": self.memory_write.max_batch_messages,
+                    "max_queue_messages": self.memory_write.max_queue_messages,
+                    "max_attempts": self.memory_write.max_attempts
+                },
+                "memory_tier": {
+                    "enabled": self.memory_tier.enabled,
+                    "max_messages": self.memory_tier.max_messages,
+                    "max_users": self.memory_tier.max_users
+                },
+                "memory_store": {
+                    "backend": self.memory_store.backend,
+                    "path": bool(self.memory_store.path),
+                    "max_messages_per_user": self.memory_store.max_messages_per_user,
+                    "retention_days": self.memory_store.retention_days,
+                    "inmemory_max_turns": self.memory_store.inmemory_max_turns,
+                    "inmemory_max_bytes": self.memory_store.inmemory_max_bytes
+                },
                 "voice": {
                     "enabled": self.voice.enabled,
                     "whisper_model": self.voice.whisper_model,
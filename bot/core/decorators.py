@@ -10,6 +10,7 @@ from typing import Callable, Optional, Any, Dict, List
 
 from .interfaces import User, UserRole, AuthorizationError, ServiceError
 from .config import config
+from .cache import cached
 
 
 logger = logging.getLogger(__name__)
@@ -273,57 +274,15 @@ def async_timeout(seconds: float):
 
 
 def memoize(maxsize: int = 128):
-    """Декоратор для мемоизации результатов функции"""
+    """Декоратор для мемоизации результатов функции (LRU на maxsize записей)"""
     def decorator(func: Callable) -> Callable:
-        cache = {}
-        cache_order = []
-        
-        @wraps(func)
-        async def async_wrapper(*args, **kwargs):
-            # Создаем ключ из аргументов
-            key = str(args) + str(sorted(kwargs.items()))
-            
-            # Проверяем кеш
-            if key in cache:
-                return cache[key]
-            
-            # Вызываем функцию
-            result = await func(*args, **kwargs)
-            
-            # Сохраняем в кеш
-            cache[key] = result
-            cache_order.append(key)
-            
-            # Очищаем старые записи если превышен размер
-            if len(cache) > maxsize:
-                oldest_key = cache_order.pop(0)
-                del cache[oldest_key]
-            
-            return result
-        
-        @wraps(func)
-        def sync_wrapper(*args, **kwargs):
-            key = str(args) + str(sorted(kwargs.items()))
-            
-            if key in cache:
-                return cache[key]
-            
-            result = func(*args, **kwargs)
-            
-            cache[key] = result
-            cache_order.append(key)
-            
-            if len(cache) > maxsize:
-                oldest_key = cache_order.pop(0)
-                del cache[oldest_key]
-            
-            return result
-        
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
-    
+        return cached(
+            f"memoize:{func.__module__}.{func.__qualname__}",
+            ttl=None,
+            max_size=maxsize,
+            is_negative=lambda result: False
+        )(func)
+
     return decorator
 
 
@@ -5,6 +5,7 @@
 from .logger import BotLogger, get_logger, setup_logging
 from .formatters import ColoredFormatter, JSONFormatter
 from .handlers import ErrorHandler, MetricsHandler
+from .request_log import RequestLog, request_stage, annotate_request, current_request_log
 
 __all__ = [
     'BotLogger',
@@ -13,5 +14,9 @@ __all__ = [
     'ColoredFormatter',
     'JSONFormatter',
     'ErrorHandler',
-    'MetricsHandler'
+    'MetricsHandler',
+    'RequestLog',
+    'request_stage',
+    'annotate_request',
+    'current_request_log'
 ]
\ No newline at end of file
@@ -74,13 +74,14 @@ class ErrorHandler(logging.Handler):
     async def _send_to_admins(self, message: str):
         """Отправляет сообщение администраторам"""
         try:
-            from ...telegram_bot import bot
+            from ...telegram_bot import send_scheduler, SendPriority
             
             for admin_id in config.admin.user_ids:
                 try:
-                    bot.send_message(
+                    await send_scheduler.send_message(
                         admin_id, 
                         message, 
+                        priority=SendPriority.NOTIFICATION,
                         parse_mode='HTML',
                         disable_notification=False
                     )
@@ -0,0 +1,154 @@
+"""
+Структурированный лог обработки update
+
+Вместо десятка INFO строк на каждое сообщение обработка update пишет одну
+запись: тип update, чат, пользователь, результат и время этапов. Полный
+update добавляется в запись только для выборки (sample_rate), а также для
+медленных и завершившихся ошибкой запросов - и сериализуется только тогда.
+"""
+
+import time
+import random
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Callable, Iterator
+
+logger = logging.getLogger("bot.requests")
+
+# Запись текущего update (доступна во всех вызовах внутри его обработки)
+_current: ContextVar[Optional["RequestLog"]] = ContextVar("request_log", default=None)
+
+
+class RequestLog:
+    """Одна структурированная запись лога на update"""
+
+    __slots__ = (
+        "fields", "stages", "sample_rate", "slow_ms",
+        "_payload", "_started_at", "_token", "_error"
+    )
+
+    def __init__(
+        self,
+        payload: Optional[Callable[[], Any]] = None,
+        sample_rate: float = 0.0,
+        slow_ms: float = 3000.0,
+        **fields
+    ):
+        """
+        Args:
+            payload: Функция, возвращающая полный update (вызывается только для дампа)
+            sample_rate: Доля запросов, для которых пишется полный update (0..1)
+            slow_ms: Порог медленного запроса в миллисекундах
+            **fields: Начальные поля записи (update_id, kind, ...)
+        """
+        self.fields: Dict[str, Any] = fields
+        self.stages: Dict[str, float] = {}
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._payload = payload
+        self._started_at = time.perf_counter()
+        self._token = None
+        self._error: Optional[BaseException] = None
+
+    def __enter__(self) -> "RequestLog":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is not None:
+            self._error = exc
+        _current.reset(self._token)
+        self.emit()
+        return False
+
+    def set(self, **fields):
+        """Добавляет поля в запись"""
+        self.fields.update(fields)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Замеряет время этапа (повторные замеры одного этапа суммируются)"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - started_at)
+
+    def add_stage(self, name: str, seconds: float):
+        """Добавляет время этапа, измеренное снаружи"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def fail(self, error: Any):
+        """Отмечает запрос как завершившийся ошибкой"""
+        self._error = error
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started_at) * 1000
+
+    def emit(self):
+        """Пишет запись (вызывается один раз по завершении обработки)"""
+        failed = self._error is not None or self.fields.get("ok") is False
+        level = logging.WARNING if failed else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+
+        total_ms = self.elapsed_ms
+        slow = total_ms >= self.slow_ms
+        record: Dict[str, Any] = {
+            **self.fields,
+            "total_ms": round(total_ms, 1),
+            "stages_ms": {name: round(ms, 1) for name, ms in self.stages.items()}
+        }
+        if self._error is not None:
+            record["error"] = str(self._error)
+        if slow:
+            record["slow"] = True
+
+        dump_reason = "failed" if failed else "slow" if slow else (
+            "sampled" if self.sample_rate and random.random() < self.sample_rate else None
+        )
+        if dump_reason and self._payload is not None:
+            record["dump_reason"] = dump_reason
+            try:
+                record["payload"] = self._payload()
+            except Exception as e:
+                record["payload"] = f"<payload error: {e}>"
+
+        stages = " ".join(f"{name}={ms:.0f}" for name, ms in self.stages.items())
+        logger.log(
+            level,
+            "%s update %s %s chat=%s %s %.0fms [%s]",
+            "🔴" if failed else "🐢" if slow else "📨",
+            self.fields.get("update_id"),
+            self.fields.get("kind"),
+            self.fields.get("chat_id"),
+            "failed" if failed else "ok",
+            total_ms,
+            stages,
+            extra={"request": record}
+        )
+
+
+def current_request_log() -> Optional[RequestLog]:
+    """Запись обрабатываемого сейчас update (или None вне обработки update)"""
+    return _current.get()
+
+
+@contextmanager
+def request_stage(name: str) -> Iterator[None]:
+    """Замеряет этап текущего update; вне обработки update ничего не делает"""
+    request_log = _current.get()
+    if request_log is None:
+        yield
+        return
+    with request_log.stage(name):
+        yield
+
+
+def annotate_request(**fields):
+    """Добавляет поля в запись текущего update"""
+    request_log = _current.get()
+    if request_log is not None:
+        request_log.fields.update(fields)
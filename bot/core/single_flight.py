@@ -0,0 +1,174 @@
+"""
+Single-flight: объединение одинаковых одновременных вызовов
+
+Если несколько обработчиков одновременно запрашивают одно и то же (два
+админа пишут "покажи приложения", два запроса контекста одного
+пользователя, анализ одного YouTube видео), выполняется один вызов, а
+остальные ждут его результат. Результат не кешируется: как только вызов
+завершился, следующий запрос с тем же ключом выполняется заново.
+
+Отмена работает по ключу:
+- отмена одного ожидающего не затрагивает остальных;
+- если все ожидающие ушли, общий вызов отменяется;
+- cancel(key) отменяет общий вызов для всех ожидающих.
+
+Результат общий для всех ожидающих - его нельзя изменять на месте.
+"""
+
+import asyncio
+import logging
+from functools import wraps
+from typing import Dict, Any, Optional, Callable, Hashable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """Выполняющийся вызов и число ожидающих его результат"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Группа вызовов одного вида (например, MCP команды)"""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Имя группы (для метрик)
+        """
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats: Dict[str, int] = {
+            "calls": 0,
+            "executions": 0,
+            "shared": 0,
+            "errors": 0,
+            "cancelled_waiters": 0,
+            "abandoned": 0,
+            "max_waiters": 0
+        }
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Выполняет func(*args, **kwargs) или присоединяется к такому же вызову
+
+        Args:
+            key: Ключ вызова (одинаковый ключ - одинаковый результат)
+            func: Асинхронная функция
+        """
+        self.stats["calls"] += 1
+        call = self._calls.get(key)
+        if call is None:
+            # Вызов выполняется в задаче: отмена первого ожидающего не прерывает остальных
+            call = _Call(asyncio.ensure_future(func(*args, **kwargs)))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finished(key, call))
+            self.stats["executions"] += 1
+        else:
+            self.stats["shared"] += 1
+            logger.debug(f"🔗 {self.name}: присоединились к выполняющемуся вызову {key!r}")
+
+        call.waiters += 1
+        self.stats["max_waiters"] = max(self.stats["max_waiters"], call.waiters)
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done():
+                # Отменен только этот ожидающий
+                self.stats["cancelled_waiters"] += 1
+                if call.waiters == 1:
+                    # Результат больше никому не нужен
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                    call.task.cancel()
+                    self.stats["abandoned"] += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _finished(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled() and call.task.exception() is not None:
+            self.stats["errors"] += 1
+
+    def forget(self, key: Hashable):
+        """
+        Следующие вызовы с этим ключом не присоединяются к текущему
+
+        Нужно, когда данные изменились (например, в память добавлено
+        сообщение) - уже ждущие получат старый результат, новые выполнят
+        свежий вызов.
+        """
+        self._calls.pop(key, None)
+
+    def forget_matching(self, predicate: Callable[[Hashable], bool]):
+        """Забывает все выполняющиеся вызовы, ключ которых подходит под predicate"""
+        for key in [key for key in self._calls if predicate(key)]:
+            del self._calls[key]
+
+    def cancel(self, key: Hashable) -> bool:
+        """Отменяет выполняющийся вызов для всех ожидающих"""
+        call = self._calls.pop(key, None)
+        if call is None:
+            return False
+        return call.task.cancel()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики группы"""
+        return {
+            **self.stats,
+            "inflight": self.inflight,
+            "saved_calls": self.stats["shared"],
+            "share_ratio": round(self.stats["shared"] / self.stats["calls"], 3) if self.stats["calls"] else 0.0
+        }
+
+
+# Группы single-flight процесса
+_groups: Dict[str, SingleFlight] = {}
+
+
+def get_flight_group(name: str) -> SingleFlight:
+    """Возвращает группу по имени (создает при первом обращении)"""
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = SingleFlight(name)
+    return group
+
+
+def single_flight(name: str, key: Callable[..., Optional[Hashable]]):
+    """
+    Декоратор: одинаковые одновременные вызовы выполняются один раз
+
+    Args:
+        name: Имя группы
+        key: Функция от аргументов вызова, возвращающая ключ
+             (None - вызов не объединяется)
+    """
+    group = get_flight_group(name)
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs)
+            if call_key is None:
+                return await func(*args, **kwargs)
+            return await group.do(call_key, func, *args, **kwargs)
+
+        wrapper.flight = group
+        return wrapper
+    return decorator
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    """Метрики всех групп single-flight"""
+    return {name: group.get_stats() for name, group in sorted(_groups.items())}
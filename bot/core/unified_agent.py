@@ -14,6 +14,7 @@ from .agent_adapters import (
     DefaultAgentAdapter
 )
 from .interfaces import Message, Response
+from .logging import annotate_request
 
 logger = logging.getLogger(__name__)
 
@@ -63,15 +64,15 @@ class UnifiedAgent:
         Returns:
             Response с ответом от подходящего агента
         """
-        logger.info(f"📨 UnifiedAgent обрабатывает сообщение от {message.user.id} (role: {message.user.role.value})")
+        logger.debug("📨 UnifiedAgent обрабатывает сообщение от %s (role: %s)", message.user.id, message.user.role.value)
         
         try:
             # Делегируем обработку цепочке
             response = await self.chain.process_message(message)
             
-            # Логируем, какой агент обработал
+            # Отмечаем в записи лога update, какой агент обработал
             if "agent" in response.metadata:
-                logger.info(f"✅ Сообщение обработано агентом: {response.metadata['agent']}")
+                annotate_request(agent=response.metadata['agent'])
             
             return response
             
@@ -6,7 +6,7 @@ import re
 import json
 import hashlib
 import logging
-from typing import Optional, Dict, Any, List, Union, Callable, TypeVar, Tuple
+from typing import Optional, Dict, Any, List, Union, Callable, TypeVar, Tuple, Iterable
 from datetime import datetime, timedelta
 from functools import wraps, lru_cache
 import asyncio
@@ -80,34 +80,31 @@ class CacheUtils:
         return hashlib.md5(key_str.encode()).hexdigest()
     
     @staticmethod
-    def ttl_cache(ttl_seconds: int = 300):
-        """Декоратор для кеширования с TTL"""
+    def ttl_cache(ttl_seconds: int = 300, max_size: int = 1024):
+        """
+        Декоратор для кеширования с TTL
+
+        Записи хранятся в ограниченном LRU кеше bot.core.cache, кеш функции
+        доступен как wrapper.cache (инвалидация, метрики).
+        """
+        from .cache import cached
+
         def decorator(func: Callable) -> Callable:
-            cache = {}
-            cache_times = {}
-            
-            @wraps(func)
-            async def wrapper(*args, **kwargs):
-                key = CacheUtils.cache_key(*args, **kwargs)
-                now = datetime.now()
-                
-                # Проверяем кеш
-                if key in cache and key in cache_times:
-                    if now - cache_times[key] < timedelta(seconds=ttl_seconds):
-                        return cache[key]
-                
-                # Вызываем функцию
-                result = await func(*args, **kwargs)
-                
-                # Сохраняем в кеш
-                cache[key] = result
-                cache_times[key] = now
-                
-                return result
-            
-            return wrapper
+            return cached(
+                f"ttl:{func.__module__}.{func.__qualname__}",
+                ttl=ttl_seconds,
+                max_size=max_size,
+                # Как и раньше, кешируется любой результат, включая None
+                is_negative=lambda result: False
+            )(func)
         return decorator
 
+    @staticmethod
+    def clear_all() -> int:
+        """Очищает все кеши процесса; возвращает число удаленных записей"""
+        from .cache import clear_all_caches
+        return clear_all_caches()
+
 
 class RateLimiter:
     """Ограничитель частоты запросов"""
@@ -301,6 +298,14 @@ class AsyncUtils:
         return task
 
 
+def percentile(samples: Iterable[float], percent: float) -> float:
+    """Возвращает перцентиль по выборке (0 для пустой выборки)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
 # Константы
 MAX_MESSAGE_LENGTH = 4096
 MAX_CAPTION_LENGTH = 1024
@@ -50,6 +50,39 @@ class TelegramFormatter:
 
 🔗 [Смотреть видео]({url})"""
     
+    @staticmethod
+    def format_youtube_video_plain(video: Dict) -> str:
+        """
+        Форматирует YouTube видео простым текстом (для отправки без parse_mode)
+        
+        Args:
+            video: Данные видео
+            
+        Returns:
+            str: Сообщение без Markdown разметки
+        """
+        title = video.get('title') or 'Без названия'
+        channel = video.get('channel') or 'Неизвестный канал'
+        views = TelegramFormatter._format_number(video.get('views', 0))
+        likes = TelegramFormatter._format_number(video.get('likes', 0))
+        comments = TelegramFormatter._format_number(video.get('comments', 0))
+        duration = TelegramFormatter._format_duration(video.get('duration', 'PT0S'))
+        published = TelegramFormatter._format_date(video.get('published_at', ''))
+        url = video.get('url', '')
+        
+        return f"""🎥 {title}
+
+👤 Канал: {channel}
+⏱️ Длительность: {duration}
+📅 Опубликовано: {published}
+
+📊 Статистика:
+👁️ {views} просмотров
+👍 {likes} лайков
+💬 {comments} комментариев
+
+🔗 {url}"""
+    
     @staticmethod
     def format_youtube_channel(channel: Dict) -> str:
         """
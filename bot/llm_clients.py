@@ -0,0 +1,224 @@
+"""
+Общие клиенты OpenAI и Anthropic на одном пуле HTTP соединений
+
+Раньше каждый компонент держал свой клиент (а генератор OpenAI создавал
+новый на каждый запрос): каждый вызов LLM начинался с TCP+TLS рукопожатия
+и загрузки сертификатов. Реестр выдает клиентов SDK, которые ходят через
+один настроенный транспорт httpx - соединения с api.openai.com и
+api.anthropic.com переиспользуются всеми генераторами, агентами и Whisper.
+
+Параметры пула (размер, keep-alive, HTTP/2, таймауты) берутся из
+config.llm_http. Счетчики новых соединений и TLS рукопожатий показывают,
+сколько рукопожатий сэкономлено (/debug/llm-clients).
+"""
+
+import asyncio
+import importlib.util
+import logging
+from collections import defaultdict
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+import openai
+import anthropic
+
+from .core.config import config, LLMHttpConfig
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 - опциональная зависимость (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """
+    Транспорт httpx, общий для всех клиентов реестра
+
+    Пул соединений привязан к event loop, поэтому для каждого loop
+    создается свой httpx.AsyncHTTPTransport. Каждый запрос трассируется:
+    по событиям httpcore считаются новые TCP соединения и TLS рукопожатия.
+    """
+
+    def __init__(self, settings: LLMHttpConfig, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Args:
+            settings: Параметры пула
+            transport: Свой транспорт вместо пула (для тестов и нагрузочных прогонов)
+        """
+        self.settings = settings
+        self.http2 = settings.http2 and HTTP2_AVAILABLE
+        self.limits = httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry
+        )
+        self._custom_transport = transport
+        self._transport: Optional[httpx.AsyncBaseTransport] = None
+        self._transport_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.transports_created = 0
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.requests_by_host: Dict[str, int] = defaultdict(int)
+
+    def _get_transport(self) -> httpx.AsyncBaseTransport:
+        """Возвращает пул соединений текущего event loop"""
+        if self._custom_transport is not None:
+            return self._custom_transport
+        loop = asyncio.get_running_loop()
+        if self._transport is None or self._transport_loop is not loop:
+            # Соединения старого loop использовать нельзя - они закроются вместе с ним
+            self._transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2, retries=1)
+            self._transport_loop = loop
+            self.transports_created += 1
+        return self._transport
+
+    async def _trace(self, event: str, info: Dict[str, Any]):
+        if event.endswith("connect_tcp.complete"):
+            self.connections_opened += 1
+        elif event.endswith("start_tls.complete"):
+            self.tls_handshakes += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.requests_by_host[request.url.host] += 1
+
+        outer_trace = request.extensions.get("trace")
+        if outer_trace is None:
+            request.extensions["trace"] = self._trace
+        else:
+            async def trace(event: str, info: Dict[str, Any]):
+                await self._trace(event, info)
+                result = outer_trace(event, info)
+                if asyncio.iscoroutine(result):
+                    await result
+            request.extensions["trace"] = trace
+
+        try:
+            return await self._get_transport().handle_async_request(request)
+        except Exception:
+            self.errors += 1
+            raise
+
+    async def aclose(self):
+        """Закрывает пул соединений (клиенты реестра продолжат работать с новым пулом)"""
+        if self._transport is not None:
+            await self._transport.aclose()
+        self._transport = None
+        self._transport_loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        reused = max(0, self.requests - self.connections_opened)
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "transports_created": self.transports_created,
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+            "requests_by_host": dict(self.requests_by_host)
+        }
+
+
+class _SharedHTTPClient(httpx.AsyncClient):
+    """httpx клиент поверх общего транспорта: закрытие клиента не закрывает пул"""
+
+    async def aclose(self) -> None:
+        pass
+
+
+class LLMClientRegistry:
+    """Реестр клиентов SDK, работающих через один общий пул соединений"""
+
+    def __init__(self, settings: Optional[LLMHttpConfig] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Args:
+            settings: Параметры пула (по умолчанию config.llm_http)
+            transport: Свой транспорт httpx (для тестов и нагрузочных прогонов)
+        """
+        self.settings = settings or config.llm_http
+        self.transport = SharedTransport(self.settings, transport)
+        self._clients: Dict[Tuple, Any] = {}
+        self._clients_created: Dict[str, int] = defaultdict(int)
+        self._lookups: Dict[str, int] = defaultdict(int)
+
+    def _http_client(self, timeout: Optional[float]) -> httpx.AsyncClient:
+        return _SharedHTTPClient(
+            transport=self.transport,
+            timeout=httpx.Timeout(timeout or self.settings.timeout, connect=self.settings.connect_timeout)
+        )
+
+    def openai(self, api_key: Optional[str] = None, timeout: Optional[float] = None,
+               base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+        """
+        Клиент OpenAI (один на ключ, таймаут и адрес API)
+
+        Args:
+            api_key: Ключ API (по умолчанию config.openai.api_key)
+            timeout: Таймаут запроса в секундах (по умолчанию config.llm_http.timeout)
+            base_url: Адрес API (по умолчанию OPENAI_BASE_URL или api.openai.com)
+        """
+        api_key = api_key or config.openai.api_key
+        key = ("openai", api_key, timeout, base_url)
+        self._lookups["openai"] += 1
+        client = self._clients.get(key)
+        if client is None:
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout or self.settings.timeout,
+                http_client=self._http_client(timeout)
+            )
+            self._clients[key] = client
+            self._clients_created["openai"] += 1
+        return client
+
+    def anthropic(self, api_key: Optional[str] = None, timeout: Optional[float] = None,
+                  base_url: Optional[str] = None) -> anthropic.AsyncAnthropic:
+        """
+        Клиент Anthropic (один на ключ, таймаут и адрес API)
+
+        Args:
+            api_key: Ключ API (по умолчанию config.anthropic.api_key)
+            timeout: Таймаут запроса в секундах (по умолчанию config.llm_http.timeout)
+            base_url: Адрес API (по умолчанию ANTHROPIC_BASE_URL или api.anthropic.com)
+        """
+        api_key = api_key or config.anthropic.api_key
+        key = ("anthropic", api_key, timeout, base_url)
+        self._lookups["anthropic"] += 1
+        client = self._clients.get(key)
+        if client is None:
+            client = anthropic.AsyncAnthropic(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout or self.settings.timeout,
+                http_client=self._http_client(timeout)
+            )
+            self._clients[key] = client
+            self._clients_created["anthropic"] += 1
+        return client
+
+    async def close(self):
+        """Закрывает пул соединений"""
+        await self.transport.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику клиентов и пула соединений"""
+        return {
+            "clients": len(self._clients),
+            "clients_created": dict(self._clients_created),
+            "lookups": dict(self._lookups),
+            **self.transport.get_stats()
+        }
+
+
+# Глобальный экземпляр
+llm_clients = LLMClientRegistry()
@@ -0,0 +1,298 @@
+"""
+Потоковая отправка ответов LLM в Telegram
+
+Пока LLM генерирует ответ, пользователь уже видит его начало: первое
+сообщение отправляется, как только накопится first_chars символов, дальше
+оно редактируется (editMessageText) не чаще раза в edit_interval секунд и
+только если текст вырос на min_chars символов. Все вызовы идут через
+send_scheduler, поэтому лимиты Telegram на чат соблюдаются, а очередь
+правок не растет: пока идет одна правка, новые куски просто копятся.
+
+Поток привязан к обработке update через ContextVar (как RequestLog):
+обработчик создает ReplyStream, генераторы ответов находят его через
+current_reply_stream() и передают в него куски текста. Если потока нет,
+генераторы работают как раньше - одним запросом.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Deque, Iterator, Union
+
+from .core.config import config
+from .core.logging import annotate_request
+from .core.utils import percentile
+from .telegram_client import TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+# Поток ответа текущего update
+_current: ContextVar[Optional["ReplyStream"]] = ContextVar("reply_stream", default=None)
+
+# Метрики всех потоков процесса
+_stream_stats: Dict[str, int] = {
+    "streams": 0,
+    "edits": 0,
+    "edit_errors": 0,
+    "fallback_sends": 0
+}
+_ttft_ms: Deque[float] = deque(maxlen=1000)
+_complete_ms: Deque[float] = deque(maxlen=1000)
+_visible_ms: Deque[float] = deque(maxlen=1000)
+
+
+class ReplyStream:
+    """Ответ, который показывается в Telegram по мере генерации"""
+
+    def __init__(
+        self,
+        chat_id: Union[int, str],
+        business_connection_id: Optional[str] = None,
+        scheduler=None,
+        first_chars: Optional[int] = None,
+        edit_interval: Optional[float] = None,
+        min_chars: Optional[int] = None,
+        max_length: Optional[int] = None
+    ):
+        """
+        Args:
+            chat_id: Чат, куда отправляется ответ
+            business_connection_id: Business подключение (ответ от имени аккаунта)
+            scheduler: Планировщик отправки (по умолчанию общий send_scheduler)
+            first_chars: Сколько символов накопить перед первым сообщением
+            edit_interval: Минимальный интервал между правками в секундах
+            min_chars: На сколько символов должен вырасти текст для новой правки
+            max_length: Максимальная длина сообщения
+        """
+        settings = config.streaming
+        self.chat_id = chat_id
+        self.business_connection_id = business_connection_id
+        self.first_chars = settings.first_chars if first_chars is None else first_chars
+        self.edit_interval = settings.edit_interval if edit_interval is None else edit_interval
+        self.min_chars = settings.min_chars if min_chars is None else min_chars
+        self.max_length = max_length or config.max_message_length
+        self._scheduler = scheduler
+
+        self.message_id: Optional[int] = None
+        self.edits = 0
+        self._text = ""
+        self._sent_text = ""
+        self._flusher: Optional[asyncio.Task] = None
+        self._dirty = asyncio.Event()
+        self._finishing = asyncio.Event()
+        self._last_sent_at = 0.0
+
+        self.created_at = time.perf_counter()
+        self.generation_started_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self.visible_at: Optional[float] = None
+
+    @property
+    def scheduler(self):
+        if self._scheduler is None:
+            from .telegram_bot import send_scheduler
+            self._scheduler = send_scheduler
+        return self._scheduler
+
+    @property
+    def started(self) -> bool:
+        """Начата отправка: ответ нужно завершить через finish(), а не отправлять заново"""
+        return self._flusher is not None
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    # Сторона генератора
+
+    def begin(self):
+        """Начало генерации (при повторе или fallback на другой провайдер текст начинается заново)"""
+        self._text = ""
+        self.generation_started_at = time.perf_counter()
+        self.first_token_at = None
+        self.completed_at = None
+
+    def push(self, delta: Optional[str]):
+        """Добавляет кусок сгенерированного текста"""
+        if not delta:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self._text += delta
+
+        if self._flusher is None:
+            if len(self._text.strip()) >= self.first_chars:
+                self._flusher = asyncio.create_task(self._run())
+        else:
+            self._dirty.set()
+
+    def complete(self):
+        """Генерация завершена - записывает время до первого токена и до конца ответа"""
+        self.completed_at = time.perf_counter()
+        started_at = self.generation_started_at or self.created_at
+        complete_ms = (self.completed_at - started_at) * 1000
+        _complete_ms.append(complete_ms)
+        fields = {"llm_complete_ms": round(complete_ms, 1)}
+        if self.first_token_at is not None:
+            ttft_ms = (self.first_token_at - started_at) * 1000
+            _ttft_ms.append(ttft_ms)
+            fields["llm_ttft_ms"] = round(ttft_ms, 1)
+        annotate_request(**fields)
+
+    # Отправка
+
+    def _display_text(self) -> str:
+        text = self._text.strip()
+        if len(text) > self.max_length:
+            text = text[:self.max_length - 1] + "…"
+        return text
+
+    async def _run(self):
+        """Фоновая отправка: первое сообщение, затем редкие правки"""
+        try:
+            text = self._display_text()
+            result = await self.scheduler.send_message(
+                self.chat_id, text, business_connection_id=self.business_connection_id
+            )
+            self.message_id = result.get("message_id")
+            self._sent_text = text
+            self._last_sent_at = time.monotonic()
+            self.visible_at = time.perf_counter()
+            _stream_stats["streams"] += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось отправить начало ответа в чат {self.chat_id}: {e}")
+            return
+
+        while not self._finishing.is_set():
+            self._dirty.clear()
+            text = self._display_text()
+            if len(text) - len(self._sent_text) < self.min_chars:
+                # Мало нового текста - ждем следующих кусков или завершения
+                await self._wait(self._dirty, None)
+                continue
+
+            delay = self._last_sent_at + self.edit_interval - time.monotonic()
+            if delay > 0 and await self._wait(self._finishing, delay):
+                break
+            await self._edit(self._display_text())
+
+    async def _wait(self, event: asyncio.Event, timeout: Optional[float]) -> bool:
+        """Ждет события (или завершения потока); True - если поток завершается"""
+        waiters = [asyncio.ensure_future(event.wait())]
+        if event is not self._finishing:
+            waiters.append(asyncio.ensure_future(self._finishing.wait()))
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        return self._finishing.is_set()
+
+    async def _edit(self, text: str, parse_mode: Optional[str] = None) -> bool:
+        """Редактирует отправленное сообщение"""
+        if self.message_id is None or (text == self._sent_text and parse_mode is None):
+            return True
+        params = {
+            "chat_id": self.chat_id,
+            "message_id": self.message_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "business_connection_id": self.business_connection_id
+        }
+        try:
+            await self.scheduler.submit("editMessageText", {k: v for k, v in params.items() if v is not None})
+        except TelegramAPIError as e:
+            if e.error_code == 400 and "not modified" in (e.description or ""):
+                self._sent_text = text
+                return True
+            _stream_stats["edit_errors"] += 1
+            logger.warning(f"⚠️ Не удалось обновить ответ в чате {self.chat_id}: {e}")
+            return False
+        except Exception as e:
+            _stream_stats["edit_errors"] += 1
+            logger.warning(f"⚠️ Не удалось обновить ответ в чате {self.chat_id}: {e}")
+            return False
+        finally:
+            self._last_sent_at = time.monotonic()
+
+        self.edits += 1
+        _stream_stats["edits"] += 1
+        self._sent_text = text
+        return True
+
+    async def finish(self, text: str, parse_mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Показывает окончательный текст ответа
+
+        Args:
+            text: Окончательный ответ (агент мог дополнить сгенерированный текст)
+            parse_mode: Разметка окончательного текста (промежуточные правки - без разметки)
+
+        Returns:
+            Dict[str, Any]: message_id, число правок и была ли отправка потоковой
+        """
+        self._finishing.set()
+        if self._flusher is not None:
+            await self._flusher
+
+        final_text = text.strip() or self._display_text()
+        if len(final_text) > self.max_length:
+            final_text = final_text[:self.max_length - 3] + "..."
+
+        if self.message_id is None:
+            # Начало ответа не отправилось - отправляем ответ целиком
+            _stream_stats["fallback_sends"] += 1
+            result = await self.scheduler.send_message(
+                self.chat_id, final_text, parse_mode=parse_mode,
+                business_connection_id=self.business_connection_id
+            )
+            self.message_id = result.get("message_id")
+            streamed = False
+        else:
+            if parse_mode and not await self._edit(final_text, parse_mode):
+                # Разметка не разобралась - показываем как есть
+                await self._edit(final_text)
+            elif not parse_mode:
+                await self._edit(final_text)
+            streamed = True
+
+        if self.visible_at is not None:
+            visible_ms = (self.visible_at - self.created_at) * 1000
+            _visible_ms.append(visible_ms)
+            annotate_request(stream_visible_ms=round(visible_ms, 1))
+        annotate_request(stream_edits=self.edits)
+
+        return {"message_id": self.message_id, "edits": self.edits, "streamed": streamed}
+
+
+def current_reply_stream() -> Optional[ReplyStream]:
+    """Поток ответа обрабатываемого update (None - отвечать одним сообщением)"""
+    return _current.get()
+
+
+@contextmanager
+def reply_stream_scope(stream: Optional[ReplyStream]) -> Iterator[Optional[ReplyStream]]:
+    """Делает поток доступным генераторам ответов на время обработки (None - без потока)"""
+    if stream is None:
+        yield None
+        return
+    token = _current.set(stream)
+    try:
+        yield stream
+    finally:
+        _current.reset(token)
+
+
+def get_stream_stats() -> Dict[str, Any]:
+    """Метрики потоковой отправки ответов"""
+    return {
+        "enabled": config.streaming.enabled,
+        **_stream_stats,
+        "ttft_ms": {"p50": round(percentile(_ttft_ms, 50), 1), "p95": round(percentile(_ttft_ms, 95), 1)},
+        "complete_ms": {"p50": round(percentile(_complete_ms, 50), 1), "p95": round(percentile(_complete_ms, 95), 1)},
+        "first_visible_ms": {"p50": round(percentile(_visible_ms, 50), 1), "p95": round(percentile(_visible_ms, 95), 1)}
+    }
@@ -0,0 +1,400 @@
+"""
+Планировщик исходящих сообщений Telegram
+
+Соблюдает лимиты Bot API (глобальный ~30 msg/s, ~1 msg/s на чат,
+20 msg/min на группу) с помощью token bucket'ов, учитывает retry_after
+из ответов 429 и обслуживает очереди по приоритетам, чтобы рассылка
+не задерживала ответы в живых диалогах.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from enum import IntEnum
+from typing import Dict, Any, Optional, List, Deque, Tuple, Union
+
+from .core.utils import percentile
+from .telegram_client import TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+
+class SendPriority(IntEnum):
+    """Приоритеты исходящих сообщений (меньше - важнее)"""
+    INTERACTIVE = 0   # Ответы пользователю в диалоге
+    NOTIFICATION = 1  # Служебные уведомления (админам и т.п.)
+    BROADCAST = 2     # Массовые рассылки
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше capacity"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать до появления токена"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        """Забирает один токен (вызывать после delay() == 0)"""
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        """Bucket полностью восстановился (чат простаивает)"""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _SendJob:
+    """Одна отправка в очереди планировщика"""
+
+    __slots__ = ("method", "params", "chat_id", "priority", "future", "enqueued_at", "not_before", "attempts")
+
+    def __init__(self, method: str, params: Dict[str, Any], priority: SendPriority, future: asyncio.Future):
+        self.method = method
+        self.params = params
+        self.chat_id = params.get("chat_id")
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.not_before = 0.0
+        self.attempts = 0
+
+
+class SendScheduler:
+    """
+    Планировщик отправки с глобальным и per-chat лимитами
+
+    Один фоновый цикл выбирает следующую отправку: сначала по приоритету,
+    затем по порядку постановки, пропуская чаты, у которых закончились
+    токены или есть незавершенная отправка (это сохраняет порядок
+    сообщений внутри чата).
+    """
+
+    # Сколько заданий одной очереди просматривать в поисках готового чата
+    SCAN_LIMIT = 200
+    # Порог количества per-chat bucket'ов, после которого чистим простаивающие
+    MAX_CHAT_BUCKETS = 10000
+
+    def __init__(
+        self,
+        client,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        group_rate_per_minute: float = 20.0,
+        max_in_flight: int = 16,
+        max_attempts: int = 3,
+        latency_window: int = 1000
+    ):
+        """
+        Args:
+            client: TelegramClient (нужен метод call(method, params))
+            global_rate: Глобальный лимит сообщений в секунду
+            chat_rate: Лимит сообщений в секунду для личного чата
+            chat_burst: Допустимый всплеск для личного чата
+            group_rate_per_minute: Лимит сообщений в минуту для группы
+            max_in_flight: Максимум одновременных запросов к API
+            max_attempts: Сколько раз пробовать отправку при 429
+            latency_window: Сколько последних замеров хранить для перцентилей
+        """
+        self.client = client
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate_per_minute = group_rate_per_minute
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_attempts = max(1, max_attempts)
+
+        self._global_bucket = TokenBucket(global_rate, max(1.0, global_rate))
+        self._chat_buckets: Dict[Any, TokenBucket] = {}
+        self._chat_blocked_until: Dict[Any, float] = {}
+        self._in_flight_chats: set = set()
+        self._lanes: Dict[SendPriority, Deque[_SendJob]] = {p: deque() for p in SendPriority}
+
+        self._loop_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+
+        self._latency: Dict[SendPriority, Deque[float]] = {
+            p: deque(maxlen=latency_window) for p in SendPriority
+        }
+        self._sent_times: Deque[float] = deque(maxlen=10000)
+        self._counters = {
+            "submitted": 0,
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "rate_limited": 0
+        }
+
+    # ------------------------------------------------------------------
+    # Публичный API
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        method: str,
+        params: Dict[str, Any],
+        priority: SendPriority = SendPriority.INTERACTIVE
+    ) -> asyncio.Future:
+        """Ставит вызов Bot API в очередь и возвращает future с результатом"""
+        self._ensure_running()
+        future = self._loop.create_future()
+        self._lanes[priority].append(_SendJob(method, params, priority, future))
+        self._counters["submitted"] += 1
+        self._wakeup.set()
+        return future
+
+    async def send_message(
+        self,
+        chat_id: Union[int, str],
+        text: str,
+        priority: SendPriority = SendPriority.INTERACTIVE,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Отправляет сообщение с учетом лимитов (параметры как у TelegramClient.send_message)"""
+        params = {"chat_id": chat_id, "text": text}
+        params.update({k: v for k, v in kwargs.items() if v is not None})
+        return await self.submit("sendMessage", params, priority)
+
+    async def broadcast(
+        self,
+        chat_ids: List[Union[int, str]],
+        text: str,
+        **kwargs
+    ) -> List[Tuple[Union[int, str], Optional[Dict[str, Any]], Optional[Exception]]]:
+        """
+        Рассылает сообщение с низким приоритетом
+
+        Returns:
+            List: (chat_id, результат, исключение) для каждого получателя
+        """
+        futures = [
+            self.send_message(chat_id, text, priority=SendPriority.BROADCAST, **kwargs)
+            for chat_id in chat_ids
+        ]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        return [
+            (chat_id, None, result) if isinstance(result, Exception) else (chat_id, result, None)
+            for chat_id, result in zip(chat_ids, results)
+        ]
+
+    async def stop(self, timeout: float = 10.0):
+        """Дожидается отправки очереди и останавливает цикл"""
+        if self._loop_task is None:
+            return
+
+        deadline = time.monotonic() + timeout
+        while (self.pending or self._tasks) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        self._loop_task.cancel()
+        await asyncio.gather(self._loop_task, return_exceptions=True)
+        self._loop_task = None
+
+        # Все, что не успели отправить, завершаем ошибкой, чтобы не висели ожидающие
+        for lane in self._lanes.values():
+            while lane:
+                job = lane.popleft()
+                job.future.cancel()
+
+    @property
+    def pending(self) -> int:
+        """Количество ожидающих отправок"""
+        return sum(len(lane) for lane in self._lanes.values())
+
+    # ------------------------------------------------------------------
+    # Планирование
+    # ------------------------------------------------------------------
+
+    def _ensure_running(self):
+        """Запускает цикл планировщика в текущем event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop_task is not None and not self._loop_task.done() and self._loop is loop:
+            return
+
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._in_flight_chats.clear()
+        self._tasks = set()
+        self._loop_task = loop.create_task(self._run())
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        """Возвращает bucket чата (группы имеют отрицательный chat_id)"""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                self._evict_idle_buckets()
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = TokenBucket(self.group_rate_per_minute / 60.0, max(1.0, self.chat_burst))
+            else:
+                bucket = TokenBucket(self.chat_rate, max(1.0, self.chat_burst))
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _evict_idle_buckets(self):
+        """Удаляет bucket'ы простаивающих чатов"""
+        now = time.monotonic()
+        idle = [
+            chat_id for chat_id, bucket in self._chat_buckets.items()
+            if chat_id not in self._in_flight_chats and bucket.is_full(now)
+        ]
+        for chat_id in idle:
+            del self._chat_buckets[chat_id]
+        for chat_id in [c for c, until in self._chat_blocked_until.items() if until <= now]:
+            del self._chat_blocked_until[chat_id]
+
+    def _next_job(self, now: float) -> Tuple[Optional[_SendJob], Optional[float]]:
+        """
+        Выбирает следующую готовую к отправке задачу
+
+        Returns:
+            Tuple: (задача или None, через сколько секунд появится готовая)
+        """
+        min_wait: Optional[float] = None
+
+        for priority in SendPriority:
+            lane = self._lanes[priority]
+            skipped_chats = set()
+
+            for index, job in enumerate(lane):
+                if index >= self.SCAN_LIMIT:
+                    break
+
+                chat_id = job.chat_id
+                if chat_id in skipped_chats or chat_id in self._in_flight_chats:
+                    skipped_chats.add(chat_id)
+                    continue
+
+                wait = max(
+                    job.not_before - now,
+                    self._chat_blocked_until.get(chat_id, 0.0) - now,
+                    self._chat_bucket(chat_id).delay(now)
+                )
+                if wait <= 0:
+                    del lane[index]
+                    return job, None
+
+                skipped_chats.add(chat_id)
+                min_wait = wait if min_wait is None else min(min_wait, wait)
+
+        return None, min_wait
+
+    async def _run(self):
+        """Основной цикл планировщика"""
+        while True:
+            now = time.monotonic()
+            job, wait = self._next_job(now)
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            global_wait = self._global_bucket.delay(now)
+            if global_wait > 0:
+                # Возвращаем задачу на место и ждем глобальный токен
+                self._lanes[job.priority].appendleft(job)
+                await asyncio.sleep(global_wait)
+                continue
+
+            await self._in_flight.acquire()
+            now = time.monotonic()
+            self._global_bucket.consume(now)
+            self._chat_bucket(job.chat_id).consume(now)
+            self._in_flight_chats.add(job.chat_id)
+
+            task = asyncio.create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job: _SendJob):
+        """Выполняет вызов API и обрабатывает 429"""
+        job.attempts += 1
+        try:
+            result = await self.client.call(job.method, job.params)
+            self._counters["sent"] += 1
+            finished_at = time.monotonic()
+            self._sent_times.append(finished_at)
+            self._latency[job.priority].append(finished_at - job.enqueued_at)
+            if not job.future.done():
+                job.future.set_result(result)
+
+        except TelegramAPIError as e:
+            if e.error_code == 429 and job.attempts < self.max_attempts:
+                self._counters["rate_limited"] += 1
+                self._counters["retried"] += 1
+                retry_after = e.retry_after or 1
+                now = time.monotonic()
+                job.not_before = now + retry_after
+                self._chat_blocked_until[job.chat_id] = now + retry_after
+                logger.warning(f"⏳ Flood limit для чата {job.chat_id}, повтор через {retry_after}с")
+                # В начало очереди, чтобы сохранить порядок сообщений чата
+                self._lanes[job.priority].appendleft(job)
+            else:
+                if e.error_code == 429:
+                    self._counters["rate_limited"] += 1
+                self._fail(job, e)
+
+        except Exception as e:
+            self._fail(job, e)
+
+        finally:
+            self._in_flight_chats.discard(job.chat_id)
+            self._in_flight.release()
+            self._wakeup.set()
+
+    def _fail(self, job: _SendJob, error: Exception):
+        """Завершает задачу ошибкой"""
+        self._counters["failed"] += 1
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    # ------------------------------------------------------------------
+    # Метрики
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает метрики планировщика"""
+        now = time.monotonic()
+        sent_last_minute = sum(1 for t in self._sent_times if now - t <= 60)
+
+        return {
+            "global_rate": self.global_rate,
+            "chat_rate": self.chat_rate,
+            "group_rate_per_minute": self.group_rate_per_minute,
+            "pending": {p.name.lower(): len(self._lanes[p]) for p in SendPriority},
+            "in_flight": len(self._in_flight_chats),
+            "chat_buckets": len(self._chat_buckets),
+            **self._counters,
+            "throughput_per_second_1m": round(sent_last_minute / 60, 2),
+            "latency_ms": {
+                p.name.lower(): {
+                    "p50": round(percentile(self._latency[p], 50) * 1000, 2),
+                    "p95": round(percentile(self._latency[p], 95) * 1000, 2)
+                }
+                for p in SendPriority
+            }
+        }
@@ -33,10 +33,16 @@ except ImportError:
             pass
 
 from ..core.config import config
+from ..core.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
 
+def _mcp_command_key(self, command: str, user_id: Optional[str] = None) -> str:
+    """Одинаковые команды разных пользователей дают одинаковый результат"""
+    return " ".join(command.lower().split())
+
+
 class ClaudeCodeService:
     """
     Сервис для работы с Claude Code SDK и выполнения MCP команд
@@ -188,6 +194,7 @@ class ClaudeCodeService:
             
         return result
         
+    @single_flight("mcp_command", key=_mcp_command_key)
     async def execute_mcp_command(
         self, 
         command: str, 
@@ -0,0 +1,295 @@
+"""
+Упаковка контекста разговора в бюджет токенов
+
+Раньше в LLM уходили последние N сообщений памяти независимо от их
+размера: одно длинное вставленное сообщение раздувало стоимость и
+задержку каждого следующего запроса, а в пределе не помещалось в окно
+модели. Упаковщик считает токены локально (tiktoken, если установлен,
+иначе консервативная оценка по байтам) и набирает сообщения от новых к
+старым, пока не исчерпан бюджет модели. Слишком длинные сообщения
+обрезаются (начало и конец сохраняются), более старые отбрасываются.
+
+Число токенов кешируется по тексту сообщения: история пользователя
+приходит из памяти на каждый запрос, а считается один раз.
+"""
+
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..core.config import config, ContextConfig
+from ..core.logging import annotate_request
+
+logger = logging.getLogger(__name__)
+
+# tiktoken - опциональная зависимость: без нее токены оцениваются по размеру текста
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+
+# Окна контекста моделей (сравнение по префиксу, более точные префиксы раньше)
+MODEL_CONTEXT_WINDOWS: List[Tuple[str, int]] = [
+    ("gpt-4o", 128000),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4.1", 1000000),
+    ("gpt-4", 8192),
+    ("gpt-3.5-turbo", 16385),
+    ("o1", 128000),
+    ("o3", 200000),
+    ("claude", 200000),
+]
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Служебные токены на каждое сообщение чата (роль, разделители)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Остаток бюджета, в который уже нет смысла втискивать обрезанное сообщение
+MIN_TURN_TOKENS = 32
+TRIM_MARKER = " … "
+
+# Метрики упаковки
+_packer_stats: Dict[str, int] = {
+    "packs": 0,
+    "turns_in": 0,
+    "turns_kept": 0,
+    "turns_dropped": 0,
+    "turns_trimmed": 0,
+    "tokens_in": 0,
+    "tokens_sent": 0,
+    "tokens_saved": 0
+}
+
+
+def context_window(model: str) -> int:
+    """Окно контекста модели в токенах"""
+    for prefix, window in MODEL_CONTEXT_WINDOWS:
+        if model.startswith(prefix):
+            return window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+class TokenCounter:
+    """Подсчет токенов с кешем по тексту"""
+
+    def __init__(self, max_entries: int = 10000):
+        """
+        Args:
+            max_entries: Сколько подсчетов хранить (LRU)
+        """
+        self.max_entries = max_entries
+        self._counts: "OrderedDict[Tuple[str, int, int], int]" = OrderedDict()
+        self._encodings: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _encoding(self, model: str):
+        """Кодировка tiktoken для модели (None - оценка по размеру)"""
+        if not TIKTOKEN_AVAILABLE:
+            return None
+        encoding = self._encodings.get(model)
+        if encoding is None:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                # Модели других провайдеров считаем близкой кодировкой OpenAI
+                encoding = tiktoken.get_encoding("o200k_base" if model.startswith(("gpt-4o", "o1", "o3")) else "cl100k_base")
+            self._encodings[model] = encoding
+        return encoding
+
+    @staticmethod
+    def estimate(text: str) -> int:
+        """Оценка без токенизатора: ~4 байта UTF-8 на токен (для кириллицы с запасом)"""
+        return (len(text.encode("utf-8")) + 3) // 4
+
+    def count(self, text: str, model: str) -> int:
+        """Число токенов текста для модели"""
+        if not text:
+            return 0
+        encoding = self._encoding(model)
+        name = encoding.name if encoding is not None else "estimate"
+        key = (name, hash(text), len(text))
+
+        tokens = self._counts.get(key)
+        if tokens is not None:
+            self._counts.move_to_end(key)
+            self.hits += 1
+            return tokens
+
+        self.misses += 1
+        tokens = len(encoding.encode(text, disallowed_special=())) if encoding is not None else self.estimate(text)
+        self._counts[key] = tokens
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return tokens
+
+    def trim(self, text: str, max_tokens: int, model: str) -> str:
+        """Обрезает текст до max_tokens, сохраняя начало и конец"""
+        marker_tokens = 2
+        keep = max(1, max_tokens - marker_tokens)
+        head_size = max(1, keep * 2 // 3)
+        tail_size = keep - head_size
+
+        encoding = self._encoding(model)
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            head = encoding.decode(tokens[:head_size])
+            tail = encoding.decode(tokens[-tail_size:]) if tail_size else ""
+        else:
+            total = self.estimate(text)
+            if total <= max_tokens:
+                return text
+            chars_per_token = len(text) / total
+            head = text[:int(head_size * chars_per_token)]
+            tail = text[len(text) - int(tail_size * chars_per_token):] if tail_size else ""
+        return f"{head.rstrip()}{TRIM_MARKER}{tail.lstrip()}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "tokenizer": "tiktoken" if TIKTOKEN_AVAILABLE else "estimate",
+            "cached_counts": len(self._counts),
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+@dataclass
+class PackedContext:
+    """Результат упаковки контекста"""
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    budget: int = 0
+    tokens: int = 0
+    original_tokens: int = 0
+    dropped: int = 0
+    trimmed: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+class ContextPacker:
+    """Набирает историю разговора от новых сообщений к старым в пределах бюджета модели"""
+
+    def __init__(self, settings: Optional[ContextConfig] = None, counter: Optional[TokenCounter] = None):
+        """
+        Args:
+            settings: Параметры бюджета (по умолчанию config.context)
+            counter: Счетчик токенов (по умолчанию свой)
+        """
+        self.settings = settings or config.context
+        self.counter = counter or TokenCounter()
+
+    def history_budget(self, model: str) -> int:
+        """Бюджет истории для модели (CONTEXT_MODEL_BUDGETS или CONTEXT_HISTORY_TOKENS)"""
+        for prefix in sorted(self.settings.model_budgets, key=len, reverse=True):
+            if model.startswith(prefix):
+                return self.settings.model_budgets[prefix]
+        return self.settings.history_tokens
+
+    def pack(
+        self,
+        context: Optional[List[Dict[str, Any]]],
+        model: str,
+        system_prompt: str = "",
+        message: str = "",
+        max_output_tokens: int = 1000
+    ) -> PackedContext:
+        """
+        Упаковывает историю разговора
+
+        Args:
+            context: История из памяти (от старых сообщений к новым)
+            model: Модель, для которой готовится запрос
+            system_prompt: Системный промпт (занимает окно модели)
+            message: Текущее сообщение пользователя
+            max_output_tokens: Сколько токенов оставить на ответ
+
+        Returns:
+            PackedContext: Сообщения для API (от старых к новым) и статистика
+        """
+        context = context or []
+        if not self.settings.enabled:
+            messages = [self._message(item, item.get("content") or "") for item in context]
+            return PackedContext(messages=messages)
+
+        # Бюджет истории не может быть больше, чем осталось в окне модели
+        fixed = (
+            self.counter.count(system_prompt, model) + self.counter.count(message, model)
+            + 2 * MESSAGE_OVERHEAD_TOKENS + max_output_tokens
+        )
+        budget = max(0, min(self.history_budget(model), context_window(model) - fixed))
+        result = PackedContext(budget=budget)
+
+        remaining = budget
+        full = False
+        kept = []
+        for item in reversed(context):
+            content = item.get("content") or ""
+            tokens = self.counter.count(content, model)
+            result.original_tokens += tokens + MESSAGE_OVERHEAD_TOKENS
+
+            if full or remaining - MESSAGE_OVERHEAD_TOKENS < MIN_TURN_TOKENS:
+                # Старые сообщения отбрасываем целиком, чтобы история оставалась непрерывной
+                full = True
+                result.dropped += 1
+                continue
+
+            limit = min(self.settings.turn_max_tokens, remaining - MESSAGE_OVERHEAD_TOKENS)
+            if tokens > limit:
+                content = self.counter.trim(content, limit, model)
+                tokens = min(limit, self.counter.count(content, model))
+                result.trimmed += 1
+
+            kept.append(self._message(item, content))
+            remaining -= tokens + MESSAGE_OVERHEAD_TOKENS
+
+        kept.reverse()
+        result.messages = kept
+        result.tokens = budget - remaining
+        self._record(result, len(context))
+        return result
+
+    @staticmethod
+    def _message(item: Dict[str, Any], content: str) -> Dict[str, str]:
+        return {"role": item.get("role") or "user", "content": content}
+
+    @staticmethod
+    def _record(result: PackedContext, turns: int):
+        _packer_stats["packs"] += 1
+        _packer_stats["turns_in"] += turns
+        _packer_stats["turns_kept"] += len(result.messages)
+        _packer_stats["turns_dropped"] += result.dropped
+        _packer_stats["turns_trimmed"] += result.trimmed
+        _packer_stats["tokens_in"] += result.original_tokens
+        _packer_stats["tokens_sent"] += result.tokens
+        _packer_stats["tokens_saved"] += result.saved_tokens
+        annotate_request(
+            context_tokens=result.tokens,
+            context_saved_tokens=result.saved_tokens,
+            context_dropped=result.dropped,
+            context_trimmed=result.trimmed
+        )
+
+
+# Глобальный экземпляр
+context_packer = ContextPacker()
+
+
+def get_context_packer_stats() -> Dict[str, Any]:
+    """Метрики упаковки контекста"""
+    return {
+        "enabled": context_packer.settings.enabled,
+        "history_tokens": context_packer.settings.history_tokens,
+        "turn_max_tokens": context_packer.settings.turn_max_tokens,
+        "model_budgets": context_packer.settings.model_budgets,
+        **_packer_stats,
+        **context_packer.counter.get_stats()
+    }
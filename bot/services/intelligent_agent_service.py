@@ -7,6 +7,7 @@ import os
 from typing import Dict, Any, Optional
 
 from agent.core.intelligent_agent import IntelligentAgent
+from agent.core.model_cascade import ModelCascade, cascade_stats
 from ..core.interfaces import Message, Response, UserRole
 from ..core.config import config
 
@@ -28,8 +29,28 @@ class IntelligentAgentService:
             return
             
         try:
+            settings = config.model_cascade
+            cascade_stats.prices.update(settings.prices)
+            cascade = None
+            if settings.enabled:
+                cascade = ModelCascade(
+                    fast_model=settings.fast_model,
+                    strong_model=settings.strong_model,
+                    min_confidence=settings.min_confidence,
+                    max_fast_chars=settings.max_fast_chars,
+                    local_tools=settings.local_tools
+                )
+            
             # Создаем упрощенного агента
-            self.agent = IntelligentAgent(api_key=openai_key, model="gpt-4o")
+            self.agent = IntelligentAgent(
+                api_key=openai_key,
+                model=settings.strong_model,
+                direct_render=config.direct_render.enabled,
+                direct_render_exclude=config.direct_render.exclude,
+                tool_timeout=config.tool_calls.timeout,
+                tool_timeouts=config.tool_calls.timeouts,
+                cascade=cascade
+            )
             self.enabled = True
             logger.info("✅ Simple Agent Service инициализирован")
         except Exception as e:
@@ -100,7 +121,11 @@ class IntelligentAgentService:
             "enabled": self.enabled,
             "available": self.is_available(),
             "agent_type": "simple_agent",
-            "model": "gpt-4o" if self.agent else None
+            "model": self.agent.model if self.agent else None,
+            "cascade": {
+                "fast_model": self.agent.cascade.fast_model,
+                "strong_model": self.agent.cascade.strong_model
+            } if self.agent and self.agent.cascade else None
         }
 
 
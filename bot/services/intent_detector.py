@@ -6,13 +6,14 @@
 
 import re
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple
 from enum import Enum
 from datetime import datetime
 
 from ..core.interfaces import IIntentDetector, Message
 from ..core.utils import TextUtils
 from ..core.decorators import measure_time
+from .intent_engine import IntentEngine, IntentScan, intent_engine
 
 
 logger = logging.getLogger(__name__)
@@ -45,39 +46,25 @@ class SocialMediaPlatform(str, Enum):
 class IntentDetector(IIntentDetector):
     """Детектор намерений на основе правил и паттернов"""
     
-    def __init__(self):
-        """Инициализация детектора"""
-        # Паттерны для приветствий
-        self.greeting_patterns = [
-            r'\b(привет|здравствуй|добрый день|добрый вечер|доброе утро|хай|hello|hi)\b',
-            r'\b(приветствую|салют|здорово)\b'
-        ]
-        
-        # Паттерны для прощаний
-        self.farewell_patterns = [
-            r'\b(пока|до свидания|прощай|увидимся|до встречи|bye|goodbye)\b',
-            r'\b(спокойной ночи|доброй ночи)\b'
-        ]
-        
-        # Паттерны для помощи
-        self.help_patterns = [
-            r'\b(помоги|помощь|help|что умеешь|что можешь|как пользоваться)\b',
-            r'\b(инструкция|руководство|обучение|научи)\b'
-        ]
-        
-        # Паттерны для благодарности
-        self.gratitude_patterns = [
-            r'\b(спасибо|благодарю|thanks|thank you|спс)\b',
-            r'\b(признателен|благодарен)\b'
-        ]
+    # Порядок проверки базовых намерений
+    BASIC_INTENTS = [
+        IntentType.GREETING,
+        IntentType.FAREWELL,
+        IntentType.HELP,
+        IntentType.GRATITUDE,
+        IntentType.COMPLAINT
+    ]
+    
+    def __init__(self, engine: Optional[IntentEngine] = None):
+        """
+        Инициализация детектора
         
-        # Паттерны для жалоб
-        self.complaint_patterns = [
-            r'\b(не работает|сломалось|ошибка|проблема|баг|bug)\b',
-            r'\b(плохо|ужасно|отвратительно|не нравится)\b'
-        ]
+        Args:
+            engine: Скомпилированные правила (по умолчанию общий intent_engine)
+        """
+        self.engine = engine or intent_engine
         
-        # Ключевые слова для социальных медиа
+        # Ключевые слова для социальных медиа (поиск - автоматом движка)
         self.social_media_keywords = {
             SocialMediaPlatform.YOUTUBE: [
                 'youtube', 'ютуб', 'видео', 'ролик', 'канал', 'подписчик',
@@ -93,36 +80,30 @@ class IntentDetector(IIntentDetector):
                 'challenge', 'тренд', 'trend', 'дуэт', 'duet'
             ]
         }
-        
-        # Паттерны URL для разных платформ
-        self.url_patterns = {
-            SocialMediaPlatform.YOUTUBE: [
-                r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=[\w-]+',
-                r'(?:https?://)?(?:www\.)?youtu\.be/[\w-]+',
-                r'(?:https?://)?(?:www\.)?youtube\.com/channel/[\w-]+',
-                r'(?:https?://)?(?:www\.)?youtube\.com/c/[\w-]+',
-                r'(?:https?://)?(?:www\.)?youtube\.com/@[\w-]+'
-            ],
-            SocialMediaPlatform.INSTAGRAM: [
-                r'(?:https?://)?(?:www\.)?instagram\.com/[\w.]+',
-                r'(?:https?://)?(?:www\.)?instagram\.com/p/[\w-]+',
-                r'(?:https?://)?(?:www\.)?instagram\.com/reel/[\w-]+'
-            ],
-            SocialMediaPlatform.TIKTOK: [
-                r'(?:https?://)?(?:www\.)?tiktok\.com/@[\w.]+/video/\d+',
-                r'(?:https?://)?vm\.tiktok\.com/[\w-]+'
-            ]
-        }
     
     @measure_time
     async def detect(self, message: Message) -> Dict[str, Any]:
-        """Определяет намерение сообщения"""
+        """
+        Определяет намерение сообщения
+        
+        Результат сохраняется в message.metadata["intent"]: вебхук и агент
+        получают одно и то же намерение без повторного разбора.
+        """
+        if message.metadata and message.metadata.get("intent") is not None:
+            return message.metadata["intent"]
+        
+        result = self._classify(message)
+        if message.metadata is None:
+            message.metadata = {}
+        message.metadata["intent"] = result
+        return result
+    
+    def _classify(self, message: Message) -> Dict[str, Any]:
+        """Определяет намерение по разбору движка"""
         text = message.text
         if not text:
             return self._create_intent_result(IntentType.UNKNOWN)
         
-        text_lower = text.lower()
-        
         # Проверяем команды
         if message.is_command:
             command, args = message.get_command()
@@ -134,136 +115,68 @@ class IntentDetector(IIntentDetector):
                 }
             )
         
-        # Проверяем URL социальных медиа
-        url_intent = self._detect_social_media_url(text)
-        if url_intent:
-            return url_intent
-        
-        # Проверяем приветствия
-        if self._matches_patterns(text_lower, self.greeting_patterns):
-            return self._create_intent_result(IntentType.GREETING)
-        
-        # Проверяем прощания
-        if self._matches_patterns(text_lower, self.farewell_patterns):
-            return self._create_intent_result(IntentType.FAREWELL)
+        scan = self.engine.scan_message(message)
         
-        # Проверяем просьбы о помощи
-        if self._matches_patterns(text_lower, self.help_patterns):
-            return self._create_intent_result(IntentType.HELP)
-        
-        # Проверяем благодарность
-        if self._matches_patterns(text_lower, self.gratitude_patterns):
-            return self._create_intent_result(IntentType.GRATITUDE)
+        # Проверяем URL социальных медиа
+        if scan.url:
+            return self._url_intent(*scan.url)
         
-        # Проверяем жалобы
-        if self._matches_patterns(text_lower, self.complaint_patterns):
-            return self._create_intent_result(IntentType.COMPLAINT)
+        # Приветствия, прощания, помощь, благодарность, жалобы (в порядке приоритета)
+        for intent_type in self.BASIC_INTENTS:
+            if intent_type.value in scan.basic:
+                return self._create_intent_result(intent_type)
         
         # Проверяем упоминания социальных медиа
-        social_media_intent = self._detect_social_media_keywords(text_lower)
+        social_media_intent = self._detect_social_media_keywords(scan)
         if social_media_intent:
             return social_media_intent
         
         # Проверяем, является ли это вопросом
-        if self._is_question(text):
+        if scan.is_question:
             return self._create_intent_result(IntentType.QUESTION)
         
         # Неизвестное намерение
         return self._create_intent_result(IntentType.UNKNOWN)
     
-    def _matches_patterns(self, text: str, patterns: List[str]) -> bool:
-        """Проверяет соответствие текста паттернам"""
-        for pattern in patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        return False
-    
-    def _detect_social_media_url(self, text: str) -> Optional[Dict[str, Any]]:
-        """Определяет URL социальных медиа"""
-        for platform, patterns in self.url_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, text)
-                if match:
-                    url = match.group(0)
-                    
-                    # Для YouTube извлекаем ID видео
-                    if platform == SocialMediaPlatform.YOUTUBE:
-                        video_id = self._extract_youtube_video_id(url)
-                        return self._create_intent_result(
-                            IntentType.YOUTUBE_URL,
-                            metadata={
-                                "platform": platform.value,
-                                "url": url,
-                                "video_id": video_id
-                            }
-                        )
-                    
-                    return self._create_intent_result(
-                        IntentType.SOCIAL_MEDIA,
-                        metadata={
-                            "platform": platform.value,
-                            "url": url
-                        }
-                    )
-        
-        return None
-    
-    def _detect_social_media_keywords(self, text: str) -> Optional[Dict[str, Any]]:
-        """Определяет упоминания социальных медиа по ключевым словам"""
-        detected_platforms = []
-        scores = {}
-        
-        for platform, keywords in self.social_media_keywords.items():
-            score = 0
-            matched_keywords = []
-            
-            for keyword in keywords:
-                if keyword in text:
-                    score += 1
-                    matched_keywords.append(keyword)
-            
-            if score > 0:
-                detected_platforms.append(platform)
-                scores[platform] = {
-                    "score": score,
-                    "keywords": matched_keywords
-                }
-        
-        if detected_platforms:
-            # Выбираем платформу с наибольшим score
-            best_platform = max(detected_platforms, key=lambda p: scores[p]["score"])
-            
+    def _url_intent(self, platform: str, url: str) -> Dict[str, Any]:
+        """Намерение для найденного URL социальных медиа"""
+        # Для YouTube извлекаем ID видео
+        if platform == SocialMediaPlatform.YOUTUBE.value:
             return self._create_intent_result(
-                IntentType.SOCIAL_MEDIA,
+                IntentType.YOUTUBE_URL,
                 metadata={
-                    "platform": best_platform.value,
-                    "confidence": scores[best_platform]["score"] / len(self.social_media_keywords[best_platform]),
-                    "matched_keywords": scores[best_platform]["keywords"],
-                    "all_detected": [p.value for p in detected_platforms]
+                    "platform": platform,
+                    "url": url,
+                    "video_id": self._extract_youtube_video_id(url)
                 }
             )
         
-        return None
+        return self._create_intent_result(
+            IntentType.SOCIAL_MEDIA,
+            metadata={
+                "platform": platform,
+                "url": url
+            }
+        )
     
-    def _is_question(self, text: str) -> bool:
-        """Определяет, является ли текст вопросом"""
-        # Проверяем вопросительный знак
-        if text.strip().endswith('?'):
-            return True
-        
-        # Проверяем вопросительные слова
-        question_words = [
-            'что', 'кто', 'где', 'когда', 'почему', 'зачем', 'как',
-            'какой', 'какая', 'какое', 'какие', 'сколько', 'куда',
-            'откуда', 'чей', 'чья', 'чье', 'чьи'
-        ]
+    def _detect_social_media_keywords(self, scan: IntentScan) -> Optional[Dict[str, Any]]:
+        """Определяет упоминания социальных медиа по ключевым словам"""
+        scores = IntentEngine.keyword_scores(scan, self.social_media_keywords)
+        if not scores:
+            return None
         
-        text_lower = text.lower()
-        for word in question_words:
-            if text_lower.startswith(word + ' ') or f' {word} ' in text_lower:
-                return True
+        # Выбираем платформу с наибольшим числом совпадений
+        best_platform = max(scores, key=lambda platform: len(scores[platform]))
         
-        return False
+        return self._create_intent_result(
+            IntentType.SOCIAL_MEDIA,
+            metadata={
+                "platform": best_platform.value,
+                "confidence": len(scores[best_platform]) / len(self.social_media_keywords[best_platform]),
+                "matched_keywords": scores[best_platform],
+                "all_detected": [platform.value for platform in scores]
+            }
+        )
     
     def _extract_youtube_video_id(self, url: str) -> Optional[str]:
         """Извлекает ID видео из YouTube URL"""
@@ -346,4 +259,8 @@ class AIIntentDetector(IIntentDetector):
             
         except Exception as e:
             logger.error(f"Ошибка AI детектора намерений: {e}")
-            return rule_based_result
\ No newline at end of file
+            return rule_based_result
+
+
+# Глобальный экземпляр (правила скомпилированы один раз в intent_engine)
+intent_detector = IntentDetector()
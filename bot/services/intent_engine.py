@@ -0,0 +1,321 @@
+"""
+Скомпилированный движок сопоставления намерений
+
+IntentDetector и UnifiedIntentService хранили паттерны строками и на
+каждое сообщение перебирали их через re.search, а ключевые слова
+социальных сетей проверяли циклом `keyword in text`. Вебхук к тому же
+создавал новый IntentDetector на каждое сообщение, а ArtemAgent
+определял намерение второй раз.
+
+Движок собирается один раз при импорте:
+- базовые намерения - одна альтернация всех слов (приоритет намерений
+  сохраняется: берется самое приоритетное из найденных);
+- специализированные намерения - по одной альтернации на намерение,
+  проверяются только по запросу (IntentDetector они не нужны);
+- URL - по одной альтернации на платформу, только если в тексте есть домен;
+- ключевые слова - автомат Ахо-Корасик (все вхождения за один проход,
+  включая вложенные: "лайк" внутри "дизлайк").
+
+Результат разбора (IntentScan) общий для всех детекторов и сохраняется в
+Message.metadata, поэтому текст сообщения разбирается один раз.
+"""
+
+import re
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple, FrozenSet, Iterable
+
+from ..core.interfaces import Message
+
+logger = logging.getLogger(__name__)
+
+# pyahocorasick - опциональная зависимость: без нее используется автомат на Python
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    ahocorasick = None
+    AHOCORASICK_AVAILABLE = False
+
+
+# Слова базовых намерений в порядке приоритета (совпадение целым словом)
+BASIC_INTENT_WORDS: Dict[str, List[str]] = {
+    "greeting": [
+        'привет', 'здравствуй', 'добрый день', 'добрый вечер', 'доброе утро', 'хай', 'hello', 'hi',
+        'приветствую', 'салют', 'здорово'
+    ],
+    "farewell": [
+        'пока', 'до свидания', 'прощай', 'увидимся', 'до встречи', 'bye', 'goodbye',
+        'спокойной ночи', 'доброй ночи'
+    ],
+    "help": [
+        'помоги', 'помощь', 'help', 'что умеешь', 'что можешь', 'как пользоваться',
+        'инструкция', 'руководство', 'обучение', 'научи'
+    ],
+    "gratitude": [
+        'спасибо', 'благодарю', 'thanks', 'thank you', 'спс',
+        'признателен', 'благодарен'
+    ],
+    "complaint": [
+        'не работает', 'сломалось', 'ошибка', 'проблема', 'баг', 'bug',
+        'плохо', 'ужасно', 'отвратительно', 'не нравится'
+    ]
+}
+
+# Специализированные намерения (UnifiedIntentService) в порядке приоритета
+SPECIALIZED_INTENT_PATTERNS: Dict[str, List[str]] = {
+    "mcp_command": [
+        r"(покажи|показать|список|list|get|получить).*(приложен|app|база|базы|данн|database|db|деплой|deploy)",
+        r"(какие|что за|проверь).*(приложен|app|база|базы|данн|database|db|деплой|deploy)",
+        r"(статус|состояние|status).*(приложен|app|база|базы|данн|database|db|деплой|deploy)",
+        r"/mcp\s+\w+",
+        r"/db\s+.+",
+        r"выполни.*(mcp|команду)"
+    ],
+    "youtube_analysis": [
+        r"(проанализируй|анализ|посмотри|изучи).*(youtube|ютуб|видео)",
+        r"(субтитры|subtitles|транскрипц).*(видео|youtube)",
+        r"(получи|извлеки|достань).*(субтитры|текст).*(видео|youtube)",
+        r"(статистика|просмотры|лайки).*(видео|youtube|ютуб)"
+    ]
+}
+
+# URL социальных сетей по платформам в порядке приоритета
+URL_PATTERNS: Dict[str, List[str]] = {
+    "youtube": [
+        r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=[\w-]+',
+        r'(?:https?://)?(?:www\.)?youtu\.be/[\w-]+',
+        r'(?:https?://)?(?:www\.)?youtube\.com/channel/[\w-]+',
+        r'(?:https?://)?(?:www\.)?youtube\.com/c/[\w-]+',
+        r'(?:https?://)?(?:www\.)?youtube\.com/@[\w-]+'
+    ],
+    "instagram": [
+        r'(?:https?://)?(?:www\.)?instagram\.com/[\w.]+',
+        r'(?:https?://)?(?:www\.)?instagram\.com/p/[\w-]+',
+        r'(?:https?://)?(?:www\.)?instagram\.com/reel/[\w-]+'
+    ],
+    "tiktok": [
+        r'(?:https?://)?(?:www\.)?tiktok\.com/@[\w.]+/video/\d+',
+        r'(?:https?://)?vm\.tiktok\.com/[\w-]+'
+    ]
+}
+
+# Подстроки, без которых URL платформы не совпадет (регулярные выражения не запускаются зря)
+URL_MARKERS: Dict[str, Tuple[str, ...]] = {
+    "youtube": ("youtube.com/", "youtu.be/"),
+    "instagram": ("instagram.com/",),
+    "tiktok": ("tiktok.com/",)
+}
+
+# Ключевые слова социальных сетей (объединение словарей всех детекторов)
+SOCIAL_KEYWORDS: Dict[str, List[str]] = {
+    "youtube": [
+        'youtube', 'ютуб', 'видео', 'ролик', 'канал', 'подписчик',
+        'просмотр', 'лайк', 'дизлайк', 'комментарий', 'трек', 'клип',
+        'стрим', 'stream', 'влог', 'vlog', 'контент', 'субтитры'
+    ],
+    "instagram": [
+        'instagram', 'инстаграм', 'инста', 'пост', 'сторис', 'stories',
+        'рилс', 'reels', 'фото', 'подписчик', 'лайк', 'хештег', 'hashtag'
+    ],
+    "tiktok": [
+        'tiktok', 'тикток', 'тик ток', 'короткое видео', 'челлендж',
+        'challenge', 'тренд', 'trend', 'дуэт', 'duet'
+    ]
+}
+
+QUESTION_WORDS = [
+    'что', 'кто', 'где', 'когда', 'почему', 'зачем', 'как',
+    'какой', 'какая', 'какое', 'какие', 'сколько', 'куда',
+    'откуда', 'чей', 'чья', 'чье', 'чьи'
+]
+
+# Метрики движка
+_engine_stats: Dict[str, Any] = {
+    "scans": 0,
+    "reused": 0,
+    "scan_time_ms": 0.0
+}
+
+
+class KeywordAutomaton:
+    """Автомат Ахо-Корасик: все вхождения набора слов за один проход по тексту"""
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Args:
+            keywords: Слова (подстроки) для поиска
+        """
+        self.keywords = sorted(set(keywords))
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._build()
+
+    def _build(self):
+        """Строит автомат с полностью разрешенными переходами (без цикла по fail-ссылкам при поиске)"""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[FrozenSet[str]] = [frozenset()]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    output.append(frozenset())
+                state = next_state
+            output[state] = output[state] | {keyword}
+
+        # Обход в ширину: fail-ссылки и выходы вложенных слов
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # Переходы состояния = переходы его fail-состояния + собственные
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            output[state] = output[state] | output[fail[state]]
+            for char, next_state in goto[state].items():
+                fail[next_state] = delta[fail[state]].get(char, 0) if state else 0
+                queue.append(next_state)
+
+        self._delta = delta
+        self._output = output
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """Все слова, входящие в текст"""
+        if self._automaton is not None:
+            return frozenset(keyword for _, keyword in self._automaton.iter(text))
+
+        delta = self._delta
+        output = self._output
+        found = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return frozenset(found)
+
+
+@dataclass
+class IntentScan:
+    """Результат разбора текста движком (общий для всех детекторов)"""
+    basic: List[str] = field(default_factory=list)
+    url: Optional[Tuple[str, str]] = None
+    keywords: FrozenSet[str] = frozenset()
+    is_question: bool = False
+    text_lower: str = field(default="", repr=False)
+    # Заполняется IntentEngine.specialized_intents при первом обращении
+    specialized: Optional[List[str]] = None
+
+
+class IntentEngine:
+    """Скомпилированные правила определения намерений"""
+
+    def __init__(
+        self,
+        basic: Dict[str, List[str]] = BASIC_INTENT_WORDS,
+        specialized: Dict[str, List[str]] = SPECIALIZED_INTENT_PATTERNS,
+        urls: Dict[str, List[str]] = URL_PATTERNS,
+        url_markers: Dict[str, Tuple[str, ...]] = URL_MARKERS,
+        keywords: Dict[str, List[str]] = SOCIAL_KEYWORDS,
+        question_words: List[str] = QUESTION_WORDS
+    ):
+        self.basic_order = list(basic)
+        self._basic_words: Dict[str, str] = {}
+        for intent, words in basic.items():
+            for word in words:
+                self._basic_words.setdefault(word, intent)
+        # Длинные варианты раньше коротких: "доброй ночи" не съедается более коротким словом
+        self._basic = re.compile(
+            r"\b(?:" + "|".join(map(re.escape, sorted(self._basic_words, key=len, reverse=True))) + r")\b"
+        )
+
+        # Текст уже в нижнем регистре - IGNORECASE не нужен
+        self._specialized = [
+            (intent, re.compile("|".join(f"(?:{pattern})" for pattern in patterns)))
+            for intent, patterns in specialized.items()
+        ]
+        self._urls = [
+            (platform, url_markers.get(platform, ("",)), re.compile("|".join(f"(?:{pattern})" for pattern in patterns)))
+            for platform, patterns in urls.items()
+        ]
+        self.keywords = keywords
+        self._automaton = KeywordAutomaton(word for words in keywords.values() for word in words)
+        self._question = re.compile(r"(?:^| )(?:" + "|".join(map(re.escape, question_words)) + r") ")
+
+    def scan(self, text: str) -> IntentScan:
+        """Разбирает текст сообщения"""
+        started = time.perf_counter()
+        text_lower = text.lower()
+
+        found = {self._basic_words[match.group(0)] for match in self._basic.finditer(text_lower)}
+        result = IntentScan(
+            basic=[intent for intent in self.basic_order if intent in found],
+            keywords=self._automaton.find(text_lower),
+            is_question=text.strip().endswith('?') or bool(self._question.search(text_lower)),
+            text_lower=text_lower
+        )
+        for platform, markers, regex in self._urls:
+            if not any(marker in text for marker in markers):
+                continue
+            match = regex.search(text)
+            if match:
+                result.url = (platform, match.group(0))
+                break
+
+        _engine_stats["scans"] += 1
+        _engine_stats["scan_time_ms"] += (time.perf_counter() - started) * 1000
+        return result
+
+    def specialized_intents(self, scan: IntentScan) -> List[str]:
+        """Специализированные намерения (проверяются один раз и сохраняются в разборе)"""
+        if scan.specialized is None:
+            scan.specialized = [intent for intent, regex in self._specialized if regex.search(scan.text_lower)]
+        return scan.specialized
+
+    def scan_message(self, message: Message) -> IntentScan:
+        """Разбор сообщения, сохраненный в message.metadata (разбирается один раз)"""
+        if message.metadata is None:
+            message.metadata = {}
+        scan = message.metadata.get("intent_scan")
+        if scan is None:
+            scan = message.metadata["intent_scan"] = self.scan(message.text or "")
+        else:
+            _engine_stats["reused"] += 1
+        return scan
+
+    @staticmethod
+    def keyword_scores(scan: IntentScan, keywords: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Найденные ключевые слова по платформам (в порядке словаря детектора)"""
+        scores = {}
+        for platform, words in keywords.items():
+            matched = [word for word in words if word in scan.keywords]
+            if matched:
+                scores[platform] = matched
+        return scores
+
+
+# Глобальный экземпляр (собирается один раз при импорте)
+intent_engine = IntentEngine()
+
+
+def get_intent_engine_stats() -> Dict[str, Any]:
+    """Метрики движка намерений"""
+    scans = _engine_stats["scans"]
+    return {
+        "automaton": "pyahocorasick" if AHOCORASICK_AVAILABLE else "python",
+        "keywords": len(intent_engine._automaton.keywords),
+        "scans": scans,
+        "reused": _engine_stats["reused"],
+        "avg_scan_us": round(_engine_stats["scan_time_ms"] * 1000 / scans, 1) if scans else 0.0
+    }
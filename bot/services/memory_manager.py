@@ -4,17 +4,23 @@
 Отвечает за сохранение и извлечение контекста разговоров
 """
 
+import sys
+import time
 import logging
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import List, Dict, Any, Optional, Deque
 from datetime import datetime
 
 from zep_cloud.client import AsyncZep
 from zep_cloud import Message as ZepMessage
 
 from ..core.interfaces import IMemoryManager, Message, Response, ServiceError
-from ..core.utils import RetryUtils, CacheUtils
+from ..core.utils import RetryUtils
 from ..core.decorators import measure_time, handle_errors
 from ..core.config import config
+from ..core.cache import cached
+from .memory_writer import memory_writer
 
 
 logger = logging.getLogger(__name__)
@@ -23,15 +29,22 @@ logger = logging.getLogger(__name__)
 class ZepMemoryManager(IMemoryManager):
     """Менеджер памяти на основе Zep"""
     
+    # Сколько известных сессий помнить (проверка memory.get_session пропускается)
+    MAX_KNOWN_SESSIONS = 100000
+    
     def __init__(self):
         """Инициализация менеджера памяти"""
         self.client = None
         self.enabled = False
+        self.writer = memory_writer if memory_writer.enabled else None
+        self._known_sessions: set = set()
+        self.session_checks = {"checked": 0, "skipped": 0}
         
         if config.zep.enabled and config.zep.api_key:
             try:
                 self.client = AsyncZep(
-                    api_key=config.zep.api_key
+                    api_key=config.zep.api_key,
+                    base_url=f"{config.zep.api_url.rstrip('/')}/api/v2"
                 )
                 self.enabled = True
                 logger.info("✅ Zep Memory Manager инициализирован")
@@ -48,58 +61,108 @@ class ZepMemoryManager(IMemoryManager):
         message: Message,
         response: Optional[Response] = None
     ) -> None:
-        """Добавляет сообщение и ответ в память"""
+        """
+        Добавляет сообщение и ответ в память
+        
+        С включенной отложенной записью реплики ставятся в очередь
+        memory_writer и записываются в фоне, ответ пользователю их не ждет.
+        """
         if not self.enabled or not self.client:
             logger.debug(f"Zep отключен, пропускаем сохранение для user {user_id}")
             return
         
+        session_id = self._get_session_id(user_id)
+        user_name = message.user.full_name
+        messages, context = self._build_messages(message, response)
+        
+        if self.writer is not None and self.writer.enqueue(
+            session_id, user_id, user_name, messages, context, self._write_batch
+        ):
+            return
+        
         try:
-            session_id = self._get_session_id(user_id)
-            
-            # Создаем сессию если не существует
-            await self._ensure_session_exists(session_id, user_id, message.user.full_name)
-            
-            # Подготавливаем сообщения
-            messages = []
-            
-            # Добавляем сообщение пользователя
-            user_message = ZepMessage(
-                role="user",
-                role_type="user",
-                content=message.text or f"[{message.type.value}]",
-                metadata={
-                    "message_id": message.id,
-                    "message_type": message.type.value,
-                    "timestamp": message.timestamp.isoformat()
-                }
-            )
-            messages.append(user_message)
-            
-            # Добавляем ответ ассистента если есть
-            if response:
-                assistant_message = ZepMessage(
-                    role="assistant",
-                    role_type="assistant",
-                    content=response.text,
-                    metadata={
-                        "timestamp": datetime.now().isoformat()
-                    }
-                )
-                messages.append(assistant_message)
-            
-            # Сохраняем в Zep
-            await self.client.memory.add(session_id=session_id, messages=messages)
-            
+            if self.writer is not None:
+                # Очередь переполнена - сначала то, что уже ждет записи, чтобы не нарушить порядок
+                await self.writer.flush_session(session_id)
+            await self._write_batch(session_id, user_id, user_name, messages)
             logger.debug(f"✅ Сохранено {len(messages)} сообщений для user {user_id}")
             
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения в Zep для user {user_id}: {e}")
             raise ServiceError(f"Ошибка сохранения памяти: {e}")
     
-    @measure_time
-    @CacheUtils.ttl_cache(ttl_seconds=60)
+    @staticmethod
+    def _build_messages(message: Message, response: Optional[Response]):
+        """Реплики для Zep и те же реплики в формате get_context"""
+        messages = []
+        context = []
+        
+        # Добавляем сообщение пользователя
+        user_content = message.text or f"[{message.type.value}]"
+        messages.append(ZepMessage(
+            role="user",
+            role_type="user",
+            content=user_content,
+            metadata={
+                "message_id": message.id,
+                "message_type": message.type.value,
+                "timestamp": message.timestamp.isoformat()
+            }
+        ))
+        context.append({"role": "user", "content": user_content, "timestamp": message.timestamp.isoformat()})
+        
+        # Добавляем ответ ассистента если есть
+        if response:
+            timestamp = datetime.now().isoformat()
+            messages.append(ZepMessage(
+                role="assistant",
+                role_type="assistant",
+                content=response.text,
+                metadata={
+                    "timestamp": timestamp
+                }
+            ))
+            context.append({"role": "assistant", "content": response.text, "timestamp": timestamp})
+        
+        return messages, context
+    
+    async def _write_batch(self, session_id: str, user_id: int, user_name: str, messages: List[ZepMessage]) -> None:
+        """Записывает реплики сессии одним вызовом memory.add"""
+        if session_id in self._known_sessions:
+            self.session_checks["skipped"] += 1
+        else:
+            # Создаем сессию если не существует
+            await self._ensure_session_exists(session_id, user_id, user_name)
+        
+        try:
+            await self.client.memory.add(session_id=session_id, messages=messages)
+        except Exception:
+            # Сессию могли удалить - в следующий раз проверим заново
+            self._known_sessions.discard(session_id)
+            raise
+        self._forget_context_reads(user_id)
+    
     async def get_context(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
-        """Получает контекст разговора из памяти"""
+        """Получает контекст разговора из памяти (с еще не записанными репликами)"""
+        context = await self._load_context(user_id, limit)
+        if self.writer is None:
+            return context
+        pending = self.writer.pending_context(self._get_session_id(user_id))
+        if not pending:
+            return context
+        return (context + pending)[-limit:]
+    
+    # Пустой контекст (нет истории или Zep недоступен) живет в кеше недолго
+    @cached(
+        "zep_context",
+        ttl=60,
+        max_size=10000,
+        key=lambda self, user_id, limit=10: (user_id, limit),
+        negative_ttl=5
+    )
+    @measure_time
+    async def _load_context(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Контекст разговора из Zep"""
         if not self.enabled or not self.client:
             logger.debug(f"Zep отключен, возвращаем пустой контекст для user {user_id}")
             return []
@@ -141,11 +204,19 @@ class ZepMemoryManager(IMemoryManager):
         
         try:
             session_id = self._get_session_id(user_id)
+            if self.writer is not None:
+                await self.writer.discard(session_id)
             await self.client.memory.delete(session_id=session_id)
+            self._known_sessions.discard(session_id)
+            self._forget_context_reads(user_id)
             logger.info(f"✅ Память очищена для user {user_id}")
         except Exception as e:
             logger.error(f"❌ Ошибка очистки памяти для user {user_id}: {e}")
     
+    def _forget_context_reads(self, user_id: int):
+        """Память изменилась - кешированный контекст пользователя (любой limit) сбрасывается"""
+        self._load_context.cache.invalidate_prefix((user_id,))
+    
     @measure_time
     async def search_memory(self, user_id: int, query: str) -> List[Dict[str, Any]]:
         """Поиск в памяти по запросу"""
@@ -207,9 +278,11 @@ class ZepMemoryManager(IMemoryManager):
     
     async def _ensure_session_exists(self, session_id: str, user_id: int, user_name: str) -> None:
         """Проверяет и создает сессию если не существует"""
+        self.session_checks["checked"] += 1
         try:
             # Пробуем получить сессию
             await self.client.memory.get_session(session_id=session_id)
+            self._remember_session(session_id)
         except Exception:
             # Сессия не существует, создаем
             try:
@@ -222,17 +295,84 @@ class ZepMemoryManager(IMemoryManager):
                         "created_at": datetime.now().isoformat()
                     }
                 )
+                self._remember_session(session_id)
                 logger.debug(f"✅ Создана новая сессия {session_id}")
             except Exception as e:
                 logger.error(f"❌ Ошибка создания сессии: {e}")
+    
+    def _remember_session(self, session_id: str) -> None:
+        """Сессия существует - следующие записи обходятся без проверки"""
+        if len(self._known_sessions) >= self.MAX_KNOWN_SESSIONS:
+            self._known_sessions.clear()
+        self._known_sessions.add(session_id)
+    
+    def get_write_stats(self) -> Dict[str, Any]:
+        """Метрики записи в Zep"""
+        return {
+            "write_behind": self.writer is not None,
+            "known_sessions": len(self._known_sessions),
+            "session_checks": dict(self.session_checks)
+        }
+
+
+class MemoryTurn:
+    """Реплика InMemoryManager: без словаря атрибутов, время - epoch float"""
+    
+    __slots__ = ("role", "content", "timestamp")
+    
+    def __init__(self, role: str, content: str, timestamp: float):
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = timestamp
+    
+    def size(self) -> int:
+        """Примерный занимаемый объем в байтах (запись + текст)"""
+        return TURN_OVERHEAD + sys.getsizeof(self.content)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Реплика в формате get_context"""
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+
+# Запись со слотами + ссылка на нее в deque; строка роли общая для всех реплик
+TURN_OVERHEAD = sys.getsizeof(MemoryTurn("user", "", 0.0)) + sys.getsizeof(0.0) + 8
+# Пустая deque пользователя + запись в OrderedDict с ключом user_id
+USER_OVERHEAD = sys.getsizeof(deque()) + sys.getsizeof(2 ** 40) + 100
 
 
 class InMemoryManager(IMemoryManager):
-    """Простой менеджер памяти в оперативной памяти (fallback)"""
+    """
+    Простой менеджер памяти в оперативной памяти (fallback)
     
-    def __init__(self, max_messages_per_user: int = 100):
-        self.memory: Dict[int, List[Dict[str, Any]]] = {}
+    История пользователя - deque из max_messages_per_user пар реплик
+    (старые выпадают при добавлении). Пользователи хранятся в LRU: при
+    превышении общего бюджета реплик или байт вытесняются те, кто дольше
+    всех не писал и не читал контекст.
+    """
+    
+    def __init__(
+        self,
+        max_messages_per_user: int = 100,
+        max_turns: Optional[int] = None,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Args:
+            max_messages_per_user: Сколько обменов (пар реплик) хранить на пользователя
+            max_turns: Общий лимит реплик (по умолчанию config.memory_store, 0 - без ограничения)
+            max_bytes: Общий лимит объема в байтах (по умолчанию config.memory_store, 0 - без ограничения)
+        """
+        self.memory: "OrderedDict[int, Deque[MemoryTurn]]" = OrderedDict()
         self.max_messages = max_messages_per_user
+        self.max_turns = config.memory_store.inmemory_max_turns if max_turns is None else max_turns
+        self.max_bytes = config.memory_store.inmemory_max_bytes if max_bytes is None else max_bytes
+        self._turns = 0
+        self._bytes = 0
+        self._evictions = 0
     
     async def add_message(
         self,
@@ -241,39 +381,33 @@ class InMemoryManager(IMemoryManager):
         response: Optional[Response] = None
     ) -> None:
         """Добавляет сообщение в память"""
-        if user_id not in self.memory:
-            self.memory[user_id] = []
-        
-        # Добавляем сообщение пользователя
-        self.memory[user_id].append({
-            "role": "user",
-            "content": message.text or f"[{message.type.value}]",
-            "timestamp": message.timestamp.isoformat()
-        })
+        turns = self.memory.get(user_id)
+        if turns is None:
+            turns = self.memory[user_id] = deque(maxlen=self.max_messages * 2)
+            self._bytes += USER_OVERHEAD
+        else:
+            self.memory.move_to_end(user_id)
         
-        # Добавляем ответ если есть
+        self._append(turns, MemoryTurn("user", message.text or f"[{message.type.value}]", message.timestamp.timestamp()))
         if response:
-            self.memory[user_id].append({
-                "role": "assistant",
-                "content": response.text,
-                "timestamp": datetime.now().isoformat()
-            })
+            self._append(turns, MemoryTurn("assistant", response.text, time.time()))
         
-        # Ограничиваем размер истории
-        if len(self.memory[user_id]) > self.max_messages * 2:
-            self.memory[user_id] = self.memory[user_id][-self.max_messages * 2:]
+        self._evict()
     
     async def get_context(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
         """Получает контекст разговора"""
-        if user_id not in self.memory:
+        turns = self.memory.get(user_id)
+        if turns is None:
             return []
         
-        return self.memory[user_id][-limit * 2:]  # Умножаем на 2 для пар user/assistant
+        self.memory.move_to_end(user_id)
+        # Умножаем на 2 для пар user/assistant
+        return [turn.to_dict() for turn in islice(turns, max(0, len(turns) - limit * 2), None)]
     
     async def clear_memory(self, user_id: int) -> None:
         """Очищает память пользователя"""
         if user_id in self.memory:
-            del self.memory[user_id]
+            self._drop(user_id)
     
     async def search_memory(self, user_id: int, query: str) -> List[Dict[str, Any]]:
         """Простой поиск в памяти"""
@@ -283,8 +417,50 @@ class InMemoryManager(IMemoryManager):
         results = []
         query_lower = query.lower()
         
-        for msg in self.memory[user_id]:
-            if query_lower in msg.get("content", "").lower():
-                results.append(msg)
+        for turn in self.memory[user_id]:
+            if query_lower in turn.content.lower():
+                results.append(turn.to_dict())
+                if len(results) == 5:  # Максимум 5 результатов
+                    break
         
-        return results[:5]  # Максимум 5 результатов
\ No newline at end of file
+        return results
+    
+    def _append(self, turns: Deque[MemoryTurn], turn: MemoryTurn):
+        """Добавляет реплику, учитывая выпавшую из заполненной deque"""
+        if len(turns) == turns.maxlen:
+            if not turns.maxlen:
+                return
+            self._turns -= 1
+            self._bytes -= turns[0].size()
+        turns.append(turn)
+        self._turns += 1
+        self._bytes += turn.size()
+    
+    def _drop(self, user_id: int):
+        """Удаляет пользователя и вычитает его объем"""
+        turns = self.memory.pop(user_id)
+        self._turns -= len(turns)
+        self._bytes -= USER_OVERHEAD + sum(turn.size() for turn in turns)
+    
+    def _evict(self):
+        """Вытесняет давно неактивных пользователей, пока не уложимся в бюджет"""
+        # Последнего (текущего) пользователя не вытесняем
+        while len(self.memory) > 1 and (
+            (self.max_turns and self._turns > self.max_turns)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            self._drop(next(iter(self.memory)))
+            self._evictions += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Объем и вытеснения памяти"""
+        return {
+            "backend": "memory",
+            "users": len(self.memory),
+            "resident_turns": self._turns,
+            "resident_bytes": self._bytes,
+            "max_messages_per_user": self.max_messages,
+            "max_turns": self.max_turns,
+            "max_bytes": self.max_bytes,
+            "evictions": self._evictions
+        }
@@ -0,0 +1,315 @@
+"""
+Отложенная запись разговоров в память (write-behind)
+
+ArtemAgent ждал memory_manager.add_message перед тем, как вернуть ответ:
+проверка сессии в Zep (memory.get_session), затем memory.add, а при
+ошибках RetryUtils.retry добавлял еще до ~3 с. Все это стояло между
+ответом LLM и пользователем.
+
+Теперь реплики пользователя и ассистента ставятся в очередь по сессиям и
+записываются фоновым циклом: все накопившиеся реплики сессии - одним
+вызовом memory.add, по таймеру (flush_interval), сразу при наборе
+max_batch_messages и при остановке сервера. Пока реплики не записаны,
+get_context добавляет их к контексту из Zep, поэтому следующий ответ
+их видит. Ошибка записи не теряет реплики: они остаются в начале очереди
+сессии и повторяются на следующем такте (до max_attempts попыток).
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Deque, Callable, Awaitable
+
+from ..core.config import config, MemoryWriteConfig
+from ..core.utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Запись пачки: (session_id, user_id, user_name, messages)
+FlushFunc = Callable[[str, int, str, List[Any]], Awaitable[None]]
+
+
+class _Turn:
+    """Реплики одного обмена (сообщение пользователя и ответ)"""
+
+    __slots__ = ("messages", "context", "enqueued_at")
+
+    def __init__(self, messages: List[Any], context: List[Dict[str, Any]]):
+        self.messages = messages
+        self.context = context
+        self.enqueued_at = time.monotonic()
+
+
+class _Session:
+    """Очередь реплик одной сессии"""
+
+    __slots__ = ("user_id", "user_name", "flush", "turns", "in_flight", "attempts", "discarded", "idle")
+
+    def __init__(self, user_id: int, user_name: str, flush: FlushFunc):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.flush = flush
+        self.turns: Deque[_Turn] = deque()
+        self.in_flight: List[_Turn] = []
+        self.attempts = 0
+        # Память очищена: пачка, которая сейчас пишется, не возвращается в очередь
+        self.discarded = False
+        # Установлено, пока пачка не записывается
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    @property
+    def pending_messages(self) -> int:
+        return sum(len(turn.messages) for turn in self.turns)
+
+
+class MemoryWriteBehind:
+    """Очередь отложенной записи реплик в память по сессиям"""
+
+    # Сколько сессий записывать одновременно
+    FLUSH_CONCURRENCY = 8
+
+    def __init__(self, settings: Optional[MemoryWriteConfig] = None):
+        """
+        Args:
+            settings: Параметры записи (по умолчанию config.memory_write)
+        """
+        self.settings = settings or config.memory_write
+        self._sessions: Dict[str, _Session] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lag: Deque[float] = deque(maxlen=1000)
+        self._counters = {
+            "enqueued_turns": 0,
+            "flushed_batches": 0,
+            "flushed_messages": 0,
+            "failed_flushes": 0,
+            "dropped_messages": 0,
+            "rejected_turns": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    # ------------------------------------------------------------------
+    # Публичный API
+    # ------------------------------------------------------------------
+
+    def enqueue(
+        self,
+        session_id: str,
+        user_id: int,
+        user_name: str,
+        messages: List[Any],
+        context: List[Dict[str, Any]],
+        flush: FlushFunc
+    ) -> bool:
+        """
+        Ставит реплики в очередь сессии
+
+        Args:
+            session_id: Сессия памяти
+            user_id: ID пользователя
+            user_name: Имя пользователя (для создания сессии)
+            messages: Реплики в формате хранилища
+            context: Те же реплики в формате get_context
+            flush: Запись пачки реплик сессии
+
+        Returns:
+            bool: False - очередь переполнена, реплики нужно записать сразу
+        """
+        if self.depth + len(messages) > self.settings.max_queue_messages:
+            self._counters["rejected_turns"] += 1
+            return False
+
+        self._ensure_running()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session(user_id, user_name, flush)
+        session.flush = flush
+        session.turns.append(_Turn(messages, context))
+        self._counters["enqueued_turns"] += 1
+
+        if session.pending_messages >= self.settings.max_batch_messages:
+            self._wakeup.set()
+        return True
+
+    def pending_context(self, session_id: str) -> List[Dict[str, Any]]:
+        """Еще не записанные реплики сессии в формате get_context"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return []
+        return [item for turn in [*session.in_flight, *session.turns] for item in turn.context]
+
+    async def discard(self, session_id: str):
+        """
+        Отбрасывает незаписанные реплики (память пользователя очищена)
+
+        Ждет пачку, которая уже записывается: иначе она попала бы в память
+        после удаления сессии, а при ошибке вернулась бы в очередь.
+        Реплики, поставленные после вызова, идут в новую сессию очереди.
+        """
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.discarded = True
+            session.turns.clear()
+            await session.idle.wait()
+
+    async def flush(self):
+        """Записывает все накопившиеся реплики"""
+        ready = [
+            (session_id, session) for session_id, session in list(self._sessions.items())
+            if session.turns and not session.in_flight
+        ]
+        for start in range(0, len(ready), self.FLUSH_CONCURRENCY):
+            await asyncio.gather(*(
+                self._flush_session(session_id, session)
+                for session_id, session in ready[start:start + self.FLUSH_CONCURRENCY]
+            ))
+
+    async def flush_session(self, session_id: str):
+        """Записывает накопившиеся реплики одной сессии (перед записью в обход очереди)"""
+        session = self._sessions.get(session_id)
+        while session is not None and session.turns and not session.in_flight:
+            await self._flush_session(session_id, session)
+            if session.attempts:
+                break
+
+    async def stop(self, timeout: float = 10.0):
+        """Записывает очередь и останавливает фоновый цикл"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+        deadline = time.monotonic() + timeout
+        while (self.depth or self._in_flight) and time.monotonic() < deadline:
+            await self.flush()
+            if self.depth or self._in_flight:
+                await asyncio.sleep(0.05)
+
+        if self.depth:
+            logger.error(f"❌ Не удалось записать в память {self.depth} сообщений при остановке")
+
+    @property
+    def depth(self) -> int:
+        """Сообщений в очереди (без записываемых сейчас)"""
+        return sum(session.pending_messages for session in self._sessions.values())
+
+    @property
+    def _in_flight(self) -> int:
+        return sum(1 for session in self._sessions.values() if session.in_flight)
+
+    # ------------------------------------------------------------------
+    # Фоновая запись
+    # ------------------------------------------------------------------
+
+    def _ensure_running(self):
+        """Запускает фоновый цикл в текущем event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop_task is not None and not self._loop_task.done() and self._loop is loop:
+            return
+
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._loop_task = loop.create_task(self._run())
+
+    async def _run(self):
+        """Запись по таймеру или при наборе полной пачки"""
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.settings.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Ошибка фоновой записи памяти: {e}")
+
+    async def _flush_session(self, session_id: str, session: _Session):
+        """Одна пачка реплик сессии одним вызовом"""
+        batch: List[_Turn] = []
+        size = 0
+        while session.turns and (not batch or size + len(session.turns[0].messages) <= self.settings.max_batch_messages):
+            turn = session.turns.popleft()
+            batch.append(turn)
+            size += len(turn.messages)
+        session.in_flight = batch
+        session.idle.clear()
+
+        try:
+            await session.flush(
+                session_id,
+                session.user_id,
+                session.user_name,
+                [message for turn in batch for message in turn.messages]
+            )
+        except asyncio.CancelledError:
+            # Остановка посреди записи - реплики вернутся в очередь и запишутся в stop()
+            if not session.discarded:
+                session.turns.extendleft(reversed(batch))
+            raise
+        except Exception as e:
+            session.attempts += 1
+            self._counters["failed_flushes"] += 1
+            if session.discarded:
+                logger.info(f"🗑 Память {session_id}: неудачная пачка отброшена - память очищена")
+            elif session.attempts >= self.settings.max_attempts:
+                self._counters["dropped_messages"] += size
+                session.attempts = 0
+                logger.error(f"❌ Память {session_id}: {size} сообщений не записаны после {self.settings.max_attempts} попыток: {e}")
+            else:
+                # Обратно в начало очереди - порядок реплик сохраняется
+                session.turns.extendleft(reversed(batch))
+                logger.warning(f"⚠️ Память {session_id}: запись отложена (попытка {session.attempts}): {e}")
+        else:
+            session.attempts = 0
+            now = time.monotonic()
+            self._lag.extend(now - turn.enqueued_at for turn in batch)
+            self._counters["flushed_batches"] += 1
+            self._counters["flushed_messages"] += size
+        finally:
+            session.in_flight = []
+            session.idle.set()
+            if not session.turns and self._sessions.get(session_id) is session:
+                del self._sessions[session_id]
+
+        # Сессия накопила еще одну полную пачку, пока шла запись
+        if session.turns and session.pending_messages >= self.settings.max_batch_messages:
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Метрики
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики очереди записи"""
+        now = time.monotonic()
+        oldest = min(
+            (session.turns[0].enqueued_at for session in self._sessions.values() if session.turns),
+            default=None
+        )
+        batches = self._counters["flushed_batches"]
+        return {
+            "enabled": self.settings.enabled,
+            "flush_interval": self.settings.flush_interval,
+            "queue_depth": self.depth,
+            "sessions_pending": sum(1 for session in self._sessions.values() if session.turns),
+            "in_flight": self._in_flight,
+            **self._counters,
+            "avg_batch_messages": round(self._counters["flushed_messages"] / batches, 2) if batches else 0.0,
+            "oldest_pending_s": round(now - oldest, 3) if oldest is not None else 0.0,
+            "lag_ms": {
+                "p50": round(percentile(self._lag, 50) * 1000, 1),
+                "p95": round(percentile(self._lag, 95) * 1000, 1),
+                "max": round(max(self._lag, default=0.0) * 1000, 1)
+            }
+        }
+
+
+# Глобальный экземпляр
+memory_writer = MemoryWriteBehind()
@@ -0,0 +1,177 @@
+"""
+Быстрые ответы на тривиальные сообщения
+
+ArtemAgent определял намерение и не использовал результат: "привет",
+"спасибо", "пока" и "что умеешь?" проходили полный путь - контекст из
+Zep, запрос к LLM, сохранение в память. Для таких сообщений ответ берется
+из шаблонов quick_replies в instruction.json (с именем пользователя, если
+оно известно) без обращения к памяти и LLM.
+
+Шаблон используется только когда сообщение действительно тривиальное:
+намерение включено, уверенность детектора не ниже порога, и после
+удаления слов самого намерения (приветствие, благодарность) остается не
+больше max_extra_words слов. "Привет, сколько стоит бот?" уходит в LLM.
+"""
+
+import re
+import random
+import logging
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+from ..core.interfaces import Message, MessageType, Response
+from ..core.config import config, QuickReplyConfig
+from ..core.logging import annotate_request
+
+logger = logging.getLogger(__name__)
+
+
+# Слова, из которых состоит тривиальное сообщение каждого намерения
+INTENT_VOCABULARY: Dict[str, str] = {
+    "greeting": (
+        r"привет\w*|здравствуй\w*|здрасьте|добр\w+ (?:день|вечер|утро|утречко)|доброе утро|хай|"
+        r"hello|hi|hey|приветствую|салют|здорово|ку"
+    ),
+    "farewell": (
+        r"пока|до свидания|прощай\w*|увидимся|до встречи|до завтра|bye|goodbye|"
+        r"(?:спокойной|доброй) ночи|всего (?:доброго|хорошего)"
+    ),
+    "gratitude": r"спасибо|благодарю|thanks|thank you|thx|спс|признател\w+|благодар\w+",
+    "help": (
+        r"помоги(?:те)?|помощь|help|что (?:ты )?(?:умеешь|можешь)|что вы (?:умеете|можете)|"
+        r"как пользоваться|инструкция|руководство"
+    )
+}
+
+# Слова, которые не превращают тривиальное сообщение в вопрос
+COURTESY_WORDS = {
+    "и", "а", "ну", "вам", "тебе", "всем", "всех", "очень", "большое", "огромное",
+    "друг", "бот", "еще", "ещё", "раз", "уже", "мне", "ок", "ладно", "же"
+}
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_URL_RE = re.compile(r"https?://|www\.|t\.me/", re.IGNORECASE)
+_DIGIT_RE = re.compile(r"\d")
+
+
+class QuickReplyResponder:
+    """Ответы по шаблонам на тривиальные намерения"""
+
+    def __init__(self, settings: Optional[QuickReplyConfig] = None):
+        """
+        Args:
+            settings: Параметры быстрых ответов (по умолчанию config.quick_replies)
+        """
+        self.settings = settings or config.quick_replies
+        self._vocabulary = {
+            intent: re.compile(rf"\b(?:{pattern})\b", re.IGNORECASE)
+            for intent, pattern in INTENT_VOCABULARY.items()
+        }
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {
+            "answered": 0,
+            "not_trivial": 0,
+            "no_template": 0
+        })
+        self.skipped: Dict[str, int] = defaultdict(int)
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    def reply(self, message: Message, intent: Dict[str, Any], instructions: Dict[str, Any]) -> Optional[Response]:
+        """
+        Готовый ответ на тривиальное сообщение
+
+        Args:
+            message: Входящее сообщение
+            intent: Результат IntentDetector/UnifiedIntentService
+            instructions: Инструкции агента (шаблоны в quick_replies)
+
+        Returns:
+            Optional[Response]: Ответ или None - сообщение обрабатывается полностью
+        """
+        intent_type = intent.get("type")
+        if intent_type not in self._vocabulary:
+            return None
+        if intent_type not in self.settings.intents:
+            self.skipped["disabled"] += 1
+            return None
+        if intent.get("confidence", 0.0) < self.settings.min_confidence:
+            self.skipped["low_confidence"] += 1
+            return None
+
+        if not self.is_trivial(message, intent_type):
+            self.stats[intent_type]["not_trivial"] += 1
+            return None
+
+        text = self._render(intent_type, message, instructions)
+        if text is None:
+            self.stats[intent_type]["no_template"] += 1
+            return None
+
+        self.stats[intent_type]["answered"] += 1
+        annotate_request(quick_reply=intent_type)
+        logger.debug(f"⚡ Быстрый ответ ({intent_type}) без памяти и LLM")
+        return Response(
+            text=text,
+            metadata={
+                "quick_reply": True,
+                "intent": intent,
+                "tokens_used": 0
+            }
+        )
+
+    def is_trivial(self, message: Message, intent_type: str) -> bool:
+        """Сообщение состоит из слов намерения и не несет вопроса"""
+        text = message.text or ""
+        if message.type != MessageType.TEXT or message.is_command:
+            return False
+        if _URL_RE.search(text) or _DIGIT_RE.search(text):
+            return False
+        if "?" in text and intent_type != "help":
+            return False
+
+        rest = self._vocabulary[intent_type].sub(" ", text.lower().replace("ё", "е"))
+        if rest == text.lower().replace("ё", "е"):
+            # Детектор сработал на слове, которого нет в словаре намерения
+            return False
+        words = [word for word in _NON_WORD_RE.sub(" ", rest).split() if word not in COURTESY_WORDS]
+        return len(words) <= self.settings.max_extra_words
+
+    def _render(self, intent_type: str, message: Message, instructions: Dict[str, Any]) -> Optional[str]:
+        """Шаблон для намерения с подставленным именем пользователя"""
+        templates = self._templates(intent_type, instructions)
+        name = message.user.first_name if self.settings.personalize else None
+
+        if name:
+            personal = [template for template in templates if "{name}" in template]
+            if personal:
+                return random.choice(personal).replace("{name}", name)
+        general = [template for template in templates if "{name}" not in template]
+        return random.choice(general) if general else None
+
+    @staticmethod
+    def _templates(intent_type: str, instructions: Dict[str, Any]) -> List[str]:
+        templates = (instructions.get("quick_replies") or {}).get(intent_type) or []
+        if isinstance(templates, str):
+            templates = [templates]
+        return [template for template in templates if isinstance(template, str) and template.strip()]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики быстрых ответов"""
+        answered = sum(stats["answered"] for stats in self.stats.values())
+        return {
+            "enabled": self.settings.enabled,
+            "intents": self.settings.intents,
+            "min_confidence": self.settings.min_confidence,
+            "answered": answered,
+            "llm_calls_avoided": answered,
+            # Контекст из памяти и сохранение ответа
+            "memory_calls_avoided": answered * 2,
+            "skipped": dict(self.skipped),
+            "by_intent": {intent: dict(stats) for intent, stats in sorted(self.stats.items())}
+        }
+
+
+# Глобальный экземпляр
+quick_replies = QuickReplyResponder()
@@ -0,0 +1,390 @@
+"""
+Семантический кеш ответов основного агента
+
+Клиенты Business API чаще всего спрашивают одно и то же ("цена", "сроки",
+"как заказать"), и каждый такой вопрос стоил полного вызова LLM. Кеш
+стоит перед HybridResponseGenerator в ArtemAgent: текст вопроса
+нормализуется, превращается в вектор символьных n-грамм (hashing trick,
+NumPy, без сети) и сравнивается по косинусной близости с уже отвеченными
+вопросами. Похожий вопрос (близость не ниже порога) получает готовый ответ.
+
+Кеш привязан к версии instruction.json: после изменения инструкций все
+ответы сбрасываются. Сохраняются только ответы, полученные без истории
+разговора: ответ с контекстом одного пользователя не отдается другим. Вопросы, ответ на которые зависит от разговора
+(уточнения "а это сколько?", ответ на вопрос бота, ссылки, команды),
+проходят мимо кеша. Размер ограничен, вытесняются давно не
+использованные ответы (LRU).
+"""
+
+import re
+import time
+import zlib
+import hashlib
+import json
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..core.interfaces import Message, MessageType, Response, User
+from ..core.config import config, ResponseCacheConfig
+from ..core.logging import annotate_request
+
+logger = logging.getLogger(__name__)
+
+# NumPy - опциональная зависимость: без нее кеш отключается
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+# Намерения, ответ на которые зависит не только от текста вопроса
+UNCACHEABLE_INTENTS = {"youtube_url", "social_media", "command", "complaint"}
+
+# Слова, которые ссылаются на предыдущие сообщения разговора
+FOLLOW_UP_WORDS = {
+    "это", "этот", "эта", "эти", "этого", "этой", "этом", "этим",
+    "он", "она", "оно", "они", "его", "ее", "их", "него", "нее", "них", "ним", "ней",
+    "там", "тогда", "тот", "та", "те", "того", "той", "тем",
+    "выше", "подробнее", "еще", "дальше", "продолжи", "продолжай", "повтори",
+    "да", "нет", "ок", "ага", "хорошо", "понятно", "согласен", "первый", "второй"
+}
+
+# Вежливые слова, которые не меняют смысла вопроса
+FILLER_WORDS = {"пожалуйста", "подскажите", "скажите", "плиз", "ну", "вот", "же"}
+
+_URL_RE = re.compile(r"https?://|www\.|t\.me/|@\w", re.IGNORECASE)
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Нормализует вопрос: регистр, ё, пунктуация, вежливые слова"""
+    text = text.lower().replace("ё", "е")
+    text = _NON_WORD_RE.sub(" ", text)
+    words = [word for word in _SPACES_RE.split(text) if word and word not in FILLER_WORDS]
+    return " ".join(words)
+
+
+def instructions_version(instructions: Dict[str, Any]) -> str:
+    """Версия инструкций: явное поле version и хеш содержимого"""
+    content = json.dumps(instructions, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha1(content.encode()).hexdigest()[:12]
+    version = instructions.get("version")
+    return f"{version}:{digest}" if version else digest
+
+
+class HashingVectorizer:
+    """Векторизатор символьных n-грамм в пространство фиксированной размерности"""
+
+    def __init__(self, dimensions: int = 1024, ngram_range: Tuple[int, int] = (2, 4)):
+        """
+        Args:
+            dimensions: Размерность вектора
+            ngram_range: Минимальная и максимальная длина n-граммы
+        """
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> List[str]:
+        padded = f" {text} "
+        features = []
+        low, high = self.ngram_range
+        for size in range(low, high + 1):
+            features.extend(padded[i:i + size] for i in range(len(padded) - size + 1))
+        # Целые слова усиливают совпадение по смыслу, а не только по написанию
+        features.extend(f"w:{word}" for word in text.split())
+        return features
+
+    def transform(self, text: str) -> "np.ndarray":
+        """Возвращает нормированный вектор текста (float32)"""
+        features = self._features(text)
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        if not features:
+            return vector
+
+        hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+        indices = (hashes % self.dimensions).astype(np.intp)
+        # Старший бит хеша - знак признака: коллизии гасят друг друга, а не накапливаются
+        signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, indices, signs)
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class _Entry:
+    """Закешированный ответ"""
+
+    __slots__ = ("key", "text", "parse_mode", "model", "tokens", "created_at", "hits", "row")
+
+    def __init__(self, key: str, response: Response, row: int):
+        metadata = response.metadata or {}
+        self.key = key
+        self.text = response.text
+        self.parse_mode = response.parse_mode
+        self.model = metadata.get("model")
+        self.tokens = int(metadata.get("tokens_used") or 0)
+        self.created_at = time.monotonic()
+        self.hits = 0
+        self.row = row
+
+
+class SemanticResponseCache:
+    """LRU кеш ответов с поиском похожих вопросов"""
+
+    def __init__(self, settings: Optional[ResponseCacheConfig] = None, dimensions: int = 1024):
+        """
+        Args:
+            settings: Параметры кеша (по умолчанию config.response_cache)
+            dimensions: Размерность векторов вопросов
+        """
+        self.settings = settings or config.response_cache
+        self.enabled = self.settings.enabled and NUMPY_AVAILABLE
+        self.threshold = self.settings.threshold
+        self.max_entries = max(1, self.settings.max_entries)
+        self.ttl = self.settings.ttl
+        self.max_chars = self.settings.max_chars
+        self.version: Optional[str] = None
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._vectorizer = HashingVectorizer(dimensions)
+        self._vectors = None
+        self._row_keys: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+
+        self.stats: Dict[str, Any] = {
+            "lookups": 0,
+            "hits": 0,
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "stores": 0,
+            "not_stored": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "saved_tokens": 0
+        }
+        self.bypassed: Dict[str, int] = defaultdict(int)
+
+        if self.settings.enabled and not NUMPY_AVAILABLE:
+            logger.warning("⚠️ Кеш ответов отключен: не установлен numpy")
+
+    # Ключ
+
+    def make_key(self, message: Message, context: List[Dict[str, Any]],
+                 intent: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Нормализованный вопрос для кеша или None, если ответ зависит от разговора
+
+        Args:
+            message: Входящее сообщение
+            context: Контекст разговора из памяти
+            intent: Результат IntentDetector
+        """
+        if not self.enabled:
+            return None
+        reason = self._bypass_reason(message, context, intent)
+        if reason is not None:
+            self.bypassed[reason] += 1
+            annotate_request(response_cache=f"bypass:{reason}")
+            return None
+        return normalize_text(message.text)
+
+    def _bypass_reason(self, message: Message, context: List[Dict[str, Any]],
+                       intent: Optional[Dict[str, Any]]) -> Optional[str]:
+        text = message.text or ""
+        if message.is_command:
+            return "command"
+        if message.type != MessageType.TEXT or not text.strip():
+            return "type"
+        if len(text) > self.max_chars:
+            return "long"
+        if _URL_RE.search(text):
+            return "url"
+        if intent and intent.get("type") in UNCACHEABLE_INTENTS:
+            return "intent"
+
+        words = normalize_text(text).split()
+        if not words:
+            return "type"
+        if context:
+            if FOLLOW_UP_WORDS.intersection(words) or words[0] in ("а", "и", "но"):
+                return "follow_up"
+            last = context[-1]
+            if last.get("role") == "assistant" and (last.get("content") or "").rstrip().endswith("?"):
+                # Пользователь отвечает на вопрос бота
+                return "answer"
+        return None
+
+    # Поиск и сохранение
+
+    def _check_version(self, version: str):
+        """Сбрасывает кеш при смене версии инструкций"""
+        if version == self.version:
+            return
+        if self._entries:
+            self.stats["invalidations"] += 1
+            logger.info(f"🔄 Инструкции изменились ({self.version} → {version}), кеш ответов сброшен")
+        self.clear()
+        self.version = version
+
+    def get(self, key: Optional[str], version: str) -> Optional[Response]:
+        """
+        Ищет ответ на такой же или похожий вопрос
+
+        Args:
+            key: Результат make_key
+            version: Версия инструкций
+
+        Returns:
+            Optional[Response]: Закешированный ответ или None
+        """
+        if key is None:
+            return None
+        self._check_version(version)
+        self.stats["lookups"] += 1
+
+        similarity = 1.0
+        entry = self._entries.get(key)
+        if entry is None and self._entries:
+            vector = self._vectorizer.transform(key)
+            scores = self._vectors @ vector
+            row = int(scores.argmax())
+            if scores[row] >= self.threshold and self._row_keys[row] is not None:
+                entry = self._entries[self._row_keys[row]]
+                similarity = float(scores[row])
+
+        if entry is not None and self.ttl and time.monotonic() - entry.created_at > self.ttl:
+            self.stats["expired"] += 1
+            self._remove(entry)
+            entry = None
+
+        if entry is None:
+            self.stats["misses"] += 1
+            annotate_request(response_cache="miss")
+            return None
+
+        self._entries.move_to_end(entry.key)
+        entry.hits += 1
+        self.stats["hits"] += 1
+        self.stats["exact_hits" if entry.key == key else "semantic_hits"] += 1
+        self.stats["saved_tokens"] += entry.tokens
+        annotate_request(response_cache="hit", response_cache_similarity=round(similarity, 3))
+
+        return Response(
+            text=entry.text,
+            parse_mode=entry.parse_mode,
+            metadata={
+                "model": entry.model,
+                "tokens_used": 0,
+                "cached": True,
+                "cache_similarity": round(similarity, 3),
+                "tokens_saved": entry.tokens
+            }
+        )
+
+    def put(self, key: Optional[str], response: Response, version: str, user: Optional[User] = None,
+            context: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        Сохраняет ответ LLM
+
+        Args:
+            key: Результат make_key
+            response: Ответ генератора
+            version: Версия инструкций, с которой получен ответ
+            user: Автор вопроса (ответы с его именем не кешируются)
+            context: Контекст, с которым получен ответ (ответы с историей не кешируются)
+
+        Returns:
+            bool: Ответ сохранен
+        """
+        if key is None:
+            return False
+        self._check_version(version)
+
+        if context or not self._is_reusable(response, user):
+            self.stats["not_stored"] += 1
+            return False
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._remove(entry)
+        if len(self._entries) >= self.max_entries:
+            _, oldest = self._entries.popitem(last=False)
+            self._release_row(oldest)
+            self.stats["evictions"] += 1
+
+        row = self._allocate_row()
+        self._vectors[row] = self._vectorizer.transform(key)
+        self._row_keys[row] = key
+        self._entries[key] = _Entry(key, response, row)
+        self.stats["stores"] += 1
+        return True
+
+    def _is_reusable(self, response: Response, user: Optional[User]) -> bool:
+        """Подходит ли ответ другим пользователям"""
+        metadata = response.metadata or {}
+        if not response.text or metadata.get("error") or metadata.get("cached"):
+            return False
+        if user is not None:
+            text = response.text.lower()
+            for name in (user.first_name, user.last_name, user.username):
+                if name and len(name) >= 3 and name.lower() in text:
+                    # Ответ обращается к пользователю по имени
+                    return False
+        return True
+
+    # Хранилище векторов
+
+    def _allocate_row(self) -> int:
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, self._vectorizer.dimensions), dtype=np.float32)
+            self._row_keys = [None] * self.max_entries
+            self._free_rows = list(range(self.max_entries - 1, -1, -1))
+        return self._free_rows.pop()
+
+    def _release_row(self, entry: _Entry):
+        self._vectors[entry.row] = 0.0
+        self._row_keys[entry.row] = None
+        self._free_rows.append(entry.row)
+
+    def _remove(self, entry: _Entry):
+        self._entries.pop(entry.key, None)
+        self._release_row(entry)
+
+    def clear(self):
+        """Очищает кеш"""
+        self._entries.clear()
+        self._vectors = None
+        self._row_keys = []
+        self._free_rows = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики кеша ответов"""
+        answered = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "numpy_available": NUMPY_AVAILABLE,
+            "version": self.version,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / answered, 3) if answered else 0.0,
+            "bypassed": dict(self.bypassed),
+            "top_entries": [
+                {"question": entry.key, "hits": entry.hits, "tokens": entry.tokens}
+                for entry in sorted(self._entries.values(), key=lambda e: e.hits, reverse=True)[:10]
+            ]
+        }
+
+
+# Глобальный экземпляр
+response_cache = SemanticResponseCache()
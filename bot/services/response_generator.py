@@ -10,12 +10,14 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 import openai
-from anthropic import AsyncAnthropic
 
 from ..core.interfaces import IResponseGenerator, Message, Response, ServiceError
 from ..core.utils import TextUtils, RetryUtils, FileUtils
 from ..core.decorators import measure_time, handle_errors, ensure_service_enabled
 from ..core.config import config
+from ..llm_clients import llm_clients
+from ..reply_stream import current_reply_stream
+from .context_packer import context_packer
 
 
 logger = logging.getLogger(__name__)
@@ -46,32 +48,35 @@ class OpenAIResponseGenerator(IResponseGenerator):
             
             # Подготавливаем сообщения для API
             messages = [{"role": "system", "content": system_prompt}]
+            user_text = message.text or f"[{message.type.value}]"
             
-            # Добавляем контекст
-            for ctx_msg in context:
-                messages.append({
-                    "role": ctx_msg.get("role", "user"),
-                    "content": ctx_msg.get("content", "")
-                })
+            # Добавляем контекст в пределах бюджета токенов модели
+            packed = context_packer.pack(context, self.model, system_prompt, user_text, max_output_tokens=1000)
+            messages.extend(packed.messages)
             
             # Добавляем текущее сообщение
             messages.append({
                 "role": "user",
-                "content": message.text or f"[{message.type.value}]"
+                "content": user_text
             })
             
-            # Вызываем OpenAI API
-            client = openai.AsyncOpenAI(api_key=config.openai.api_key)
-            response = await client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1000,
-                user=str(message.user.id)
-            )
-            
-            # Извлекаем ответ
-            ai_response = response.choices[0].message.content
+            # Вызываем OpenAI API (клиент из общего пула соединений)
+            client = llm_clients.openai(config.openai.api_key)
+            stream = current_reply_stream()
+            if stream is not None:
+                ai_response, tokens_used = await self._generate_streaming(client, messages, message, stream)
+            else:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1000,
+                    user=str(message.user.id)
+                )
+                
+                # Извлекаем ответ
+                ai_response = response.choices[0].message.content
+                tokens_used = response.usage.total_tokens if response.usage else 0
             
             # Обрезаем если слишком длинный
             ai_response = TextUtils.truncate(ai_response, config.max_message_length)
@@ -82,7 +87,8 @@ class OpenAIResponseGenerator(IResponseGenerator):
                 text=ai_response,
                 metadata={
                     "model": self.model,
-                    "tokens_used": response.usage.total_tokens if response.usage else 0
+                    "tokens_used": tokens_used,
+                    "streamed": stream is not None
                 }
             )
             
@@ -96,6 +102,33 @@ class OpenAIResponseGenerator(IResponseGenerator):
             logger.error(f"❌ Неожиданная ошибка: {e}")
             raise ServiceError(f"Внутренняя ошибка: {e}")
     
+    async def _generate_streaming(self, client, messages, message: Message, stream) -> tuple:
+        """Генерирует ответ потоком, передавая куски текста в Telegram"""
+        stream.begin()
+        chunks = await client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=1000,
+            user=str(message.user.id),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        parts = []
+        tokens_used = 0
+        async for chunk in chunks:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    stream.push(delta)
+            if chunk.usage:
+                tokens_used = chunk.usage.total_tokens
+        stream.complete()
+        
+        return "".join(parts), tokens_used
+    
     async def is_available(self) -> bool:
         """Проверяет доступность генератора"""
         return self.enabled
@@ -144,7 +177,7 @@ class AnthropicResponseGenerator(IResponseGenerator):
         self.instructions = self._load_instructions()
         
         if self.enabled:
-            self.client = AsyncAnthropic(api_key=config.anthropic.api_key)
+            self.client = llm_clients.anthropic(config.anthropic.api_key)
             logger.info(f"✅ Anthropic Response Generator инициализирован (модель: {self.model})")
         else:
             logger.warning("⚠️ Anthropic Response Generator отключен - нет API ключа")
@@ -162,29 +195,30 @@ class AnthropicResponseGenerator(IResponseGenerator):
             system_prompt = self._prepare_system_prompt(message.user)
             
             # Подготавливаем сообщения для API
-            messages = []
+            user_text = message.text or f"[{message.type.value}]"
             
-            # Добавляем контекст
-            for ctx_msg in context:
-                messages.append({
-                    "role": ctx_msg.get("role", "user"),
-                    "content": ctx_msg.get("content", "")
-                })
+            # Добавляем контекст в пределах бюджета токенов модели
+            packed = context_packer.pack(context, self.model, system_prompt, user_text, max_output_tokens=1024)
+            messages = packed.messages
             
             # Добавляем текущее сообщение
             messages.append({
                 "role": "user",
-                "content": message.text or f"[{message.type.value}]"
+                "content": user_text
             })
             
             # Вызываем Claude API
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                system=system_prompt,
-                messages=messages,
-                metadata={"user_id": str(message.user.id)}
-            )
+            stream = current_reply_stream()
+            if stream is not None:
+                response = await self._generate_streaming(system_prompt, messages, message, stream)
+            else:
+                response = await self.client.messages.create(
+                    model=self.model,
+                    max_tokens=1024,
+                    system=system_prompt,
+                    messages=messages,
+                    metadata={"user_id": str(message.user.id)}
+                )
             
             # Извлекаем ответ
             ai_response = response.content[0].text
@@ -198,7 +232,8 @@ class AnthropicResponseGenerator(IResponseGenerator):
                 text=ai_response,
                 metadata={
                     "model": self.model,
-                    "tokens_used": response.usage.input_tokens + response.usage.output_tokens
+                    "tokens_used": response.usage.input_tokens + response.usage.output_tokens,
+                    "streamed": stream is not None
                 }
             )
             
@@ -206,6 +241,22 @@ class AnthropicResponseGenerator(IResponseGenerator):
             logger.error(f"❌ Ошибка Anthropic API: {e}")
             raise ServiceError(f"Ошибка генерации ответа: {e}")
     
+    async def _generate_streaming(self, system_prompt: str, messages, message: Message, stream):
+        """Генерирует ответ потоком, передавая куски текста в Telegram"""
+        stream.begin()
+        async with self.client.messages.stream(
+            model=self.model,
+            max_tokens=1024,
+            system=system_prompt,
+            messages=messages,
+            metadata={"user_id": str(message.user.id)}
+        ) as events:
+            async for delta in events.text_stream:
+                stream.push(delta)
+            response = await events.get_final_message()
+        stream.complete()
+        return response
+    
     async def is_available(self) -> bool:
         """Проверяет доступность генератора"""
         return self.enabled and self.client is not None
@@ -12,6 +12,8 @@ from datetime import datetime, timedelta
 import json
 
 from ..config import YOUTUBE_API_KEY, INSTAGRAM_API_KEY, TIKTOK_API_KEY
+from ..core.single_flight import single_flight
+from ..core.cache import cached
 
 logger = logging.getLogger(__name__)
 
@@ -124,6 +126,10 @@ class YouTubeStrategy:
         self.base_url = 'https://www.googleapis.com/youtube/v3'
         self.api_key = YOUTUBE_API_KEY
         
+    @single_flight(
+        "youtube_search",
+        key=lambda self, query, search_type, limit: (search_type, " ".join(query.lower().split()), limit)
+    )
     async def search(self, query: str, search_type: str, limit: int) -> List[Dict]:
         """
         Поиск на YouTube
@@ -283,6 +289,15 @@ class YouTubeStrategy:
                 video_ids = [item['id']['videoId'] for item in data['items']]
                 return await self._get_videos_stats(video_ids)
     
+    # search.list стоит 100 единиц квоты, а handle канала не меняется;
+    # "не найден" (и ошибка API) кешируется ненадолго
+    @cached(
+        "youtube_channel_handle",
+        ttl=24 * 3600,
+        max_size=2048,
+        key=lambda self, handle: handle.strip().lower(),
+        negative_ttl=300
+    )
     async def _get_channel_id_by_handle(self, handle: str) -> Optional[str]:
         """
         Получение ID канала по handle
@@ -368,6 +383,7 @@ class YouTubeStrategy:
                 
                 return results
     
+    @single_flight("youtube_channel", key=lambda self, channel_id: channel_id.strip())
     async def get_channel_info(self, channel_id: str) -> Dict:
         """
         Получение информации о канале
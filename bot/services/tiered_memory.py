@@ -0,0 +1,205 @@
+"""
+Двухуровневая память разговоров: локальный горячий уровень перед Zep
+
+ArtemAgent перед каждым ответом читал контекст из Zep
+(memory.get(session_id, lastn)) - сетевой запрос на каждое сообщение,
+хотя последние реплики записал этот же процесс секунды назад.
+
+TieredMemoryManager хранит последние max_messages реплик пользователя в
+процессе (deque с ограничением длины, пользователи - LRU на max_users):
+- чтение (read-through): первый запрос пользователя читается из Zep и
+  заполняет горячий уровень, дальше контекст отдается локально; limit
+  больше max_messages читается из Zep;
+- запись (write-through): реплика добавляется в горячий уровень и
+  передается в Zep; если Zep не принял запись, пользователь удаляется из
+  горячего уровня, чтобы уровни не расходились;
+- поиск и саммари - только в Zep.
+
+Пустой контекст из Zep горячий уровень не заполняет: ZepMemoryManager
+возвращает [] и при ошибке, а новому пользователю хватит одного
+повторного чтения после первой записи.
+"""
+
+import time
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Any, List, Optional, Deque
+
+from ..core.interfaces import IMemoryManager, Message, Response
+from ..core.config import config, MemoryTierConfig
+from ..core.single_flight import get_flight_group
+from ..core.utils import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class TierStats:
+    """Попадания и задержка по уровням памяти"""
+
+    SAMPLES = 1000
+
+    def __init__(self):
+        self.counters = {
+            "hot_hits": 0,
+            "remote_reads": 0,
+            "warmups": 0,
+            "warmups_discarded": 0,
+            "oversized_reads": 0,
+            "evictions": 0,
+            "write_failures": 0
+        }
+        self.latency: Dict[str, Deque[float]] = {
+            "hot": deque(maxlen=self.SAMPLES),
+            "remote": deque(maxlen=self.SAMPLES)
+        }
+
+    def record(self, tier: str, started: float):
+        self.latency[tier].append((time.perf_counter() - started) * 1000)
+
+    def get_stats(self) -> Dict[str, Any]:
+        reads = self.counters["hot_hits"] + self.counters["remote_reads"]
+        return {
+            **self.counters,
+            "hit_ratio": round(self.counters["hot_hits"] / reads, 3) if reads else 0.0,
+            "latency_ms": {
+                tier: {
+                    "p50": round(percentile(samples, 50), 3),
+                    "p95": round(percentile(samples, 95), 3),
+                    "max": round(max(samples, default=0.0), 3)
+                }
+                for tier, samples in self.latency.items()
+            }
+        }
+
+
+class TieredMemoryManager(IMemoryManager):
+    """Память с локальным горячим уровнем перед удаленным хранилищем"""
+
+    def __init__(self, remote: IMemoryManager, settings: Optional[MemoryTierConfig] = None):
+        """
+        Args:
+            remote: Удаленная память (ZepMemoryManager)
+            settings: Параметры горячего уровня (по умолчанию config.memory_tier)
+        """
+        self.remote = remote
+        self.settings = settings or config.memory_tier
+        self.max_messages = max(1, self.settings.max_messages)
+        self._hot: "OrderedDict[int, Deque[Dict[str, Any]]]" = OrderedDict()
+        # Пользователи, чей контекст сейчас читается из Zep: число записей за время чтения
+        self._loading: Dict[int, int] = {}
+        self._flight = get_flight_group("memory_warmup")
+        self.stats = TierStats()
+
+    async def add_message(
+        self,
+        user_id: int,
+        message: Message,
+        response: Optional[Response] = None
+    ) -> None:
+        """Добавляет реплики в горячий уровень и в удаленную память"""
+        if user_id in self._loading:
+            self._loading[user_id] += 1
+
+        turns = self._hot.get(user_id)
+        if turns is not None:
+            turns.extend(self._build_context(message, response))
+            self._hot.move_to_end(user_id)
+
+        try:
+            await self.remote.add_message(user_id, message, response)
+        except Exception:
+            self.stats.counters["write_failures"] += 1
+            self._hot.pop(user_id, None)
+            raise
+
+    async def get_context(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Контекст из горячего уровня; промах - чтение из Zep с заполнением"""
+        started = time.perf_counter()
+
+        if limit > self.max_messages:
+            self.stats.counters["oversized_reads"] += 1
+            context = await self.remote.get_context(user_id, limit)
+            self.stats.counters["remote_reads"] += 1
+            self.stats.record("remote", started)
+            return context
+
+        turns = self._hot.get(user_id)
+        if turns is None:
+            turns = await self._flight.do(user_id, self._warm_up, user_id)
+            self.stats.counters["remote_reads"] += 1
+            self.stats.record("remote", started)
+            return [dict(item) for item in islice(turns, max(0, len(turns) - limit), None)]
+
+        self._hot.move_to_end(user_id)
+        context = [dict(item) for item in islice(turns, max(0, len(turns) - limit), None)]
+        self.stats.counters["hot_hits"] += 1
+        self.stats.record("hot", started)
+        return context
+
+    async def clear_memory(self, user_id: int) -> None:
+        """Очищает память пользователя на обоих уровнях"""
+        self._hot.pop(user_id, None)
+        if user_id in self._loading:
+            self._loading[user_id] += 1
+        self._flight.forget(user_id)
+        await self.remote.clear_memory(user_id)
+
+    async def search_memory(self, user_id: int, query: str) -> List[Dict[str, Any]]:
+        """Поиск выполняет удаленная память"""
+        return await self.remote.search_memory(user_id, query)
+
+    async def get_session_summary(self, user_id: int) -> Optional[str]:
+        """Саммари сессии из удаленной памяти"""
+        get_summary = getattr(self.remote, "get_session_summary", None)
+        return await get_summary(user_id) if get_summary else None
+
+    def get_write_stats(self) -> Dict[str, Any]:
+        """Метрики записи удаленной памяти"""
+        get_stats = getattr(self.remote, "get_write_stats", None)
+        return get_stats() if get_stats else {}
+
+    async def _warm_up(self, user_id: int) -> Deque[Dict[str, Any]]:
+        """Читает последние max_messages реплик из Zep и заполняет горячий уровень"""
+        self._loading[user_id] = 0
+        try:
+            context = await self.remote.get_context(user_id, self.max_messages)
+        finally:
+            writes = self._loading.pop(user_id, 0)
+
+        turns = deque(context, maxlen=self.max_messages)
+        if writes or not context:
+            # За время чтения появились записи (или истории нет) - не заполняем
+            self.stats.counters["warmups_discarded"] += 1
+            return turns
+
+        self._hot[user_id] = turns
+        self.stats.counters["warmups"] += 1
+        while len(self._hot) > self.settings.max_users:
+            self._hot.popitem(last=False)
+            self.stats.counters["evictions"] += 1
+        return turns
+
+    @staticmethod
+    def _build_context(message: Message, response: Optional[Response]) -> List[Dict[str, Any]]:
+        """Реплики обмена в формате get_context"""
+        context = [{
+            "role": "user",
+            "content": message.text or f"[{message.type.value}]",
+            "timestamp": message.timestamp.isoformat()
+        }]
+        if response:
+            context.append({"role": "assistant", "content": response.text, "timestamp": datetime.now().isoformat()})
+        return context
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики горячего уровня"""
+        return {
+            "enabled": True,
+            "max_messages": self.max_messages,
+            "max_users": self.settings.max_users,
+            "users": len(self._hot),
+            "resident_messages": sum(len(turns) for turns in self._hot.values()),
+            **self.stats.get_stats()
+        }
@@ -6,12 +6,13 @@
 
 import re
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple
 from enum import Enum
 from datetime import datetime
 
 from ..core.interfaces import Message, IIntentDetector
 from ..core.decorators import measure_time
+from .intent_engine import IntentEngine, IntentScan, intent_engine
 
 logger = logging.getLogger(__name__)
 
@@ -50,59 +51,27 @@ class UnifiedIntentService(IIntentDetector):
     - Логику уточнения намерений
     """
     
-    def __init__(self):
-        """Инициализация с загрузкой всех паттернов"""
-        self._init_patterns()
-        self._init_social_media_patterns()
-        self._init_specialized_patterns()
-        logger.info("✅ UnifiedIntentService инициализирован")
-        
-    def _init_patterns(self):
-        """Инициализация базовых паттернов"""
-        self.patterns = {
-            UnifiedIntentType.GREETING: [
-                r'\b(привет|здравствуй|добрый день|добрый вечер|доброе утро|хай|hello|hi)\b',
-                r'\b(приветствую|салют|здорово)\b'
-            ],
-            UnifiedIntentType.FAREWELL: [
-                r'\b(пока|до свидания|прощай|увидимся|до встречи|bye|goodbye)\b',
-                r'\b(спокойной ночи|доброй ночи)\b'
-            ],
-            UnifiedIntentType.HELP: [
-                r'\b(помоги|помощь|help|что умеешь|что можешь|как пользоваться)\b',
-                r'\b(инструкция|руководство|обучение|научи)\b'
-            ],
-            UnifiedIntentType.GRATITUDE: [
-                r'\b(спасибо|благодарю|thanks|thank you|спс)\b',
-                r'\b(признателен|благодарен)\b'
-            ],
-            UnifiedIntentType.COMPLAINT: [
-                r'\b(не работает|сломалось|ошибка|проблема|баг|bug)\b',
-                r'\b(плохо|ужасно|отвратительно|не нравится)\b'
-            ]
-        }
-        
-    def _init_social_media_patterns(self):
-        """Инициализация паттернов социальных медиа"""
-        self.url_patterns = {
-            'youtube': [
-                r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=[\w-]+',
-                r'(?:https?://)?(?:www\.)?youtu\.be/[\w-]+',
-                r'(?:https?://)?(?:www\.)?youtube\.com/channel/[\w-]+',
-                r'(?:https?://)?(?:www\.)?youtube\.com/c/[\w-]+',
-                r'(?:https?://)?(?:www\.)?youtube\.com/@[\w-]+'
-            ],
-            'instagram': [
-                r'(?:https?://)?(?:www\.)?instagram\.com/[\w.]+',
-                r'(?:https?://)?(?:www\.)?instagram\.com/p/[\w-]+',
-                r'(?:https?://)?(?:www\.)?instagram\.com/reel/[\w-]+'
-            ],
-            'tiktok': [
-                r'(?:https?://)?(?:www\.)?tiktok\.com/@[\w.]+/video/\d+',
-                r'(?:https?://)?vm\.tiktok\.com/[\w-]+'
-            ]
-        }
+    # Порядок проверки базовых и специализированных намерений
+    BASIC_INTENTS = [
+        UnifiedIntentType.GREETING,
+        UnifiedIntentType.FAREWELL,
+        UnifiedIntentType.HELP,
+        UnifiedIntentType.GRATITUDE,
+        UnifiedIntentType.COMPLAINT
+    ]
+    SPECIALIZED_INTENTS = [
+        UnifiedIntentType.MCP_COMMAND,
+        UnifiedIntentType.YOUTUBE_ANALYSIS
+    ]
+    
+    def __init__(self, engine: Optional[IntentEngine] = None):
+        """
+        Инициализация (паттерны скомпилированы в общем движке)
         
+        Args:
+            engine: Скомпилированные правила (по умолчанию общий intent_engine)
+        """
+        self.engine = engine or intent_engine
         self.social_keywords = {
             'youtube': [
                 'youtube', 'ютуб', 'видео', 'ролик', 'канал', 'подписчик',
@@ -117,25 +86,7 @@ class UnifiedIntentService(IIntentDetector):
                 'challenge', 'тренд', 'trend'
             ]
         }
-        
-    def _init_specialized_patterns(self):
-        """Инициализация специализированных паттернов"""
-        self.specialized_patterns = {
-            UnifiedIntentType.MCP_COMMAND: [
-                r"(покажи|показать|список|list|get|получить).*(приложен|app|база|базы|данн|database|db|деплой|deploy)",
-                r"(какие|что за|проверь).*(приложен|app|база|базы|данн|database|db|деплой|deploy)",
-                r"(статус|состояние|status).*(приложен|app|база|базы|данн|database|db|деплой|deploy)",
-                r"/mcp\s+\w+",
-                r"/db\s+.+",
-                r"выполни.*(mcp|команду)"
-            ],
-            UnifiedIntentType.YOUTUBE_ANALYSIS: [
-                r"(проанализируй|анализ|посмотри|изучи).*(youtube|ютуб|видео)",
-                r"(субтитры|subtitles|транскрипц).*(видео|youtube)",
-                r"(получи|извлеки|достань).*(субтитры|текст).*(видео|youtube)",
-                r"(статистика|просмотры|лайки).*(видео|youtube|ютуб)"
-            ]
-        }
+        logger.info("✅ UnifiedIntentService инициализирован")
         
     @measure_time
     async def detect(self, message: Message) -> Dict[str, Any]:
@@ -152,8 +103,6 @@ class UnifiedIntentService(IIntentDetector):
         if not text:
             return self._create_intent_result(UnifiedIntentType.UNKNOWN)
             
-        text_lower = text.lower()
-        
         # 1. Проверяем команды
         if message.is_command:
             command, args = message.get_command()
@@ -165,28 +114,30 @@ class UnifiedIntentService(IIntentDetector):
                 }
             )
             
+        # Текст разбирается один раз (разбор общий с IntentDetector)
+        scan = self.engine.scan_message(message)
+        
         # 2. Проверяем URL социальных медиа
-        url_intent = self._detect_social_media_url(text)
-        if url_intent:
-            return url_intent
+        if scan.url:
+            return self._url_intent(*scan.url)
             
         # 3. Проверяем специализированные паттерны (MCP, YouTube)
-        specialized_intent = self._detect_specialized_intent(text_lower)
+        specialized_intent = self._detect_specialized_intent(scan, text)
         if specialized_intent:
             return specialized_intent
             
         # 4. Проверяем базовые паттерны
-        for intent_type, patterns in self.patterns.items():
-            if self._matches_patterns(text_lower, patterns):
+        for intent_type in self.BASIC_INTENTS:
+            if intent_type.value in scan.basic:
                 return self._create_intent_result(intent_type)
                 
         # 5. Проверяем упоминания социальных медиа
-        social_intent = self._detect_social_media_keywords(text_lower)
+        social_intent = self._detect_social_media_keywords(scan)
         if social_intent:
             return social_intent
             
         # 6. Проверяем, является ли это вопросом
-        if self._is_question(text):
+        if scan.is_question:
             return self._create_intent_result(UnifiedIntentType.QUESTION)
             
         # 7. По умолчанию - обычный чат
@@ -224,51 +175,38 @@ class UnifiedIntentService(IIntentDetector):
         
         return intent_type, confidence, metadata
         
-    def _matches_patterns(self, text: str, patterns: List[str]) -> bool:
-        """Проверяет соответствие текста паттернам"""
-        for pattern in patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-        return False
-        
-    def _detect_social_media_url(self, text: str) -> Optional[Dict[str, Any]]:
-        """Определяет URL социальных медиа"""
-        for platform, patterns in self.url_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, text)
-                if match:
-                    url = match.group(0)
-                    
-                    if platform == 'youtube':
-                        video_id = self._extract_youtube_video_id(url)
-                        return self._create_intent_result(
-                            UnifiedIntentType.YOUTUBE_URL,
-                            metadata={
-                                "platform": platform,
-                                "url": url,
-                                "video_id": video_id
-                            }
-                        )
-                        
-                    return self._create_intent_result(
-                        UnifiedIntentType.SOCIAL_MEDIA,
-                        metadata={
-                            "platform": platform,
-                            "url": url
-                        }
-                    )
-        return None
+    def _url_intent(self, platform: str, url: str) -> Dict[str, Any]:
+        """Намерение для найденного URL социальных медиа"""
+        if platform == 'youtube':
+            video_id = self._extract_youtube_video_id(url)
+            return self._create_intent_result(
+                UnifiedIntentType.YOUTUBE_URL,
+                metadata={
+                    "platform": platform,
+                    "url": url,
+                    "video_id": video_id
+                }
+            )
+            
+        return self._create_intent_result(
+            UnifiedIntentType.SOCIAL_MEDIA,
+            metadata={
+                "platform": platform,
+                "url": url
+            }
+        )
         
-    def _detect_specialized_intent(self, text: str) -> Optional[Dict[str, Any]]:
+    def _detect_specialized_intent(self, scan: IntentScan, text: str) -> Optional[Dict[str, Any]]:
         """Определяет специализированные намерения"""
-        for intent_type, patterns in self.specialized_patterns.items():
-            if self._matches_patterns(text, patterns):
+        specialized = self.engine.specialized_intents(scan)
+        for intent_type in self.SPECIALIZED_INTENTS:
+            if intent_type.value in specialized:
                 metadata = {"specialized": True}
                 
                 # Добавляем специфичные метаданные
                 if intent_type == UnifiedIntentType.YOUTUBE_ANALYSIS:
                     # Проверяем наличие URL
-                    url_match = re.search(r'https?://\S+', text)
+                    url_match = re.search(r'https?://\S+', text.lower())
                     if url_match:
                         metadata["has_url"] = True
                         metadata["url"] = url_match.group(0)
@@ -277,57 +215,23 @@ class UnifiedIntentService(IIntentDetector):
                 
         return None
         
-    def _detect_social_media_keywords(self, text: str) -> Optional[Dict[str, Any]]:
+    def _detect_social_media_keywords(self, scan: IntentScan) -> Optional[Dict[str, Any]]:
         """Определяет упоминания социальных медиа по ключевым словам"""
-        scores = {}
-        
-        for platform, keywords in self.social_keywords.items():
-            score = 0
-            matched_keywords = []
-            
-            for keyword in keywords:
-                if keyword in text:
-                    score += 1
-                    matched_keywords.append(keyword)
-                    
-            if score > 0:
-                scores[platform] = {
-                    "score": score,
-                    "keywords": matched_keywords
-                }
-                
-        if scores:
-            best_platform = max(scores.keys(), key=lambda p: scores[p]["score"])
+        scores = IntentEngine.keyword_scores(scan, self.social_keywords)
+        if not scores:
+            return None
             
-            return self._create_intent_result(
-                UnifiedIntentType.SOCIAL_MEDIA,
-                confidence=min(scores[best_platform]["score"] / 3, 0.9),
-                metadata={
-                    "platform": best_platform,
-                    "matched_keywords": scores[best_platform]["keywords"],
-                    "all_detected": list(scores.keys())
-                }
-            )
-            
-        return None
+        best_platform = max(scores, key=lambda platform: len(scores[platform]))
         
-    def _is_question(self, text: str) -> bool:
-        """Определяет, является ли текст вопросом"""
-        if text.strip().endswith('?'):
-            return True
-            
-        question_words = [
-            'что', 'кто', 'где', 'когда', 'почему', 'зачем', 'как',
-            'какой', 'какая', 'какое', 'какие', 'сколько', 'куда',
-            'откуда', 'чей', 'чья', 'чье', 'чьи'
-        ]
-        
-        text_lower = text.lower()
-        for word in question_words:
-            if text_lower.startswith(word + ' ') or f' {word} ' in text_lower:
-                return True
-                
-        return False
+        return self._create_intent_result(
+            UnifiedIntentType.SOCIAL_MEDIA,
+            confidence=min(len(scores[best_platform]) / 3, 0.9),
+            metadata={
+                "platform": best_platform,
+                "matched_keywords": scores[best_platform],
+                "all_detected": list(scores.keys())
+            }
+        )
         
     def _extract_youtube_video_id(self, url: str) -> Optional[str]:
         """Извлекает ID видео из YouTube URL"""
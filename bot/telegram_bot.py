@@ -4,9 +4,22 @@ Telegram Bot instance
 
 import telebot
 from .core.config import config
+from .telegram_client import get_telegram_client
+from .send_scheduler import SendScheduler, SendPriority
 
 # Создаем экземпляр бота
 bot = telebot.TeleBot(config.telegram.token)
 
+# Асинхронный клиент для вызовов Bot API из async кода
+telegram_client = get_telegram_client(config.telegram.token)
+
+# Планировщик исходящих сообщений с учетом лимитов Telegram
+send_scheduler = SendScheduler(
+    telegram_client,
+    global_rate=config.telegram.global_rate_limit,
+    chat_rate=config.telegram.chat_rate_limit,
+    group_rate_per_minute=config.telegram.group_rate_limit_per_minute
+)
+
 # Экспортируем для обратной совместимости
-__all__ = ['bot']
\ No newline at end of file
+__all__ = ['bot', 'telegram_client', 'send_scheduler', 'SendPriority']
\ No newline at end of file
@@ -0,0 +1,312 @@
+"""
+Асинхронный клиент Telegram Bot API
+
+Все запросы идут через один общий httpx.AsyncClient с пулом keep-alive
+соединений (и HTTP/2, если установлен пакет h2), поэтому отправка
+сообщений не блокирует event loop и не открывает новое TLS соединение
+на каждый вызов.
+"""
+
+import time
+import asyncio
+import importlib.util
+import logging
+from collections import defaultdict
+from typing import Dict, Any, Optional, Union, AsyncIterator
+
+import httpx
+
+from .core.errors import APIError
+from .telegram_types import encode, json_loads, JSON_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 - опциональная зависимость (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class TelegramAPIError(APIError):
+    """Ошибка, которую вернул Telegram Bot API"""
+
+    def __init__(self, method: str, error_code: Optional[int] = None,
+                 description: str = "", retry_after: Optional[int] = None, **kwargs):
+        super().__init__("Telegram", status_code=error_code, response=description, **kwargs)
+        self.method = method
+        self.error_code = error_code
+        self.description = description
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        return f"Telegram API {self.method} error {self.error_code}: {self.description}"
+
+
+class TelegramClient:
+    """Асинхронный клиент Telegram Bot API на общем пуле соединений"""
+
+    API_URL = "https://api.telegram.org"
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str = API_URL,
+        timeout: float = 30.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Args:
+            token: Токен бота
+            base_url: Адрес Bot API (можно указать локальный Bot API сервер)
+            timeout: Таймаут запроса в секундах
+            max_connections: Максимум соединений в пуле
+            max_keepalive_connections: Сколько соединений держать открытыми
+            http2: Использовать HTTP/2 (по умолчанию - если доступен h2)
+            transport: Свой транспорт httpx (для тестов и нагрузочных прогонов)
+        """
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=60.0
+        )
+        self.http2 = HTTP2_AVAILABLE if http2 is None else (http2 and HTTP2_AVAILABLE)
+        self.transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: set = set()
+
+        self._requests = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._total_time = 0.0
+        self._clients_created = 0
+        self._last_network_error: Optional[str] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Возвращает общий HTTP клиент, создавая его для текущего event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            if self._client is not None and not self._client.is_closed:
+                self._close_stale_client(self._client, self._client_loop)
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self.transport
+            )
+            self._client_loop = loop
+            self._clients_created += 1
+        return self._client
+
+    def _close_stale_client(self, client: httpx.AsyncClient, client_loop: Optional[asyncio.AbstractEventLoop]):
+        """Закрывает клиент прежнего event loop, чтобы не оставлять открытые соединения"""
+        if client_loop is not None and client_loop.is_running():
+            # Прежний loop еще работает в другом потоке - закрываем клиент в нем
+            asyncio.run_coroutine_threadsafe(self._aclose_quietly(client), client_loop)
+            return
+        task = asyncio.get_running_loop().create_task(self._aclose_quietly(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _aclose_quietly(client: httpx.AsyncClient):
+        try:
+            await client.aclose()
+        except Exception as e:
+            # Соединения закрытого loop уже недоступны - достаточно освободить пул
+            logger.debug(f"Ошибка закрытия HTTP клиента прежнего event loop: {e}")
+
+    async def call(
+        self,
+        method: str,
+        params: Optional[Dict[str, Any]] = None,
+        files: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Вызывает метод Bot API
+
+        Args:
+            method: Имя метода (sendMessage, getFile, ...)
+            params: Параметры метода (None значения отбрасываются, объекты схемы допустимы)
+            files: Файлы для multipart загрузки
+            timeout: Таймаут конкретного запроса
+
+        Returns:
+            Any: Поле result ответа Telegram
+
+        Raises:
+            TelegramAPIError: Telegram вернул ok=false
+            httpx.HTTPError: Сетевая ошибка
+        """
+        payload = {k: v for k, v in (params or {}).items() if v is not None}
+        url = f"{self.base_url}/bot{self.token}/{method}"
+        request_timeout = timeout if timeout is not None else self.timeout
+
+        started_at = time.monotonic()
+        self._requests[method] += 1
+        try:
+            client = self._get_client()
+            if files:
+                response = await client.post(url, data=payload, files=files, timeout=request_timeout)
+            else:
+                response = await client.post(
+                    url, content=encode(payload), headers=JSON_HEADERS, timeout=request_timeout
+                )
+            data = json_loads(response.content)
+        except Exception as e:
+            self._errors[method] += 1
+            if isinstance(e, httpx.TransportError):
+                self._last_network_error = str(e) or type(e).__name__
+            raise
+        finally:
+            self._total_time += time.monotonic() - started_at
+
+        self._last_network_error = None
+
+        if not data.get("ok"):
+            self._errors[method] += 1
+            parameters = data.get("parameters") or {}
+            raise TelegramAPIError(
+                method,
+                error_code=data.get("error_code", response.status_code),
+                description=data.get("description", "Unknown error"),
+                retry_after=parameters.get("retry_after")
+            )
+
+        return data.get("result")
+
+    @property
+    def is_reachable(self) -> bool:
+        """Был ли последний запрос к Bot API доставлен (без сетевой ошибки)"""
+        return self._last_network_error is None
+
+    async def get_me(self) -> Dict[str, Any]:
+        """Информация о боте"""
+        return await self.call("getMe")
+
+    async def send_message(
+        self,
+        chat_id: Union[int, str],
+        text: str,
+        parse_mode: Optional[str] = None,
+        business_connection_id: Optional[str] = None,
+        reply_to_message_id: Optional[int] = None,
+        reply_markup: Optional[Dict[str, Any]] = None,
+        disable_web_page_preview: Optional[bool] = None,
+        disable_notification: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Отправляет текстовое сообщение (в том числе от имени Business аккаунта)"""
+        return await self.call("sendMessage", {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "business_connection_id": business_connection_id,
+            "reply_to_message_id": reply_to_message_id,
+            "reply_markup": reply_markup,
+            "disable_web_page_preview": disable_web_page_preview,
+            "disable_notification": disable_notification
+        })
+
+    async def edit_message_text(
+        self,
+        chat_id: Union[int, str],
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        business_connection_id: Optional[str] = None,
+        reply_markup: Optional[Dict[str, Any]] = None
+    ) -> Union[Dict[str, Any], bool]:
+        """Редактирует текст отправленного сообщения"""
+        return await self.call("editMessageText", {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "business_connection_id": business_connection_id,
+            "reply_markup": reply_markup
+        })
+
+    async def send_chat_action(
+        self,
+        chat_id: Union[int, str],
+        action: str = "typing",
+        business_connection_id: Optional[str] = None
+    ) -> bool:
+        """Показывает статус действия (typing, record_voice, ...)"""
+        return await self.call("sendChatAction", {
+            "chat_id": chat_id,
+            "action": action,
+            "business_connection_id": business_connection_id
+        })
+
+    async def get_file(self, file_id: str) -> Dict[str, Any]:
+        """Информация о файле (включая file_path для скачивания)"""
+        return await self.call("getFile", {"file_id": file_id})
+
+    async def get_business_connection(self, business_connection_id: str) -> Dict[str, Any]:
+        """Информация о Business подключении"""
+        return await self.call("getBusinessConnection", {"business_connection_id": business_connection_id})
+
+    async def iter_file(self, file_path: str, chunk_size: int = 65536) -> AsyncIterator[bytes]:
+        """Потоково скачивает файл по file_path из getFile"""
+        url = f"{self.base_url}/file/bot{self.token}/{file_path}"
+        self._requests["downloadFile"] += 1
+        try:
+            async with self._get_client().stream("GET", url) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(chunk_size):
+                    yield chunk
+        except Exception:
+            self._errors["downloadFile"] += 1
+            raise
+
+    async def download_file(self, file_path: str) -> bytes:
+        """Скачивает файл целиком в память"""
+        chunks = [chunk async for chunk in self.iter_file(file_path)]
+        return b"".join(chunks)
+
+    async def close(self):
+        """Закрывает пул соединений"""
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику запросов"""
+        total = sum(self._requests.values())
+        return {
+            "http2": self.http2,
+            "json_backend": JSON_BACKEND,
+            "reachable": self.is_reachable,
+            "last_network_error": self._last_network_error,
+            "clients_created": self._clients_created,
+            "requests": dict(self._requests),
+            "errors": dict(self._errors),
+            "total_requests": total,
+            "total_errors": sum(self._errors.values()),
+            "avg_request_time_ms": round(self._total_time / total * 1000, 2) if total else 0.0
+        }
+
+
+# Общие клиенты по токену, чтобы все модули использовали один пул соединений
+_clients: Dict[str, TelegramClient] = {}
+
+
+def get_telegram_client(token: str) -> TelegramClient:
+    """Возвращает общий клиент для токена"""
+    client = _clients.get(token)
+    if client is None:
+        client = TelegramClient(token)
+        _clients[token] = client
+    return client
@@ -0,0 +1,311 @@
+"""
+Типизированная схема Telegram updates
+
+Update декодируется один раз из байтов тела запроса сразу в объекты
+(msgspec.Struct, если установлен msgspec) и дальше передается по конвейеру
+без промежуточных словарей. Без msgspec используются dataclass'ы со
+__slots__ и orjson (или стандартный json) - интерфейс объектов тот же.
+
+Неизвестные поля отбрасываются при декодировании: в памяти остается
+только то, что использует бот.
+"""
+
+import json
+import dataclasses
+from typing import Any, Dict, List, Optional, Union, get_type_hints, get_origin, get_args
+
+# msgspec и orjson - опциональные зависимости (pip install msgspec orjson)
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    msgspec = None
+    MSGSPEC_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+JSON_BACKEND = "msgspec" if MSGSPEC_AVAILABLE else "orjson" if ORJSON_AVAILABLE else "json"
+
+
+class UpdateDecodeError(ValueError):
+    """Данные не являются корректным Telegram update"""
+
+
+if MSGSPEC_AVAILABLE:
+    class TelegramObject(msgspec.Struct, kw_only=True, omit_defaults=True):
+        """Базовый класс объектов Telegram"""
+
+    def telegram_type(cls):
+        """Struct уже готов к использованию"""
+        return cls
+else:
+    class TelegramObject:
+        """Базовый класс объектов Telegram"""
+        __slots__ = ()
+
+        def __init_subclass__(cls, rename: Optional[Dict[str, str]] = None, **kwargs):
+            super().__init_subclass__(**kwargs)
+            # dataclass(slots=True) пересоздает класс без rename - сохраняем унаследованное
+            if rename is not None:
+                cls.__rename__ = rename
+
+    def telegram_type(cls):
+        """Превращает объявление схемы в dataclass со __slots__"""
+        return dataclasses.dataclass(slots=True, kw_only=True)(cls)
+
+
+@telegram_type
+class User(TelegramObject):
+    """Пользователь Telegram"""
+    id: int
+    is_bot: bool = False
+    first_name: str = ""
+    last_name: Optional[str] = None
+    username: Optional[str] = None
+    language_code: Optional[str] = None
+
+
+@telegram_type
+class Chat(TelegramObject):
+    """Чат"""
+    id: int
+    type: str = "private"
+    title: Optional[str] = None
+    username: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+
+
+@telegram_type
+class MessageEntity(TelegramObject):
+    """Сущность в тексте (команда, ссылка, упоминание)"""
+    type: str
+    offset: int
+    length: int
+    url: Optional[str] = None
+
+
+@telegram_type
+class Voice(TelegramObject):
+    """Голосовое сообщение"""
+    file_id: str
+    file_unique_id: str = ""
+    duration: int = 0
+    mime_type: Optional[str] = None
+    file_size: Optional[int] = None
+
+
+@telegram_type
+class Message(TelegramObject, rename={"from_user": "from"}):
+    """Сообщение (обычное или Business)"""
+    chat: Chat
+    message_id: int = 0
+    date: int = 0
+    from_user: Optional[User] = None
+    text: Optional[str] = None
+    caption: Optional[str] = None
+    entities: Optional[List[MessageEntity]] = None
+    voice: Optional[Voice] = None
+    business_connection_id: Optional[str] = None
+
+
+@telegram_type
+class CallbackQuery(TelegramObject, rename={"from_user": "from"}):
+    """Нажатие inline кнопки"""
+    from_user: User
+    id: str = ""
+    message: Optional[Message] = None
+    data: Optional[str] = None
+    chat_instance: str = ""
+
+
+@telegram_type
+class BusinessConnection(TelegramObject):
+    """Подключение бота к Business аккаунту"""
+    id: str
+    user: Optional[User] = None
+    user_chat_id: int = 0
+    date: int = 0
+    can_reply: bool = False
+    is_enabled: bool = False
+
+
+@telegram_type
+class Update(TelegramObject):
+    """Входящий update"""
+    update_id: int
+    message: Optional[Message] = None
+    edited_message: Optional[Message] = None
+    callback_query: Optional[CallbackQuery] = None
+    business_message: Optional[Message] = None
+    edited_business_message: Optional[Message] = None
+    business_connection: Optional[BusinessConnection] = None
+
+    @property
+    def kind(self) -> str:
+        """Тип update (имя заполненного поля)"""
+        for name in UPDATE_KINDS:
+            if getattr(self, name) is not None:
+                return name
+        return "unknown"
+
+
+UPDATE_KINDS = (
+    "message", "edited_message", "callback_query",
+    "business_message", "edited_business_message", "business_connection"
+)
+
+
+# Универсальное преобразование словарь <-> объект (без msgspec и для тестов)
+
+_field_specs_cache: Dict[type, list] = {}
+
+
+def _field_specs(cls) -> list:
+    """Возвращает [(атрибут, ключ JSON, конвертер, значение по умолчанию)] для класса"""
+    specs = _field_specs_cache.get(cls)
+    if specs is not None:
+        return specs
+
+    hints = get_type_hints(cls)
+    if MSGSPEC_AVAILABLE and issubclass(cls, msgspec.Struct):
+        names = cls.__struct_fields__
+        keys = cls.__struct_encode_fields__
+        defaults = (dataclasses.MISSING,) * (len(names) - len(cls.__struct_defaults__)) + cls.__struct_defaults__
+    else:
+        fields = dataclasses.fields(cls)
+        rename = getattr(cls, "__rename__", {})
+        names = [f.name for f in fields]
+        keys = [rename.get(f.name, f.name) for f in fields]
+        defaults = [f.default for f in fields]
+
+    specs = [
+        (name, key, _converter(hints[name]), default)
+        for name, key, default in zip(names, keys, defaults)
+    ]
+    _field_specs_cache[cls] = specs
+    return specs
+
+
+def _converter(tp):
+    """Строит функцию преобразования значения JSON в тип поля (None - без преобразования)"""
+    origin = get_origin(tp)
+    if origin is Union:
+        args = [arg for arg in get_args(tp) if arg is not type(None)]
+        return _converter(args[0]) if len(args) == 1 else None
+    if origin is list:
+        args = get_args(tp)
+        item = _converter(args[0]) if args else None
+        return (lambda value: [item(v) for v in value]) if item else None
+    if isinstance(tp, type) and issubclass(tp, TelegramObject):
+        return lambda value: from_dict(tp, value)
+    return None
+
+
+def from_dict(cls, data: Dict[str, Any]):
+    """
+    Создает объект схемы из словаря Telegram API
+
+    Raises:
+        UpdateDecodeError: Данные не подходят под схему
+    """
+    if not isinstance(data, dict):
+        raise UpdateDecodeError(f"Ожидался объект для {cls.__name__}, получено {type(data).__name__}")
+
+    kwargs = {}
+    for name, key, convert, _ in _field_specs(cls):
+        if key in data:
+            value = data[key]
+            if convert is not None and value is not None:
+                value = convert(value)
+            kwargs[name] = value
+
+    try:
+        return cls(**kwargs)
+    except TypeError as e:
+        raise UpdateDecodeError(f"Некорректный {cls.__name__}: {e}") from e
+
+
+def to_builtins(obj: Any) -> Any:
+    """Преобразует объекты схемы в словари/списки (ключи как в Telegram API)"""
+    if MSGSPEC_AVAILABLE:
+        return msgspec.to_builtins(obj)
+    if isinstance(obj, TelegramObject):
+        result = {}
+        for name, key, _, default in _field_specs(type(obj)):
+            value = getattr(obj, name)
+            if value != default:
+                result[key] = to_builtins(value)
+        return result
+    if isinstance(obj, (list, tuple)):
+        return [to_builtins(item) for item in obj]
+    if isinstance(obj, dict):
+        return {key: to_builtins(value) for key, value in obj.items()}
+    return obj
+
+
+# JSON
+
+if MSGSPEC_AVAILABLE:
+    _update_decoder = msgspec.json.Decoder(Update, strict=False)
+    _json_encoder = msgspec.json.Encoder()
+    _json_decoder = msgspec.json.Decoder()
+
+
+def encode(obj: Any) -> bytes:
+    """Кодирует объект (словари, списки, объекты схемы) в JSON bytes"""
+    if MSGSPEC_AVAILABLE:
+        return _json_encoder.encode(obj)
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(to_builtins(obj))
+    return json.dumps(to_builtins(obj), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def dumps(obj: Any) -> str:
+    """Кодирует объект в JSON строку"""
+    return encode(obj).decode()
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Декодирует JSON самым быстрым доступным парсером"""
+    if MSGSPEC_AVAILABLE:
+        return _json_decoder.decode(data)
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode_update(data: Union[bytes, str]) -> Update:
+    """
+    Декодирует тело webhook запроса (или строку JSON) сразу в Update
+
+    Raises:
+        UpdateDecodeError: Некорректный JSON или структура update
+    """
+    if MSGSPEC_AVAILABLE:
+        try:
+            return _update_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise UpdateDecodeError(str(e)) from e
+    try:
+        raw = json_loads(data)
+    except ValueError as e:
+        raise UpdateDecodeError(f"Некорректный JSON: {e}") from e
+    return from_dict(Update, raw)
+
+
+def to_update(update: Union[Update, Dict[str, Any]]) -> Update:
+    """Приводит update к типизированному виду (словарь из getUpdates, тестов и т.п.)"""
+    if isinstance(update, Update):
+        return update
+    if MSGSPEC_AVAILABLE and isinstance(update, dict):
+        try:
+            return msgspec.convert(update, Update, strict=False)
+        except msgspec.ValidationError as e:
+            raise UpdateDecodeError(str(e)) from e
+    return from_dict(Update, update)
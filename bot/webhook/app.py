@@ -2,13 +2,16 @@
 Создание и конфигурация FastAPI приложения
 """
 
+import asyncio
 import logging
 from typing import Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from ..core import config
-from .middleware import SecurityMiddleware, LoggingMiddleware, ErrorHandlerMiddleware
+from .middleware import (
+    SecurityMiddleware, LoggingMiddleware, ErrorHandlerMiddleware, WebhookFastPathMiddleware
+)
 from .routers import health, webhook, debug, admin, test
 
 logger = logging.getLogger(__name__)
@@ -38,6 +41,8 @@ def create_app(title: Optional[str] = None, description: Optional[str] = None) -
     app.add_middleware(ErrorHandlerMiddleware)
     app.add_middleware(LoggingMiddleware)
     app.add_middleware(SecurityMiddleware)
+    # Внешний слой: POST /webhook обрабатывается здесь целиком, остальные слои его пропускают
+    app.add_middleware(WebhookFastPathMiddleware)
     
     # CORS для debug режима
     if config.debug:
@@ -65,8 +70,15 @@ def create_app(title: Optional[str] = None, description: Optional[str] = None) -
     async def startup_event():
         logger.info("🚀 Webhook server starting...")
         
-        # Проверяем настройки webhook
-        if hasattr(config, 'webhook') and hasattr(config.webhook, 'auto_setup') and config.webhook.auto_setup:
+        # Запускаем фоновую очередь updates, если включен режим queue
+        from .handlers import update_queue, update_poller
+        if update_queue is not None:
+            await update_queue.start()
+        
+        # В режиме polling webhook не устанавливаем - updates забирает poller
+        if update_poller is not None:
+            await update_poller.start()
+        elif hasattr(config, 'webhook') and hasattr(config.webhook, 'auto_setup') and config.webhook.auto_setup:
             from .services import WebhookService
             webhook_service = WebhookService()
             result = await webhook_service.setup_webhook()
@@ -78,5 +90,37 @@ def create_app(title: Optional[str] = None, description: Optional[str] = None) -
     @app.on_event("shutdown")
     async def shutdown_event():
         logger.info("👋 Webhook server shutting down...")
+        
+        from .handlers import update_queue, update_dispatcher, update_poller
+        if update_poller is not None:
+            await update_poller.stop()
+        if update_queue is not None:
+            await update_queue.stop()
+        if update_dispatcher is not None:
+            try:
+                await asyncio.wait_for(update_dispatcher.join(), timeout=10.0)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ Диспетчер не завершил обработку updates за 10с")
+        
+        from .handlers import webhook_handler
+        if webhook_handler.deduplicator is not None:
+            webhook_handler.deduplicator.close()
+        
+        # Дописываем в память реплики из очереди отложенной записи
+        from ..services.memory_writer import memory_writer
+        await memory_writer.stop()
+        
+        from ..core.agent import AgentFactory
+        from ..services.sqlite_memory import SqliteMemoryManager
+        agent = AgentFactory._instance
+        if agent is not None and isinstance(agent.memory_manager, SqliteMemoryManager):
+            await agent.memory_manager.close()
+        
+        from ..telegram_bot import telegram_client, send_scheduler
+        await send_scheduler.stop()
+        await telegram_client.close()
+        
+        from ..llm_clients import llm_clients
+        await llm_clients.close()
     
     return app
\ No newline at end of file
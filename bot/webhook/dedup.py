@@ -0,0 +1,259 @@
+"""
+Дедупликация входящих updates
+
+Telegram повторяет доставку webhook, если не получил ответ вовремя.
+Дедупликатор хранит недавно увиденные update_id (и идентификаторы
+business сообщений) в ограниченном LRU+TTL множестве и при необходимости
+дублирует их в SQLite, чтобы пережить рестарт во время деплоя.
+
+Ключи запоминаются в памяти при начале обработки (повторная доставка во
+время обработки пропускается). Если обработка не удалась, ключи забываются
+(forget) - повторная доставка Telegram будет обработана. В SQLite попадают
+только успешно обработанные updates (confirm): записи копятся и пишутся
+одной транзакцией в отдельном потоке, не занимая event loop.
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from ..telegram_types import Update, UpdateDecodeError, to_update
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """
+    Ограниченное множество уже обработанных updates
+
+    Ключи хранятся в порядке первого появления, поэтому самые старые
+    (и первыми истекающие) записи всегда находятся в начале.
+    """
+
+    # Как часто чистить устаревшие записи в постоянном хранилище (в записанных ключах)
+    PURGE_EVERY = 1000
+    # Сколько копить подтвержденные ключи перед записью в SQLite (секунды)
+    FLUSH_DELAY = 0.2
+
+    def __init__(self, max_size: int = 10000, ttl: float = 3600.0, persist_path: Optional[str] = None):
+        """
+        Args:
+            max_size: Максимальное количество запоминаемых ключей
+            ttl: Время жизни ключа в секундах
+            persist_path: Путь к SQLite файлу (None - только в памяти)
+        """
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.persist_path = persist_path
+
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._pending_writes: List[Tuple[str, float]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._writes_since_purge = 0
+        self._counters = {
+            "checks": 0,
+            "duplicates": 0,
+            "update_id_hits": 0,
+            "business_message_hits": 0,
+            "marked": 0,
+            "forgotten": 0,
+            "evicted": 0,
+            "expired": 0,
+            "persist_errors": 0
+        }
+
+        if persist_path:
+            self._open_store(persist_path)
+
+    @staticmethod
+    def keys_for(update: Union[Update, Dict[str, Any]]) -> List[str]:
+        """Возвращает ключи дедупликации для update"""
+        try:
+            update = to_update(update)
+        except UpdateDecodeError:
+            # Без update_id отличить повторную доставку невозможно
+            return []
+        keys = [f"update:{update.update_id}"]
+
+        business_message = update.business_message
+        if business_message is not None:
+            keys.append(
+                f"business:{business_message.business_connection_id or ''}:"
+                f"{business_message.chat.id}:{business_message.message_id}"
+            )
+
+        return keys
+
+    def is_duplicate(self, update: Union[Update, Dict[str, Any]]) -> bool:
+        """Проверяет, видели ли мы уже этот update (без запоминания)"""
+        now = time.time()
+        return any(self._lookup(key, now) for key in self.keys_for(update))
+
+    def check_and_mark(self, update: Union[Update, Dict[str, Any]]) -> bool:
+        """
+        Проверяет update и запоминает его ключи в памяти
+
+        После обработки вызывается confirm (успех) или forget (ошибка).
+
+        Returns:
+            bool: True если update уже обрабатывался и его нужно пропустить
+        """
+        keys = self.keys_for(update)
+        if not keys:
+            return False
+
+        now = time.time()
+        self._counters["checks"] += 1
+        self._expire(now)
+
+        for key in keys:
+            if self._lookup(key, now):
+                self._counters["duplicates"] += 1
+                if key.startswith("update:"):
+                    self._counters["update_id_hits"] += 1
+                else:
+                    self._counters["business_message_hits"] += 1
+                return True
+
+        for key in keys:
+            self._seen[key] = now
+            self._counters["marked"] += 1
+
+        while len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+            self._counters["evicted"] += 1
+
+        return False
+
+    def confirm(self, update: Union[Update, Dict[str, Any]]):
+        """Update обработан: его ключи сохраняются в постоянное хранилище"""
+        if self._db is None:
+            return
+        now = time.time()
+        for key in self.keys_for(update):
+            self._pending_writes.append((key, self._seen.get(key, now)))
+        self._schedule_flush()
+
+    def forget(self, update: Union[Update, Dict[str, Any]]):
+        """Обработка не удалась: повторная доставка update будет обработана"""
+        for key in self.keys_for(update):
+            if self._seen.pop(key, None) is not None:
+                self._counters["forgotten"] += 1
+
+    def _lookup(self, key: str, now: float) -> bool:
+        """Проверяет наличие неистекшего ключа"""
+        seen_at = self._seen.get(key)
+        if seen_at is None:
+            return False
+        if now - seen_at > self.ttl:
+            del self._seen[key]
+            self._counters["expired"] += 1
+            return False
+        return True
+
+    def _expire(self, now: float):
+        """Удаляет истекшие ключи из начала очереди"""
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at <= self.ttl:
+                break
+            self._seen.popitem(last=False)
+            self._counters["expired"] += 1
+
+    def _open_store(self, path: str):
+        """Открывает SQLite хранилище и загружает неистекшие ключи"""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS seen_updates (key TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+            )
+
+            rows = self._db.execute(
+                "SELECT key, seen_at FROM seen_updates WHERE seen_at > ? ORDER BY seen_at DESC LIMIT ?",
+                (time.time() - self.ttl, self.max_size)
+            ).fetchall()
+            for key, seen_at in reversed(rows):
+                self._seen[key] = seen_at
+
+            logger.info(f"💾 Дедупликация: загружено {len(rows)} ключей из {path}")
+        except sqlite3.Error as e:
+            logger.error(f"❌ Не удалось открыть хранилище дедупликации {path}: {e}")
+            self._db = None
+
+    def _schedule_flush(self):
+        """Запускает отложенную запись подтвержденных ключей"""
+        if not self._pending_writes:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Вне event loop (скрипты, тесты) пишем сразу
+            self._write(self._take_pending())
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        """Пишет накопившиеся ключи одной транзакцией в отдельном потоке"""
+        while self._pending_writes:
+            await asyncio.sleep(self.FLUSH_DELAY)
+            await asyncio.to_thread(self._write, self._take_pending())
+
+    def _take_pending(self) -> List[Tuple[str, float]]:
+        rows, self._pending_writes = self._pending_writes, []
+        return rows
+
+    def _write(self, rows: List[Tuple[str, float]]):
+        """Сохраняет ключи в постоянное хранилище (вызывается в рабочем потоке)"""
+        if not rows:
+            return
+        with self._db_lock:
+            if self._db is None:
+                return
+            try:
+                with self._db:
+                    self._db.execute("BEGIN")
+                    self._db.executemany("INSERT OR REPLACE INTO seen_updates (key, seen_at) VALUES (?, ?)", rows)
+                    self._writes_since_purge += len(rows)
+                    if self._writes_since_purge >= self.PURGE_EVERY:
+                        self._writes_since_purge = 0
+                        self._db.execute("DELETE FROM seen_updates WHERE seen_at <= ?", (time.time() - self.ttl,))
+            except sqlite3.Error as e:
+                self._counters["persist_errors"] += 1
+                logger.warning(f"⚠️ Ошибка записи в хранилище дедупликации: {e}")
+
+    def close(self):
+        """Дописывает подтвержденные ключи и закрывает постоянное хранилище"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._write(self._take_pending())
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает метрики дедупликации"""
+        checks = self._counters["checks"]
+        return {
+            "size": len(self._seen),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "persistent": self._db is not None,
+            **self._counters,
+            "hit_rate": round(self._counters["duplicates"] / checks, 4) if checks else 0.0
+        }
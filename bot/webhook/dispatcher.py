@@ -0,0 +1,228 @@
+"""
+Диспетчер updates: строгий порядок внутри чата, параллельность между чатами
+
+Каждому ключу (чат или пара business_connection + чат) соответствует
+своя FIFO-полоса. Полосы разных ключей выполняются параллельно в пределах
+общего лимита, а опустевшая полоса сразу удаляется, поэтому память
+зависит только от числа чатов с необработанными сообщениями.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, Deque, Union
+
+from ..telegram_types import Update, UpdateDecodeError, to_update
+from ..core.utils import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class _Lane:
+    """FIFO-полоса одного ключа"""
+
+    __slots__ = ("key", "items", "task")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.items: Deque[tuple] = deque()
+        self.task: Optional[asyncio.Task] = None
+
+
+class ChatDispatcher:
+    """
+    Диспетчер с упорядочиванием по ключу чата
+
+    Гарантирует, что updates одного ключа обрабатываются строго по одному
+    и в порядке поступления, а разные ключи - параллельно.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        max_active_keys: int = 10000,
+        max_pending: int = 1000,
+        latency_window: int = 1000
+    ):
+        """
+        Args:
+            max_concurrency: Сколько полос могут выполняться одновременно
+            max_active_keys: Максимальное число одновременно существующих полос
+            max_pending: Максимальное число ожидающих задач во всех полосах
+            latency_window: Сколько последних замеров хранить для перцентилей
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_active_keys = max(1, max_active_keys)
+        self.max_pending = max(1, max_pending)
+
+        self._lanes: Dict[str, _Lane] = {}
+        self._pending = 0
+        self._running = 0
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._capacity = asyncio.Condition()
+
+        self._wait_times: Deque[float] = deque(maxlen=latency_window)
+        self._peak_active_keys = 0
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "lanes_created": 0,
+            "lanes_evicted": 0,
+            "capacity_waits": 0
+        }
+
+    @staticmethod
+    def dispatch_key(update: Union[Update, Dict[str, Any]]) -> str:
+        """
+        Вычисляет ключ упорядочивания для update
+
+        Бизнес-сообщения упорядочиваются в рамках пары
+        business_connection_id + chat_id, обычные - по chat_id.
+        Updates без чата получают уникальный ключ и не упорядочиваются.
+        """
+        try:
+            update = to_update(update)
+        except UpdateDecodeError:
+            return f"update:{update.get('update_id')}"
+
+        message = update.business_message or update.edited_business_message
+        if message is not None:
+            return f"biz:{message.business_connection_id or ''}:{message.chat.id}"
+
+        if update.business_connection is not None:
+            return f"biz:{update.business_connection.id}"
+
+        message = update.message or update.edited_message
+        if message is not None:
+            return f"chat:{message.chat.id}"
+
+        callback = update.callback_query
+        if callback is not None:
+            if callback.message is not None:
+                return f"chat:{callback.message.chat.id}"
+            return f"user:{callback.from_user.id}"
+
+        return f"update:{update.update_id}"
+
+    @property
+    def active_keys(self) -> int:
+        """Количество существующих полос"""
+        return len(self._lanes)
+
+    async def submit(self, key: str, func: Callable[..., Awaitable[Any]], *args) -> None:
+        """
+        Ставит задачу в полосу ключа, не дожидаясь выполнения
+
+        Ожидает только при исчерпании лимитов полос или ожидающих задач.
+        Ошибки задачи логируются и учитываются в метриках.
+        """
+        await self._enqueue(key, func, args, None)
+
+    async def run(self, key: str, func: Callable[..., Awaitable[Any]], *args) -> Any:
+        """
+        Ставит задачу в полосу ключа и возвращает ее результат
+
+        Если ожидающий отменен до начала выполнения, задача не запускается.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._enqueue(key, func, args, future)
+        return await future
+
+    async def _enqueue(self, key: str, func: Callable, args: tuple, future: Optional[asyncio.Future]):
+        """Добавляет задачу в полосу, создавая ее при необходимости"""
+        if not self._has_capacity(key):
+            self._counters["capacity_waits"] += 1
+            async with self._capacity:
+                await self._capacity.wait_for(lambda: self._has_capacity(key))
+
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = _Lane(key)
+            self._lanes[key] = lane
+            self._counters["lanes_created"] += 1
+            self._peak_active_keys = max(self._peak_active_keys, len(self._lanes))
+            lane.task = asyncio.create_task(self._run_lane(lane))
+
+        lane.items.append((func, args, future, time.monotonic()))
+        self._pending += 1
+        self._counters["submitted"] += 1
+
+    def _has_capacity(self, key: str) -> bool:
+        """Можно ли сейчас принять задачу для ключа"""
+        if self._pending >= self.max_pending:
+            return False
+        return key in self._lanes or len(self._lanes) < self.max_active_keys
+
+    async def _run_lane(self, lane: _Lane):
+        """Последовательно выполняет задачи полосы"""
+        try:
+            while lane.items:
+                func, args, future, enqueued_at = lane.items[0]
+
+                async with self._semaphore:
+                    if future is not None and future.cancelled():
+                        # Ожидающий отменен (например, остановка очереди сохранила update на диск)
+                        self._counters["cancelled"] += 1
+                    else:
+                        self._wait_times.append(time.monotonic() - enqueued_at)
+                        await self._execute(lane, func, args, future)
+
+                lane.items.popleft()
+                self._pending -= 1
+                await self._notify_capacity()
+        finally:
+            # Полоса опустела - удаляем ее сразу, чтобы не держать память под простаивающие чаты
+            self._lanes.pop(lane.key, None)
+            self._counters["lanes_evicted"] += 1
+            await self._notify_capacity()
+
+    async def _execute(self, lane: _Lane, func: Callable, args: tuple, future: Optional[asyncio.Future]):
+        """Выполняет задачу полосы и передает результат ожидающему"""
+        self._running += 1
+        try:
+            result = await func(*args)
+            self._counters["completed"] += 1
+            if future is not None and not future.done():
+                future.set_result(result)
+        except Exception as e:
+            self._counters["failed"] += 1
+            if future is not None and not future.done():
+                future.set_exception(e)
+            else:
+                logger.error(f"❌ Ошибка обработки в полосе {lane.key}: {e}", exc_info=True)
+        finally:
+            self._running -= 1
+
+    async def _notify_capacity(self):
+        """Будит ожидающих освобождения места"""
+        async with self._capacity:
+            self._capacity.notify_all()
+
+    async def join(self):
+        """Ждет выполнения всех поставленных задач"""
+        while self._lanes:
+            await asyncio.gather(
+                *[lane.task for lane in list(self._lanes.values())],
+                return_exceptions=True
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает метрики диспетчера"""
+        return {
+            "active_keys": len(self._lanes),
+            "peak_active_keys": self._peak_active_keys,
+            "max_active_keys": self.max_active_keys,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            **self._counters,
+            "wait_time_ms": {
+                "p50": round(percentile(self._wait_times, 50) * 1000, 2),
+                "p95": round(percentile(self._wait_times, 95) * 1000, 2),
+                "max": round(max(self._wait_times, default=0.0) * 1000, 2)
+            }
+        }
@@ -3,13 +3,24 @@
 """
 
 import logging
-import requests
-from typing import Dict, Any, Optional
+import httpx
+from typing import Dict, Any, Optional, Union
 from datetime import datetime
 
 from ..core.interfaces import Message, User, MessageType, UserRole
 from ..core.unified_agent import unified_agent
 from ..core.config import config
+from ..core.logging import RequestLog, request_stage, annotate_request
+from ..telegram_client import TelegramAPIError
+from ..reply_stream import ReplyStream, reply_stream_scope
+from ..telegram_types import (
+    Update, Message as TelegramMessage, Voice, CallbackQuery, BusinessConnection,
+    to_update, to_builtins, dumps, decode_update
+)
+from .update_queue import UpdateQueue
+from .dispatcher import ChatDispatcher
+from .dedup import UpdateDeduplicator
+from .polling import UpdatePoller
 
 logger = logging.getLogger(__name__)
 
@@ -40,15 +51,22 @@ try:
 except ImportError:
     unified_mcp_service = None
 
+try:
+    from ..services.claude_code_service import claude_code_service
+except ImportError:
+    claude_code_service = None
+
+# Управление MCP серверами через Docker пока не подключено
+mcp_docker_manager = None
+
 
 from ..auth import is_admin, get_user_mode
 from ..core.auto_admin import auto_admin_manager
 
 
-def send_business_message(chat_id: int, text: str, business_connection_id: str) -> Dict[str, Any]:
+async def send_business_message(chat_id: int, text: str, business_connection_id: str) -> Dict[str, Any]:
     """
-    Отправка сообщения через Business API используя прямой HTTP запрос
-    (pyTelegramBotAPI не поддерживает business_connection_id)
+    Отправка сообщения от имени Business аккаунта через планировщик исходящих сообщений
     
     Args:
         chat_id: ID чата для отправки
@@ -76,49 +94,38 @@ def send_business_message(chat_id: int, text: str, business_connection_id: str)
         logger.warning(f"⚠️ Сообщение слишком длинное ({len(text)} символов), обрезаю до 4096")
         text = text[:4093] + "..."
     
-    url = f"https://api.telegram.org/bot{config.telegram.token}/sendMessage"
-    data = {
-        "chat_id": chat_id,
-        "text": text,
-        "business_connection_id": business_connection_id,
-        "parse_mode": "HTML"  # Добавляем поддержку HTML форматирования
-    }
+    from ..telegram_bot import send_scheduler
     
     try:
-        logger.info(f"📤 Отправляю Business сообщение: chat_id={chat_id}, connection_id={business_connection_id}, text_length={len(text)}")
-        
-        response = requests.post(url, json=data, timeout=15)
-        result = response.json()
+        logger.debug("📤 Отправляю Business сообщение: chat_id=%s, connection_id=%s, text_length=%s",
+                     chat_id, business_connection_id, len(text))
         
-        logger.info(f"📨 Telegram API response: status={response.status_code}, ok={result.get('ok')}")
+        result = await send_scheduler.send_message(
+            chat_id,
+            text,
+            parse_mode="HTML",  # Поддержка HTML форматирования
+            business_connection_id=business_connection_id
+        )
         
-        if response.status_code == 200 and result.get("ok"):
-            message_id = result.get('result', {}).get('message_id', 'Unknown')
-            logger.info(f"✅ Business сообщение отправлено успешно: message_id={message_id}")
-            return {
-                "success": True, 
-                "message_id": message_id,
-                "api_response": result
-            }
-        else:
-            error_code = result.get("error_code", "Unknown")
-            error_description = result.get("description", "Unknown error")
-            logger.error(f"❌ Telegram API ошибка: code={error_code}, description={error_description}")
-            
-            return {
-                "success": False, 
-                "error": f"Telegram API Error {error_code}",
-                "details": error_description,
-                "api_response": result
-            }
-            
-    except requests.exceptions.Timeout:
-        logger.error("❌ Timeout при отправке Business сообщения (15 секунд)")
-        return {"success": False, "error": "Request timeout", "details": "Request took longer than 15 seconds"}
-    except requests.exceptions.ConnectionError as e:
-        logger.error(f"❌ Ошибка соединения с Telegram API: {e}")
-        return {"success": False, "error": "Connection error", "details": str(e)}
-    except requests.exceptions.RequestException as e:
+        message_id = result.get('message_id', 'Unknown')
+        logger.debug("✅ Business сообщение отправлено успешно: message_id=%s", message_id)
+        return {
+            "success": True, 
+            "message_id": message_id,
+            "api_response": result
+        }
+            
+    except TelegramAPIError as e:
+        logger.error(f"❌ Telegram API ошибка: code={e.error_code}, description={e.description}")
+        return {
+            "success": False, 
+            "error": f"Telegram API Error {e.error_code}",
+            "details": e.description
+        }
+    except httpx.TimeoutException:
+        logger.error("❌ Timeout при отправке Business сообщения")
+        return {"success": False, "error": "Request timeout", "details": "Request to Telegram API timed out"}
+    except httpx.HTTPError as e:
         logger.error(f"❌ HTTP ошибка при отправке Business сообщения: {e}")
         return {"success": False, "error": "HTTP error", "details": str(e)}
     except ValueError as e:
@@ -129,40 +136,35 @@ def send_business_message(chat_id: int, text: str, business_connection_id: str)
         return {"success": False, "error": "Unexpected error", "details": str(e)}
 
 
-def get_business_connections_info() -> Dict[str, Any]:
+async def get_business_connections_info() -> Dict[str, Any]:
     """
     Получает информацию о Business подключениях бота
     
     Returns:
         Dict[str, Any]: Информация о подключениях
     """
-    url = f"https://api.telegram.org/bot{config.telegram.token}/getBusinessConnection"
+    from ..telegram_bot import telegram_client
     
     try:
         logger.info("🔍 Запрашиваю информацию о Business подключениях...")
         
-        response = requests.get(url, timeout=10)
-        result = response.json()
+        result = await telegram_client.call("getBusinessConnection")
+        connections = result if isinstance(result, list) else [result] if result else []
+        logger.info(f"✅ Найдено {len(connections)} Business подключений")
         
-        if response.status_code == 200 and result.get("ok"):
-            connections = result.get("result", [])
-            logger.info(f"✅ Найдено {len(connections)} Business подключений")
-            
-            return {
-                "success": True,
-                "connections_count": len(connections),
-                "connections": connections
-            }
-        else:
-            error_description = result.get("description", "Unknown error")
-            logger.error(f"❌ Ошибка получения Business подключений: {error_description}")
-            
-            return {
-                "success": False,
-                "error": "API Error",
-                "details": error_description
-            }
+        return {
+            "success": True,
+            "connections_count": len(connections),
+            "connections": connections
+        }
             
+    except TelegramAPIError as e:
+        logger.error(f"❌ Ошибка получения Business подключений: {e.description}")
+        return {
+            "success": False,
+            "error": "API Error",
+            "details": e.description
+        }
     except Exception as e:
         logger.error(f"❌ Ошибка запроса Business подключений: {e}")
         return {
@@ -172,6 +174,10 @@ def get_business_connections_info() -> Dict[str, Any]:
         }
 
 
+# Поля результата обработки, которые попадают в запись лога update
+_RESULT_LOG_FIELDS = ("ok", "duplicate", "response_sent", "command", "method", "description")
+
+
 class WebhookHandler:
     """Основной обработчик webhook запросов"""
     
@@ -180,101 +186,142 @@ class WebhookHandler:
         self.agent = unified_agent
         self.update_counter = 0
         self.last_updates = []
+        
+        # Защита от повторной обработки при повторных доставках Telegram
+        self.deduplicator: Optional[UpdateDeduplicator] = None
+        if config.webhook.dedup_enabled:
+            self.deduplicator = UpdateDeduplicator(
+                max_size=config.webhook.dedup_max_size,
+                ttl=config.webhook.dedup_ttl,
+                persist_path=config.webhook.dedup_persist_path or None
+            )
     
-    async def handle_update(self, update: Dict[str, Any]) -> Dict[str, Any]:
+    async def handle_update(self, update: Union[Update, Dict[str, Any]]) -> Dict[str, Any]:
         """
         Обрабатывает входящий update от Telegram
         
         Args:
-            update: Update от Telegram API
+            update: Update от Telegram API (типизированный или словарь)
             
         Returns:
             Dict[str, Any]: Результат обработки
         """
-        logger.info(f"📥 Received update: {update}")
+        update = to_update(update)
         
+        # Одна структурированная запись лога на update (полный update - только в выборке)
+        with RequestLog(
+            payload=lambda: to_builtins(update),
+            sample_rate=config.webhook.request_log_sample_rate,
+            slow_ms=config.webhook.request_log_slow_ms,
+            update_id=update.update_id,
+            kind=update.kind
+        ) as request_log:
+            result = await self._process_update(update, request_log)
+            request_log.set(**{key: result[key] for key in _RESULT_LOG_FIELDS if key in result})
+            return result
+    
+    async def _process_update(self, update: Update, request_log: RequestLog) -> Dict[str, Any]:
+        """Маршрутизирует update по типу"""
+        if self.deduplicator:
+            with request_log.stage("dedup"):
+                duplicate = self.deduplicator.check_and_mark(update)
+            if duplicate:
+                return {"ok": True, "duplicate": True}
+
+        try:
+            result = await self._route_update(update, request_log)
+        except BaseException:
+            if self.deduplicator:
+                self.deduplicator.forget(update)
+            raise
+
+        # Сохраняем как обработанный только успешный update - иначе повторная доставка обработается
+        if self.deduplicator:
+            if result.get("ok") is False:
+                self.deduplicator.forget(update)
+            else:
+                self.deduplicator.confirm(update)
+        return result
+
+    async def _route_update(self, update: Update, request_log: RequestLog) -> Dict[str, Any]:
+        """Определяет тип update и передает его обработчику"""
         self.update_counter += 1
-        update_id = update.get('update_id', self.update_counter)
-        
-        logger.info(f"📨 Processing update #{update_id}, total: {self.update_counter}")
         
         # Всегда сохраняем для отладки (не только в debug режиме)
         self._save_update_for_debug(update)
-        logger.info(f"💾 Saved to debug. Total updates in memory: {len(self.last_updates)}")
         
         try:
             # Определяем тип update
-            if 'message' in update:
-                return await self._handle_message(update['message'])
-            elif 'callback_query' in update:
-                return await self._handle_callback_query(update['callback_query'])
-            elif 'business_message' in update:
-                return await self._handle_business_message(update['business_message'])
-            elif 'business_connection' in update:
-                return await self._handle_business_connection(update['business_connection'])
+            if update.message is not None:
+                return await self._handle_message(update.message)
+            elif update.callback_query is not None:
+                return await self._handle_callback_query(update.callback_query)
+            elif update.business_message is not None:
+                return await self._handle_business_message(update.business_message)
+            elif update.business_connection is not None:
+                return await self._handle_business_connection(update.business_connection)
             else:
-                logger.warning(f"❓ Неизвестный тип update: {list(update.keys())}")
                 return {"ok": True, "description": "Unknown update type"}
                 
         except Exception as e:
-            logger.error(f"❌ Ошибка обработки update {update_id}: {e}", exc_info=True)
+            logger.error("❌ Ошибка обработки update %s: %s", update.update_id, e, exc_info=True)
+            request_log.fail(e)
             return {"ok": False, "error": str(e)}
     
-    async def _handle_message(self, telegram_message: Dict[str, Any], is_business: bool = False, business_connection_id: Optional[str] = None) -> Dict[str, Any]:
+    async def _handle_message(self, telegram_message: TelegramMessage, is_business: bool = False, business_connection_id: Optional[str] = None) -> Dict[str, Any]:
         """Обрабатывает обычное сообщение"""
         try:
-            logger.info(f"📩 Processing message: {telegram_message}")
-            
             # Извлекаем данные
-            user_data = telegram_message.get('from', {})
-            chat_id = telegram_message.get('chat', {}).get('id')
-            text = telegram_message.get('text')
-            voice = telegram_message.get('voice')
+            sender = telegram_message.from_user
+            chat_id = telegram_message.chat.id
+            text = telegram_message.text
+            voice = telegram_message.voice
             
-            logger.info(f"👤 User: {user_data.get('username', 'Unknown')} ({user_data.get('id', 'Unknown')})")
-            logger.info(f"💬 Text: {text}")
-            logger.info(f"🎤 Voice: {bool(voice)}")
+            user_id = sender.id if sender else None
+            username = sender.username if sender else None
             
             # Создаем объект пользователя
-            user_id = user_data.get('id')
-            username = user_data.get('username')
             is_user_admin = is_admin(user_id, username)
             
-            logger.info(f"🔑 User {user_id} (@{username}) admin check: {is_user_admin}")
-            
             user = User(
                 id=user_id,
                 username=username,
-                first_name=user_data.get('first_name'),
-                last_name=user_data.get('last_name'),
+                first_name=sender.first_name if sender else None,
+                last_name=sender.last_name if sender else None,
                 role=UserRole.ADMIN if is_user_admin else UserRole.USER
             )
             
-            logger.info(f"👤 Created user object with role: {user.role.value}")
-            logger.info(f"📱 Is business message: {is_business}")
+            annotate_request(
+                chat_id=chat_id,
+                user_id=user_id,
+                role=user.role.value,
+                business=is_business,
+                has_text=bool(text),
+                voice=bool(voice)
+            )
             
             # Определяем тип сообщения
             if voice:
                 message_type = MessageType.VOICE
                 # Сначала транскрибируем голос
                 if voice_service and config.voice.enabled:
-                    logger.info("🎤 Транскрибируем голосовое сообщение...")
-                    transcription_result = await self._process_voice_transcription(voice, user.id)
+                    with request_stage("voice"):
+                        transcription_result = await self._process_voice_transcription(voice, user.id)
                     
                     if transcription_result and transcription_result.get('success'):
                         # Получаем транскрибированный текст
                         text = transcription_result.get('text')
-                        logger.info(f"✅ Транскрипция: {text}")
+                        logger.debug("✅ Транскрипция: %s", text)
                         
                         # Теперь обрабатываем как обычное текстовое сообщение
                         message_type = MessageType.TEXT
                     else:
                         error_msg = transcription_result.get('error', 'Ошибка транскрипции')
                         try:
-                            from ..telegram_bot import bot
-                            bot.send_message(chat_id, f"❌ {error_msg}")
-                        except ImportError:
-                            pass
+                            from ..telegram_bot import send_scheduler
+                            await send_scheduler.send_message(chat_id, f"❌ {error_msg}")
+                        except Exception as e:
+                            logger.error(f"❌ Failed to send transcription error: {e}")
                         return {"ok": True, "description": "Voice transcription failed"}
                 else:
                     return {"ok": True, "description": "Voice service disabled"}
@@ -283,47 +330,68 @@ class WebhookHandler:
             else:
                 message_type = MessageType.OTHER
             
-            # Создаем объект сообщения
+            # Создаем объект сообщения (типизированное сообщение без копии в словарь)
             metadata = {"telegram_message": telegram_message}
             if business_connection_id:
                 metadata["business_connection_id"] = business_connection_id
                 
             message = Message(
-                id=telegram_message.get('message_id'),
+                id=telegram_message.message_id,
                 user=user,
                 chat_id=chat_id,
                 text=text,
                 type=message_type,
-                timestamp=datetime.fromtimestamp(telegram_message.get('date', 0)),
+                timestamp=datetime.fromtimestamp(telegram_message.date),
                 metadata=metadata,
                 is_business_message=is_business
             )
             
             # Проверяем специальные команды
             if text and text.startswith('/'):
-                special_response = await self._handle_special_command(message)
+                with request_stage("command"):
+                    special_response = await self._handle_special_command(message)
                 if special_response:
                     # Важно: возвращаем сразу после обработки команды
                     return special_response
             
             # Проверяем Social Media интент
             if text and social_media_service:
-                social_response = await self._handle_social_media(message)
+                with request_stage("social"):
+                    social_response = await self._handle_social_media(message)
                 if social_response:
                     return social_response
             
-            # Обрабатываем через унифицированный агент
-            logger.info(f"🔗 Processing message through UnifiedAgent")
-            response = await self.agent.process_message(message)
+            # Обрабатываем через унифицированный агент (ответ LLM может показываться по мере генерации)
+            reply_stream = None
+            if config.streaming.enabled:
+                reply_stream = ReplyStream(chat_id, business_connection_id=business_connection_id if is_business else None)
+            with request_stage("agent"), reply_stream_scope(reply_stream):
+                response = await self.agent.process_message(message)
+            
+            if reply_stream is not None and reply_stream.started:
+                # Начало ответа уже в чате - показываем окончательный текст
+                try:
+                    with request_stage("send"):
+                        result = await reply_stream.finish(
+                            response.text, parse_mode="HTML" if is_business and business_connection_id else None
+                        )
+                    return {
+                        "ok": True,
+                        "response_sent": True,
+                        "method": "stream" if result["streamed"] else "send",
+                        "message_id": result.get("message_id")
+                    }
+                except Exception as e:
+                    logger.error(f"❌ Failed to finish streamed response: {e}", exc_info=True)
+                    return {"ok": True, "response_sent": False, "error": str(e)}
             
             # Отправляем ответ
             if is_business and business_connection_id:
                 # Для Business сообщений используем специальную функцию
-                logger.info(f"📤 Sending Business response to {chat_id}: {response.text[:100]}...")
-                result = send_business_message(chat_id, response.text, business_connection_id)
+                with request_stage("send"):
+                    result = await send_business_message(chat_id, response.text, business_connection_id)
                 
                 if result.get("success"):
-                    logger.info(f"✅ Business сообщение отправлено: message_id={result.get('message_id')}")
                     return {
                         "ok": True, 
                         "response_sent": True, 
@@ -338,28 +406,10 @@ class WebhookHandler:
             
             # Обычная отправка или fallback для Business
             try:
-                from ..telegram_bot import bot
-                logger.info(f"📤 Sending response to {chat_id}: {response.text[:100]}...")
-                result = bot.send_message(chat_id, response.text)
-                logger.info(f"✅ Response sent successfully. Message ID: {result.message_id if hasattr(result, 'message_id') else 'Unknown'}")
-                return {"ok": True, "response_sent": True, "message_id": result.message_id if hasattr(result, 'message_id') else None}
-            except ImportError as e:
-                logger.error(f"❌ Failed to import telegram bot: {e}", exc_info=True)
-                # Fallback: используем requests для отправки
-                import requests
-                url = f"https://api.telegram.org/bot{config.telegram.token}/sendMessage"
-                data = {"chat_id": chat_id, "text": response.text}
-                try:
-                    resp = requests.post(url, json=data)
-                    if resp.ok:
-                        logger.info(f"✅ Response sent via API")
-                        return {"ok": True, "response_sent": True}
-                    else:
-                        logger.error(f"❌ API error: {resp.text}")
-                        return {"ok": True, "response_sent": False, "error": resp.text}
-                except Exception as api_error:
-                    logger.error(f"❌ Failed to send via API: {api_error}")
-                    return {"ok": True, "response_sent": False, "error": str(api_error)}
+                from ..telegram_bot import send_scheduler
+                with request_stage("send"):
+                    result = await send_scheduler.send_message(chat_id, response.text)
+                return {"ok": True, "response_sent": True, "message_id": result.get('message_id')}
             except Exception as e:
                 logger.error(f"❌ Failed to send response: {e}", exc_info=True)
                 return {"ok": True, "response_sent": False, "error": str(e)}
@@ -368,18 +418,15 @@ class WebhookHandler:
             logger.error(f"❌ Ошибка обработки сообщения: {e}", exc_info=True)
             return {"ok": False, "error": str(e)}
     
-    async def _handle_callback_query(self, callback_query: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_callback_query(self, callback_query: CallbackQuery) -> Dict[str, Any]:
         """Обрабатывает callback query"""
         # TODO: Реализовать обработку callback queries
         return {"ok": True, "description": "Callback query handled"}
     
-    async def _handle_business_message(self, business_message: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_business_message(self, business_message: TelegramMessage) -> Dict[str, Any]:
         """Обрабатывает Business API сообщение"""
-        logger.info(f"📱 Обработка Business сообщения: {business_message}")
-        
         # Извлекаем business_connection_id
-        business_connection_id = business_message.get('business_connection_id')
-        logger.info(f"📊 Business connection ID: {business_connection_id}")
+        business_connection_id = business_message.business_connection_id
         
         # Обрабатываем как обычное сообщение, но с флагом Business и connection_id
         result = await self._handle_message(
@@ -395,13 +442,10 @@ class WebhookHandler:
         
         return result
     
-    async def _handle_business_connection(self, connection: Dict[str, Any]) -> Dict[str, Any]:
+    async def _handle_business_connection(self, connection: BusinessConnection) -> Dict[str, Any]:
         """Обрабатывает Business API connection"""
-        logger.info(f"📱 Business connection update: {connection}")
-        
-        connection_id = connection.get('id')
-        is_enabled = connection.get('is_enabled', False)
-        user_data = connection.get('user', {})
+        connection_id = connection.id
+        is_enabled = connection.is_enabled
         
         if is_enabled:
             logger.info(f"✅ Business connection установлено: {connection_id}")
@@ -410,18 +454,17 @@ class WebhookHandler:
         
         return {"ok": True, "description": f"Business connection {'enabled' if is_enabled else 'disabled'}"}
     
-    async def _process_voice_transcription(self, voice_data: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+    async def _process_voice_transcription(self, voice: Voice, user_id: int) -> Dict[str, Any]:
         """Транскрибирует голосовое сообщение без MCP"""
         try:
-            file_id = voice_data.get('file_id')
-            if not file_id:
+            if not voice.file_id:
                 return {"success": False, "error": "No file_id in voice data"}
             
-            # Используем базовый метод транскрипции
+            # Используем базовый метод транскрипции (VoiceService работает со словарем Telegram)
             result = await voice_service.process_voice_message(
-                voice_data, 
+                to_builtins(voice), 
                 str(user_id), 
-                str(voice_data.get('file_id', 'unknown'))
+                voice.file_id
             )
             
             return result or {"success": False, "error": "Voice processing failed"}
@@ -453,11 +496,11 @@ class WebhookHandler:
     async def _handle_special_command(self, message: Message) -> Optional[Dict[str, Any]]:
         """Обрабатывает специальные команды"""
         command = message.text.split()[0].lower()
-        logger.info(f"🎯 Handling special command: {command} for user {message.user.id} (role: {message.user.role.value})")
+        annotate_request(command=command)
         
         # Команды для всех
         if command == '/start':
-            from ..telegram_bot import bot
+            from ..telegram_bot import send_scheduler
             
             # Автоматически добавляем первого пользователя как администратора
             if auto_admin_manager.is_first_run():
@@ -472,25 +515,25 @@ class WebhookHandler:
             
             welcome_text = self._get_welcome_message(message.user)
             try:
-                bot.send_message(message.chat_id, welcome_text, parse_mode='HTML')
-                logger.info(f"✅ Welcome message sent to {message.chat_id}")
+                await send_scheduler.send_message(message.chat_id, welcome_text, parse_mode='HTML')
+                logger.debug("✅ Welcome message sent to %s", message.chat_id)
             except Exception as e:
                 logger.error(f"❌ Failed to send welcome message: {e}", exc_info=True)
             return {"ok": True, "command": "start"}
         
         elif command == '/help':
-            from ..telegram_bot import bot
+            from ..telegram_bot import send_scheduler
             help_text = self._get_help_message(message.user)
             try:
-                bot.send_message(message.chat_id, help_text, parse_mode='HTML')
-                logger.info(f"✅ Help message sent to {message.chat_id}")
+                await send_scheduler.send_message(message.chat_id, help_text, parse_mode='HTML')
+                logger.debug("✅ Help message sent to %s", message.chat_id)
             except Exception as e:
                 logger.error(f"❌ Failed to send help message: {e}", exc_info=True)
             return {"ok": True, "command": "help"}
         
         elif command == '/mcp_enable':
             # Команда для включения MCP доступа обычным пользователям
-            from ..telegram_bot import bot
+            from ..telegram_bot import send_scheduler
             if message.user.role != UserRole.ADMIN:
                 success = auto_admin_manager.add_admin(
                     message.user.id,
@@ -500,7 +543,7 @@ class WebhookHandler:
                 if success:
                     message.user.role = UserRole.ADMIN
                     try:
-                        bot.send_message(
+                        await send_scheduler.send_message(
                             message.chat_id,
                             "✅ MCP доступ активирован! Теперь вы можете использовать:\n\n"
                             "/mcp - Общий доступ к MCP\n"
@@ -514,22 +557,21 @@ class WebhookHandler:
                         logger.error(f"❌ Failed to send MCP enable message: {e}")
                 else:
                     try:
-                        bot.send_message(message.chat_id, "❌ Не удалось активировать MCP доступ")
+                        await send_scheduler.send_message(message.chat_id, "❌ Не удалось активировать MCP доступ")
                     except:
                         pass
             else:
                 try:
-                    bot.send_message(message.chat_id, "ℹ️ У вас уже есть MCP доступ")
+                    await send_scheduler.send_message(message.chat_id, "ℹ️ У вас уже есть MCP доступ")
                 except:
                     pass
             return {"ok": True, "command": "mcp_enable"}
         
         # Админские команды
-        logger.info(f"🔐 Checking admin commands. User role: {message.user.role.value}, is ADMIN: {message.user.role == UserRole.ADMIN}")
         if message.user.role == UserRole.ADMIN:
             # Команда для статуса Intelligent Agent
             if command == '/agent':
-                from ..telegram_bot import bot
+                from ..telegram_bot import send_scheduler
                 if intelligent_agent_service:
                     status = intelligent_agent_service.get_status()
                     status_text = "🧠 **Intelligent Agent Status**\n\n"
@@ -546,19 +588,19 @@ class WebhookHandler:
                     status_text = "❌ Intelligent Agent Service не доступен"
                 
                 try:
-                    bot.send_message(message.chat_id, status_text, parse_mode='Markdown')
+                    await send_scheduler.send_message(message.chat_id, status_text, parse_mode='Markdown')
                 except Exception as e:
                     logger.error(f"❌ Failed to send agent status: {e}")
                 return {"ok": True, "command": "agent"}
             
             elif command == '/clear':
                 success = await self.agent.clear_user_memory(message.user.id)
-                from ..telegram_bot import bot
+                from ..telegram_bot import send_scheduler
                 try:
                     if success:
-                        bot.send_message(message.chat_id, "✅ Память очищена")
+                        await send_scheduler.send_message(message.chat_id, "✅ Память очищена")
                     else:
-                        bot.send_message(message.chat_id, "❌ Ошибка очистки памяти")
+                        await send_scheduler.send_message(message.chat_id, "❌ Ошибка очистки памяти")
                     logger.info(f"✅ Clear memory response sent to {message.chat_id}")
                 except Exception as e:
                     logger.error(f"❌ Failed to send clear memory response: {e}", exc_info=True)
@@ -566,12 +608,12 @@ class WebhookHandler:
             
             elif command == '/business_status':
                 # Команда для проверки статуса Business API
-                from ..telegram_bot import bot
+                from ..telegram_bot import send_scheduler
                 logger.info(f"🔍 Business status check requested by {message.user.id}")
                 
                 try:
                     # Получаем информацию о подключениях
-                    connections_info = get_business_connections_info()
+                    connections_info = await get_business_connections_info()
                     
                     if connections_info.get("success"):
                         count = connections_info.get("connections_count", 0)
@@ -592,27 +634,27 @@ class WebhookHandler:
                         error_details = connections_info.get("details", "Unknown error")
                         status_text = f"❌ **Business API Error**\n\nОшибка: {error_details}"
                     
-                    bot.send_message(message.chat_id, status_text, parse_mode='Markdown')
+                    await send_scheduler.send_message(message.chat_id, status_text, parse_mode='Markdown')
                     logger.info(f"✅ Business status sent to {message.chat_id}")
                     
                 except Exception as e:
                     logger.error(f"❌ Failed to get business status: {e}", exc_info=True)
                     try:
-                        bot.send_message(message.chat_id, f"❌ Ошибка проверки статуса: {str(e)}")
+                        await send_scheduler.send_message(message.chat_id, f"❌ Ошибка проверки статуса: {str(e)}")
                     except:
                         pass
                 
                 return {"ok": True, "command": "business_status"}
             
             # MCP команды через унифицированный сервис (только для админов)
-            logger.info(f"🔌 Checking MCP commands. Command: {command}, unified_mcp_service: {unified_mcp_service is not None}")
+            logger.debug("🔌 Checking MCP commands. Command: %s, unified_mcp_service: %s", command, unified_mcp_service is not None)
             if unified_mcp_service and unified_mcp_service.is_mcp_command(message.text):
-                logger.info(f"🔌 Processing MCP command: {message.text}")
-                from ..telegram_bot import bot
+                logger.debug("🔌 Processing MCP command: %s", message.text)
+                from ..telegram_bot import send_scheduler
                 
                 try:
                     # Отправляем сообщение о начале обработки
-                    bot.send_message(message.chat_id, "⏳ Выполняю MCP команду...")
+                    await send_scheduler.send_message(message.chat_id, "⏳ Выполняю MCP команду...")
                     
                     # Выполняем команду через унифицированный сервис
                     response_text = await unified_mcp_service.process_message(message.text)
@@ -623,16 +665,16 @@ class WebhookHandler:
                             response_text = response_text[:3997] + "..."
                         
                         # Отправляем результат
-                        logger.info(f"📤 Sending MCP response to {message.chat_id}: {response_text[:100]}...")
-                        bot.send_message(message.chat_id, response_text, parse_mode='Markdown')
-                        logger.info(f"✅ MCP response sent to {message.chat_id}")
+                        logger.debug("📤 Sending MCP response to %s: %.100s...", message.chat_id, response_text)
+                        await send_scheduler.send_message(message.chat_id, response_text, parse_mode='Markdown')
+                        logger.debug("✅ MCP response sent to %s", message.chat_id)
                     else:
-                        bot.send_message(message.chat_id, "❌ Не удалось выполнить MCP команду")
+                        await send_scheduler.send_message(message.chat_id, "❌ Не удалось выполнить MCP команду")
                     
                 except Exception as e:
                     logger.error(f"❌ Failed to execute MCP command: {e}", exc_info=True)
                     try:
-                        bot.send_message(
+                        await send_scheduler.send_message(
                             message.chat_id, 
                             f"❌ Ошибка выполнения MCP команды: {str(e)}"
                         )
@@ -645,10 +687,9 @@ class WebhookHandler:
     
     async def _handle_social_media(self, message: Message) -> Optional[Dict[str, Any]]:
         """Обрабатывает Social Media запросы"""
-        # Проверяем интент через детектор
-        from ..services.intent_detector import IntentDetector
-        detector = IntentDetector()
-        intent = await detector.detect(message)
+        # Намерение сохраняется в message.metadata - агент не определяет его повторно
+        from ..services.intent_detector import intent_detector
+        intent = await intent_detector.detect(message)
         
         if intent['type'] in ['youtube_url', 'social_media'] and message.user.role == UserRole.ADMIN:
             # Обрабатываем через Social Media Service
@@ -659,10 +700,10 @@ class WebhookHandler:
             )
             
             if result and result.get('success'):
-                from ..telegram_bot import bot
+                from ..telegram_bot import send_scheduler
                 try:
-                    bot.send_message(message.chat_id, result.get('response'), parse_mode='HTML')
-                    logger.info(f"✅ Social media response sent to {message.chat_id}")
+                    await send_scheduler.send_message(message.chat_id, result.get('response'), parse_mode='HTML')
+                    logger.debug("✅ Social media response sent to %s", message.chat_id)
                 except Exception as e:
                     logger.error(f"❌ Failed to send social media response: {e}", exc_info=True)
                 return {"ok": True, "social_media": True}
@@ -770,7 +811,7 @@ class WebhookHandler:
         Returns:
             Dict с результатом
         """
-        from ..telegram_bot import bot
+        from ..telegram_bot import send_scheduler
         logger.info(f"🐳 MCP Docker command: {command} {server_name}")
         
         try:
@@ -844,7 +885,7 @@ class WebhookHandler:
                 text = f"❌ Неизвестная команда: {command}"
                 
             # Отправляем ответ
-            bot.send_message(message.chat_id, text, parse_mode='Markdown')
+            await send_scheduler.send_message(message.chat_id, text, parse_mode='Markdown')
             logger.info(f"✅ MCP Docker response sent")
             
             return {"ok": True, "command": f"mcp_{command}", "server": server_name}
@@ -852,7 +893,7 @@ class WebhookHandler:
         except Exception as e:
             logger.error(f"❌ Failed to handle MCP Docker command: {e}", exc_info=True)
             try:
-                bot.send_message(
+                await send_scheduler.send_message(
                     message.chat_id,
                     f"❌ Ошибка выполнения команды: {str(e)}"
                 )
@@ -860,8 +901,8 @@ class WebhookHandler:
                 pass
             return {"ok": False, "error": str(e)}
     
-    def _save_update_for_debug(self, update: Dict[str, Any]):
-        """Сохраняет update для отладки"""
+    def _save_update_for_debug(self, update: Update):
+        """Сохраняет update для отладки (в словарь преобразуется только при чтении)"""
         self.last_updates.append({
             "id": self.update_counter,
             "timestamp": datetime.now().isoformat(),
@@ -873,4 +914,78 @@ class WebhookHandler:
 
 
 # Создаем глобальный экземпляр обработчика
-webhook_handler = WebhookHandler()
\ No newline at end of file
+webhook_handler = WebhookHandler()
+
+# Диспетчер с порядком обработки внутри чата (UPDATE_DISPATCHER_ENABLED)
+update_dispatcher: Optional[ChatDispatcher] = None
+if config.webhook.dispatcher_enabled:
+    update_dispatcher = ChatDispatcher(
+        max_concurrency=config.webhook.dispatcher_max_concurrency,
+        max_active_keys=config.webhook.dispatcher_max_active_keys,
+        max_pending=config.webhook.dispatcher_max_pending
+    )
+
+
+async def dispatch_update(update: Update) -> Dict[str, Any]:
+    """Обрабатывает update с соблюдением порядка внутри чата"""
+    if update_dispatcher is None:
+        return await webhook_handler.handle_update(update)
+    return await update_dispatcher.run(
+        ChatDispatcher.dispatch_key(update), webhook_handler.handle_update, update
+    )
+
+
+async def _submit_update(update: Update):
+    """Передает update из long polling в диспетчер, не дожидаясь обработки"""
+    if update_dispatcher is None:
+        await webhook_handler.handle_update(update)
+        return
+    await update_dispatcher.submit(
+        ChatDispatcher.dispatch_key(update), webhook_handler.handle_update, update
+    )
+
+
+# Фоновая очередь для режима быстрого подтверждения webhook (WEBHOOK_PROCESSING_MODE=queue).
+# Воркер ждет завершения update в диспетчере: число воркеров ограничивает обработку,
+# а при остановке необработанные updates остаются в очереди и сохраняются на диск
+update_queue: Optional[UpdateQueue] = None
+if config.webhook.processing_mode == "queue":
+    update_queue = UpdateQueue(
+        handler=dispatch_update,
+        max_size=config.webhook.queue_max_size,
+        workers=config.webhook.queue_workers,
+        overflow_policy=config.webhook.queue_overflow_policy,
+        spill_path=config.webhook.queue_spill_path or str(config.data_dir / "update_queue_spill.jsonl"),
+        serializer=dumps,
+        deserializer=decode_update
+    )
+
+
+async def ingest_update(update: Dict[str, Any]) -> bool:
+    """
+    Принимает update из long polling в общий конвейер обработки
+    
+    Returns:
+        bool: False если update не принят (очередь переполнена)
+    """
+    update = to_update(update)
+    if update_queue is not None and update_queue.is_running:
+        if webhook_handler.deduplicator and webhook_handler.deduplicator.is_duplicate(update):
+            return True
+        return update_queue.enqueue(update)
+    
+    await _submit_update(update)
+    return True
+
+
+# Long polling вместо webhook (TELEGRAM_INGESTION_MODE=polling)
+update_poller: Optional[UpdatePoller] = None
+if config.webhook.ingestion_mode == "polling":
+    from ..telegram_bot import telegram_client
+    update_poller = UpdatePoller(
+        telegram_client,
+        handler=ingest_update,
+        allowed_updates=config.webhook.allowed_updates,
+        limit=config.webhook.polling_limit,
+        poll_timeout=config.webhook.polling_timeout
+    )
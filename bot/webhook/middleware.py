@@ -1,106 +1,263 @@
 """
 Middleware для webhook сервера
+
+Все middleware написаны как чистые ASGI приложения: в отличие от
+BaseHTTPMiddleware они не создают отдельную задачу и не оборачивают поток
+ответа на каждый запрос. Запросы Telegram к /webhook обрабатывает один слой
+WebhookFastPathMiddleware (проверка secret token, замер времени, перехват
+ошибок и заголовки безопасности), остальные слои пропускают их без работы.
 """
 
+import hmac
 import time
 import logging
-from typing import Callable
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+import traceback
+from typing import Dict, Any, Optional
+
+from fastapi import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
 
 from ..core.config import config
 
 logger = logging.getLogger(__name__)
 
+# Пути, на которые Telegram доставляет updates
+WEBHOOK_PATHS = frozenset({"/webhook", "/webhook/", "/webhook/telegram"})
+SECRET_TOKEN_HEADER = b"x-telegram-bot-api-secret-token"
+# Ключ в scope: запрос уже обработан быстрым путем
+FAST_PATH_SCOPE_KEY = "webhook_fast_path"
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Middleware для безопасности"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Проверка secret token для webhook
-        if request.url.path == "/webhook":
-            secret_token = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
-            expected_token = config.webhook.secret_token
-            
-            # Логируем для отладки
-            logger.info(f"🔐 Webhook security check:")
-            logger.info(f"   Headers: {dict(request.headers)}")
-            logger.info(f"   Received token: {secret_token}")
-            logger.info(f"   Expected token: {expected_token}")
-            
-            # Временно отключаем проверку токена для отладки
-            if False and secret_token != expected_token:
-                logger.warning(f"❌ Invalid secret token from {request.client.host if request.client else 'unknown'}")
-                return JSONResponse(
-                    status_code=200,  # Telegram требует 200 OK
-                    content={"ok": False, "error": "Invalid secret token"}
-                )
-        
-        response = await call_next(request)
-        
-        # Добавляем заголовки безопасности
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
-        return response
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+]
+
+
+# Метрики быстрого пути (общие для всех экземпляров приложения)
+_fast_path_stats: Dict[str, Any] = {
+    "requests": 0,
+    "rejected": 0,
+    "errors": 0,
+    "total_time": 0.0
+}
+
+
+def get_fast_path_stats() -> Dict[str, Any]:
+    """Возвращает метрики обработки POST /webhook"""
+    requests = _fast_path_stats["requests"]
+    return {
+        "requests": requests,
+        "rejected": _fast_path_stats["rejected"],
+        "errors": _fast_path_stats["errors"],
+        "avg_time_ms": round(_fast_path_stats["total_time"] / requests * 1000, 3) if requests else 0.0
+    }
+
+
+def _is_fast_path(scope: Scope) -> bool:
+    """Запрос уже обслуживается WebhookFastPathMiddleware"""
+    return scope.get(FAST_PATH_SCOPE_KEY, False)
+
+
+def _get_header(scope: Scope, name: bytes) -> Optional[bytes]:
+    """Возвращает значение заголовка из ASGI scope (имя в нижнем регистре)"""
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+
+def _client_host(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _error_response(error: Exception) -> JSONResponse:
+    """Ответ 500 для необработанной ошибки"""
+    # В production скрываем детали ошибок
+    if config.environment.value == "production":
+        return JSONResponse(status_code=500, content={"error": "Internal server error"})
+    # В debug режиме показываем полную информацию
+    return JSONResponse(
+        status_code=500,
+        content={
+            "error": str(error),
+            "type": type(error).__name__,
+            "traceback": traceback.format_exc()
+        }
+    )
+
+
+def verify_secret_token(received: Optional[bytes], expected: str) -> bool:
+    """
+    Проверяет secret token за постоянное время
+
+    Args:
+        received: Значение заголовка X-Telegram-Bot-Api-Secret-Token
+        expected: Ожидаемый токен (пустой - проверка не требуется)
+
+    Returns:
+        bool: Токен совпадает или проверка отключена
+    """
+    if not expected:
+        return True
+    if received is None:
+        return False
+    return hmac.compare_digest(received, expected.encode())
+
+
+class WebhookFastPathMiddleware:
+    """Единый слой для POST /webhook: secret token, тайминг, ошибки, заголовки"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in WEBHOOK_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        _fast_path_stats["requests"] += 1
+        scope[FAST_PATH_SCOPE_KEY] = True
+
+        if config.webhook.verify_secret and not verify_secret_token(
+            _get_header(scope, SECRET_TOKEN_HEADER), config.webhook.secret_token
+        ):
+            _fast_path_stats["rejected"] += 1
+            logger.warning(f"❌ Invalid secret token from {_client_host(scope)}")
+            response = JSONResponse(
+                status_code=200,  # Telegram требует 200 OK
+                content={"ok": False, "error": "Invalid secret token"}
+            )
+            await response(scope, receive, self._wrap_send(send, started_at))
+            return
+
+        response_started = False
+        wrapped_send = self._wrap_send(send, started_at)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await wrapped_send(message)
 
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            _fast_path_stats["errors"] += 1
+            logger.error(f"❌ Необработанная ошибка webhook: {e}", exc_info=True)
+            if response_started:
+                raise
+            await _error_response(e)(scope, receive, wrapped_send)
+        finally:
+            _fast_path_stats["total_time"] += time.perf_counter() - started_at
+
+    @staticmethod
+    def _wrap_send(send: Send, started_at: float) -> Send:
+        """Добавляет заголовки безопасности и X-Process-Time к ответу"""
+        async def wrapped(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - started_at
+                headers = list(message.get("headers", ()))
+                headers.extend(SECURITY_HEADERS)
+                headers.append((b"x-process-time", str(process_time).encode()))
+                message["headers"] = headers
+                logger.debug(f"⚡ POST webhook -> {message['status']} ({process_time:.3f}s)")
+            await send(message)
+        return wrapped
+
+
+class SecurityMiddleware:
+    """Middleware для безопасности (заголовки ответа)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _is_fast_path(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.extend(SECURITY_HEADERS)
+                message["headers"] = headers
+            await send(message)
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+        await self.app(scope, receive, send_wrapper)
+
+
+class LoggingMiddleware:
     """Middleware для логирования запросов"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-        
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _is_fast_path(scope):
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+
         # Логируем входящий запрос
-        logger.debug(f"🔵 {request.method} {request.url.path}")
-        
-        # Обрабатываем запрос
-        response = await call_next(request)
-        
-        # Считаем время обработки
-        process_time = time.time() - start_time
-        
-        # Логируем результат
-        status_emoji = "🟢" if response.status_code < 400 else "🔴"
-        logger.info(
-            f"{status_emoji} {request.method} {request.url.path} "
-            f"-> {response.status_code} ({process_time:.3f}s)"
-        )
-        
-        # Добавляем заголовок с временем обработки
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
+        logger.debug(f"🔵 {method} {path}")
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Считаем время обработки
+                process_time = time.perf_counter() - start_time
+                status_code = message["status"]
+
+                # Логируем результат
+                status_emoji = "🟢" if status_code < 400 else "🔴"
+                logger.info(f"{status_emoji} {method} {path} -> {status_code} ({process_time:.3f}s)")
+
+                # Добавляем заголовок с временем обработки
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-process-time", str(process_time).encode()))
+                message["headers"] = headers
+            await send(message)
 
+        await self.app(scope, receive, send_wrapper)
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
+
+class ErrorHandlerMiddleware:
     """Middleware для обработки ошибок"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _is_fast_path(scope):
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
         try:
-            return await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
             logger.error(f"❌ Необработанная ошибка: {e}", exc_info=True)
-            
-            # В production скрываем детали ошибок
-            if config.environment.value == "production":
-                return JSONResponse(
-                    status_code=500,
-                    content={"error": "Internal server error"}
-                )
-            else:
-                # В debug режиме показываем полную информацию
-                import traceback
-                return JSONResponse(
-                    status_code=500,
-                    content={
-                        "error": str(e),
-                        "type": type(e).__name__,
-                        "traceback": traceback.format_exc()
-                    }
-                )
+            # Если ответ уже начат, корректно ответить нельзя
+            if response_started:
+                raise
+            await _error_response(e)(scope, receive, send)
 
 
 class WebhookMiddleware:
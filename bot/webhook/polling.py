@@ -0,0 +1,175 @@
+"""
+Long-polling ingestion (getUpdates)
+
+Альтернатива webhook: забирает updates пачками через getUpdates и
+передает их в тот же конвейер обработки (дедупликация, очередь,
+диспетчер, WebhookHandler). Позволяет работать без публичного URL -
+для локальных нагрузочных прогонов и при недоступности туннеля.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional, List, Callable, Awaitable
+
+import httpx
+
+from ..telegram_client import TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+
+class UpdatePoller:
+    """Получает updates через getUpdates и передает их обработчику"""
+
+    # Пауза перед повтором, если обработчик не принял update (очередь полна)
+    RETRY_ACCEPT_DELAY = 0.5
+    # Максимальная пауза после ошибок API
+    MAX_BACKOFF = 30.0
+
+    def __init__(
+        self,
+        client,
+        handler: Callable[[Dict[str, Any]], Awaitable[bool]],
+        allowed_updates: Optional[List[str]] = None,
+        limit: int = 100,
+        poll_timeout: int = 30
+    ):
+        """
+        Args:
+            client: TelegramClient
+            handler: Корутина приема update; возвращает False, если update не принят
+            allowed_updates: Типы updates (как в WebhookConfig)
+            limit: Размер пачки (1-100)
+            poll_timeout: Таймаут long polling в секундах
+        """
+        self.client = client
+        self.handler = handler
+        self.allowed_updates = allowed_updates
+        self.limit = max(1, min(100, limit))
+        self.poll_timeout = poll_timeout
+
+        self.offset: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._started_at: Optional[float] = None
+        self._counters = {
+            "polls": 0,
+            "empty_polls": 0,
+            "updates": 0,
+            "accept_retries": 0,
+            "errors": 0
+        }
+        self._last_batch_size = 0
+        self._last_error: Optional[str] = None
+
+    @property
+    def is_running(self) -> bool:
+        """Запущен ли цикл опроса"""
+        return self._task is not None and not self._task.done()
+
+    async def start(self, delete_webhook: bool = True):
+        """
+        Запускает цикл опроса
+
+        Args:
+            delete_webhook: Снять webhook (getUpdates не работает при активном webhook)
+        """
+        if self.is_running:
+            return
+
+        if delete_webhook:
+            try:
+                await self.client.call("deleteWebhook", {"drop_pending_updates": False})
+                logger.info("🔌 Webhook снят, переходим на long polling")
+            except Exception as e:
+                logger.error(f"❌ Не удалось снять webhook перед polling: {e}")
+
+        self._started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run(), name="update-poller")
+        logger.info(f"🚀 Long polling запущен: limit={self.limit}, timeout={self.poll_timeout}с")
+
+    async def stop(self):
+        """Останавливает цикл опроса"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        logger.info("👋 Long polling остановлен")
+
+    async def poll_once(self) -> int:
+        """
+        Выполняет один запрос getUpdates и передает пачку обработчику
+
+        Returns:
+            int: Количество полученных updates
+        """
+        updates = await self.client.call(
+            "getUpdates",
+            {
+                "offset": self.offset,
+                "limit": self.limit,
+                "timeout": self.poll_timeout,
+                "allowed_updates": self.allowed_updates
+            },
+            timeout=self.poll_timeout + 10
+        ) or []
+
+        self._counters["polls"] += 1
+        self._last_batch_size = len(updates)
+        if not updates:
+            self._counters["empty_polls"] += 1
+
+        for update in updates:
+            # Offset сдвигаем только после того, как update принят,
+            # иначе при переполнении очереди Telegram вернет его снова
+            while not await self.handler(update):
+                self._counters["accept_retries"] += 1
+                await asyncio.sleep(self.RETRY_ACCEPT_DELAY)
+
+            self.offset = update["update_id"] + 1
+            self._counters["updates"] += 1
+
+        return len(updates)
+
+    async def _run(self):
+        """Основной цикл опроса с экспоненциальной паузой при ошибках"""
+        backoff = 1.0
+        while True:
+            try:
+                await self.poll_once()
+                backoff = 1.0
+                self._last_error = None
+            except asyncio.CancelledError:
+                raise
+            except (TelegramAPIError, httpx.HTTPError) as e:
+                self._counters["errors"] += 1
+                self._last_error = str(e)
+                if isinstance(e, TelegramAPIError) and e.error_code == 409:
+                    logger.error("❌ getUpdates конфликтует с активным webhook или другим poller'ом")
+                else:
+                    logger.warning(f"⚠️ Ошибка getUpdates: {e}, повтор через {backoff:.0f}с")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+            except Exception as e:
+                self._counters["errors"] += 1
+                self._last_error = str(e)
+                logger.error(f"❌ Ошибка в цикле polling: {e}", exc_info=True)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает метрики опроса"""
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        polls = self._counters["polls"]
+        return {
+            "running": self.is_running,
+            "offset": self.offset,
+            "limit": self.limit,
+            "poll_timeout": self.poll_timeout,
+            **self._counters,
+            "last_batch_size": self._last_batch_size,
+            "avg_batch_size": round(self._counters["updates"] / polls, 2) if polls else 0.0,
+            "updates_per_second": round(self._counters["updates"] / uptime, 2) if uptime else 0.0,
+            "last_error": self._last_error
+        }
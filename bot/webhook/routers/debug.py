@@ -8,8 +8,10 @@ from typing import Optional
 from datetime import datetime
 
 from ...core.config import config
-from ..handlers import webhook_handler
+from ..handlers import webhook_handler, update_queue, update_dispatcher, update_poller
 from ..services import ServiceManager, DebugService
+from ..middleware import get_fast_path_stats
+from ...telegram_types import to_builtins, JSON_BACKEND
 
 router = APIRouter()
 
@@ -24,7 +26,263 @@ async def get_last_updates():
     """Получить последние обработанные updates"""
     return {
         "total_updates": webhook_handler.update_counter,
-        "last_updates": webhook_handler.last_updates,
+        "duplicates_skipped": webhook_handler.deduplicator.get_stats()["duplicates"] if webhook_handler.deduplicator else 0,
+        "last_updates": [
+            {**entry, "update": to_builtins(entry["update"])}
+            for entry in webhook_handler.last_updates
+        ],
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/dedup")
+async def get_dedup_stats():
+    """Получить метрики дедупликации updates"""
+    deduplicator = webhook_handler.deduplicator
+    if deduplicator is None:
+        return {"enabled": False, "timestamp": datetime.now().isoformat()}
+    
+    return {
+        "enabled": True,
+        **deduplicator.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/update-queue")
+async def get_update_queue_stats():
+    """Получить метрики фоновой очереди updates"""
+    if update_queue is None:
+        return {
+            "enabled": False,
+            "processing_mode": config.webhook.processing_mode,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    return {
+        "enabled": True,
+        "processing_mode": config.webhook.processing_mode,
+        **update_queue.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/webhook-fast-path")
+async def get_webhook_fast_path_stats():
+    """Получить метрики обработки POST /webhook (secret token, время, ошибки)"""
+    return {
+        "verify_secret": config.webhook.verify_secret,
+        "json_backend": JSON_BACKEND,
+        **get_fast_path_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/dispatcher")
+async def get_dispatcher_stats():
+    """Получить метрики диспетчера updates по чатам"""
+    if update_dispatcher is None:
+        return {"enabled": False, "timestamp": datetime.now().isoformat()}
+    
+    return {
+        "enabled": True,
+        **update_dispatcher.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/poller")
+async def get_poller_stats():
+    """Получить метрики long polling ingestion"""
+    if update_poller is None:
+        return {
+            "enabled": False,
+            "ingestion_mode": config.webhook.ingestion_mode,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    return {
+        "enabled": True,
+        "ingestion_mode": config.webhook.ingestion_mode,
+        **update_poller.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/send-scheduler")
+async def get_send_scheduler_stats():
+    """Получить метрики планировщика исходящих сообщений"""
+    from ...telegram_bot import telegram_client, send_scheduler
+    return {
+        "scheduler": send_scheduler.get_stats(),
+        "client": telegram_client.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/llm-clients")
+async def get_llm_clients_stats():
+    """Получить метрики общего пула соединений OpenAI/Anthropic"""
+    from ...llm_clients import llm_clients
+    return {
+        **llm_clients.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/reply-stream")
+async def get_reply_stream_stats():
+    """Получить метрики потоковой отправки ответов LLM"""
+    from ...reply_stream import get_stream_stats
+    return {
+        **get_stream_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/response-cache")
+async def get_response_cache_stats():
+    """Получить метрики семантического кеша ответов"""
+    from ...services.response_cache import response_cache
+    return {
+        **response_cache.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/single-flight")
+async def get_single_flight_stats():
+    """Получить метрики объединения одинаковых одновременных вызовов"""
+    from ...core.single_flight import get_single_flight_stats as get_stats
+    return {
+        "groups": get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/context-packer")
+async def get_context_packer_stats():
+    """Получить метрики упаковки контекста в бюджет токенов"""
+    from ...services.context_packer import get_context_packer_stats as get_stats
+    return {
+        **get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/quick-replies")
+async def get_quick_reply_stats():
+    """Получить метрики шаблонных ответов на тривиальные сообщения"""
+    from ...services.quick_replies import quick_replies
+    return {
+        **quick_replies.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/direct-render")
+async def get_direct_render_stats():
+    """Получить метрики ответов инструментов без второго запроса к LLM"""
+    from agent.tools.renderers import get_direct_render_stats as get_stats
+    return {
+        "enabled": config.direct_render.enabled,
+        "exclude": config.direct_render.exclude,
+        **get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/tool-calls")
+async def get_tool_call_stats():
+    """Получить время выполнения инструментов агента и критический путь"""
+    from agent.core.tool_stats import get_tool_call_stats as get_stats
+    return {
+        "timeout": config.tool_calls.timeout,
+        "timeouts": config.tool_calls.timeouts,
+        **get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/intent-engine")
+async def get_intent_engine_stats():
+    """Получить метрики скомпилированного движка намерений"""
+    from ...services.intent_engine import get_intent_engine_stats as get_stats
+    return {
+        **get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/model-cascade")
+async def get_model_cascade_stats():
+    """Получить маршрутизацию, эскалации, задержку и стоимость уровней каскада моделей"""
+    from agent.core.model_cascade import get_model_cascade_stats as get_stats
+    return {
+        "enabled": config.model_cascade.enabled,
+        "fast_model": config.model_cascade.fast_model,
+        "strong_model": config.model_cascade.strong_model,
+        "min_confidence": config.model_cascade.min_confidence,
+        **get_stats(config.model_cascade.strong_model),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/memory-write")
+async def get_memory_write_stats():
+    """Получить глубину очереди и задержку отложенной записи памяти"""
+    from ...core.agent import AgentFactory
+    from ...services.memory_writer import memory_writer
+    memory_manager = AgentFactory.get_agent().memory_manager
+    return {
+        **memory_writer.get_stats(),
+        **(memory_manager.get_write_stats() if hasattr(memory_manager, "get_write_stats") else {}),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/memory-tier")
+async def get_memory_tier_stats():
+    """Получить попадания и задержку горячего уровня памяти"""
+    from ...core.agent import AgentFactory
+    from ...services.tiered_memory import TieredMemoryManager
+    memory_manager = AgentFactory.get_agent().memory_manager
+    if not isinstance(memory_manager, TieredMemoryManager):
+        return {
+            "enabled": False,
+            "memory_manager": type(memory_manager).__name__,
+            "timestamp": datetime.now().isoformat()
+        }
+    return {
+        **memory_manager.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/memory-store")
+async def get_memory_store_stats():
+    """Получить размер, транзакции и задержку локальной памяти (SQLite или InMemory)"""
+    from ...core.agent import AgentFactory
+    from ...services.memory_manager import InMemoryManager
+    from ...services.sqlite_memory import SqliteMemoryManager
+    memory_manager = AgentFactory.get_agent().memory_manager
+    if not isinstance(memory_manager, (SqliteMemoryManager, InMemoryManager)):
+        return {
+            "backend": type(memory_manager).__name__,
+            "timestamp": datetime.now().isoformat()
+        }
+    return {
+        **memory_manager.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@router.get("/caches")
+async def get_caches_stats():
+    """Получить размер, попадания и инвалидации кешей"""
+    from ...core.cache import get_cache_stats
+    return {
+        "caches": get_cache_stats(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -118,9 +376,9 @@ async def get_environment():
 async def clear_cache():
     """Очистить все кеши"""
     from ...core.utils import CacheUtils
-    CacheUtils.clear_all()
+    removed = CacheUtils.clear_all()
     
-    return {"status": "Cache cleared", "timestamp": datetime.now().isoformat()}
+    return {"status": "Cache cleared", "removed_entries": removed, "timestamp": datetime.now().isoformat()}
 
 
 @router.post("/test-send-message")
@@ -130,20 +388,19 @@ async def test_send_message(chat_id: int, text: str):
     logger = logging.getLogger(__name__)
     
     try:
-        from ...telegram_bot import bot
+        from ...telegram_bot import telegram_client
         logger.info(f"📤 Attempting to send message to {chat_id}: {text}")
         
         # Проверяем, что бот инициализирован
-        logger.info(f"🤖 Bot token exists: {bool(bot.token)}")
-        logger.info(f"🤖 Bot token (masked): {bot.token[:10]}...{bot.token[-5:] if bot.token else 'None'}")
+        logger.info(f"🤖 Bot token exists: {bool(telegram_client.token)}")
         
         # Пытаемся отправить сообщение
-        result = bot.send_message(chat_id, text)
+        result = await telegram_client.send_message(chat_id, text)
         
         logger.info(f"✅ Message sent successfully: {result}")
         return {
             "success": True,
-            "message_id": result.message_id if hasattr(result, 'message_id') else None,
+            "message_id": result.get('message_id'),
             "chat_id": chat_id,
             "text": text,
             "timestamp": datetime.now().isoformat()
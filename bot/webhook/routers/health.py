@@ -6,25 +6,32 @@ from fastapi import APIRouter
 from datetime import datetime
 
 from ...core.config import config
-from ...telegram_bot import bot
+from ...core.cache import cached
+from ...telegram_bot import telegram_client
 from ..services import ServiceManager
 
 router = APIRouter()
 
 
+@cached("telegram_bot_info", ttl=300, max_size=1, key=lambda: ())
+async def _get_bot_info() -> dict:
+    """Данные бота (getMe) для информационных endpoints; /health и /ready проверяют Telegram напрямую"""
+    return await telegram_client.get_me()
+
+
 @router.get("/")
 async def health_check():
     """Основной health check endpoint"""
     try:
-        bot_info = bot.get_me()
+        bot_info = await _get_bot_info()
         service_manager = ServiceManager()
         
         return {
             "status": "🟢 ONLINE",
             "service": "Artyom Integrator Webhook",
-            "bot": f"@{bot_info.username}",
-            "bot_id": bot_info.id,
-            "mode": "WEBHOOK",
+            "bot": f"@{bot_info['username']}",
+            "bot_id": bot_info['id'],
+            "mode": config.webhook.ingestion_mode.upper(),
             "timestamp": datetime.now().isoformat(),
             "environment": config.environment.value,
             "services": service_manager.get_services_status(),
@@ -49,7 +56,7 @@ async def railway_health():
     """Упрощённый healthcheck для Railway"""
     try:
         # Простая проверка - только Telegram бот
-        bot.get_me()
+        await telegram_client.get_me()
         
         return {
             "status": "healthy",
@@ -102,7 +109,7 @@ async def detailed_health():
             health_data["status"] = "unhealthy"
         
         # Добавляем дополнительную диагностическую информацию
-        health_data["diagnostics"] = _get_health_diagnostics(service_manager)
+        health_data["diagnostics"] = await _get_health_diagnostics(service_manager)
         
         return health_data
         
@@ -116,11 +123,11 @@ async def detailed_health():
         }
 
 
-def _get_health_diagnostics(service_manager: ServiceManager) -> dict:
+async def _get_health_diagnostics(service_manager: ServiceManager) -> dict:
     """Получает дополнительную диагностическую информацию"""
     try:
         return {
-            "telegram_bot_info": _get_telegram_info(),
+            "telegram_bot_info": await _get_telegram_info(),
             "config_status": _get_config_status(),
             "python_info": {
                 "version": f"{config.environment.value}",
@@ -131,16 +138,16 @@ def _get_health_diagnostics(service_manager: ServiceManager) -> dict:
         return {"error": str(e)}
 
 
-def _get_telegram_info() -> dict:
+async def _get_telegram_info() -> dict:
     """Получает информацию о Telegram боте"""
     try:
-        bot_info = bot.get_me()
+        bot_info = await _get_bot_info()
         return {
-            "bot_username": bot_info.username,
-            "bot_id": bot_info.id,
-            "can_join_groups": bot_info.can_join_groups,
-            "can_read_all_group_messages": bot_info.can_read_all_group_messages,
-            "supports_inline_queries": bot_info.supports_inline_queries
+            "bot_username": bot_info.get('username'),
+            "bot_id": bot_info['id'],
+            "can_join_groups": bot_info.get('can_join_groups'),
+            "can_read_all_group_messages": bot_info.get('can_read_all_group_messages'),
+            "supports_inline_queries": bot_info.get('supports_inline_queries')
         }
     except Exception as e:
         return {"error": str(e)}
@@ -164,7 +171,7 @@ async def readiness_check():
     """Проверка готовности сервиса"""
     try:
         # Проверяем подключение к Telegram
-        bot.get_me()
+        await telegram_client.get_me()
         
         # Проверяем критичные сервисы
         service_manager = ServiceManager()
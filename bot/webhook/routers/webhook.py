@@ -3,11 +3,12 @@ Webhook management endpoints
 """
 
 import logging
-from fastapi import APIRouter, Request, HTTPException
-from typing import Optional
+from fastapi import APIRouter, Request, HTTPException, Response
+from typing import Optional, Dict, Any
 
 from ...core.config import config
-from ..handlers import webhook_handler
+from ...telegram_types import decode_update, encode, UpdateDecodeError
+from ..handlers import webhook_handler, update_queue, dispatch_update
 from ..services import WebhookService
 
 router = APIRouter()
@@ -29,28 +30,43 @@ async def webhook_telegram_endpoint(request: Request):
     return await _handle_webhook_request(request)
 
 
+def _json_response(content: Dict[str, Any], status_code: int = 200) -> Response:
+    """Ответ с JSON, закодированным быстрым кодировщиком (без jsonable_encoder)"""
+    return Response(content=encode(content), status_code=status_code, media_type="application/json")
+
+
 async def _handle_webhook_request(request: Request):
     """Общая логика обработки webhook запросов"""
     try:
-        # Получаем данные
-        update = await request.json()
-        
-        # Логируем входящий update
-        logger.info(f"📥 Received update: {update}")
+        # Декодируем тело один раз сразу в типизированный Update
+        try:
+            update = decode_update(await request.body())
+        except UpdateDecodeError as e:
+            logger.warning(f"⚠️ Некорректный update: {e}")
+            return _json_response({"ok": False, "error": "Invalid update payload"})
         
-        # Обрабатываем update
-        result = await webhook_handler.handle_update(update)
+        # Режим быстрого подтверждения: ставим в очередь и сразу отвечаем
+        if update_queue is not None and update_queue.is_running:
+            # Повторную доставку уже принятого update не ставим в очередь
+            if webhook_handler.deduplicator and webhook_handler.deduplicator.is_duplicate(update):
+                return _json_response({"ok": True, "duplicate": True})
+            
+            if update_queue.enqueue(update):
+                return _json_response({"ok": True, "queued": True})
+            
+            # Очередь переполнена - не-2xx заставит Telegram повторить доставку позже
+            return _json_response({"ok": False, "error": "Update queue is full"}, status_code=503)
         
-        # Логируем результат
-        logger.info(f"📤 Response: {result}")
+        # Обрабатываем update (с порядком внутри чата)
+        result = await dispatch_update(update)
         
         # Telegram требует всегда возвращать 200 OK
-        return result
+        return _json_response(result)
         
     except Exception as e:
         logger.error(f"❌ Ошибка в webhook: {e}", exc_info=True)
         # Все равно возвращаем 200 OK для Telegram
-        return {"ok": False, "error": str(e)}
+        return _json_response({"ok": False, "error": str(e)})
 
 
 @router.get("/info")
@@ -3,15 +3,16 @@
 """
 
 import os
-import json
 import time
+import json
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import requests
 
 from ..core.config import config
-from ..telegram_bot import bot
+from ..core.cache import cached
+from ..telegram_bot import bot, telegram_client, send_scheduler
 from ..core.agent import AgentFactory
 
 logger = logging.getLogger(__name__)
@@ -75,11 +76,13 @@ class WebhookService:
             # Параметры webhook
             params = {
                 "url": webhook_url,
-                "secret_token": secret_token,
                 "allowed_updates": allowed_updates or config.webhook.allowed_updates,
                 "drop_pending_updates": drop_pending_updates
             }
             
+            if secret_token:
+                params["secret_token"] = secret_token
+            
             if max_connections:
                 params["max_connections"] = max_connections
             
@@ -89,6 +92,8 @@ class WebhookService:
             result = self.bot.set_webhook(**params)
             
             if result:
+                # Входящие updates теперь подписаны новым токеном
+                config.webhook.secret_token = secret_token
                 logger.info(f"✅ Webhook set successfully: {webhook_url}")
                 return {
                     "success": True,
@@ -137,18 +142,17 @@ class ServiceManager:
     
     def __init__(self):
         self.start_time = datetime.now()
-        self._services_cache = {}
-        self._cache_ttl = 60  # секунд
-        self._last_cache_update = 0
     
     def get_services_status(self) -> Dict[str, str]:
         """Получает статус всех сервисов"""
-        # Проверяем кеш
-        if time.time() - self._last_cache_update < self._cache_ttl:
-            return self._services_cache
-        
-        status = {
-            "telegram": self._check_telegram(),
+        # Telegram - состояние последнего вызова, остальное зависит от конфигурации
+        return {"telegram": self._check_telegram(), **self._get_configured_status()}
+    
+    # ServiceManager создается на каждый запрос - кеш общий для процесса
+    @cached("service_status", ttl=60, max_size=1, key=lambda self: ())
+    def _get_configured_status(self) -> Dict[str, str]:
+        """Статус сервисов по конфигурации и доступности модулей"""
+        return {
             "agent": self._check_agent(),
             "openai": self._check_openai(),
             "anthropic": self._check_anthropic(),
@@ -157,11 +161,6 @@ class ServiceManager:
             "social_media": self._check_social_media(),
             "mcp": self._check_mcp()
         }
-        
-        self._services_cache = status
-        self._last_cache_update = time.time()
-        
-        return status
     
     def get_detailed_status(self) -> Dict[str, Any]:
         """Получает детальный статус всех сервисов"""
@@ -203,11 +202,8 @@ class ServiceManager:
     
     def _check_telegram(self) -> str:
         """Проверяет подключение к Telegram"""
-        try:
-            bot.get_me()
-            return "✅ CONNECTED"
-        except:
-            return "❌ DISCONNECTED"
+        # Не делаем блокирующий запрос: берем состояние последнего вызова async клиента
+        return "✅ CONNECTED" if telegram_client.is_reachable else "❌ DISCONNECTED"
     
     def _check_agent(self) -> str:
         """Проверяет AI агента"""
@@ -398,17 +394,16 @@ class AdminService:
                 "error": "No user IDs provided"
             }
         
-        sent = 0
-        failed = 0
-        errors = []
+        # Рассылка идет через планировщик с низким приоритетом:
+        # максимум допустимой скорости, но без задержки живых диалогов
+        results = await send_scheduler.broadcast(user_ids, message, parse_mode=parse_mode)
         
-        for user_id in user_ids:
-            try:
-                bot.send_message(user_id, message, parse_mode=parse_mode)
-                sent += 1
-            except Exception as e:
-                failed += 1
-                errors.append({"user_id": user_id, "error": str(e)})
+        sent = sum(1 for _, _, error in results if error is None)
+        failed = len(results) - sent
+        errors = [
+            {"user_id": user_id, "error": str(error)}
+            for user_id, _, error in results if error is not None
+        ]
         
         return {
             "success": sent > 0,
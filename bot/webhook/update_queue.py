@@ -0,0 +1,350 @@
+"""
+Фоновая очередь updates для режима быстрого подтверждения webhook
+
+Webhook endpoint кладет update в ограниченную очередь и сразу отвечает
+Telegram 200 OK, а пул asyncio воркеров обрабатывает очередь в фоне.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from enum import Enum
+from typing import Dict, Any, Optional, Callable, Awaitable, Deque, Tuple, Union
+
+from ..core.utils import percentile
+from ..telegram_types import Update
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(str, Enum):
+    """Политика поведения при переполнении очереди"""
+    REJECT = "reject"            # Отклоняем новый update (Telegram повторит доставку)
+    DROP_OLDEST = "drop_oldest"  # Выбрасываем самый старый update из очереди
+    SPILL = "spill"              # Сбрасываем update на диск и дочитываем позже
+
+
+def _update_id(update: Union[Update, Dict[str, Any]]) -> Optional[int]:
+    """update_id для логов: очередь принимает и типизированные Update, и словари"""
+    if isinstance(update, dict):
+        return update.get("update_id")
+    return getattr(update, "update_id", None)
+
+
+class UpdateQueue:
+    """
+    Ограниченная очередь updates с пулом воркеров
+
+    Хранит в очереди пары (время постановки, update), чтобы считать
+    время ожидания каждого update до начала обработки.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        max_size: int = 1000,
+        workers: int = 8,
+        overflow_policy: str = OverflowPolicy.REJECT.value,
+        spill_path: Optional[str] = None,
+        latency_window: int = 1000,
+        serializer: Optional[Callable[[Any], str]] = None,
+        deserializer: Optional[Callable[[str], Any]] = None
+    ):
+        """
+        Args:
+            handler: Корутина обработки одного update
+            max_size: Максимальная длина очереди
+            workers: Количество воркеров
+            overflow_policy: reject, drop_oldest или spill
+            spill_path: Файл для сброса updates при политике spill
+            latency_window: Сколько последних замеров хранить для перцентилей
+            serializer: Преобразование update в строку для spill файла (по умолчанию json)
+            deserializer: Обратное преобразование строки spill файла в update
+        """
+        self.handler = handler
+        self.max_size = max(1, max_size)
+        self.workers_count = max(1, workers)
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        self.spill_path = spill_path
+        self.serializer = serializer or (lambda update: json.dumps(update, ensure_ascii=False))
+        self.deserializer = deserializer or json.loads
+
+        if self.overflow_policy == OverflowPolicy.SPILL and not self.spill_path:
+            raise ValueError("Для политики spill нужно указать spill_path")
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        self._running = False
+        self._busy_workers = 0
+        self._spill_lock: Optional[asyncio.Lock] = None
+        # enqueue дописывает файл из event loop, восстановление переписывает его в потоке
+        self._spill_file_lock = threading.Lock()
+        self._spilled_pending = 0
+        # Updates, обработка которых прервана остановкой по таймауту
+        self._interrupted: list = []
+
+        self._wait_times: Deque[float] = deque(maxlen=latency_window)
+        self._processing_times: Deque[float] = deque(maxlen=latency_window)
+        self._counters = {
+            "enqueued": 0,
+            "processed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "restored": 0
+        }
+
+    @property
+    def is_running(self) -> bool:
+        """Запущены ли воркеры"""
+        return self._running
+
+    @property
+    def depth(self) -> int:
+        """Текущая глубина очереди (без учета сброшенных на диск)"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        """Запускает пул воркеров"""
+        if self._running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._spill_lock = asyncio.Lock()
+        self._running = True
+
+        if self.overflow_policy == OverflowPolicy.SPILL:
+            self._spilled_pending = await asyncio.to_thread(self._count_spilled)
+            if self._spilled_pending:
+                logger.info(f"💾 На диске найдено {self._spilled_pending} отложенных updates")
+                await self._restore_spilled()
+
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"update-worker-{i}")
+            for i in range(self.workers_count)
+        ]
+        logger.info(
+            f"🚀 Очередь updates запущена: workers={self.workers_count}, "
+            f"max_size={self.max_size}, overflow={self.overflow_policy.value}"
+        )
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Останавливает воркеров, дав им дообработать очередь
+
+        Args:
+            timeout: Сколько секунд ждать опустошения очереди
+        """
+        if not self._running:
+            return
+
+        self._running = False
+
+        try:
+            await asyncio.wait_for(self._drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Очередь не опустела за {timeout}с, осталось {self.depth} updates")
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # Необработанные updates (прерванные и оставшиеся в очереди) сохраняем на диск,
+        # чтобы не потерять их при рестарте
+        if self.overflow_policy == OverflowPolicy.SPILL:
+            leftovers, self._interrupted = self._interrupted, []
+            while not self._queue.empty():
+                leftovers.append(self._queue.get_nowait()[1])
+                self._queue.task_done()
+            if leftovers:
+                await asyncio.to_thread(self._append_spilled, leftovers)
+                logger.info(f"💾 {len(leftovers)} необработанных updates сохранено на диск")
+
+        logger.info("👋 Очередь updates остановлена")
+
+    async def _drain(self):
+        """Ждет опустошения очереди вместе с отложенными на диск updates"""
+        while True:
+            await self._queue.join()
+            if not self._spilled_pending:
+                return
+            await self._restore_spilled()
+
+    def enqueue(self, update: Union[Update, Dict[str, Any]]) -> bool:
+        """
+        Ставит update в очередь без ожидания
+
+        Returns:
+            bool: True если update принят (в очередь или на диск)
+        """
+        if not self._running:
+            return False
+
+        item = (time.monotonic(), update)
+
+        try:
+            self._queue.put_nowait(item)
+            self._counters["enqueued"] += 1
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+            try:
+                _, dropped = self._queue.get_nowait()
+                self._queue.task_done()
+                self._counters["dropped"] += 1
+                logger.warning(f"⚠️ Очередь переполнена, выброшен update {_update_id(dropped)}")
+            except asyncio.QueueEmpty:
+                pass
+            self._queue.put_nowait(item)
+            self._counters["enqueued"] += 1
+            return True
+
+        if self.overflow_policy == OverflowPolicy.SPILL:
+            # Запись одной строки в файл достаточно быстрая, чтобы не уходить в поток
+            self._append_spilled([update])
+            self._spilled_pending += 1
+            self._counters["spilled"] += 1
+            return True
+
+        self._counters["rejected"] += 1
+        logger.warning(f"⚠️ Очередь переполнена, update {_update_id(update)} отклонен")
+        return False
+
+    async def _worker(self, worker_id: int):
+        """Воркер, обрабатывающий updates из очереди"""
+        while True:
+            enqueued_at, update = await self._queue.get()
+            started_at = time.monotonic()
+            self._wait_times.append(started_at - enqueued_at)
+            self._busy_workers += 1
+
+            try:
+                await self.handler(update)
+                self._counters["processed"] += 1
+            except asyncio.CancelledError:
+                # Остановка по таймауту: update сохраняется вместе с остатком очереди
+                self._interrupted.append(update)
+                raise
+            except Exception as e:
+                self._counters["failed"] += 1
+                logger.error(
+                    f"❌ Воркер {worker_id}: ошибка обработки update {_update_id(update)}: {e}",
+                    exc_info=True
+                )
+            finally:
+                self._processing_times.append(time.monotonic() - started_at)
+                self._busy_workers -= 1
+                self._queue.task_done()
+
+            if self._spilled_pending and self._queue.qsize() < self.max_size // 2:
+                try:
+                    await self._restore_spilled()
+                except Exception as e:
+                    logger.error(f"❌ Воркер {worker_id}: ошибка восстановления updates с диска: {e}", exc_info=True)
+
+    async def _restore_spilled(self):
+        """Дочитывает сброшенные на диск updates в освободившееся место очереди"""
+        async with self._spill_lock:
+            free_slots = self.max_size - self._queue.qsize()
+            if free_slots <= 0 or not self._spilled_pending:
+                return
+
+            restored, taken = await asyncio.to_thread(self._take_spilled, free_slots)
+            self._spilled_pending = max(0, self._spilled_pending - taken)
+
+            # Пока файл читался, новые updates могли занять место в очереди -
+            # то, что не помещается, возвращаем в начало spill файла
+            free_slots = max(0, self.max_size - self._queue.qsize())
+            fits, overflow = restored[:free_slots], restored[free_slots:]
+            now = time.monotonic()
+            for update in fits:
+                self._queue.put_nowait((now, update))
+            if overflow:
+                await asyncio.to_thread(self._prepend_spilled, overflow)
+                self._spilled_pending += len(overflow)
+
+            self._counters["restored"] += len(fits)
+            if fits:
+                logger.debug(f"💾 Восстановлено {len(fits)} updates с диска, осталось {self._spilled_pending}")
+
+    def _append_spilled(self, updates: list):
+        """Дописывает updates в spill файл (JSON Lines)"""
+        directory = os.path.dirname(self.spill_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._spill_file_lock:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for update in updates:
+                    f.write(self.serializer(update) + "\n")
+
+    def _prepend_spilled(self, updates: list):
+        """Возвращает updates в начало spill файла (перед более поздними)"""
+        with self._spill_file_lock:
+            lines = self._read_spilled()
+            self._write_spilled([self.serializer(update) + "\n" for update in updates] + lines)
+
+    def _take_spilled(self, limit: int) -> Tuple[list, int]:
+        """Забирает до limit updates из начала spill файла (updates, число забранных строк)"""
+        with self._spill_file_lock:
+            lines = self._read_spilled()
+            taken, rest = lines[:limit], lines[limit:]
+            if taken:
+                self._write_spilled(rest)
+
+        updates = []
+        for line in taken:
+            try:
+                updates.append(self.deserializer(line))
+            except ValueError:
+                logger.warning("⚠️ Поврежденная строка в spill файле пропущена")
+        return updates, len(taken)
+
+    def _read_spilled(self) -> list:
+        if not os.path.exists(self.spill_path):
+            return []
+        with open(self.spill_path, 'r', encoding='utf-8') as f:
+            return [line for line in f if line.strip()]
+
+    def _write_spilled(self, lines: list):
+        tmp_path = f"{self.spill_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.spill_path)
+
+    def _count_spilled(self) -> int:
+        """Считает количество updates в spill файле"""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return 0
+        with open(self.spill_path, 'r', encoding='utf-8') as f:
+            return sum(1 for line in f if line.strip())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает метрики очереди"""
+        return {
+            "running": self._running,
+            "depth": self.depth,
+            "max_size": self.max_size,
+            "spilled_pending": self._spilled_pending,
+            "workers": self.workers_count,
+            "busy_workers": self._busy_workers,
+            "overflow_policy": self.overflow_policy.value,
+            **self._counters,
+            "wait_time_ms": {
+                "p50": round(percentile(self._wait_times, 50) * 1000, 2),
+                "p95": round(percentile(self._wait_times, 95) * 1000, 2),
+                "max": round(max(self._wait_times, default=0.0) * 1000, 2)
+            },
+            "processing_time_ms": {
+                "p50": round(percentile(self._processing_times, 50) * 1000, 2),
+                "p95": round(percentile(self._processing_times, 95) * 1000, 2),
+                "max": round(max(self._processing_times, default=0.0) * 1000, 2)
+            }
+        }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк занимаемой памяти InMemoryManager
+
+Сравнивает прежнее представление истории (dict пользователей со списками
+словарей {"role", "content", "timestamp"} и ISO-строками времени) с
+компактным InMemoryManager (deque записей MemoryTurn со __slots__,
+интернированная роль, время - float) на --users пользователей по --turns
+обменов. Объем измеряется tracemalloc; для InMemoryManager рядом
+выводится его собственная оценка resident_bytes из get_stats.
+
+Последний прогон - с общим бюджетом --budget-mb: пользователи сверх
+бюджета вытесняются (LRU), объем не растет с числом пользователей.
+
+Использование:
+    python scripts/bench_inmemory_footprint.py [--users 100000] [--turns 10]
+        [--budget-mb 64]
+"""
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.interfaces import Message, MessageType, Response, User
+from bot.services.memory_manager import InMemoryManager
+
+WORDS = (
+    "привет бот заказ стоимость интеграция срок оплата доставка клиент менеджер "
+    "telegram business amocrm сайт договор скидка вопрос ответ поддержка ассистент"
+).split()
+
+
+def sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 15)))
+
+
+def make_message(user_id: int, text: str) -> Message:
+    user = User(id=user_id, username="bench", first_name="Bench", last_name=None)
+    return Message(id=1, user=user, chat_id=user_id, text=text, type=MessageType.TEXT, timestamp=datetime.now())
+
+
+def load_legacy(users: int, turns: int, texts: List[str]) -> Dict[int, List[Dict[str, Any]]]:
+    """Прежнее представление InMemoryManager.memory"""
+    memory: Dict[int, List[Dict[str, Any]]] = {}
+    position = 0
+    for user_id in range(users):
+        history = memory[user_id] = []
+        for _ in range(turns):
+            history.append({"role": "user", "content": texts[position], "timestamp": datetime.now().isoformat()})
+            history.append({"role": "assistant", "content": texts[position + 1], "timestamp": datetime.now().isoformat()})
+            position += 2
+    return memory
+
+
+def load_manager(manager: InMemoryManager, users: int, turns: int, texts: List[str]) -> InMemoryManager:
+    async def fill():
+        position = 0
+        for user_id in range(users):
+            for _ in range(turns):
+                await manager.add_message(user_id, make_message(user_id, texts[position]), Response(text=texts[position + 1]))
+                position += 2
+
+    asyncio.run(fill())
+    return manager
+
+
+def traced(load: Callable[[], Any]):
+    """Загрузка под tracemalloc: (объект, байт, секунд)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк памяти InMemoryManager")
+    parser.add_argument("--users", type=int, default=100_000, help="Число пользователей")
+    parser.add_argument("--turns", type=int, default=10, help="Обменов (пар реплик) на пользователя")
+    parser.add_argument("--budget-mb", type=int, default=64, help="Общий бюджет для прогона с вытеснением")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Тексты создаются заранее и не входят в измерение - сравниваются только структуры
+    texts = [sentence(rng) for _ in range(args.users * args.turns * 2)]
+    text_bytes = sum(sys.getsizeof(text) for text in texts)
+    print(f"{args.users:,} пользователей x {args.turns} обменов, тексты {text_bytes / 2 ** 20:.1f} МБ (не учитываются)")
+
+    legacy, legacy_size, elapsed = traced(lambda: load_legacy(args.users, args.turns, texts))
+    print(f"  dict/list/dict   {legacy_size / 2 ** 20:8.1f} МБ  {elapsed:6.1f} с")
+    del legacy
+
+    manager, size, elapsed = traced(lambda: load_manager(
+        InMemoryManager(max_messages_per_user=args.turns, max_turns=0, max_bytes=0), args.users, args.turns, texts
+    ))
+    stats = manager.get_stats()
+    print(f"  InMemoryManager  {size / 2 ** 20:8.1f} МБ  {elapsed:6.1f} с  "
+          f"(оценка resident_bytes без текстов {(stats['resident_bytes'] - text_bytes) / 2 ** 20:.1f} МБ, "
+          f"в {legacy_size / max(size, 1):.1f} раза меньше)")
+    del manager
+
+    budget = args.budget_mb * 2 ** 20
+    manager, size, elapsed = traced(lambda: load_manager(
+        InMemoryManager(max_messages_per_user=args.turns, max_turns=0, max_bytes=budget), args.users, args.turns, texts
+    ))
+    stats = manager.get_stats()
+    print(f"  бюджет {args.budget_mb} МБ    {size / 2 ** 20:8.1f} МБ  {elapsed:6.1f} с  "
+          f"(resident_bytes {stats['resident_bytes'] / 2 ** 20:.1f} МБ, "
+          f"пользователей {stats['users']:,}, вытеснено {stats['evictions']:,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк определения намерений
+
+Сравнивает прежний путь (списки строковых паттернов через re.search,
+ключевые слова циклом `keyword in text`, новый IntentDetector на каждое
+сообщение в вебхуке и повторное определение в агенте) со скомпилированным
+движком bot.services.intent_engine, где сообщение разбирается один раз.
+
+Корпус - типичные сообщения бота на русском и английском; можно передать
+свой файл (по одному сообщению на строку).
+
+Использование:
+    python scripts/bench_intents.py [--file messages.txt] [--count 50000]
+"""
+
+import re
+import sys
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.interfaces import Message, MessageType, User
+from bot.services import intent_engine as engine_module
+from bot.services.intent_engine import (
+    BASIC_INTENT_WORDS, URL_PATTERNS, SOCIAL_KEYWORDS, QUESTION_WORDS, intent_engine
+)
+from bot.services.intent_detector import IntentDetector, intent_detector
+
+CORPUS = [
+    "Привет!",
+    "Добрый день, сколько стоит Telegram ассистент?",
+    "Здравствуйте, хочу заказать бота для бизнеса",
+    "спасибо большое",
+    "Спасибо, а интеграция с amoCRM тоже есть?",
+    "пока, до встречи",
+    "Что умеешь?",
+    "Помоги настроить интеграцию с Bitrix24",
+    "Сколько времени занимает разработка?",
+    "Как подключить бота к Business аккаунту",
+    "Какие сроки у LinkedIn автоматизации?",
+    "Бот не работает, выдает ошибку при оплате",
+    "Можно ли поменять модель на Claude?",
+    "Хочу автоматизировать воронку продаж",
+    "Интересует автоматизация LinkedIn и CRM под ключ для агентства недвижимости, "
+    "у нас около 30 менеджеров и 5000 лидов в месяц, что посоветуете?",
+    "посмотри это видео https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtu.be/jNQXAC9IVRw",
+    "Глянь пост https://www.instagram.com/p/C1a2b3c4d5/",
+    "https://vm.tiktok.com/ZMabcdef/",
+    "Сколько подписчиков у моего YouTube канала?",
+    "Какие тренды в тикток сейчас",
+    "Сделай анализ ролика и статистику по лайкам",
+    "покажи мои приложения",
+    "какие у меня базы данных?",
+    "статус деплоя",
+    "Hello!",
+    "Hi, how much does the assistant cost?",
+    "Thanks a lot",
+    "Goodbye",
+    "What can you do?",
+    "I need help with CRM integration",
+    "How long does development take?",
+    "The bot is broken, I get a bug when paying",
+    "Check out this stream on youtube, lots of comments",
+    "ok",
+    "да",
+    "Отлично, давайте начнем",
+    "Расскажите подробнее про второй пункт",
+]
+
+
+def legacy_detect(text: str) -> str:
+    """Прежний алгоритм IntentDetector: перебор строковых паттернов и подстрок"""
+    text_lower = text.lower()
+    for patterns in URL_PATTERNS.values():
+        for pattern in patterns:
+            if re.search(pattern, text):
+                return "url"
+    for intent, words in BASIC_INTENT_WORDS.items():
+        if re.search(r'\b(' + '|'.join(words) + r')\b', text_lower, re.IGNORECASE):
+            return intent
+    scores = {}
+    for platform, keywords in SOCIAL_KEYWORDS.items():
+        score = 0
+        for keyword in keywords:
+            if keyword in text_lower:
+                score += 1
+        if score:
+            scores[platform] = score
+    if scores:
+        return "social_media"
+    if text.strip().endswith('?'):
+        return "question"
+    for word in QUESTION_WORDS:
+        if text_lower.startswith(word + ' ') or f' {word} ' in text_lower:
+            return "question"
+    return "unknown"
+
+
+def make_message(text: str) -> Message:
+    user = User(id=1, username="client", first_name="Иван", last_name=None)
+    return Message(id=1, user=user, chat_id=1, text=text, type=MessageType.TEXT, timestamp=datetime.now())
+
+
+def bench(func: Callable[[str], object], corpus: List[str], count: int) -> float:
+    """Среднее время на сообщение в микросекундах"""
+    n = len(corpus)
+    for i in range(min(count, 1000)):
+        func(corpus[i % n])
+    started_at = time.perf_counter()
+    for i in range(count):
+        func(corpus[i % n])
+    return (time.perf_counter() - started_at) / count * 1_000_000
+
+
+def run(coroutine):
+    """Выполняет корутину без событийного цикла (detect не ждет ввода-вывода)"""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("Корутина ожидает ввода-вывода")
+
+
+def legacy_pipeline(text: str):
+    """Вебхук создает детектор и определяет намерение, агент определяет его еще раз"""
+    make_message(text)
+    IntentDetector()
+    legacy_detect(text)
+    legacy_detect(text)
+
+
+def engine_pipeline(text: str):
+    """Вебхук и агент используют одно намерение из message.metadata"""
+    message = make_message(text)
+    run(intent_detector.detect(message))
+    run(intent_detector.detect(message))
+
+
+def keyword_loops(text: str):
+    text = text.lower()
+    return [keyword for keywords in SOCIAL_KEYWORDS.values() for keyword in keywords if keyword in text]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк определения намерений")
+    parser.add_argument("--file", help="Файл с сообщениями (по одному на строку)")
+    parser.add_argument("--count", type=int, default=50000)
+    args = parser.parse_args()
+
+    if args.file:
+        corpus = [line.strip() for line in open(args.file, encoding="utf-8") if line.strip()]
+    else:
+        corpus = CORPUS
+
+    automaton = intent_engine._automaton
+    rows = [
+        ("ключевые слова: циклы `in`", bench(keyword_loops, corpus, args.count)),
+        (f"ключевые слова: Ахо-Корасик ({'pyahocorasick' if engine_module.AHOCORASICK_AVAILABLE else 'python'})",
+         bench(lambda text: automaton.find(text.lower()), corpus, args.count)),
+        ("разбор: строковые паттерны", bench(legacy_detect, corpus, args.count)),
+        ("разбор: intent_engine.scan", bench(intent_engine.scan, corpus, args.count)),
+        ("сообщение: прежний конвейер (2 разбора)", bench(legacy_pipeline, corpus, args.count)),
+        ("сообщение: движок + message.metadata", bench(engine_pipeline, corpus, args.count)),
+    ]
+
+    print(f"\n{len(corpus)} сообщений, {args.count} итераций\n")
+    width = max(len(name) for name, _ in rows)
+    for name, micros in rows:
+        print(f"{name:<{width}}  {micros:8.2f} мкс")
+    print()
+
+
+if __name__ == "__main__":
+    main()
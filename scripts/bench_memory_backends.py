@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк хранилищ памяти разговоров
+
+Сравнивает InMemoryManager, SqliteMemoryManager (WAL + FTS5) и Zep на
+1k, 100k и 10M сохраненных сообщений: загрузка, add_message,
+get_context(limit=10) и search_memory (p50/p95), размер базы.
+
+История создается синтетически: size сообщений, по --per-user на
+пользователя, тексты из словаря типичных сообщений бота. В SQLite она
+загружается пачками через write_batch (тот же путь, что и group commit),
+в InMemoryManager - напрямую в deque пользователей. InMemoryManager на
+больших объемах занимает гигабайты памяти, поэтому выше --max-inmemory он
+пропускается.
+
+Zep измеряется, только если задан ZEP_API_KEY: на отдельных тестовых
+сессиях (заполнить облачный Zep миллионами сообщений нельзя), поэтому его
+задержка - сетевой уровень, не зависящий от size.
+
+Использование:
+    python scripts/bench_memory_backends.py [--sizes 1000,100000,10000000]
+        [--per-user 200] [--ops 300] [--max-inmemory 1000000] [--dir /tmp/bench]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.config import MemoryStoreConfig
+from bot.core.interfaces import IMemoryManager, Message, MessageType, Response, User
+from bot.services.memory_manager import InMemoryManager, MemoryTurn
+from bot.services.sqlite_memory import SqliteMemoryManager
+
+WORDS = (
+    "привет бот заказ стоимость интеграция срок оплата доставка клиент менеджер "
+    "telegram business amocrm сайт договор скидка вопрос ответ поддержка ассистент "
+    "запуск тест настройка аналитика отчет продажи воронка заявка звонок встреча "
+    "проект команда цена тариф месяц неделя сегодня завтра спасибо отлично хорошо"
+).split()
+
+LOAD_CHUNK = 20000
+
+
+def sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 15)))
+
+
+def make_message(user_id: int, text: str) -> Message:
+    user = User(id=user_id, username="bench", first_name="Bench", last_name=None)
+    return Message(id=1, user=user, chat_id=user_id, text=text, type=MessageType.TEXT, timestamp=datetime.now())
+
+
+def percentiles(samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p50 = ordered[len(ordered) // 2]
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50 {p50:8.3f} мс  p95 {p95:8.3f} мс"
+
+
+async def timed(operation: Callable[[], Awaitable], count: int) -> List[float]:
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await operation()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def load_inmemory(store: InMemoryManager, size: int, per_user: int, rng: random.Random):
+    timestamp = time.time()
+    for index in range(size):
+        user_id = index // per_user
+        if user_id not in store.memory:
+            store.memory[user_id] = deque(maxlen=store.max_messages * 2)
+        store._append(store.memory[user_id], MemoryTurn("user" if index % 2 == 0 else "assistant", sentence(rng), timestamp))
+
+
+def load_sqlite(store: SqliteMemoryManager, size: int, per_user: int, rng: random.Random):
+    timestamp = datetime.now().isoformat()
+    ops = []
+    rows_in_chunk = 0
+    for start in range(0, size, per_user):
+        rows = [
+            ("user" if index % 2 == 0 else "assistant", sentence(rng), timestamp)
+            for index in range(min(per_user, size - start))
+        ]
+        ops.append(("add", start // per_user, rows))
+        rows_in_chunk += len(rows)
+        if rows_in_chunk >= LOAD_CHUNK:
+            store.write_batch(ops)
+            ops, rows_in_chunk = [], 0
+    if ops:
+        store.write_batch(ops)
+
+
+async def measure(name: str, store: IMemoryManager, users: int, ops: int, rng: random.Random) -> Dict[str, List[float]]:
+    """Задержка операций на случайных пользователях"""
+    results = {
+        "add_message": await timed(
+            lambda: store.add_message(rng.randrange(users), make_message(0, sentence(rng)), Response(text=sentence(rng))),
+            ops
+        ),
+        "get_context": await timed(lambda: store.get_context(rng.randrange(users), 10), ops),
+        "search_memory": await timed(
+            lambda: store.search_memory(rng.randrange(users), " ".join(rng.sample(WORDS, 2))),
+            ops
+        )
+    }
+    for operation, samples in results.items():
+        print(f"  {name:<10} {operation:<14} {percentiles(samples)}")
+    return results
+
+
+async def bench_size(size: int, args, directory: str):
+    rng = random.Random(size)
+    per_user = min(args.per_user, size)
+    users = max(1, size // per_user)
+    print(f"\n=== {size:,} сообщений, {users:,} пользователей ===")
+
+    if size <= args.max_inmemory:
+        store = InMemoryManager(max_messages_per_user=per_user, max_turns=0, max_bytes=0)
+        started = time.perf_counter()
+        load_inmemory(store, size, per_user, rng)
+        print(f"  inmemory   загрузка {time.perf_counter() - started:8.1f} с")
+        await measure("inmemory", store, users, args.ops, rng)
+        del store
+    else:
+        print(f"  inmemory   пропущен (больше --max-inmemory {args.max_inmemory:,})")
+
+    path = os.path.join(directory, f"memory_{size}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    store = SqliteMemoryManager(MemoryStoreConfig(max_messages_per_user=per_user * 2), path=path)
+    started = time.perf_counter()
+    await asyncio.to_thread(load_sqlite, store, size, per_user, rng)
+    print(f"  sqlite     загрузка {time.perf_counter() - started:8.1f} с")
+    await measure("sqlite", store, users, args.ops, rng)
+
+    # Одновременные записи разных пользователей делят транзакции
+    transactions = store.get_stats()["transactions"]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        store.add_message(user_id % users, make_message(0, sentence(rng)), Response(text="ок"))
+        for user_id in range(args.ops)
+    ))
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"  sqlite     {args.ops} одновременных add_message: {elapsed:8.1f} мс, "
+          f"{store.get_stats()['transactions'] - transactions} транзакций")
+    await store.close()
+    size_mb = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix)) / 2 ** 20
+    print(f"  sqlite     размер базы {size_mb:8.1f} МБ")
+
+
+async def bench_zep(ops: int):
+    """Сетевая задержка Zep на тестовых сессиях"""
+    if not os.getenv("ZEP_API_KEY"):
+        print("\n=== Zep: пропущен (нет ZEP_API_KEY) ===")
+        return
+
+    from bot.services.memory_manager import ZepMemoryManager
+
+    print("\n=== Zep (тестовые сессии, сетевая задержка) ===")
+    store = ZepMemoryManager()
+    store.writer = None
+    rng = random.Random(0)
+    users = [900_000_000 + index for index in range(5)]
+    try:
+        await measure("zep", _RandomUser(store, users), len(users), ops, rng)
+    finally:
+        for user_id in users:
+            await store.clear_memory(user_id)
+
+
+class _RandomUser(IMemoryManager):
+    """Отображает случайный индекс пользователя на тестовые сессии Zep"""
+
+    def __init__(self, store: IMemoryManager, users: List[int]):
+        self.store = store
+        self.users = users
+
+    async def add_message(self, user_id, message, response=None):
+        await self.store.add_message(self.users[user_id], message, response)
+
+    async def get_context(self, user_id, limit=10):
+        # Без кеша контекста: измеряем чтение из Zep
+        self.store._load_context.cache.clear()
+        return await self.store.get_context(self.users[user_id], limit)
+
+    async def clear_memory(self, user_id):
+        await self.store.clear_memory(self.users[user_id])
+
+    async def search_memory(self, user_id, query):
+        return await self.store.search_memory(self.users[user_id], query)
+
+
+async def run(args):
+    directory = args.dir or tempfile.mkdtemp(prefix="bench_memory_")
+    print(f"Базы SQLite: {directory}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        await bench_size(size, args, directory)
+    await bench_zep(min(args.ops, 50))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк хранилищ памяти")
+    parser.add_argument("--sizes", default="1000,100000,10000000", help="Объемы истории через запятую")
+    parser.add_argument("--per-user", type=int, default=200, help="Сообщений на пользователя")
+    parser.add_argument("--ops", type=int, default=300, help="Операций каждого вида")
+    parser.add_argument("--max-inmemory", type=int, default=1_000_000, help="Наибольший объем для InMemoryManager")
+    parser.add_argument("--dir", default=None, help="Каталог для баз SQLite")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
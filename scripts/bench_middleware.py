@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов middleware на POST /webhook
+
+Сравнивает три варианта одного и того же приложения:
+  bare   - без middleware
+  legacy - прежний стек из трех BaseHTTPMiddleware (копия ниже)
+  asgi   - текущий стек из bot.webhook.middleware
+
+Запросы идут в приложение напрямую через httpx.ASGITransport, без сети,
+поэтому разница во времени - это стоимость самих middleware.
+
+Использование:
+    python scripts/bench_middleware.py [--requests 5000] [--path /webhook]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import statistics
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123:bench")
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from bot.core.config import config
+from bot.webhook.middleware import (
+    SecurityMiddleware, LoggingMiddleware, ErrorHandlerMiddleware, WebhookFastPathMiddleware
+)
+
+legacy_logger = logging.getLogger("bench.legacy")
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "Bench"},
+        "text": "привет"
+    }
+}
+
+
+# Прежняя реализация (BaseHTTPMiddleware), сохранена для сравнения
+
+class LegacySecurityMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if request.url.path == "/webhook":
+            secret_token = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
+            expected_token = config.webhook.secret_token
+            legacy_logger.info("🔐 Webhook security check:")
+            legacy_logger.info(f"   Headers: {dict(request.headers)}")
+            legacy_logger.info(f"   Received token: {secret_token}")
+            legacy_logger.info(f"   Expected token: {expected_token}")
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        return response
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        start_time = time.time()
+        legacy_logger.debug(f"🔵 {request.method} {request.url.path}")
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        status_emoji = "🟢" if response.status_code < 400 else "🔴"
+        legacy_logger.info(
+            f"{status_emoji} {request.method} {request.url.path} "
+            f"-> {response.status_code} ({process_time:.3f}s)"
+        )
+        response.headers["X-Process-Time"] = str(process_time)
+        return response
+
+
+class LegacyErrorHandlerMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        try:
+            return await call_next(request)
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"error": str(e)})
+
+
+def build_app(variant: str) -> FastAPI:
+    """Создает приложение с нужным стеком middleware"""
+    app = FastAPI()
+    if variant == "legacy":
+        app.add_middleware(LegacyErrorHandlerMiddleware)
+        app.add_middleware(LegacyLoggingMiddleware)
+        app.add_middleware(LegacySecurityMiddleware)
+    elif variant == "asgi":
+        app.add_middleware(ErrorHandlerMiddleware)
+        app.add_middleware(LoggingMiddleware)
+        app.add_middleware(SecurityMiddleware)
+        app.add_middleware(WebhookFastPathMiddleware)
+
+    @app.post("/webhook")
+    async def webhook(request: Request):
+        await request.json()
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+async def run_variant(variant: str, path: str, requests: int, warmup: int) -> List[float]:
+    """Прогоняет запросы и возвращает время каждого в микросекундах"""
+    transport = httpx.ASGITransport(app=build_app(variant))
+    headers = {"X-Telegram-Bot-Api-Secret-Token": config.webhook.secret_token}
+    method = "POST" if path.startswith("/webhook") else "GET"
+    samples = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(warmup + requests):
+            started_at = time.perf_counter()
+            if method == "POST":
+                response = await client.post(path, json=UPDATE, headers=headers)
+            else:
+                response = await client.get(path)
+            elapsed = (time.perf_counter() - started_at) * 1_000_000
+            assert response.status_code == 200, response.text
+            if i >= warmup:
+                samples.append(elapsed)
+
+    return samples
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк middleware webhook сервера")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--path", default="/webhook")
+    parser.add_argument("--log-level", default="INFO",
+                        help="Уровень логов (логи пишутся в /dev/null, но форматируются)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, stream=open(os.devnull, "w"))
+
+    results = {}
+    for variant in ("bare", "legacy", "asgi"):
+        results[variant] = await run_variant(variant, args.path, args.requests, args.warmup)
+
+    base = statistics.mean(results["bare"])
+    print(f"\n{args.requests} запросов {args.path}, log level {args.log_level} (мкс на запрос)\n")
+    print(f"{'variant':<8} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'overhead':>9}")
+    for variant, samples in results.items():
+        mean = statistics.mean(samples)
+        print(
+            f"{variant:<8} {mean:>9.1f} {percentile(samples, 50):>9.1f} "
+            f"{percentile(samples, 95):>9.1f} {percentile(samples, 99):>9.1f} {mean - base:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
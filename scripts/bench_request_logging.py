@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Замер стоимости логирования одного update
+
+Прогоняет логирование обработки текстового сообщения двумя способами:
+  legacy  - прежняя последовательность INFO строк из router/handlers/agent
+            (update целиком форматируется трижды, f-строки строятся всегда)
+  request - одна запись RequestLog со временем этапов
+и считает байты лога и процессорное время на update с production
+форматтером (JSONFormatter). Логи пишутся в счетчик, а не на диск.
+
+Использование:
+    python scripts/bench_request_logging.py [--count 5000] [--sample-rate 0.01]
+"""
+
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123:bench")
+
+from bot.core.logging import JSONFormatter, RequestLog, request_stage, annotate_request
+from bot.telegram_types import decode_update, to_builtins
+
+RAW_UPDATE = (
+    '{"update_id": 100500, "message": {"message_id": 10, "date": 1735689600,'
+    ' "from": {"id": 123456789, "is_bot": false, "first_name": "Иван", "username": "ivan_p",'
+    ' "language_code": "ru"}, "chat": {"id": 123456789, "first_name": "Иван",'
+    ' "username": "ivan_p", "type": "private"},'
+    ' "text": "Привет! Расскажи, пожалуйста, как подключить бота к Business аккаунту?"}}'
+)
+RESPONSE_TEXT = "Чтобы подключить бота к Business аккаунту, откройте настройки Telegram Business. " * 3
+
+
+class CountingStream(io.TextIOBase):
+    """Поток, который только считает записанные байты"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, s: str) -> int:
+        self.bytes += len(s.encode("utf-8"))
+        return len(s)
+
+
+def legacy_logging(log: logging.Logger, update):
+    """Прежний набор строк лога для одного текстового сообщения"""
+    message = update.message
+    user = message.from_user
+    log.info(f"📥 Received update: {update}")                       # router
+    log.info(f"📥 Received update: {update}")                       # handle_update
+    log.info(f"📨 Processing update #{update.update_id}, total: 1")
+    log.info("💾 Saved to debug. Total updates in memory: 10")
+    log.info(f"📩 Processing message: {message}")
+    log.info(f"👤 User: {user.username} ({user.id})")
+    log.info(f"💬 Text: {message.text}")
+    log.info(f"🎤 Voice: {bool(message.voice)}")
+    log.info(f"🔑 User {user.id} (@{user.username}) admin check: False")
+    log.info("👤 Created user object with role: user")
+    log.info("📱 Is business message: False")
+    log.info("🔗 Processing message through UnifiedAgent")
+    log.info(f"📨 UnifiedAgent обрабатывает сообщение от {user.id} (role: user)")
+    log.info("✅ Сообщение обработано агентом: default")
+    log.info(f"📤 Sending response to {message.chat.id}: {RESPONSE_TEXT[:100]}...")
+    log.info("✅ Response sent successfully. Message ID: 11")
+    log.info("📤 Response: {'ok': True, 'response_sent': True, 'message_id': 11}")
+
+
+def request_logging(update, sample_rate: float):
+    """Новый путь: одна запись на update"""
+    message = update.message
+    with RequestLog(
+        payload=lambda: to_builtins(update),
+        sample_rate=sample_rate,
+        update_id=update.update_id,
+        kind=update.kind
+    ) as request_log:
+        with request_stage("dedup"):
+            pass
+        annotate_request(chat_id=message.chat.id, user_id=message.from_user.id, role="user",
+                         business=False, has_text=True, voice=False)
+        with request_stage("agent"):
+            annotate_request(agent="default")
+        with request_stage("send"):
+            pass
+        request_log.set(ok=True, response_sent=True)
+
+
+def measure(name: str, func, count: int, level: int):
+    stream = CountingStream()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+    for logger_name in ("bench.legacy", "bot.requests"):
+        logging.getLogger(logger_name).setLevel(level)
+
+    started_cpu = time.process_time()
+    for _ in range(count):
+        func()
+    cpu = (time.process_time() - started_cpu) / count * 1_000_000
+    print(f"{name:<28} {logging.getLevelName(level):<8} {stream.bytes / count:>12.0f} {cpu:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер стоимости логирования update")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    update = decode_update(RAW_UPDATE)
+    legacy_log = logging.getLogger("bench.legacy")
+
+    print(f"\n{args.count} updates, JSONFormatter, sample_rate={args.sample_rate}\n")
+    print(f"{'variant':<28} {'level':<8} {'байт/update':>12} {'CPU мкс':>12}")
+    for level in (logging.INFO, logging.WARNING):
+        measure("legacy (17 строк)", lambda: legacy_logging(legacy_log, update), args.count, level)
+        measure("RequestLog (1 запись)", lambda: request_logging(update, args.sample_rate), args.count, level)
+
+
+if __name__ == "__main__":
+    main()
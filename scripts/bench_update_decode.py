@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк декодирования Telegram updates
+
+Сравнивает прежний путь (json.loads в словари) с типизированной схемой
+bot.telegram_types: время декодирования одного update и память, которую
+занимает декодированный update, пока он идет по конвейеру.
+
+Updates берутся из JSON Lines файла (по одному update на строку, например
+spill файл очереди или выгрузка /debug/last-updates), а без файла -
+из синтетического набора, похожего на реальный трафик бота.
+
+Использование:
+    python scripts/bench_update_decode.py [--file updates.jsonl] [--count 20000]
+"""
+
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Any
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot import telegram_types
+from bot.telegram_types import Update, decode_update, from_dict, encode
+
+USER = {"id": 123456789, "is_bot": False, "first_name": "Иван", "last_name": "Петров",
+        "username": "ivan_p", "language_code": "ru", "is_premium": True}
+CHAT = {"id": 123456789, "first_name": "Иван", "last_name": "Петров",
+        "username": "ivan_p", "type": "private"}
+
+
+def synthetic_updates() -> List[bytes]:
+    """Набор типичных updates: текст, команда, голос, business, callback, фото"""
+    text = {"update_id": 1, "message": {
+        "message_id": 10, "from": USER, "chat": CHAT, "date": 1735689600,
+        "text": "Привет! Расскажи, пожалуйста, как подключить бота к Business аккаунту?"}}
+    command = {"update_id": 2, "message": {
+        "message_id": 11, "from": USER, "chat": CHAT, "date": 1735689601, "text": "/help",
+        "entities": [{"offset": 0, "length": 5, "type": "bot_command"}]}}
+    voice = {"update_id": 3, "message": {
+        "message_id": 12, "from": USER, "chat": CHAT, "date": 1735689602,
+        "voice": {"duration": 7, "mime_type": "audio/ogg", "file_id": "AwACAgIAAxkBAAIBZ2" * 3,
+                  "file_unique_id": "AgADnB0AAu7vAUk", "file_size": 28745}}}
+    business = {"update_id": 4, "business_message": {
+        "business_connection_id": "CAAAAAB1c2VyX2Nvbm5lY3Rpb25faWQ", "message_id": 13,
+        "from": USER, "chat": CHAT, "date": 1735689603, "text": "Здравствуйте, есть вопрос по заказу"}}
+    callback = {"update_id": 5, "callback_query": {
+        "id": "4382bfdwdsb323b2d9", "from": USER, "chat_instance": "-8871239876123",
+        "data": "confirm:yes", "message": {"message_id": 14, "from": USER, "chat": CHAT,
+                                           "date": 1735689604, "text": "Подтвердить?"}}}
+    photo = {"update_id": 6, "message": {
+        "message_id": 15, "from": USER, "chat": CHAT, "date": 1735689605, "caption": "Скриншот",
+        "photo": [{"file_id": "AgACAgIAAxkBAAIBaGd" * 3, "file_unique_id": "AQADx8MxG",
+                   "file_size": size, "width": width, "height": width}
+                  for size, width in ((1523, 90), (22105, 320), (89712, 800), (180233, 1280))]}}
+    return [json.dumps(u, ensure_ascii=False).encode() for u in (text, command, voice, business, callback, photo)]
+
+
+def load_updates(path: str) -> List[bytes]:
+    """Читает записанные updates из JSON Lines файла"""
+    updates = []
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            # Формат /debug/last-updates: {"id": ..., "update": {...}}
+            if "update" in data and "update_id" not in data:
+                data = data["update"]
+            updates.append(json.dumps(data, ensure_ascii=False).encode())
+    return updates
+
+
+def bench_time(decode: Callable[[bytes], Any], payloads: List[bytes], count: int) -> float:
+    """Среднее время декодирования одного update в микросекундах"""
+    n = len(payloads)
+    for i in range(min(count, 1000)):
+        decode(payloads[i % n])
+    started_at = time.perf_counter()
+    for i in range(count):
+        decode(payloads[i % n])
+    return (time.perf_counter() - started_at) / count * 1_000_000
+
+
+def bench_memory(decode: Callable[[bytes], Any], payloads: List[bytes], count: int) -> float:
+    """Сколько байт занимает один декодированный update (удерживаются count объектов)"""
+    n = len(payloads)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [decode(payloads[i % n]) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк декодирования Telegram updates")
+    parser.add_argument("--file", help="JSON Lines файл с записанными updates")
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    payloads = load_updates(args.file) if args.file else synthetic_updates()
+    source = args.file or "синтетический набор"
+
+    variants = [("json.loads -> dict", json.loads)]
+    if telegram_types.ORJSON_AVAILABLE:
+        import orjson
+        variants.append(("orjson.loads -> dict", orjson.loads))
+    variants.append(("json + from_dict (fallback)", lambda data: from_dict(Update, json.loads(data))))
+    variants.append((f"decode_update ({telegram_types.JSON_BACKEND})", decode_update))
+
+    print(f"\n{len(payloads)} разных updates ({source}), {args.count} декодирований\n")
+    print(f"{'variant':<34} {'мкс/update':>11} {'байт/update':>12}")
+    for name, decode in variants:
+        micros = bench_time(decode, payloads, args.count)
+        memory = bench_memory(decode, payloads, min(args.count, 10000))
+        print(f"{name:<34} {micros:>11.2f} {memory:>12.0f}")
+
+    # Кодирование ответа webhook
+    result = {"ok": True, "response_sent": True, "message_id": 12345}
+    started_at = time.perf_counter()
+    for _ in range(args.count):
+        json.dumps(result).encode()
+    json_micros = (time.perf_counter() - started_at) / args.count * 1_000_000
+    started_at = time.perf_counter()
+    for _ in range(args.count):
+        encode(result)
+    fast_micros = (time.perf_counter() - started_at) / args.count * 1_000_000
+    print(f"\nкодирование ответа: json.dumps {json_micros:.2f} мкс, encode ({telegram_types.JSON_BACKEND}) {fast_micros:.2f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,712 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный прогон webhook сервера с заглушками внешних сервисов
+
+Приложение из create_app() запускается в этом же процессе, updates идут
+в POST /webhook через httpx.ASGITransport - без сети и без uvicorn перед
+ботом. Внешние сервисы заменены локальным сервером-заглушкой (uvicorn в
+отдельном процессе, чтобы его работа не занимала event loop и GIL бота)
+с настраиваемой задержкой:
+  Telegram Bot API  - /bot{token}/{method}, /file/bot{token}/{path}
+  OpenAI            - /v1/chat/completions, /v1/audio/transcriptions
+  Anthropic         - /v1/messages
+  Zep               - /api/v2/sessions/...
+SDK направляются на заглушку через OPENAI_BASE_URL, ANTHROPIC_BASE_URL
+и ZEP_API_URL, клиент Bot API - через base_url; ключи подставляются фиктивные, так что реальные сервисы
+не вызываются никогда.
+
+Updates - синтетическая смесь (TestService.create_test_update,
+create_test_voice_update, create_test_business_update) или записанные
+updates из JSON Lines файла (spill файл очереди, выгрузка
+/debug/last-updates). Время этапов берется из записей RequestLog
+(логгер bot.requests), поэтому в отчете те же этапы, что и в production
+логах: dedup, command, voice, agent (intent, memory_context, llm,
+memory_save), send.
+
+Использование:
+    python scripts/load_replay.py [--updates 2000] [--concurrency 50]
+        [--mix text=8,command=1,voice=1,business=1] [--chats 500]
+        [--file updates.jsonl] [--mode sync|queue]
+        [--llm openai|anthropic|none] [--no-zep] [--streaming]
+        [--telegram-latency 40] [--openai-latency 800] [--anthropic-latency 1200]
+        [--zep-latency 60] [--whisper-latency 1500] [--jitter 0.3]
+        [--json report.json]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import socket
+import tempfile
+import multiprocessing
+from pathlib import Path
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+BOT_TOKEN = "123456:LOAD-REPLAY"
+WEBHOOK_SECRET = "load-replay-secret"
+BUSINESS_CONNECTION_ID = "load-replay-business"
+
+TEXTS = [
+    "Привет!",
+    "Расскажи, пожалуйста, как подключить бота к Business аккаунту?",
+    "Сколько стоит интеграция с CRM?",
+    "Можно ли настроить автоответы на выходные?",
+    "Спасибо, все понятно",
+    "Какие у вас есть тарифы и чем они отличаются?",
+]
+COMMANDS = ["/start", "/help"]
+
+
+# Заглушка внешних сервисов
+
+class StubServices:
+    """Локальные заменители Telegram, OpenAI, Anthropic и Zep с задержкой"""
+
+    def __init__(self, latency_ms: Dict[str, float], jitter: float = 0.3):
+        """
+        Args:
+            latency_ms: Средняя задержка ответа по сервису (telegram, openai, whisper, anthropic, zep)
+            jitter: Разброс задержки (доля от средней, равномерно в обе стороны)
+        """
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.sessions: Dict[str, List[Dict[str, Any]]] = {}
+        self._message_id = 0
+        self.app = Starlette(routes=[
+            Route("/bot{token}/{method}", self.telegram, methods=["GET", "POST"]),
+            Route("/file/bot{token}/{path:path}", self.telegram_file),
+            Route("/v1/chat/completions", self.openai_chat, methods=["POST"]),
+            Route("/v1/audio/transcriptions", self.openai_transcription, methods=["POST"]),
+            Route("/v1/messages", self.anthropic_messages, methods=["POST"]),
+            Route("/api/v2/sessions", self.zep_add_session, methods=["POST"]),
+            Route("/api/v2/sessions/{session_id}", self.zep_get_session),
+            Route("/api/v2/sessions/{session_id}/memory", self.zep_memory, methods=["GET", "POST"]),
+            Route("/_stub/calls", self.stats),
+        ])
+
+    async def stats(self, request: Request) -> Response:
+        """Число вызовов по сервисам (для отчета)"""
+        return JSONResponse(self.calls)
+
+    def _latency(self, service: str) -> float:
+        latency = self.latency_ms.get(service, 0.0)
+        spread = latency * self.jitter
+        return max(0.0, random.uniform(latency - spread, latency + spread)) / 1000
+
+    async def _delay(self, service: str):
+        self.calls[service] += 1
+        latency = self._latency(service)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    async def _sse(self, service: str, events: List[str]):
+        """Потоковый ответ: первый кусок через 30% задержки, остальные равномерно"""
+        self.calls[service] += 1
+        latency = self._latency(service)
+        await asyncio.sleep(latency * 0.3)
+        step = latency * 0.7 / max(1, len(events) - 1)
+        for index, event in enumerate(events):
+            if index:
+                await asyncio.sleep(step)
+            yield event
+
+    # Telegram
+
+    async def telegram(self, request: Request) -> Response:
+        method = request.path_params["method"]
+        await self._delay("telegram")
+        payload = await request.json() if request.method == "POST" else {}
+
+        if method in ("sendMessage", "editMessageText"):
+            self._message_id += 1
+            result: Any = {
+                "message_id": payload.get("message_id") or self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": payload.get("chat_id"), "type": "private"},
+                "text": payload.get("text", "")
+            }
+        elif method == "getFile":
+            result = {"file_id": payload.get("file_id"), "file_unique_id": "stub",
+                      "file_size": 4096, "file_path": "voice/stub.oga"}
+        elif method == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "Load", "username": "load_replay_bot"}
+        elif method == "getBusinessConnection":
+            result = {"id": payload.get("business_connection_id", BUSINESS_CONNECTION_ID),
+                      "user": {"id": 1, "is_bot": False, "first_name": "Owner"},
+                      "user_chat_id": 1, "date": 0, "can_reply": True, "is_enabled": True}
+        else:
+            result = True
+        return JSONResponse({"ok": True, "result": result})
+
+    async def telegram_file(self, request: Request) -> Response:
+        await self._delay("telegram")
+        # Заголовок Ogg + нули: достаточно для проверки размера и расширения
+        return Response(b"OggS" + b"\x00" * 4092, media_type="audio/ogg")
+
+    # OpenAI
+
+    async def openai_chat(self, request: Request) -> Response:
+        body = await request.json()
+        if body.get("stream"):
+            return StreamingResponse(
+                self._sse("openai", list(openai_stream_events(body))), media_type="text/event-stream"
+            )
+        await self._delay("openai")
+        return JSONResponse({
+            "id": f"chatcmpl-{self.calls['openai']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": stub_reply(body.get("messages"))}
+            }],
+            "usage": {"prompt_tokens": 200, "completion_tokens": 60, "total_tokens": 260}
+        })
+
+    async def openai_transcription(self, request: Request) -> Response:
+        form = await request.form()
+        await self._delay("whisper")
+        text = "Подскажите, пожалуйста, как подключить бота"
+        if form.get("response_format") == "text":
+            return PlainTextResponse(text)
+        return JSONResponse({"text": text})
+
+    # Anthropic
+
+    async def anthropic_messages(self, request: Request) -> Response:
+        body = await request.json()
+        if body.get("stream"):
+            return StreamingResponse(
+                self._sse("anthropic", list(anthropic_stream_events(body))), media_type="text/event-stream"
+            )
+        await self._delay("anthropic")
+        return JSONResponse({
+            "id": f"msg_{self.calls['anthropic']}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "claude-3-5-sonnet-20241022"),
+            "content": [{"type": "text", "text": stub_reply(body.get("messages"))}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 200, "output_tokens": 60}
+        })
+
+    # Zep
+
+    async def zep_add_session(self, request: Request) -> Response:
+        body = await request.json()
+        await self._delay("zep")
+        self.sessions.setdefault(body["session_id"], [])
+        return JSONResponse({"session_id": body["session_id"], "user_id": body.get("user_id")})
+
+    async def zep_get_session(self, request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        await self._delay("zep")
+        if session_id not in self.sessions:
+            return JSONResponse({"message": "not found"}, status_code=404)
+        return JSONResponse({"session_id": session_id})
+
+    async def zep_memory(self, request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        if request.method == "POST":
+            body = await request.json()
+            await self._delay("zep")
+            messages = self.sessions.setdefault(session_id, [])
+            messages.extend(body.get("messages", []))
+            del messages[:-50]
+            return JSONResponse({})
+
+        await self._delay("zep")
+        if session_id not in self.sessions:
+            return JSONResponse({"message": "not found"}, status_code=404)
+        lastn = int(request.query_params.get("lastn", 10))
+        return JSONResponse({"messages": self.sessions[session_id][-lastn:]})
+
+
+def stub_reply(messages: Optional[List[Dict[str, Any]]]) -> str:
+    """Ответ заглушки LLM, похожий по длине на настоящий"""
+    question = ""
+    if messages:
+        content = messages[-1].get("content")
+        question = content if isinstance(content, str) else ""
+    return (
+        f"Отличный вопрос! По поводу «{question[:60]}»: для подключения откройте настройки "
+        "Telegram Business, раздел «Чат-боты», и укажите имя бота. После этого бот сможет "
+        "отвечать клиентам от вашего имени."
+    )
+
+
+def _serve_stubs(latency_ms: Dict[str, float], jitter: float, ports) -> None:
+    """Точка входа процесса заглушки"""
+    stubs = StubServices(latency_ms, jitter)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    ports.put(sock.getsockname()[1])
+    server = uvicorn.Server(uvicorn.Config(
+        stubs.app, log_level="warning", lifespan="off", access_log=False, backlog=4096
+    ))
+    server.run(sockets=[sock])
+
+
+def reply_chunks(messages: Optional[List[Dict[str, Any]]], chunks: int = 20) -> List[str]:
+    """Ответ заглушки, разбитый на куски потока"""
+    words = stub_reply(messages).split(" ")
+    size = max(1, len(words) // chunks)
+    return [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+
+
+def openai_stream_events(body: Dict[str, Any]):
+    """SSE события chat.completion.chunk"""
+    base = {"id": "chatcmpl-stream", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini")}
+    for text in reply_chunks(body.get("messages")):
+        chunk = {**base, "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    final = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    if (body.get("stream_options") or {}).get("include_usage"):
+        final["usage"] = {"prompt_tokens": 200, "completion_tokens": 60, "total_tokens": 260}
+    yield f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n"
+
+
+def anthropic_stream_events(body: Dict[str, Any]):
+    """SSE события Messages API"""
+    def event(name: str, data: Dict[str, Any]) -> str:
+        return f"event: {name}\ndata: {json.dumps({'type': name, **data}, ensure_ascii=False)}\n\n"
+
+    chunks = reply_chunks(body.get("messages"))
+    yield event("message_start", {"message": {
+        "id": "msg_stream", "type": "message", "role": "assistant", "content": [],
+        "model": body.get("model", "claude-3-5-sonnet-20241022"), "stop_reason": None,
+        "stop_sequence": None, "usage": {"input_tokens": 200, "output_tokens": 1}
+    }}) + event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}}) + event(
+        "content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": chunks[0]}})
+    for text in chunks[1:]:
+        yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": text}})
+    yield event("content_block_stop", {"index": 0}) + event("message_delta", {
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 60}
+    }) + event("message_stop", {})
+
+
+class StubServer:
+    """Процесс с uvicorn и заглушкой"""
+
+    def __init__(self, latency_ms: Dict[str, float], jitter: float):
+        context = multiprocessing.get_context("spawn")
+        self._ports = context.Queue()
+        self.process = context.Process(
+            target=_serve_stubs, args=(latency_ms, jitter, self._ports),
+            name="load-replay-stubs", daemon=True
+        )
+        self.url = ""
+
+    def start(self) -> str:
+        self.process.start()
+        port = self._ports.get(timeout=30)
+        self.url = f"http://127.0.0.1:{port}"
+        # Ждем, пока uvicorn начнет принимать запросы
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{self.url}/_stub/calls", timeout=1.0)
+                return self.url
+            except httpx.TransportError:
+                if time.monotonic() > deadline or not self.process.is_alive():
+                    raise RuntimeError("Сервер-заглушка не запустился")
+                time.sleep(0.05)
+
+    async def calls(self) -> Dict[str, int]:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(f"{self.url}/_stub/calls")
+            return response.json()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join(timeout=5)
+
+
+# Окружение бота
+
+def configure_environment(args, stub_url: str):
+    """Направляет бота на заглушки (до импорта bot - конфигурация читается при импорте)"""
+    env = {
+        "TELEGRAM_BOT_TOKEN": BOT_TOKEN,
+        "TELEGRAM_WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "WEBHOOK_VERIFY_SECRET": "true",
+        "AUTO_SETUP_WEBHOOK": "false",
+        "TELEGRAM_INGESTION_MODE": "webhook",
+        "WEBHOOK_PROCESSING_MODE": args.mode,
+        "UPDATE_QUEUE_SPILL_PATH": "",
+        "UPDATE_DEDUP_PERSIST_PATH": "",
+        "REQUEST_LOG_SAMPLE_RATE": "0",
+        "REQUEST_LOG_SLOW_MS": "3600000",
+        # Whisper идет через OpenAI - без ключа OpenAI голосовые не распознаются
+        "VOICE_ENABLED": "true" if args.llm == "openai" else "false",
+        "MCP_ENABLED": "false",
+        "ADMIN_USER_ID": "",
+        "ADMIN_USERNAMES": "",
+        "YOUTUBE_API_KEY": "",
+        "INSTAGRAM_API_KEY": "",
+        "TIKTOK_API_KEY": "",
+        "OPENAI_API_KEY": "sk-load-replay" if args.llm == "openai" else "",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "ANTHROPIC_API_KEY": "sk-ant-load-replay" if args.llm == "anthropic" else "",
+        "ANTHROPIC_BASE_URL": stub_url,
+        "ZEP_API_KEY": "" if args.no_zep else "z_load_replay",
+        "ZEP_API_URL": stub_url,
+        "LLM_STREAMING": "true" if args.streaming else "false",
+    }
+    if not args.respect_rate_limits:
+        # Меряем сам бот, а не лимиты Telegram
+        env["TELEGRAM_GLOBAL_RATE_LIMIT"] = "100000"
+        env["TELEGRAM_CHAT_RATE_LIMIT"] = "100000"
+        env["TELEGRAM_GROUP_RATE_LIMIT_PER_MINUTE"] = "100000"
+    os.environ.update(env)
+
+
+# Updates
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'text=8,voice=1' -> {'text': 8.0, 'voice': 1.0}"""
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("text", "command", "voice", "business"):
+            raise ValueError(f"Неизвестный тип update в смеси: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def synthetic_updates(count: int, mix: Dict[str, float], chats: int, seed: int) -> List[Dict[str, Any]]:
+    """Синтетическая смесь updates из TestService"""
+    from bot.webhook.services import TestService
+
+    test_service = TestService()
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    updates = []
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        chat_id = 10_000_000 + rng.randrange(chats)
+        if kind == "voice":
+            update = test_service.create_test_voice_update(chat_id, f"voice-{chat_id}", chat_id, duration=rng.randint(2, 20))
+        elif kind == "business":
+            update = test_service.create_test_business_update(chat_id, rng.choice(TEXTS), BUSINESS_CONNECTION_ID, chat_id)
+        else:
+            text = rng.choice(COMMANDS if kind == "command" else TEXTS)
+            update = test_service.create_test_update(chat_id, text, chat_id)
+        updates.append(update)
+    return updates
+
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    """Читает записанные updates из JSON Lines файла"""
+    updates = []
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            # Формат /debug/last-updates: {"id": ..., "update": {...}}
+            if "update" in data and "update_id" not in data:
+                data = data["update"]
+            updates.append(data)
+    return updates
+
+
+def renumber(updates: List[Dict[str, Any]], start: int = 1) -> None:
+    """
+    Уникальные update_id и message_id
+
+    TestService берет id из текущего времени, и updates, созданные подряд,
+    получают одинаковые id - дедупликация отбросила бы их как повторы.
+    """
+    for number, update in enumerate(updates, start):
+        update["update_id"] = number
+        for kind in ("message", "edited_message", "business_message", "edited_business_message"):
+            if update.get(kind):
+                update[kind]["message_id"] = number
+
+
+# Сбор метрик
+
+class RequestRecorder(logging.Handler):
+    """Забирает записи RequestLog (логгер bot.requests) без форматирования"""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.records: List[Dict[str, Any]] = []
+        self.last_at = 0.0
+
+    def emit(self, record: logging.LogRecord):
+        request = getattr(record, "request", None)
+        if request is not None:
+            request["failed"] = record.levelno >= logging.WARNING
+            self.records.append(request)
+            self.last_at = time.perf_counter()
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50": round(percentile(samples, 50), 1),
+        "p95": round(percentile(samples, 95), 1),
+        "p99": round(percentile(samples, 99), 1),
+        "max": round(max(samples), 1),
+    }
+
+
+# Прогон
+
+async def replay(app, updates: List[Dict[str, Any]], concurrency: int) -> List[float]:
+    """Отправляет updates в POST /webhook с заданной параллельностью, возвращает время ответа (мс)"""
+    from bot.telegram_types import encode
+
+    headers = {"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET, "Content-Type": "application/json"}
+    bodies = iter([encode(update) for update in updates])
+    latencies: List[float] = []
+    errors: Dict[int, int] = defaultdict(int)
+
+    async def worker(client: httpx.AsyncClient):
+        for body in bodies:
+            started_at = time.perf_counter()
+            response = await client.post("/webhook", content=body, headers=headers)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+            if response.status_code != 200:
+                errors[response.status_code] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-replay", timeout=None) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    for status, count in errors.items():
+        print(f"⚠️ HTTP {status}: {count} ответов")
+    return latencies
+
+
+async def wait_processed(recorder: RequestRecorder, expected: int, timeout: float) -> bool:
+    """Ждет записи RequestLog по всем updates (в режиме queue ответ webhook приходит раньше обработки)"""
+    deadline = time.perf_counter() + timeout
+    while len(recorder.records) < expected:
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+def redirect_file_logs():
+    """Переносит файловые логи бота (logs/bot.log, logs/errors.log) во временный каталог"""
+    root = logging.getLogger()
+    directory = None
+    for handler in list(root.handlers):
+        if not isinstance(handler, logging.FileHandler):
+            continue
+        directory = directory or tempfile.mkdtemp(prefix="load_replay_logs_")
+        root.removeHandler(handler)
+        handler.close()
+        replacement = logging.FileHandler(os.path.join(directory, os.path.basename(handler.baseFilename)), encoding="utf-8")
+        replacement.setLevel(handler.level)
+        replacement.setFormatter(handler.formatter)
+        root.addHandler(replacement)
+    if directory:
+        print(f"📝 Логи бота: {directory}")
+
+
+async def run(args, stub_server: StubServer, latency_ms: Dict[str, float]) -> Dict[str, Any]:
+    # Файловые обработчики создаются при импорте bot.core.logging - переносим их до импорта приложения
+    import bot.core.logging  # noqa: F401
+    redirect_file_logs()
+
+    from bot.webhook.app import create_app
+    from bot.telegram_bot import telegram_client
+
+    # Общий клиент Bot API (его же используют отправка и загрузка голосовых)
+    telegram_client.base_url = stub_server.url
+
+    # Логи бота - только предупреждения; записи RequestLog идут в recorder, а не в файлы
+    logging.getLogger().setLevel(args.log_level)
+    recorder = RequestRecorder()
+    requests_logger = logging.getLogger("bot.requests")
+    requests_logger.setLevel(logging.INFO)
+    requests_logger.propagate = False
+    requests_logger.handlers = [recorder]
+
+    updates = load_updates(args.file) if args.file else synthetic_updates(
+        args.warmup + args.updates, parse_mix(args.mix), args.chats, args.seed
+    )
+    if args.file and len(updates) < args.warmup + args.updates:
+        # Записанный набор повторяется по кругу
+        updates = [json.loads(json.dumps(updates[i % len(updates)])) for i in range(args.warmup + args.updates)]
+    if not args.keep_ids:
+        renumber(updates)
+    warmup, measured = updates[:args.warmup], updates[args.warmup:args.warmup + args.updates]
+
+    app = create_app()
+    await app.router.startup()
+    try:
+        if warmup:
+            await replay(app, warmup, args.concurrency)
+            await wait_processed(recorder, len(warmup), args.drain_timeout)
+        recorder.records.clear()
+        stub_calls_before = await stub_server.calls()
+
+        started_at = time.perf_counter()
+        latencies = await replay(app, measured, args.concurrency)
+        acked_at = time.perf_counter()
+        drained = await wait_processed(recorder, len(measured), args.drain_timeout)
+        processed_at = recorder.last_at if recorder.records else acked_at
+        stub_calls = await stub_server.calls()
+    finally:
+        await app.router.shutdown()
+
+    records = list(recorder.records)
+    stages: Dict[str, List[float]] = defaultdict(list)
+    for record in records:
+        for name, ms in record.get("stages_ms", {}).items():
+            stages[name].append(ms)
+        # Тайминги потоковых ответов (LLM_STREAMING)
+        for field in ("llm_ttft_ms", "stream_visible_ms"):
+            if field in record:
+                stages[field[:-3]].append(record[field])
+
+    wall = max(processed_at - started_at, 1e-9)
+    return {
+        "config": {
+            "updates": len(measured), "concurrency": args.concurrency, "mode": args.mode,
+            "llm": args.llm, "zep": not args.no_zep, "streaming": args.streaming,
+            "source": args.file or args.mix,
+            "latency_ms": latency_ms, "jitter": args.jitter,
+        },
+        "throughput": {
+            "acked_per_s": round(len(latencies) / max(acked_at - started_at, 1e-9), 1),
+            "processed_per_s": round(len(records) / wall, 1),
+            "wall_s": round(wall, 2),
+        },
+        "processed": len(records),
+        "failed": sum(1 for r in records if r["failed"]),
+        "duplicates": sum(1 for r in records if r.get("duplicate")),
+        "drained": drained,
+        "http_ms": summarize(latencies),
+        "total_ms": summarize([r["total_ms"] for r in records]),
+        "stages_ms": {name: summarize(samples) for name, samples in sorted(stages.items())},
+        "stub_calls": {name: count - stub_calls_before.get(name, 0) for name, count in sorted(stub_calls.items())},
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    cfg = report["config"]
+    throughput = report["throughput"]
+    print(
+        f"\n{cfg['updates']} updates ({cfg['source']}), concurrency {cfg['concurrency']}, "
+        f"mode {cfg['mode']}, llm {cfg['llm']}, zep {'on' if cfg['zep'] else 'off'}"
+        + (", streaming" if cfg["streaming"] else "")
+    )
+    print(f"задержка заглушек (мс): {cfg['latency_ms']} ±{cfg['jitter']:.0%}\n")
+    print(
+        f"пропускная способность: {throughput['processed_per_s']} updates/s обработано, "
+        f"{throughput['acked_per_s']} updates/s принято webhook ({throughput['wall_s']} с)"
+    )
+    print(
+        f"обработано {report['processed']}, с ошибкой {report['failed']}, "
+        f"дубликатов {report['duplicates']}"
+        + ("" if report["drained"] else "  ⚠️ не все updates обработаны за --drain-timeout")
+    )
+
+    print(f"\n{'этап (мс)':<16} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    rows = [("http", report["http_ms"]), ("total", report["total_ms"])] + list(report["stages_ms"].items())
+    for name, stats in rows:
+        if not stats.get("count"):
+            continue
+        print(
+            f"{name:<16} {stats['count']:>7} {stats['p50']:>9.1f} {stats['p95']:>9.1f} "
+            f"{stats['p99']:>9.1f} {stats['max']:>9.1f}"
+        )
+
+    calls = ", ".join(f"{name}={count}" for name, count in report["stub_calls"].items())
+    print(f"\nвызовы заглушек: {calls or 'нет'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон webhook сервера с заглушками сервисов")
+    parser.add_argument("--updates", type=int, default=2000, help="Сколько updates отправить")
+    parser.add_argument("--warmup", type=int, default=100, help="Updates для прогрева (в отчет не входят)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных запросов к /webhook")
+    parser.add_argument("--mix", default="text=8,command=1,voice=1,business=1",
+                        help="Смесь синтетических updates: text, command, voice, business")
+    parser.add_argument("--chats", type=int, default=500, help="Число разных чатов в синтетической смеси")
+    parser.add_argument("--file", help="JSON Lines файл с записанными updates вместо синтетики")
+    parser.add_argument("--keep-ids", action="store_true", help="Не перенумеровывать update_id (проверка дедупликации)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mode", choices=("sync", "queue"), default="sync", help="WEBHOOK_PROCESSING_MODE")
+    parser.add_argument("--llm", choices=("openai", "anthropic", "none"), default="openai",
+                        help="Генератор ответов (голосовые распознаются только с openai)")
+    parser.add_argument("--no-zep", action="store_true", help="Без Zep (InMemory память)")
+    parser.add_argument("--streaming", action="store_true", help="Потоковые ответы LLM (LLM_STREAMING)")
+    parser.add_argument("--respect-rate-limits", action="store_true",
+                        help="Оставить лимиты отправки Telegram из окружения")
+    parser.add_argument("--telegram-latency", type=float, default=40.0)
+    parser.add_argument("--openai-latency", type=float, default=800.0)
+    parser.add_argument("--whisper-latency", type=float, default=1500.0)
+    parser.add_argument("--anthropic-latency", type=float, default=1200.0)
+    parser.add_argument("--zep-latency", type=float, default=60.0)
+    parser.add_argument("--jitter", type=float, default=0.3, help="Разброс задержки заглушек (доля)")
+    parser.add_argument("--drain-timeout", type=float, default=120.0,
+                        help="Сколько ждать завершения обработки после отправки (с)")
+    parser.add_argument("--log-level", default="WARNING", help="Уровень остальных логов бота")
+    parser.add_argument("--json", help="Сохранить отчет в JSON файл")
+    args = parser.parse_args()
+
+    latency_ms = {
+        "telegram": args.telegram_latency,
+        "openai": args.openai_latency,
+        "whisper": args.whisper_latency,
+        "anthropic": args.anthropic_latency,
+        "zep": args.zep_latency,
+    }
+    stub_server = StubServer(latency_ms, args.jitter)
+    configure_environment(args, stub_server.start())
+
+    try:
+        report = asyncio.run(run(args, stub_server, latency_ms))
+    finally:
+        stub_server.stop()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Общие фикстуры тестов: фабрики сообщений и подмены внешних сервисов
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.config import MemoryWriteConfig
+from bot.core.interfaces import Message, MessageType, Response, User
+
+
+class FakeZepMemory:
+    """memory API Zep: сессии и записанные сообщения"""
+
+    def __init__(self, failures: int = 0):
+        self.sessions = set()
+        self.added = []
+        self.deleted = []
+        self.session_checks = 0
+        self.failures = failures
+
+    async def get_session(self, session_id):
+        self.session_checks += 1
+        if session_id not in self.sessions:
+            raise RuntimeError("not found")
+
+    async def add_session(self, session_id, user_id, metadata):
+        self.sessions.add(session_id)
+
+    async def add(self, session_id, messages):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Zep недоступен")
+        self.added.append((session_id, [message.content for message in messages]))
+
+    async def get(self, session_id, lastn=10):
+        return None
+
+    async def delete(self, session_id):
+        self.deleted.append(session_id)
+        self.sessions.discard(session_id)
+        self.added = [item for item in self.added if item[0] != session_id]
+
+
+class FakeCompletions:
+    """
+    chat.completions: запрос с tools выбирает инструмент, без tools - итоговый ответ
+
+    answer - сообщение модели или словарь {модель: сообщение}; запросы сохраняются.
+    """
+
+    def __init__(self, answer, final_text: str = "Ответ от LLM", usage=None):
+        self.answer = answer
+        self.final_text = final_text
+        self.usage = usage
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if "tools" in kwargs:
+            message = self.answer[kwargs["model"]] if isinstance(self.answer, dict) else self.answer
+        else:
+            message = SimpleNamespace(content=self.final_text.format(model=kwargs["model"]), tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=self.usage)
+
+
+class FakeClaudeCodeService:
+    """MCP команды: запоминает команды и возвращает заданный результат"""
+
+    def __init__(self, result=None):
+        self.result = result or {"success": True, "response": "📱 Приложения: bot, admin"}
+        self.commands = []
+
+    async def execute_mcp_command(self, command, user_id=None):
+        self.commands.append(command)
+        return self.result
+
+
+@pytest.fixture
+def make_message():
+    """Фабрика текстовых (или других типов) сообщений пользователя"""
+    def factory(text: str, user_id: int = 1, first_name: str = "Иван", username: str = "client",
+                message_type: MessageType = MessageType.TEXT) -> Message:
+        user = User(id=user_id, username=username, first_name=first_name, last_name=None)
+        return Message(id=1, user=user, chat_id=user_id, text=text, type=message_type, timestamp=datetime.now())
+
+    return factory
+
+
+@pytest.fixture
+def add_turn(make_message):
+    """Записывает обмен (сообщение пользователя и ответ) в менеджер памяти"""
+    async def add(memory, user_id: int, text: str, answer: str = "ок"):
+        await memory.add_message(user_id, make_message(text, user_id=user_id), Response(text=answer))
+
+    return add
+
+
+@pytest.fixture
+def make_zep_manager():
+    """Фабрика ZepMemoryManager с подмененным Zep и очередью отложенной записи"""
+    from bot.services.memory_manager import ZepMemoryManager
+    from bot.services.memory_writer import MemoryWriteBehind
+
+    def factory(failures: int = 0, **settings) -> ZepMemoryManager:
+        manager = ZepMemoryManager()
+        manager.client = SimpleNamespace(memory=FakeZepMemory(failures))
+        manager.enabled = True
+        manager.writer = MemoryWriteBehind(MemoryWriteConfig(**{"flush_interval": 60.0, **settings}))
+        return manager
+
+    return factory
+
+
+@pytest.fixture
+def make_agent():
+    """Фабрика IntelligentAgent с подмененными OpenAI клиентом и MCP сервисом"""
+    from agent.core.intelligent_agent import IntelligentAgent
+
+    def factory(answer, final_text: str = "Ответ от LLM", usage=None, mcp_result=None, **agent_settings):
+        agent = IntelligentAgent(api_key="sk-test", **agent_settings)
+        completions = FakeCompletions(answer, final_text=final_text, usage=usage)
+        agent.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        agent.claude_code_service = FakeClaudeCodeService(mcp_result)
+        return agent
+
+    return factory
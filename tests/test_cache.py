@@ -0,0 +1,184 @@
+"""
+Тесты асинхронного кеша (LRU + TTL, инвалидация, single-flight заполнение)
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.cache import AsyncCache, cached, get_cache_stats
+from bot.core.decorators import memoize
+from bot.core.utils import CacheUtils
+
+
+class CountingSource:
+    """Источник данных, считающий обращения"""
+
+    def __init__(self, value="data", delay: float = 0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        value = self.value
+        await asyncio.sleep(self.delay)
+        return value
+
+
+class TestAsyncCache:
+    """Тесты кеша"""
+
+    def test_lru_eviction_keeps_recently_used(self):
+        cache = AsyncCache("test_lru", max_size=2, ttl=None)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        cache = AsyncCache("test_ttl", ttl=10)
+        now = time.monotonic()
+        monkeypatch.setattr("bot.core.cache.time.monotonic", lambda: now)
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+
+        monkeypatch.setattr("bot.core.cache.time.monotonic", lambda: now + 11)
+        assert cache.get("key") is None
+        assert cache.get_stats()["expirations"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_fill_once(self):
+        cache = AsyncCache("test_fill", ttl=60)
+        source = CountingSource(delay=0.02)
+
+        results = await asyncio.gather(*(cache.get_or_fill("key", source.fetch) for _ in range(5)))
+        assert results == ["data"] * 5
+        assert await cache.get_or_fill("key", source.fetch) == "data"
+
+        assert source.calls == 1
+        stats = cache.get_stats()
+        assert stats["fills"] == 1
+        assert stats["shared_fills"] == 4
+        assert stats["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_fill_drops_stale_result(self):
+        cache = AsyncCache("test_stale", ttl=60)
+        source = CountingSource(value="old", delay=0.02)
+
+        fill = asyncio.ensure_future(cache.get_or_fill((1, 10), source.fetch))
+        await asyncio.sleep(0.005)
+        cache.invalidate_prefix((1,))
+        source.value = "new"
+
+        assert await fill == "old"
+        assert await cache.get_or_fill((1, 10), source.fetch) == "new"
+        assert cache.get_stats()["stale_fills_dropped"] == 1
+
+    def test_prefix_invalidation(self):
+        cache = AsyncCache("test_prefix", ttl=None)
+        cache.set((1, 10), "a")
+        cache.set((1, 20), "b")
+        cache.set((2, 10), "c")
+        cache.set("user:1:profile", "d")
+
+        assert cache.invalidate_prefix((1,)) == 2
+        assert cache.invalidate_prefix("user:1:") == 1
+        assert cache.get((2, 10)) == "c"
+        assert len(cache) == 1
+
+    @pytest.mark.asyncio
+    async def test_negative_results(self):
+        source = CountingSource(value=None)
+
+        skipped = AsyncCache("test_negative_skip", ttl=60)
+        await skipped.get_or_fill("key", source.fetch)
+        await skipped.get_or_fill("key", source.fetch)
+        assert source.calls == 2
+
+        short = AsyncCache("test_negative_short", ttl=60, negative_ttl=30)
+        await short.get_or_fill("key", source.fetch)
+        await short.get_or_fill("key", source.fetch)
+        assert source.calls == 3
+        assert short.get_stats()["negative_stored"] == 1
+
+    @pytest.mark.asyncio
+    async def test_decorators(self):
+        calls = []
+
+        @cached("test_decorator", ttl=60, key=lambda user_id, flag=False: None if flag else user_id)
+        async def load(user_id, flag=False):
+            calls.append(user_id)
+            return {"id": user_id}
+
+        await load(1)
+        await load(1)
+        await load(1, flag=True)
+        assert calls == [1, 1]
+        assert load.cache.get_stats()["hits"] == 1
+        assert "test_decorator" in get_cache_stats()
+
+        @memoize(maxsize=2)
+        def square(value):
+            calls.append(value)
+            return value * value
+
+        assert [square(3), square(3), square(4)] == [9, 9, 16]
+        assert calls == [1, 1, 3, 4]
+
+        @CacheUtils.ttl_cache(ttl_seconds=60, max_size=2)
+        async def lookup(value):
+            calls.append(value)
+            return None
+
+        await lookup("x")
+        await lookup("x")
+        assert calls[-1] == "x" and calls.count("x") == 1
+        assert CacheUtils.clear_all() >= 3
+
+
+class TestZepContextCache:
+    """Кеш контекста Zep сбрасывается записью"""
+
+    @pytest.mark.asyncio
+    async def test_context_fresh_after_flush(self, make_zep_manager, add_turn):
+        manager = make_zep_manager()
+        zep = manager.client.memory
+        stored = []
+        reads = []
+
+        async def get(session_id, lastn=10):
+            reads.append(session_id)
+            return SimpleNamespace(messages=[
+                SimpleNamespace(role="user", content=content, metadata=None) for content in stored
+            ])
+
+        async def add(session_id, messages):
+            stored.extend(message.content for message in messages)
+
+        zep.get = get
+        zep.add = add
+
+        await add_turn(manager, 21, "первый", "1")
+        await manager.writer.flush()
+        assert [item["content"] for item in await manager.get_context(21)] == ["первый", "1"]
+        assert [item["content"] for item in await manager.get_context(21)] == ["первый", "1"]
+        assert len(reads) == 1
+
+        await add_turn(manager, 21, "второй", "2")
+        await manager.writer.flush()
+        assert [item["content"] for item in await manager.get_context(21)] == ["первый", "1", "второй", "2"]
+        assert len(reads) == 2
+
+        await manager.writer.stop()
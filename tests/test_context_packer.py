@@ -0,0 +1,165 @@
+"""
+Тесты упаковки контекста в бюджет токенов
+"""
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.config import ContextConfig
+from bot.core.logging import RequestLog
+from bot.services.context_packer import (
+    ContextPacker, TokenCounter, context_window, get_context_packer_stats, TRIM_MARKER
+)
+
+MODEL = "gpt-4o-mini"
+
+
+def turn(role: str, content: str, **extra):
+    return {"role": role, "content": content, **extra}
+
+
+def make_packer(**settings) -> ContextPacker:
+    return ContextPacker(ContextConfig(**settings))
+
+
+class TestTokenCounter:
+    """Тесты TokenCounter"""
+
+    def test_counts_are_cached(self):
+        counter = TokenCounter()
+        text = "Сколько стоит пошив 100 футболок?"
+
+        first = counter.count(text, MODEL)
+        assert counter.count(text, MODEL) == first > 0
+
+        stats = counter.get_stats()
+        assert stats["cache_hits"] == 1
+        assert stats["cache_misses"] == 1
+
+    def test_cache_is_bounded(self):
+        counter = TokenCounter(max_entries=3)
+        for i in range(10):
+            counter.count(f"сообщение {i}", MODEL)
+
+        assert counter.get_stats()["cached_counts"] == 3
+
+    def test_trim_keeps_head_and_tail(self):
+        counter = TokenCounter()
+        text = "НАЧАЛО " + "середина " * 500 + "КОНЕЦ"
+
+        trimmed = counter.trim(text, 50, MODEL)
+
+        assert trimmed.startswith("НАЧАЛО")
+        assert trimmed.endswith("КОНЕЦ")
+        assert TRIM_MARKER in trimmed
+        assert counter.count(trimmed, MODEL) <= 55
+
+    def test_context_window(self):
+        assert context_window("gpt-4o-mini") == 128000
+        assert context_window("gpt-4") == 8192
+        assert context_window("claude-3-5-sonnet-20241022") == 200000
+        assert context_window("unknown-model") == 8192
+
+
+class TestContextPacker:
+    """Тесты ContextPacker"""
+
+    def test_small_history_passes_unchanged(self):
+        packer = make_packer()
+        context = [turn("user", "Привет", timestamp="2025-01-01"), turn("assistant", "Здравствуйте!")]
+
+        packed = packer.pack(context, MODEL, "Ты - ассистент", "Как дела?")
+
+        assert packed.messages == [turn("user", "Привет"), turn("assistant", "Здравствуйте!")]
+        assert packed.dropped == packed.trimmed == 0
+        assert packed.saved_tokens == 0
+
+    def test_budget_filled_newest_first(self):
+        packer = make_packer(history_tokens=100, turn_max_tokens=100)
+        context = [turn("user", f"сообщение номер {i} " * 4) for i in range(20)]
+
+        packed = packer.pack(context, MODEL)
+
+        # Сохраняются последние сообщения в исходном порядке (самое старое могло быть обрезано)
+        kept = len(packed.messages)
+        assert kept >= 2
+        assert packed.messages[1:] == context[-(kept - 1):]
+        assert packed.dropped == 20 - len(packed.messages)
+        assert packed.dropped > 0
+        assert packed.tokens <= 100
+        assert packed.saved_tokens > 0
+
+    def test_oversize_turn_is_trimmed(self):
+        packer = make_packer(history_tokens=2000, turn_max_tokens=50)
+        pasted = "Длинный лог ошибки: " + "Traceback line " * 400
+        context = [turn("user", pasted), turn("assistant", "Вижу ошибку")]
+
+        packed = packer.pack(context, MODEL)
+
+        assert len(packed.messages) == 2
+        assert packed.trimmed == 1
+        assert TRIM_MARKER in packed.messages[0]["content"]
+        assert packed.messages[1]["content"] == "Вижу ошибку"
+        assert packed.saved_tokens > 500
+
+    def test_older_turns_dropped_after_budget_exhausted(self):
+        packer = make_packer(history_tokens=60, turn_max_tokens=1000)
+        context = [turn("user", "старое"), turn("user", "x" * 400), turn("user", "новое")]
+
+        packed = packer.pack(context, MODEL)
+
+        # Длинное сообщение обрезано до остатка бюджета, более старое не попадает
+        assert [m["content"] for m in packed.messages][-1] == "новое"
+        assert "старое" not in [m["content"] for m in packed.messages]
+        assert packed.dropped >= 1
+
+    def test_model_budget_and_window(self):
+        packer = make_packer(history_tokens=2000, model_budgets={"gpt-4o": 100, "gpt-4o-mini": 300})
+
+        assert packer.history_budget("gpt-4o-mini") == 300
+        assert packer.history_budget("gpt-4o") == 100
+        assert packer.history_budget("claude-3-5-sonnet") == 2000
+
+        # Окно gpt-4 (8192) почти занято системным промптом и ответом
+        packed = packer.pack([turn("user", "привет")], "gpt-4", system_prompt="a" * 30000, max_output_tokens=1000)
+        assert packed.budget < 2000
+
+    def test_disabled_packer_keeps_history(self):
+        packer = make_packer(enabled=False)
+        context = [turn("user", "x" * 10000)]
+
+        packed = packer.pack(context, MODEL)
+
+        assert packed.messages == context
+
+    def test_metrics_and_request_log(self):
+        packer = make_packer(history_tokens=40)
+        context = [turn("user", "сообщение " * 30) for _ in range(3)]
+
+        with RequestLog(update_id=1) as request_log:
+            packed = packer.pack(context, MODEL)
+
+        assert request_log.fields["context_tokens"] == packed.tokens
+        assert request_log.fields["context_saved_tokens"] == packed.saved_tokens > 0
+        stats = get_context_packer_stats()
+        assert stats["packs"] >= 1
+        assert stats["tokens_saved"] >= packed.saved_tokens
+        assert packed.tokens <= packed.budget == 40
+
+
+class TestIntelligentAgentContext:
+    """Тесты контекста IntelligentAgent без упаковки"""
+
+    def test_simple_messages_keep_last_five_when_disabled(self, monkeypatch):
+        from agent.core import intelligent_agent
+
+        monkeypatch.setattr(intelligent_agent, "context_packer", make_packer(enabled=False))
+        agent = intelligent_agent.IntelligentAgent(api_key="sk-test")
+        context = [turn("user", f"сообщение {i}") for i in range(10)]
+
+        simple = agent._prepare_simple_messages("привет", context)
+        full = agent._prepare_messages("привет", context)
+
+        assert [item["content"] for item in simple[1:-1]] == [f"сообщение {i}" for i in range(5, 10)]
+        assert len(full) == len(context) + 2
@@ -0,0 +1,157 @@
+"""
+Тесты дедупликации повторных доставок updates
+"""
+import time
+import sqlite3
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.webhook.dedup import UpdateDeduplicator
+
+
+def _business_update(update_id, message_id):
+    return {
+        "update_id": update_id,
+        "business_message": {
+            "message_id": message_id,
+            "business_connection_id": "bc1",
+            "chat": {"id": 42}
+        }
+    }
+
+
+class TestUpdateDeduplicator:
+    """Тесты UpdateDeduplicator"""
+
+    def test_repeated_update_id_is_duplicate(self):
+        dedup = UpdateDeduplicator()
+        assert not dedup.check_and_mark({"update_id": 1})
+        assert dedup.check_and_mark({"update_id": 1})
+        assert not dedup.check_and_mark({"update_id": 2})
+
+        stats = dedup.get_stats()
+        assert stats["duplicates"] == 1
+        assert stats["update_id_hits"] == 1
+
+    def test_business_message_with_new_update_id(self):
+        """Тот же business message с другим update_id тоже считается дублем"""
+        dedup = UpdateDeduplicator()
+        assert not dedup.check_and_mark(_business_update(1, 100))
+        assert dedup.check_and_mark(_business_update(2, 100))
+        assert dedup.get_stats()["business_message_hits"] == 1
+
+    def test_is_duplicate_does_not_mark(self):
+        dedup = UpdateDeduplicator()
+        assert not dedup.is_duplicate({"update_id": 1})
+        assert not dedup.check_and_mark({"update_id": 1})
+        assert dedup.is_duplicate({"update_id": 1})
+
+    def test_lru_eviction(self):
+        dedup = UpdateDeduplicator(max_size=3)
+        for update_id in range(5):
+            dedup.check_and_mark({"update_id": update_id})
+
+        assert dedup.get_stats()["size"] == 3
+        assert dedup.get_stats()["evicted"] == 2
+        assert not dedup.is_duplicate({"update_id": 0})
+        assert dedup.is_duplicate({"update_id": 4})
+
+    def test_ttl_expiration(self):
+        dedup = UpdateDeduplicator(ttl=0.05)
+        dedup.check_and_mark({"update_id": 1})
+        time.sleep(0.1)
+        assert not dedup.check_and_mark({"update_id": 1})
+        assert dedup.get_stats()["expired"] >= 1
+
+    def test_update_without_ids_is_not_tracked(self):
+        dedup = UpdateDeduplicator()
+        assert not dedup.check_and_mark({})
+        assert not dedup.check_and_mark({})
+
+    def test_persistent_store_survives_restart(self, tmp_path):
+        path = str(tmp_path / "dedup.sqlite")
+
+        first = UpdateDeduplicator(persist_path=path)
+        for update in ({"update_id": 1}, _business_update(2, 100)):
+            first.check_and_mark(update)
+            first.confirm(update)
+        first.close()
+
+        second = UpdateDeduplicator(persist_path=path)
+        assert second.get_stats()["persistent"]
+        assert second.check_and_mark({"update_id": 1})
+        assert second.check_and_mark(_business_update(3, 100))
+        second.close()
+
+    def test_unconfirmed_update_is_not_persisted(self, tmp_path):
+        path = str(tmp_path / "dedup.sqlite")
+
+        first = UpdateDeduplicator(persist_path=path)
+        first.check_and_mark({"update_id": 1})
+        first.close()
+
+        second = UpdateDeduplicator(persist_path=path)
+        assert not second.check_and_mark({"update_id": 1})
+        second.close()
+
+    def test_forget_allows_redelivery(self):
+        dedup = UpdateDeduplicator()
+        dedup.check_and_mark(_business_update(1, 100))
+        dedup.forget(_business_update(1, 100))
+
+        assert not dedup.check_and_mark(_business_update(2, 100))
+        assert dedup.get_stats()["forgotten"] == 2
+
+    @pytest.mark.asyncio
+    async def test_confirmed_keys_written_in_batch_off_loop(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "dedup.sqlite")
+        dedup = UpdateDeduplicator(persist_path=path)
+        batches = []
+        write = dedup._write
+
+        def tracked_write(rows):
+            batches.append(len(rows))
+            write(rows)
+
+        monkeypatch.setattr(dedup, "_write", tracked_write)
+        monkeypatch.setattr(dedup, "FLUSH_DELAY", 0.01)
+
+        for update_id in range(5):
+            dedup.check_and_mark({"update_id": update_id})
+            dedup.confirm({"update_id": update_id})
+        assert batches == []
+
+        await dedup._flush_task
+        assert batches == [5]
+        with sqlite3.connect(path) as db:
+            assert db.execute("SELECT COUNT(*) FROM seen_updates").fetchone()[0] == 5
+        dedup.close()
+
+
+class TestWebhookHandlerDedup:
+    """Тесты дедупликации в WebhookHandler"""
+
+    @pytest.mark.asyncio
+    async def test_failed_update_processed_on_redelivery(self, monkeypatch):
+        from bot.webhook.handlers import WebhookHandler
+
+        handler = WebhookHandler()
+        handler.deduplicator = UpdateDeduplicator()
+        results = [{"ok": False, "error": "boom"}, {"ok": True}]
+        calls = []
+
+        async def route_update(update, request_log):
+            calls.append(update.update_id)
+            return results[len(calls) - 1]
+
+        monkeypatch.setattr(handler, "_route_update", route_update)
+        for _ in range(3):
+            await handler.handle_update({"update_id": 7})
+
+        assert calls == [7, 7]
+        assert handler.deduplicator.get_stats()["duplicates"] == 1
@@ -0,0 +1,141 @@
+"""
+Тесты прямого вывода результатов инструментов без второго запроса к LLM
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent.core.models import ToolResponse, ToolType
+from agent.tools.echo_tool import EchoTool
+from agent.tools.renderers import DirectRenderStats, render_tool_result
+from bot.core.logging import RequestLog
+
+APPS_LIST = "📁 **DigitalOcean Apps**\n\n📦 **sample-app**\n  🆔 ID: `6eb5ebe0`\n  🌍 Регион: ams\n\n"
+
+
+def tool_call_message(name: str, arguments: dict):
+    call = SimpleNamespace(
+        id="call_1",
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments, ensure_ascii=False))
+    )
+    return SimpleNamespace(content=None, tool_calls=[call])
+
+
+class TestRenderers:
+    """Тесты renderer'ов"""
+
+    def test_mcp_uses_formatted_response(self):
+        response = ToolResponse(success=True, data={"response": APPS_LIST, "mcp_response": None})
+
+        assert render_tool_result("mcp", response) == APPS_LIST
+
+    def test_mcp_placeholder_and_raw_json_need_llm(self):
+        placeholder = ToolResponse(success=True, data={"response": "Команда выполнена", "mcp_response": {"id": 1}})
+        apps = ToolResponse(success=True, data={
+            "response": "Команда выполнена",
+            "mcp_response": {"apps": [{"name": "web", "status": "running"}]}
+        })
+
+        assert render_tool_result("mcp", placeholder) is None
+        assert "🟢 **web**" in render_tool_result("mcp", apps)
+
+    def test_youtube_stats_rendered_by_telegram_formatter(self):
+        data = {
+            "url": "https://youtube.com/watch?v=dQw4w9WgXcQ",
+            "metadata": {
+                "title": "Never Gonna Give You Up",
+                "channel": "Rick Astley",
+                "duration": "3м 33с",
+                "statistics": {"views": 1400000000, "likes": 70000000, "comments": 1400000}
+            }
+        }
+
+        text = render_tool_result("youtube", ToolResponse(success=True, data=data))
+
+        # Ответ уходит без parse_mode - Markdown разметки быть не должно
+        assert text.startswith("🎥 Never Gonna Give You Up\n")
+        assert "**" not in text and "](" not in text
+        assert "1400.0M просмотров" in text
+        assert "https://youtube.com/watch?v=dQw4w9WgXcQ" in text
+        # Текст субтитров нужно пересказать - прямой вывод не подходит
+        data["subtitles"] = {"text": "Never gonna give you up..."}
+        assert render_tool_result("youtube", ToolResponse(success=True, data=data)) is None
+
+    def test_errors_and_unknown_renderers_need_llm(self):
+        assert render_tool_result("echo", ToolResponse(success=False, error="boom")) is None
+        assert render_tool_result(None, ToolResponse(success=True, data={"echo": "x"})) is None
+        assert render_tool_result("unknown", ToolResponse(success=True, data={"echo": "x"})) is None
+
+    @pytest.mark.asyncio
+    async def test_tool_declares_renderer_in_metadata(self):
+        tool = EchoTool()
+        response = await tool.execute_with_validation({"message": "привет", "uppercase": True, "user_id": "1"})
+
+        assert tool.metadata.renderer == "echo"
+        assert tool.render(response) == "ПРИВЕТ"
+
+
+class TestDirectRenderStats:
+    """Тесты метрик прямого вывода"""
+
+    def test_latency_saved_from_measured_llm_renders(self):
+        stats = DirectRenderStats()
+        stats.record_llm_render("echo_tool", 800.0, 500)
+        stats.record_llm_render("echo_tool", 1200.0, 700)
+
+        assert stats.record_direct_render("echo_tool", 400) == 1000.0
+        # Для инструмента без замеров - средняя по всем инструментам
+        assert stats.record_direct_render("claude_code_direct", 300) == 1000.0
+
+        result = stats.get_stats()
+        assert result["direct_renders"] == 2
+        assert result["tokens_saved"] == 700
+        assert result["tools"]["echo_tool"]["direct_ratio"] == round(1 / 3, 3)
+        assert result["tools"]["echo_tool"]["llm_avg_ms"] == 1000.0
+
+
+class TestIntelligentAgentDirectRender:
+    """Тесты агента: второй запрос к LLM только когда он нужен"""
+
+    @pytest.mark.asyncio
+    async def test_mcp_result_skips_second_completion(self, make_agent):
+        agent = make_agent(
+            tool_call_message("claude_code_direct", {"message": "покажи приложения"}),
+            mcp_result={"success": True, "response": APPS_LIST}
+        )
+
+        with RequestLog(update_id=1) as request_log:
+            response = await agent.process_message("покажи приложения", "42")
+
+        assert response.message == APPS_LIST
+        assert response.tool_used == ToolType.MCP
+        assert len(agent.client.chat.completions.calls) == 1
+        assert request_log.fields["tool_render"] == "direct"
+        assert request_log.fields["tool_render_saved_tokens"] > 0
+
+    @pytest.mark.asyncio
+    async def test_unrenderable_result_uses_second_completion(self, make_agent):
+        agent = make_agent(tool_call_message("generate_image", {"prompt": "кот"}))
+
+        response = await agent.process_message("нарисуй кота", "42")
+
+        assert response.message == "Ответ от LLM"
+        assert len(agent.client.chat.completions.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_direct_render_can_be_disabled(self, make_agent):
+        message = tool_call_message("echo_tool", {"message": "тест"})
+        disabled = make_agent(message, direct_render=False)
+        excluded = make_agent(message, direct_render_exclude=["echo_tool"])
+        enabled = make_agent(message)
+
+        assert (await disabled.process_message("эхо тест", "1")).message == "Ответ от LLM"
+        assert (await excluded.process_message("эхо тест", "1")).message == "Ответ от LLM"
+        assert (await enabled.process_message("эхо тест", "1")).message == "тест"
+        assert len(enabled.client.chat.completions.calls) == 1
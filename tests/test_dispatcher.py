@@ -0,0 +1,158 @@
+"""
+Тесты диспетчера updates с порядком обработки внутри чата
+"""
+import asyncio
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.webhook.dispatcher import ChatDispatcher
+
+
+class TestDispatchKey:
+    """Тесты вычисления ключа упорядочивания"""
+
+    def test_message_key(self):
+        update = {"update_id": 1, "message": {"chat": {"id": 42}}}
+        assert ChatDispatcher.dispatch_key(update) == "chat:42"
+
+    def test_business_message_key(self):
+        update = {
+            "update_id": 1,
+            "business_message": {"business_connection_id": "bc1", "chat": {"id": 42}}
+        }
+        assert ChatDispatcher.dispatch_key(update) == "biz:bc1:42"
+
+    def test_callback_query_key(self):
+        update = {"update_id": 1, "callback_query": {"from": {"id": 7}, "message": {"chat": {"id": 42}}}}
+        assert ChatDispatcher.dispatch_key(update) == "chat:42"
+
+    def test_unknown_update_key(self):
+        assert ChatDispatcher.dispatch_key({"update_id": 5}) == "update:5"
+
+
+class TestChatDispatcher:
+    """Тесты ChatDispatcher"""
+
+    @pytest.mark.asyncio
+    async def test_fifo_within_key(self):
+        """Задачи одного ключа выполняются по порядку и не пересекаются"""
+        dispatcher = ChatDispatcher(max_concurrency=8)
+        order = []
+        active = {"count": 0, "max": 0}
+
+        async def handler(i, delay):
+            active["count"] += 1
+            active["max"] = max(active["max"], active["count"])
+            await asyncio.sleep(delay)
+            order.append(i)
+            active["count"] -= 1
+
+        # Первые задачи медленнее - без упорядочивания они бы завершились позже
+        for i in range(5):
+            await dispatcher.submit("chat:1", handler, i, 0.05 - i * 0.01)
+        await dispatcher.join()
+
+        assert order == [0, 1, 2, 3, 4]
+        assert active["max"] == 1
+
+    @pytest.mark.asyncio
+    async def test_parallel_across_keys(self):
+        """Разные ключи выполняются параллельно"""
+        dispatcher = ChatDispatcher(max_concurrency=10)
+        running = {"count": 0, "max": 0}
+
+        async def handler():
+            running["count"] += 1
+            running["max"] = max(running["max"], running["count"])
+            await asyncio.sleep(0.05)
+            running["count"] -= 1
+
+        for chat_id in range(5):
+            await dispatcher.submit(f"chat:{chat_id}", handler)
+        await dispatcher.join()
+
+        assert running["max"] == 5
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        """Общий лимит параллельности соблюдается"""
+        dispatcher = ChatDispatcher(max_concurrency=2)
+        running = {"count": 0, "max": 0}
+
+        async def handler():
+            running["count"] += 1
+            running["max"] = max(running["max"], running["count"])
+            await asyncio.sleep(0.01)
+            running["count"] -= 1
+
+        for chat_id in range(6):
+            await dispatcher.submit(f"chat:{chat_id}", handler)
+        await dispatcher.join()
+
+        assert running["max"] == 2
+
+    @pytest.mark.asyncio
+    async def test_run_returns_result_and_raises(self):
+        """run возвращает результат и пробрасывает исключения"""
+        dispatcher = ChatDispatcher()
+
+        async def ok(value):
+            return value * 2
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        assert await dispatcher.run("chat:1", ok, 21) == 42
+        with pytest.raises(RuntimeError):
+            await dispatcher.run("chat:1", fail)
+        assert dispatcher.get_stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_idle_lanes_are_evicted(self):
+        """Опустевшие полосы удаляются"""
+        dispatcher = ChatDispatcher()
+
+        async def handler():
+            await asyncio.sleep(0)
+
+        for chat_id in range(100):
+            await dispatcher.submit(f"chat:{chat_id}", handler)
+        await dispatcher.join()
+
+        stats = dispatcher.get_stats()
+        assert stats["active_keys"] == 0
+        assert stats["lanes_created"] == 100
+        assert stats["lanes_evicted"] == 100
+
+    @pytest.mark.asyncio
+    async def test_active_keys_cap(self):
+        """Новый ключ ждет, пока число полос превышает лимит"""
+        dispatcher = ChatDispatcher(max_active_keys=2)
+        release = asyncio.Event()
+
+        async def handler():
+            await release.wait()
+
+        await dispatcher.submit("chat:1", handler)
+        await dispatcher.submit("chat:2", handler)
+        # Существующий ключ принимается без ожидания
+        await dispatcher.submit("chat:1", handler)
+
+        third = asyncio.create_task(dispatcher.submit("chat:3", handler))
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        assert dispatcher.active_keys == 2
+
+        release.set()
+        await asyncio.wait_for(third, timeout=1)
+        await dispatcher.join()
+
+        stats = dispatcher.get_stats()
+        assert stats["capacity_waits"] == 1
+        assert stats["peak_active_keys"] == 2
+        assert stats["completed"] == 4
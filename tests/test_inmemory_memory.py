@@ -0,0 +1,87 @@
+"""
+Тесты компактного InMemoryManager с общим бюджетом памяти
+"""
+from datetime import datetime
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.services.memory_manager import InMemoryManager, MemoryTurn, TURN_OVERHEAD, USER_OVERHEAD
+
+
+def contents(context):
+    return [item["content"] for item in context]
+
+
+def expected_bytes(memory: InMemoryManager) -> int:
+    return sum(USER_OVERHEAD + sum(turn.size() for turn in turns) for turns in memory.memory.values())
+
+
+class TestInMemoryManager:
+    """Тесты представления истории и вытеснения пользователей"""
+
+    @pytest.mark.asyncio
+    async def test_context_format_and_per_user_limit(self, add_turn):
+        memory = InMemoryManager(max_messages_per_user=2, max_turns=0, max_bytes=0)
+        for word in ["альфа", "бета", "гамма"]:
+            await add_turn(memory, 1, f"вопрос {word}", f"ответ {word}")
+
+        context = await memory.get_context(1, limit=10)
+        assert contents(context) == ["вопрос бета", "ответ бета", "вопрос гамма", "ответ гамма"]
+        assert context[0]["role"] == "user" and context[1]["role"] == "assistant"
+        datetime.fromisoformat(context[0]["timestamp"])
+        assert contents(await memory.get_context(1, limit=1)) == ["вопрос гамма", "ответ гамма"]
+
+        stats = memory.get_stats()
+        assert stats["resident_turns"] == 4
+        assert stats["resident_bytes"] == expected_bytes(memory)
+
+    def test_turn_is_compact(self):
+        turn = MemoryTurn("".join(["ass", "istant"]), "текст", 1.5)
+        assert not hasattr(turn, "__dict__")
+        assert turn.role is MemoryTurn("assistant", "", 0.0).role
+        assert turn.size() == TURN_OVERHEAD + sys.getsizeof("текст")
+
+    @pytest.mark.asyncio
+    async def test_lru_users_evicted_over_turn_budget(self, add_turn):
+        memory = InMemoryManager(max_turns=6, max_bytes=0)
+        for user_id in (1, 2, 3):
+            await add_turn(memory, user_id, f"привет от {user_id}")
+        # Чтение контекста обновляет порядок: первым вытесняется пользователь 2
+        await memory.get_context(1)
+        await add_turn(memory, 4, "новый пользователь")
+
+        assert list(memory.memory) == [3, 1, 4]
+        assert await memory.get_context(2) == []
+        stats = memory.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["resident_turns"] == 6
+
+    @pytest.mark.asyncio
+    async def test_byte_budget_and_clear(self, add_turn):
+        memory = InMemoryManager(max_turns=0, max_bytes=USER_OVERHEAD * 3)
+        for user_id in range(10):
+            await add_turn(memory, user_id, "длинное сообщение " * 10)
+
+        stats = memory.get_stats()
+        assert stats["resident_bytes"] <= USER_OVERHEAD * 3
+        assert stats["users"] < 10
+        assert 9 in memory.memory
+
+        await memory.clear_memory(9)
+        assert memory.get_stats()["resident_bytes"] == expected_bytes(memory)
+        assert memory.get_stats()["resident_turns"] == sum(len(turns) for turns in memory.memory.values())
+
+    @pytest.mark.asyncio
+    async def test_search_returns_dicts(self, add_turn):
+        memory = InMemoryManager(max_turns=0, max_bytes=0)
+        await add_turn(memory, 1, "Расскажи про MCP", "MCP - это протокол")
+        await add_turn(memory, 1, "А Docker?", "Docker - контейнеры")
+
+        results = await memory.search_memory(1, "mcp")
+        assert contents(results) == ["Расскажи про MCP", "MCP - это протокол"]
+        assert results[1]["role"] == "assistant"
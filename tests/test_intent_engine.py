@@ -0,0 +1,105 @@
+"""
+Тесты скомпилированного движка намерений
+"""
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.services.intent_engine import IntentEngine, KeywordAutomaton, get_intent_engine_stats
+from bot.services.intent_detector import IntentDetector
+from bot.services.unified_intent_service import UnifiedIntentService
+
+
+class CountingEngine(IntentEngine):
+    def __init__(self):
+        super().__init__()
+        self.scans = 0
+
+    def scan(self, text):
+        self.scans += 1
+        return super().scan(text)
+
+
+class TestKeywordAutomaton:
+    """Тесты автомата Ахо-Корасик"""
+
+    def test_overlapping_and_nested_keywords(self):
+        automaton = KeywordAutomaton(["лайк", "дизлайк", "инста", "инстаграм", "тик ток"])
+
+        assert automaton.find("один дизлайк") == {"лайк", "дизлайк"}
+        assert automaton.find("мой инстаграм") == {"инста", "инстаграм"}
+        assert automaton.find("видео в тик ток") == {"тик ток"}
+        assert automaton.find("ничего") == frozenset()
+
+
+class TestIntentEngine:
+    """Тесты разбора сообщений"""
+
+    def test_basic_intents_in_priority_order(self):
+        engine = IntentEngine()
+
+        assert engine.scan("Спасибо и пока").basic == ["farewell", "gratitude"]
+        assert engine.scan("Доброй ночи").basic == ["farewell"]
+        # Целые слова: "хай" не находится внутри "хайп"
+        assert engine.scan("какой хайп").basic == []
+
+    def test_urls_and_questions(self):
+        engine = IntentEngine()
+
+        scan = engine.scan("Глянь https://youtu.be/jNQXAC9IVRw и https://vm.tiktok.com/ZMabc/")
+        assert scan.url == ("youtube", "https://youtu.be/jNQXAC9IVRw")
+        assert engine.scan("https://www.instagram.com/p/C1a2b3/").url[0] == "instagram"
+        assert engine.scan("сколько стоит бот").is_question
+        assert engine.scan("Really?").is_question
+        assert not engine.scan("сколькостоит").is_question
+
+    def test_specialized_intents_are_lazy(self):
+        engine = IntentEngine()
+        scan = engine.scan("покажи мои приложения")
+
+        assert scan.specialized is None
+        assert engine.specialized_intents(scan) == ["mcp_command"]
+        assert scan.specialized == ["mcp_command"]
+
+
+class TestSharedClassification:
+    """Тесты однократного разбора сообщения"""
+
+    @pytest.mark.asyncio
+    async def test_intent_cached_in_message_metadata(self, make_message):
+        engine = CountingEngine()
+        detector = IntentDetector(engine)
+        message = make_message("Привет! Как дела?")
+
+        first = await detector.detect(message)
+        second = await IntentDetector(engine).detect(message)
+
+        assert first["type"] == "greeting"
+        assert second is first
+        assert message.metadata["intent"] is first
+        assert engine.scans == 1
+
+    @pytest.mark.asyncio
+    async def test_unified_service_reuses_scan(self, make_message):
+        engine = CountingEngine()
+        message = make_message("Посмотри видео про продажи")
+
+        basic = await IntentDetector(engine).detect(message)
+        unified = await UnifiedIntentService(engine).detect(message)
+
+        assert basic["type"] == "social_media"
+        assert unified["type"] == "youtube_analysis"
+        assert engine.scans == 1
+        assert get_intent_engine_stats()["reused"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_detectors_agree_on_shared_intents(self, make_message):
+        for text in ["Добрый вечер", "спасибо", "до свидания", "бот не работает",
+                     "https://youtube.com/watch?v=abc", "сколько подписчиков в инсте?"]:
+            basic = await IntentDetector().detect(make_message(text))
+            unified = await UnifiedIntentService().detect(make_message(text))
+
+            assert basic["type"] == unified["type"], text
@@ -0,0 +1,147 @@
+"""
+Тесты общего реестра LLM клиентов
+"""
+import json
+import asyncio
+
+import httpx
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.config import LLMHttpConfig
+from bot.llm_clients import LLMClientRegistry, SharedTransport
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}]
+}
+
+
+def completion_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json=COMPLETION)
+
+
+async def start_keepalive_server():
+    """Минимальный HTTP/1.1 сервер с keep-alive, отвечающий chat completion"""
+    body = json.dumps(COMPLETION).encode()
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode().split("\r\n"):
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/v1", connections
+
+
+class TestLLMClientRegistry:
+    """Тесты LLMClientRegistry"""
+
+    def test_clients_are_cached_per_key(self):
+        registry = LLMClientRegistry(LLMHttpConfig(), transport=httpx.MockTransport(completion_handler))
+
+        first = registry.openai("sk-test")
+        assert registry.openai("sk-test") is first
+        assert registry.openai("sk-test", timeout=120) is not first
+        assert registry.openai("sk-other") is not first
+
+        stats = registry.get_stats()
+        assert stats["clients_created"] == {"openai": 3}
+        assert stats["lookups"] == {"openai": 4}
+
+    def test_all_clients_share_one_transport(self):
+        registry = LLMClientRegistry(LLMHttpConfig(), transport=httpx.MockTransport(completion_handler))
+
+        openai_client = registry.openai("sk-test")
+        anthropic_client = registry.anthropic("sk-ant-test")
+
+        assert openai_client._client._transport is registry.transport
+        assert anthropic_client._client._transport is registry.transport
+
+    @pytest.mark.asyncio
+    async def test_requests_go_through_shared_transport(self):
+        registry = LLMClientRegistry(LLMHttpConfig(), transport=httpx.MockTransport(completion_handler))
+        client = registry.openai("sk-test", base_url="https://llm.test/v1")
+
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+        )
+        # Закрытие клиента SDK не закрывает общий пул
+        await client.close()
+        await client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+
+        assert response.choices[0].message.content == "ok"
+        stats = registry.get_stats()
+        assert stats["requests"] == 2
+        assert stats["requests_by_host"] == {"llm.test": 2}
+
+    @pytest.mark.asyncio
+    async def test_connection_reuse_is_counted(self):
+        server, base_url, connections = await start_keepalive_server()
+        registry = LLMClientRegistry(LLMHttpConfig(http2=False))
+        try:
+            for _ in range(5):
+                # Как в генераторе ответов: клиент запрашивается на каждый вызов
+                client = registry.openai("sk-test", base_url=base_url)
+                await client.chat.completions.create(
+                    model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+                )
+        finally:
+            await registry.close()
+            server.close()
+            await server.wait_closed()
+
+        stats = registry.get_stats()
+        assert len(connections) == 1
+        assert stats["requests"] == 5
+        assert stats["connections_opened"] == 1
+        assert stats["connections_reused"] == 4
+        assert stats["reuse_ratio"] == 0.8
+
+
+class TestSharedTransport:
+    """Тесты SharedTransport"""
+
+    def test_pool_is_recreated_for_new_event_loop(self):
+        transport = SharedTransport(LLMHttpConfig())
+
+        async def get_pool():
+            return transport._get_transport()
+
+        first = asyncio.run(get_pool())
+        second = asyncio.run(get_pool())
+
+        assert first is not second
+        assert transport.get_stats()["transports_created"] == 2
+
+    def test_pool_settings_from_config(self):
+        transport = SharedTransport(LLMHttpConfig(max_connections=7, max_keepalive_connections=3, http2=False))
+        stats = transport.get_stats()
+
+        assert stats["max_connections"] == 7
+        assert stats["max_keepalive_connections"] == 3
+        assert stats["http2"] is False
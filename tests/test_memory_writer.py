@@ -0,0 +1,160 @@
+"""
+Тесты отложенной записи разговоров в Zep
+"""
+import asyncio
+
+import pytest
+
+
+class TestMemoryWriteBehind:
+    """Тесты очереди отложенной записи"""
+
+    @pytest.mark.asyncio
+    async def test_turns_batched_per_session(self, make_zep_manager, add_turn):
+        manager = make_zep_manager()
+        zep = manager.client.memory
+
+        await add_turn(manager, 1, "Привет", "Здравствуйте")
+        await add_turn(manager, 1, "Сколько стоит?", "От 50 000")
+        await add_turn(manager, 2, "Пока", "До встречи")
+        assert zep.added == []
+
+        await manager.writer.flush()
+
+        assert sorted(zep.added) == [
+            ("telegram_user_1", ["Привет", "Здравствуйте", "Сколько стоит?", "От 50 000"]),
+            ("telegram_user_2", ["Пока", "До встречи"])
+        ]
+        stats = manager.writer.get_stats()
+        assert stats["flushed_batches"] == 2
+        assert stats["queue_depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_pending_turns_visible_in_context(self, make_zep_manager, add_turn):
+        manager = make_zep_manager()
+
+        await add_turn(manager, 3, "Хочу бота", "Расскажите подробнее")
+        context = await manager.get_context(3, limit=10)
+
+        assert [item["content"] for item in context] == ["Хочу бота", "Расскажите подробнее"]
+        assert manager.writer.get_stats()["queue_depth"] == 2
+
+    @pytest.mark.asyncio
+    async def test_known_sessions_skip_session_check(self, make_zep_manager, add_turn):
+        manager = make_zep_manager()
+        zep = manager.client.memory
+
+        for text in ["раз", "два", "три"]:
+            await add_turn(manager, 4, text, "ок")
+            await manager.writer.flush()
+
+        assert zep.session_checks == 1
+        assert manager.get_write_stats()["session_checks"] == {"checked": 1, "skipped": 2}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_order(self, make_zep_manager, add_turn):
+        manager = make_zep_manager(failures=1)
+        zep = manager.client.memory
+
+        await add_turn(manager, 5, "первый", "1")
+        await manager.writer.flush()
+        await add_turn(manager, 5, "второй", "2")
+        await manager.writer.flush()
+
+        assert zep.added == [("telegram_user_5", ["первый", "1", "второй", "2"])]
+        assert manager.writer.get_stats()["failed_flushes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timer_and_full_batch_flush(self, make_zep_manager, add_turn):
+        manager = make_zep_manager(flush_interval=0.05, max_batch_messages=4)
+        zep = manager.client.memory
+
+        await add_turn(manager, 6, "a", "b")
+        await asyncio.sleep(0.15)
+        assert zep.added == [("telegram_user_6", ["a", "b"])]
+
+        manager.writer.settings.flush_interval = 60.0
+        await asyncio.sleep(0.06)
+        await add_turn(manager, 7, "c", "d")
+        await add_turn(manager, 7, "e", "f")
+        await asyncio.sleep(0.05)
+        assert zep.added[-1] == ("telegram_user_7", ["c", "d", "e", "f"])
+
+        await manager.writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_and_full_queue_writes_directly(self, make_zep_manager, add_turn):
+        manager = make_zep_manager(max_queue_messages=2)
+        zep = manager.client.memory
+
+        await add_turn(manager, 8, "в очередь", "1")
+        await add_turn(manager, 8, "сразу", "2")
+        # Реплики из очереди записываются раньше - порядок сохраняется
+        assert zep.added == [("telegram_user_8", ["в очередь", "1"]), ("telegram_user_8", ["сразу", "2"])]
+        assert manager.writer.get_stats()["rejected_turns"] == 1
+
+        await add_turn(manager, 9, "при остановке", "3")
+        await manager.writer.stop()
+
+        assert zep.added[-1] == ("telegram_user_9", ["при остановке", "3"])
+        assert manager.writer.get_stats()["lag_ms"]["max"] > 0
+
+    @staticmethod
+    def _hold_writes(zep, fail: bool = False):
+        """Запись в Zep ждет release; fail - после этого завершается ошибкой"""
+        started, release = asyncio.Event(), asyncio.Event()
+        add = zep.add
+
+        async def held_add(session_id, messages):
+            started.set()
+            await release.wait()
+            if fail:
+                raise RuntimeError("Zep недоступен")
+            await add(session_id, messages)
+
+        zep.add = held_add
+        return started, release
+
+    @pytest.mark.asyncio
+    async def test_clear_waits_for_flush_in_progress(self, make_zep_manager, add_turn):
+        manager = make_zep_manager()
+        zep = manager.client.memory
+        started, release = self._hold_writes(zep)
+
+        await add_turn(manager, 10, "секрет", "ок")
+        flush = asyncio.create_task(manager.writer.flush())
+        await started.wait()
+
+        clear = asyncio.create_task(manager.clear_memory(10))
+        await asyncio.sleep(0.01)
+        # Пачка еще пишется - удаление ждет ее
+        assert zep.deleted == []
+        assert await manager.get_context(10, limit=10) == []
+
+        release.set()
+        await asyncio.gather(flush, clear)
+
+        assert zep.deleted == ["telegram_user_10"]
+        assert zep.added == []
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_after_clear_is_dropped(self, make_zep_manager, add_turn):
+        manager = make_zep_manager()
+        zep = manager.client.memory
+        started, release = self._hold_writes(zep, fail=True)
+
+        await add_turn(manager, 11, "секрет", "ок")
+        flush = asyncio.create_task(manager.writer.flush())
+        await started.wait()
+
+        clear = asyncio.create_task(manager.clear_memory(11))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(flush, clear)
+
+        # Очищенные реплики не возвращаются в очередь, новые пишутся как обычно
+        assert manager.writer.get_stats()["queue_depth"] == 0
+        del zep.add
+        await add_turn(manager, 11, "после очистки", "ок")
+        await manager.writer.flush()
+        assert zep.added == [("telegram_user_11", ["после очистки", "ок"])]
@@ -0,0 +1,155 @@
+"""
+Тесты ASGI middleware webhook сервера
+"""
+import httpx
+import pytest
+from fastapi import FastAPI
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.config import config, WebhookConfig
+from bot.webhook.middleware import (
+    SecurityMiddleware, LoggingMiddleware, ErrorHandlerMiddleware,
+    WebhookFastPathMiddleware, verify_secret_token, get_fast_path_stats
+)
+
+
+def make_app() -> FastAPI:
+    """Приложение с тем же порядком middleware, что и create_app"""
+    app = FastAPI()
+    app.add_middleware(ErrorHandlerMiddleware)
+    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(SecurityMiddleware)
+    app.add_middleware(WebhookFastPathMiddleware)
+
+    @app.post("/webhook")
+    async def webhook():
+        return {"ok": True}
+
+    @app.post("/webhook/set")
+    async def webhook_set():
+        return {"success": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    @app.post("/webhook/telegram")
+    async def webhook_boom():
+        raise RuntimeError("webhook boom")
+
+    return app
+
+
+@pytest.fixture
+def secret(monkeypatch):
+    monkeypatch.setattr(config.webhook, "secret_token", "s3cret")
+    monkeypatch.setattr(config.webhook, "verify_secret", True)
+    return "s3cret"
+
+
+async def request(method: str, path: str, **kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=make_app(), raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request(method, path, **kwargs)
+
+
+class TestVerifySecretToken:
+    """Тесты проверки secret token"""
+
+    def test_verify(self):
+        assert verify_secret_token(b"abc", "abc")
+        assert not verify_secret_token(b"abd", "abc")
+        assert not verify_secret_token(None, "abc")
+        assert verify_secret_token(None, "")
+
+    def test_missing_secret_disables_verification(self, monkeypatch, caplog):
+        monkeypatch.delenv("TELEGRAM_WEBHOOK_SECRET", raising=False)
+        monkeypatch.delenv("WEBHOOK_VERIFY_SECRET", raising=False)
+
+        webhook = WebhookConfig.from_env()
+
+        assert webhook.secret_token == ""
+        assert not webhook.verify_secret
+        assert "проверка secret token ОТКЛЮЧЕНА" in caplog.text
+
+        monkeypatch.setenv("TELEGRAM_WEBHOOK_SECRET", "s3cret")
+        assert WebhookConfig.from_env().verify_secret
+
+
+class TestWebhookFastPath:
+    """Тесты быстрого пути POST /webhook"""
+
+    @pytest.mark.asyncio
+    async def test_valid_secret_passes(self, secret):
+        before = get_fast_path_stats()["requests"]
+        response = await request(
+            "POST", "/webhook", json={"update_id": 1},
+            headers={"X-Telegram-Bot-Api-Secret-Token": secret}
+        )
+
+        assert response.json() == {"ok": True}
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert "x-process-time" in response.headers
+        assert get_fast_path_stats()["requests"] == before + 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_secret_rejected(self, secret):
+        before = get_fast_path_stats()["rejected"]
+        response = await request(
+            "POST", "/webhook", json={"update_id": 1},
+            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"ok": False, "error": "Invalid secret token"}
+        assert get_fast_path_stats()["rejected"] == before + 1
+
+    @pytest.mark.asyncio
+    async def test_verification_can_be_disabled(self, secret, monkeypatch):
+        monkeypatch.setattr(config.webhook, "verify_secret", False)
+        response = await request("POST", "/webhook", json={"update_id": 1})
+
+        assert response.json() == {"ok": True}
+
+    @pytest.mark.asyncio
+    async def test_management_endpoints_not_checked(self, secret):
+        response = await request("POST", "/webhook/set")
+
+        assert response.json() == {"success": True}
+
+    @pytest.mark.asyncio
+    async def test_webhook_error_captured(self, secret):
+        response = await request(
+            "POST", "/webhook/telegram", json={},
+            headers={"X-Telegram-Bot-Api-Secret-Token": secret}
+        )
+
+        assert response.status_code == 500
+        assert response.headers["x-frame-options"] == "DENY"
+
+
+class TestGeneralMiddleware:
+    """Тесты слоев для остальных запросов"""
+
+    @pytest.mark.asyncio
+    async def test_headers_and_timing(self):
+        response = await request("GET", "/health")
+
+        assert response.json() == {"status": "healthy"}
+        assert response.headers["x-xss-protection"] == "1; mode=block"
+        assert float(response.headers["x-process-time"]) >= 0
+
+    @pytest.mark.asyncio
+    async def test_error_handler(self):
+        response = await request("GET", "/boom")
+
+        assert response.status_code == 500
+        assert "error" in response.json()
@@ -0,0 +1,141 @@
+"""
+Тесты каскада моделей IntelligentAgent
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent.core.model_cascade import CascadeStats, ModelCascade, RouteDecision
+from bot.core.logging import RequestLog
+
+
+def text_message(content):
+    return SimpleNamespace(content=content, tool_calls=None)
+
+
+def tool_message(name, arguments):
+    return SimpleNamespace(content=None, tool_calls=[SimpleNamespace(
+        id="call_0",
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments, ensure_ascii=False))
+    )])
+
+
+@pytest.fixture
+def cascade_agent(make_agent):
+    """Агент с каскадом mini/large; возвращает (агент, статистика каскада)"""
+    def factory(answers, **cascade_settings):
+        stats = CascadeStats()
+        cascade = ModelCascade(fast_model="mini", strong_model="large", stats=stats, **cascade_settings)
+        agent = make_agent(
+            answers, final_text="Итог от {model}", model="large", cascade=cascade,
+            usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+        )
+        stats.prices = {"mini": (0.15, 0.6), "large": (2.5, 10.0)}
+        return agent, stats
+
+    return factory
+
+
+def requested_models(agent):
+    return [call["model"] for call in agent.client.chat.completions.calls]
+
+
+class TestModelCascade:
+    """Тесты маршрутизации и эскалации"""
+
+    @pytest.mark.asyncio
+    async def test_small_talk_stays_on_fast_model(self, cascade_agent):
+        agent, stats = cascade_agent({"mini": text_message("Все отлично, чем помочь?")})
+
+        with RequestLog(update_id=1) as request_log:
+            response = await agent.process_message("как дела?", "42")
+
+        assert response.message == "Все отлично, чем помочь?"
+        assert requested_models(agent) == ["mini"]
+        assert request_log.fields["model_tier"] == "fast"
+
+        result = stats.get_stats("large")
+        assert result["escalation_rate"] == 0.0
+        assert result["tiers"]["fast"]["cost_usd"] == pytest.approx(0.00021)
+        assert result["saved_usd"] == pytest.approx(0.0035 - 0.00021)
+
+    @pytest.mark.asyncio
+    async def test_obvious_mcp_command_runs_without_llm(self, cascade_agent):
+        agent, stats = cascade_agent({})
+
+        response = await agent.process_message("покажи мои приложения", "42")
+
+        assert response.message == "📱 Приложения: bot, admin"
+        assert agent.claude_code_service.commands == ["покажи мои приложения"]
+        assert requested_models(agent) == []
+        assert stats.get_stats()["routes"] == {"local:mcp_command": 1}
+
+    @pytest.mark.parametrize("message", [
+        "get me a happy birthday poem",
+        "какие данные нужны для регистрации ИП",
+        "покажи приложения для фитнеса"
+    ])
+    def test_chat_mentioning_mcp_words_goes_to_fast_model(self, message):
+        cascade = ModelCascade(stats=CascadeStats())
+
+        assert cascade.route(message).tier == "fast"
+
+    def test_explicit_commands_run_locally(self):
+        cascade = ModelCascade(stats=CascadeStats())
+
+        for message in ("/mcp list apps", "/db select count(*) from users", "статус деплоя"):
+            decision = cascade.route(message)
+            assert (decision.tier, decision.expected_tool) == ("local", "claude_code_direct")
+
+    @pytest.mark.asyncio
+    async def test_uncertain_fast_answer_escalates(self, cascade_agent):
+        agent, stats = cascade_agent({
+            "mini": text_message("Не уверен, что понял вопрос"),
+            "large": text_message("Развернутый ответ")
+        })
+
+        with RequestLog(update_id=1) as request_log:
+            response = await agent.process_message("что нового в моем проекте", "42")
+
+        assert response.message == "Развернутый ответ"
+        assert requested_models(agent) == ["mini", "large"]
+        assert request_log.fields["model_escalation"] == "uncertain_answer"
+        assert stats.get_stats()["escalation_reasons"] == {"uncertain_answer": 1}
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool_escalates(self, cascade_agent):
+        agent, _ = cascade_agent({
+            "mini": tool_message("delete_everything", {}),
+            "large": text_message("Такой команды нет")
+        })
+
+        response = await agent.process_message("удали базу", "42")
+
+        assert response.message == "Такой команды нет"
+        assert requested_models(agent) == ["mini", "large"]
+
+    @pytest.mark.asyncio
+    async def test_complex_request_goes_to_strong_model(self, cascade_agent):
+        agent, stats = cascade_agent({"large": text_message("План миграции")})
+
+        await agent.process_message("Спланируй миграцию базы на новый кластер", "42")
+        await agent.process_message("расскажи " + "очень подробно " * 40, "42")
+
+        assert requested_models(agent) == ["large", "large"]
+        assert stats.get_stats()["routes"] == {"strong:complex": 1, "strong:long_message": 1}
+
+    def test_youtube_link_answered_with_text_is_low_confidence(self):
+        cascade = ModelCascade(stats=CascadeStats())
+        decision = cascade.route("https://youtu.be/jNQXAC9IVRw")
+
+        assert decision == RouteDecision("fast", "gpt-4o-mini", "default", "analyze_youtube_video")
+        assert cascade.assess(decision, text_message("Это видео"), {"analyze_youtube_video"}) == (0.3, "missed_tool")
+        assert cascade.assess(
+            decision, tool_message("analyze_youtube_video", {"url": "x"}), {"analyze_youtube_video"}
+        ) == (0.95, None)
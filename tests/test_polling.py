@@ -0,0 +1,94 @@
+"""
+Тесты long polling ingestion
+"""
+import asyncio
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.webhook.polling import UpdatePoller
+
+
+class FakeClient:
+    """Заглушка TelegramClient, отдающая заранее заданные пачки updates"""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.calls = []
+
+    async def call(self, method, params=None, timeout=None):
+        self.calls.append((method, dict(params or {})))
+        if method == "getUpdates":
+            if self.batches:
+                return self.batches.pop(0)
+            await asyncio.sleep(0.01)
+            return []
+        return True
+
+
+class TestUpdatePoller:
+    """Тесты UpdatePoller"""
+
+    @pytest.mark.asyncio
+    async def test_offset_tracking_and_parameters(self):
+        client = FakeClient([
+            [{"update_id": 10}, {"update_id": 11}],
+            [{"update_id": 12}]
+        ])
+        received = []
+
+        async def handler(update):
+            received.append(update["update_id"])
+            return True
+
+        poller = UpdatePoller(client, handler, allowed_updates=["message"], limit=500, poll_timeout=5)
+        await poller.poll_once()
+        await poller.poll_once()
+
+        assert received == [10, 11, 12]
+        assert poller.offset == 13
+        first_params = client.calls[0][1]
+        assert first_params["limit"] == 100
+        assert first_params["allowed_updates"] == ["message"]
+        assert client.calls[1][1]["offset"] == 12
+
+    @pytest.mark.asyncio
+    async def test_offset_not_advanced_until_accepted(self):
+        client = FakeClient([[{"update_id": 1}]])
+        attempts = []
+
+        async def handler(update):
+            attempts.append(update["update_id"])
+            return len(attempts) > 1
+
+        poller = UpdatePoller(client, handler)
+        poller.RETRY_ACCEPT_DELAY = 0
+        await poller.poll_once()
+
+        assert attempts == [1, 1]
+        assert poller.offset == 2
+        assert poller.get_stats()["accept_retries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_start_deletes_webhook_and_polls(self):
+        client = FakeClient([[{"update_id": 1}, {"update_id": 2}]])
+        received = []
+
+        async def handler(update):
+            received.append(update["update_id"])
+            return True
+
+        poller = UpdatePoller(client, handler)
+        await poller.start()
+        await asyncio.sleep(0.05)
+        await poller.stop()
+
+        assert client.calls[0][0] == "deleteWebhook"
+        assert received == [1, 2]
+        stats = poller.get_stats()
+        assert stats["updates"] == 2
+        assert not stats["running"]
@@ -0,0 +1,144 @@
+"""
+Тесты шаблонных ответов на тривиальные сообщения
+"""
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.agent import ArtemAgent
+from bot.core.config import QuickReplyConfig
+from bot.core.interfaces import Response
+from bot.core.logging import RequestLog
+from bot.services.intent_detector import IntentDetector
+from bot.services.unified_intent_service import UnifiedIntentService
+from bot.services.quick_replies import QuickReplyResponder
+
+INSTRUCTIONS = {
+    "system_instruction": "Ты - ассистент",
+    "quick_replies": {
+        "greeting": ["Приветствую, {name}!", "Приветствую!"],
+        "gratitude": "Рад помочь!",
+        "help": ["Я помогаю с AI-автоматизацией."]
+    }
+}
+
+
+def make_responder(**settings) -> QuickReplyResponder:
+    return QuickReplyResponder(QuickReplyConfig(enabled=True, **settings))
+
+
+@pytest.fixture
+def reply(make_message):
+    """Ответ responder'а на сообщение пользователя (по умолчанию без имени)"""
+    async def answer(responder: QuickReplyResponder, text: str, first_name: str = None):
+        message = make_message(text, first_name=first_name)
+        intent = await IntentDetector().detect(message)
+        return responder.reply(message, intent, INSTRUCTIONS)
+
+    return answer
+
+
+class TestQuickReplyResponder:
+    """Тесты QuickReplyResponder"""
+
+    @pytest.mark.asyncio
+    async def test_trivial_messages_answered_from_templates(self, reply):
+        responder = make_responder()
+
+        assert (await reply(responder, "Привет!")).text == "Приветствую!"
+        assert (await reply(responder, "спасибо большое)")).text == "Рад помочь!"
+        assert (await reply(responder, "Что умеешь?")).text == "Я помогаю с AI-автоматизацией."
+
+        response = await reply(responder, "привет")
+        assert response.metadata["quick_reply"] is True
+        assert response.metadata["tokens_used"] == 0
+
+    @pytest.mark.asyncio
+    async def test_personalized_template(self, reply):
+        responder = make_responder()
+
+        assert (await reply(responder, "Добрый день", first_name="Анна")).text == "Приветствую, Анна!"
+        assert (await reply(make_responder(personalize=False), "Привет", first_name="Анна")).text == "Приветствую!"
+
+    @pytest.mark.asyncio
+    async def test_messages_with_content_go_to_llm(self, reply):
+        responder = make_responder()
+
+        assert await reply(responder, "Привет, сколько стоит бот?") is None
+        assert await reply(responder, "Спасибо, а интеграция с amoCRM тоже есть") is None
+        assert await reply(responder, "помоги настроить интеграцию с CRM") is None
+        assert await reply(responder, "привет, вот ссылка https://example.com") is None
+        # Намерение без шаблона
+        assert await reply(responder, "пока") is None
+
+        stats = responder.get_stats()["by_intent"]
+        assert stats["greeting"]["not_trivial"] == 2
+        assert stats["farewell"]["no_template"] == 1
+
+    @pytest.mark.asyncio
+    async def test_per_intent_switch_and_confidence(self, reply, make_message):
+        responder = make_responder(intents=["gratitude"])
+
+        assert await reply(responder, "Привет") is None
+        assert (await reply(responder, "Спасибо")).text == "Рад помочь!"
+
+        message = make_message("привет")
+        assert responder.reply(message, {"type": "gratitude", "confidence": 0.5}, INSTRUCTIONS) is None
+        assert responder.get_stats()["skipped"] == {"disabled": 1, "low_confidence": 1}
+
+    @pytest.mark.asyncio
+    async def test_unified_intent_service_results(self, make_message):
+        responder = make_responder()
+        message = make_message("Благодарю!")
+
+        intent = await UnifiedIntentService().detect(message)
+
+        assert responder.reply(message, intent, INSTRUCTIONS).text == "Рад помочь!"
+
+
+class CountingMemory:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_context(self, user_id, limit=10):
+        self.calls += 1
+        return []
+
+    async def add_message(self, user_id, message, response):
+        self.calls += 1
+
+
+class CountingGenerator:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, message, context):
+        self.calls += 1
+        return Response(text="Ответ от LLM", metadata={"tokens_used": 100})
+
+
+class TestArtemAgentQuickReplies:
+    """Тесты быстрого пути в ArtemAgent"""
+
+    @pytest.mark.asyncio
+    async def test_trivial_message_skips_memory_and_llm(self, make_message):
+        agent = ArtemAgent()
+        agent.memory_manager = CountingMemory()
+        agent.response_generator = CountingGenerator()
+        agent.response_cache = None
+        agent.instructions = INSTRUCTIONS
+        agent.quick_replies = make_responder()
+
+        with RequestLog(update_id=1) as request_log:
+            greeting = await agent.process_message(make_message("Привет", first_name=None))
+        question = await agent.process_message(make_message("Привет, сколько стоит бот?", first_name=None))
+
+        assert greeting.text == "Приветствую!"
+        assert request_log.fields["quick_reply"] == "greeting"
+        assert question.text == "Ответ от LLM"
+        assert agent.response_generator.calls == 1
+        assert agent.memory_manager.calls == 2
+        assert agent.quick_replies.get_stats()["llm_calls_avoided"] == 1
@@ -0,0 +1,181 @@
+"""
+Тесты потоковой отправки ответов LLM
+"""
+import asyncio
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.logging import RequestLog
+from bot.reply_stream import ReplyStream, current_reply_stream, reply_stream_scope, get_stream_stats
+from bot.telegram_client import TelegramAPIError
+
+
+class FakeScheduler:
+    """Заглушка SendScheduler, записывающая отправки и правки"""
+
+    def __init__(self, delay: float = 0.0, fail_send: bool = False, bad_markup: bool = False):
+        self.sent = []
+        self.edits = []
+        self.delay = delay
+        self.fail_send = fail_send
+        self.bad_markup = bad_markup
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.delay)
+        if self.fail_send:
+            self.fail_send = False
+            raise TelegramAPIError("sendMessage", error_code=500, description="Internal Server Error")
+        self.sent.append((chat_id, text, kwargs))
+        return {"message_id": 100 + len(self.sent)}
+
+    async def submit(self, method, params):
+        await asyncio.sleep(self.delay)
+        assert method == "editMessageText"
+        if self.bad_markup and params.get("parse_mode"):
+            raise TelegramAPIError(method, error_code=400, description="Bad Request: can't parse entities")
+        self.edits.append(params)
+        return True
+
+
+async def feed(stream: ReplyStream, pieces, pause: float = 0.0):
+    stream.begin()
+    for piece in pieces:
+        stream.push(piece)
+        await asyncio.sleep(pause)
+    stream.complete()
+
+
+class TestReplyStream:
+    """Тесты ReplyStream"""
+
+    @pytest.mark.asyncio
+    async def test_first_message_sent_before_generation_ends(self):
+        scheduler = FakeScheduler()
+        stream = ReplyStream(1, scheduler=scheduler, first_chars=5, edit_interval=10, min_chars=1000)
+
+        stream.begin()
+        stream.push("Привет, ")
+        await asyncio.sleep(0.01)
+
+        # Генерация еще идет, а начало ответа уже в чате
+        assert stream.started
+        assert scheduler.sent == [(1, "Привет,", {"business_connection_id": None})]
+        assert stream.message_id == 101
+
+        stream.push("как дела?")
+        stream.complete()
+        result = await stream.finish("Привет, как дела?")
+
+        assert result == {"message_id": 101, "edits": 1, "streamed": True}
+        assert scheduler.edits[-1]["text"] == "Привет, как дела?"
+        assert len(scheduler.sent) == 1
+
+    @pytest.mark.asyncio
+    async def test_not_started_below_first_chars(self):
+        scheduler = FakeScheduler()
+        stream = ReplyStream(1, scheduler=scheduler, first_chars=50)
+
+        await feed(stream, ["Да", "."])
+
+        assert not stream.started
+        assert scheduler.sent == []
+
+    @pytest.mark.asyncio
+    async def test_edits_are_throttled(self):
+        scheduler = FakeScheduler()
+        stream = ReplyStream(1, scheduler=scheduler, first_chars=1, edit_interval=0.05, min_chars=5)
+
+        # 100 кусков за ~0.2с: правок должно быть не больше чем 0.2 / 0.05
+        await feed(stream, ["слово "] * 100, pause=0.002)
+        full_text = "слово " * 100
+        await stream.finish(full_text)
+
+        assert len(scheduler.sent) == 1
+        assert 1 <= len(scheduler.edits) <= 8
+        assert scheduler.edits[-1]["text"] == full_text.strip()
+
+    @pytest.mark.asyncio
+    async def test_small_growth_waits_for_finish(self):
+        scheduler = FakeScheduler()
+        stream = ReplyStream(1, scheduler=scheduler, first_chars=1, edit_interval=0, min_chars=100)
+
+        await feed(stream, ["Ок", ", ", "понял"], pause=0.01)
+        assert scheduler.edits == []
+
+        await stream.finish("Ок, понял")
+        assert [edit["text"] for edit in scheduler.edits] == ["Ок, понял"]
+
+    @pytest.mark.asyncio
+    async def test_finish_falls_back_to_send_when_first_message_failed(self):
+        scheduler = FakeScheduler(fail_send=True)
+        stream = ReplyStream(1, scheduler=scheduler, first_chars=1)
+
+        await feed(stream, ["Ответ"], pause=0.01)
+        result = await stream.finish("Ответ полностью")
+
+        assert result["streamed"] is False
+        assert scheduler.sent == [(1, "Ответ полностью", {"parse_mode": None, "business_connection_id": None})]
+
+    @pytest.mark.asyncio
+    async def test_final_markup_falls_back_to_plain_text(self):
+        scheduler = FakeScheduler(bad_markup=True)
+        stream = ReplyStream(1, business_connection_id="bc", scheduler=scheduler, first_chars=1)
+
+        await feed(stream, ["<b>Ответ"], pause=0.01)
+        await stream.finish("<b>Ответ", parse_mode="HTML")
+
+        assert scheduler.sent[0][2] == {"business_connection_id": "bc"}
+        assert scheduler.edits == []  # Текст не изменился, разметка не разобралась - правка не нужна
+
+    @pytest.mark.asyncio
+    async def test_long_reply_is_truncated(self):
+        scheduler = FakeScheduler()
+        stream = ReplyStream(1, scheduler=scheduler, first_chars=1, edit_interval=0, min_chars=1, max_length=20)
+
+        await feed(stream, ["x" * 50], pause=0.01)
+        await stream.finish("x" * 50)
+
+        assert len(scheduler.sent[0][1]) == 20
+        assert all(len(edit["text"]) <= 20 for edit in scheduler.edits)
+
+    @pytest.mark.asyncio
+    async def test_timings_recorded_in_request_log(self):
+        scheduler = FakeScheduler()
+        with RequestLog(update_id=1) as request_log:
+            stream = ReplyStream(1, scheduler=scheduler, first_chars=1)
+            stream.begin()
+            await asyncio.sleep(0.02)
+            stream.push("Ответ")
+            stream.complete()
+            await stream.finish("Ответ")
+
+        assert request_log.fields["llm_ttft_ms"] >= 15
+        assert request_log.fields["llm_complete_ms"] >= request_log.fields["llm_ttft_ms"]
+        assert "stream_visible_ms" in request_log.fields
+        assert request_log.fields["stream_edits"] == 0
+
+        stats = get_stream_stats()
+        assert stats["streams"] >= 1
+        assert stats["ttft_ms"]["p95"] > 0
+
+
+class TestReplyStreamScope:
+    """Тесты привязки потока к обработке update"""
+
+    def test_scope_sets_and_resets(self):
+        stream = object.__new__(ReplyStream)
+
+        assert current_reply_stream() is None
+        with reply_stream_scope(stream):
+            assert current_reply_stream() is stream
+        assert current_reply_stream() is None
+
+    def test_scope_without_stream(self):
+        with reply_stream_scope(None) as stream:
+            assert stream is None
+            assert current_reply_stream() is None
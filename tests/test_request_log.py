@@ -0,0 +1,103 @@
+"""
+Тесты структурированного лога обработки update
+"""
+import logging
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.logging import RequestLog, request_stage, annotate_request, current_request_log
+
+
+@pytest.fixture
+def records(caplog):
+    caplog.set_level(logging.INFO, logger="bot.requests")
+    return lambda: [r for r in caplog.records if r.name == "bot.requests"]
+
+
+def payload_factory(calls):
+    def payload():
+        calls.append(1)
+        return {"update_id": 1, "message": {"text": "hi"}}
+    return payload
+
+
+class TestRequestLog:
+    """Тесты RequestLog"""
+
+    def test_single_record_with_stages(self, records):
+        with RequestLog(update_id=1, kind="message") as request_log:
+            with request_stage("agent"):
+                pass
+            with request_stage("agent"):
+                pass
+            annotate_request(chat_id=42, ok=True)
+            assert current_request_log() is request_log
+
+        assert current_request_log() is None
+        emitted = records()
+        assert len(emitted) == 1
+        data = emitted[0].request
+        assert data["update_id"] == 1
+        assert data["chat_id"] == 42
+        assert set(data["stages_ms"]) == {"agent"}
+        assert "payload" not in data
+
+    def test_payload_not_built_when_not_sampled(self, records):
+        calls = []
+        with RequestLog(payload=payload_factory(calls), sample_rate=0.0, update_id=1):
+            pass
+
+        assert calls == []
+        assert "payload" not in records()[0].request
+
+    def test_payload_dumped_when_sampled(self, records):
+        calls = []
+        with RequestLog(payload=payload_factory(calls), sample_rate=1.0, update_id=1):
+            pass
+
+        data = records()[0].request
+        assert data["dump_reason"] == "sampled"
+        assert data["payload"]["message"]["text"] == "hi"
+
+    def test_failed_request_dumped_as_warning(self, records):
+        calls = []
+        with RequestLog(payload=payload_factory(calls), update_id=1) as request_log:
+            request_log.set(ok=False)
+
+        record = records()[0]
+        assert record.levelno == logging.WARNING
+        assert record.request["dump_reason"] == "failed"
+
+    def test_exception_recorded(self, records):
+        with pytest.raises(RuntimeError):
+            with RequestLog(payload=lambda: {}, update_id=1):
+                raise RuntimeError("boom")
+
+        assert records()[0].request["error"] == "boom"
+
+    def test_slow_request_dumped(self, records):
+        with RequestLog(payload=lambda: {"update_id": 1}, slow_ms=0, update_id=1):
+            pass
+
+        data = records()[0].request
+        assert data["slow"] is True
+        assert data["dump_reason"] == "slow"
+
+    def test_nothing_built_when_level_filtered(self, caplog):
+        caplog.set_level(logging.ERROR, logger="bot.requests")
+        calls = []
+        with RequestLog(payload=payload_factory(calls), sample_rate=1.0, update_id=1):
+            pass
+
+        assert calls == []
+        assert not [r for r in caplog.records if r.name == "bot.requests"]
+
+    def test_helpers_outside_request_are_noop(self):
+        with request_stage("agent"):
+            annotate_request(chat_id=1)
+        assert current_request_log() is None
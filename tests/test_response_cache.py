@@ -0,0 +1,197 @@
+"""
+Тесты семантического кеша ответов
+"""
+from datetime import datetime
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.config import ResponseCacheConfig
+from bot.core.interfaces import Message, MessageType, Response, User
+from bot.services.response_cache import (
+    SemanticResponseCache, HashingVectorizer, normalize_text, instructions_version
+)
+
+pytest.importorskip("numpy")
+
+VERSION = "v1"
+
+
+def make_response(text: str, tokens: int = 300) -> Response:
+    return Response(text=text, metadata={"model": "gpt-4o-mini", "tokens_used": tokens})
+
+
+def make_cache(**settings) -> SemanticResponseCache:
+    return SemanticResponseCache(ResponseCacheConfig(enabled=True, **settings), dimensions=512)
+
+
+class TestNormalization:
+    """Тесты нормализации и векторизации"""
+
+    def test_normalize_text(self):
+        assert normalize_text("Подскажите, пожалуйста: какая ЦЕНА?!") == "какая цена"
+        assert normalize_text("Всё ещё") == "все еще"
+
+    def test_similar_questions_are_close(self):
+        vectorizer = HashingVectorizer(512)
+        base = vectorizer.transform("как с вами связаться")
+
+        assert float(base @ vectorizer.transform("как связаться с вами")) > 0.85
+        assert float(base @ vectorizer.transform("какая цена на пошив")) < 0.5
+
+    def test_instructions_version_changes_with_content(self):
+        first = instructions_version({"system_instruction": "A", "version": "2.0"})
+
+        assert first.startswith("2.0:")
+        assert instructions_version({"system_instruction": "B", "version": "2.0"}) != first
+        assert instructions_version({"system_instruction": "A", "version": "2.0"}) == first
+
+
+class TestSemanticResponseCache:
+    """Тесты SemanticResponseCache"""
+
+    def test_exact_and_semantic_hits(self, make_message):
+        cache = make_cache()
+        key = cache.make_key(make_message("Как с вами связаться?"), [])
+        assert cache.get(key, VERSION) is None
+        assert cache.put(key, make_response("Пишите нам в Telegram"), VERSION)
+
+        exact = cache.get(cache.make_key(make_message("как с вами связаться"), []), VERSION)
+        similar = cache.get(cache.make_key(make_message("Как связаться с вами?"), []), VERSION)
+        other = cache.get(cache.make_key(make_message("Какая цена на пошив?"), []), VERSION)
+
+        assert exact.text == similar.text == "Пишите нам в Telegram"
+        assert exact.metadata["cached"] is True and exact.metadata["tokens_used"] == 0
+        assert similar.metadata["cache_similarity"] < 1.0
+        assert other is None
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 2
+        assert stats["exact_hits"] == 1 and stats["semantic_hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["hit_rate"] == 0.5
+        assert stats["saved_tokens"] == 600
+
+    def test_context_dependent_messages_bypass_cache(self, make_message):
+        cache = make_cache(max_chars=50)
+        history = [
+            {"role": "user", "content": "Шьете футболки?"},
+            {"role": "assistant", "content": "Да, шьем. Какой тираж вам нужен?"}
+        ]
+
+        assert cache.make_key(make_message("а сколько это стоит?"), history[:1]) is None
+        assert cache.make_key(make_message("100 штук"), history) is None
+        assert cache.make_key(make_message("/start", message_type=MessageType.COMMAND), []) is None
+        assert cache.make_key(make_message("Посмотри https://youtu.be/abc"), []) is None
+        assert cache.make_key(make_message("очень " * 20), []) is None
+        assert cache.make_key(make_message("привет"), [], {"type": "complaint"}) is None
+        assert cache.make_key(make_message(None, message_type=MessageType.VOICE), []) is None
+        # Без истории вопрос не может быть уточнением
+        assert cache.make_key(make_message("сколько это стоит?"), []) == "сколько это стоит"
+
+        assert cache.get_stats()["bypassed"] == {
+            "follow_up": 1, "answer": 1, "command": 1, "url": 1, "long": 1, "intent": 1, "type": 1
+        }
+
+    def test_personalized_response_not_stored(self, make_message):
+        cache = make_cache()
+        message = make_message("привет")
+        key = cache.make_key(message, [])
+
+        assert not cache.put(key, make_response("Привет, Иван! Чем помочь?"), VERSION, message.user)
+        assert not cache.put(key, Response(text="Ошибка", metadata={"error": "timeout"}), VERSION)
+        assert cache.get(key, VERSION) is None
+        assert cache.get_stats()["not_stored"] == 2
+
+    def test_lru_eviction(self):
+        cache = make_cache(max_entries=2)
+        for question in ("сроки изготовления", "адрес офиса"):
+            cache.put(normalize_text(question), make_response(question), VERSION)
+
+        # Обращение делает "сроки" свежими, вытесняется "адрес"
+        assert cache.get("сроки изготовления", VERSION) is not None
+        cache.put("способы оплаты", make_response("оплата"), VERSION)
+
+        assert cache.get("адрес офиса", VERSION) is None
+        assert cache.get("сроки изготовления", VERSION) is not None
+        assert cache.get("способы оплаты", VERSION) is not None
+        stats = cache.get_stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+
+    def test_instruction_version_change_invalidates(self):
+        cache = make_cache()
+        cache.put("какая цена", make_response("1000 рублей"), VERSION)
+
+        assert cache.get("какая цена", VERSION) is not None
+        assert cache.get("какая цена", "v2") is None
+
+        stats = cache.get_stats()
+        assert stats["invalidations"] == 1
+        assert stats["version"] == "v2"
+        assert stats["size"] == 0
+
+    def test_expired_entry_is_dropped(self):
+        cache = make_cache(ttl=60)
+        cache.put("какая цена", make_response("1000 рублей"), VERSION)
+        cache._entries["какая цена"].created_at -= 120
+
+        assert cache.get("какая цена", VERSION) is None
+        assert cache.get_stats()["expired"] == 1
+        assert cache.get_stats()["size"] == 0
+
+    def test_disabled_cache(self, make_message):
+        cache = SemanticResponseCache(ResponseCacheConfig(enabled=False))
+
+        assert cache.make_key(make_message("какая цена"), []) is None
+        assert cache.get(None, VERSION) is None
+        assert not cache.put(None, make_response("ответ"), VERSION)
+
+
+class ContextGenerator:
+    """Ответ зависит от истории разговора пользователя"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, message, context):
+        self.calls += 1
+        if context:
+            return make_response(f"С учетом вашего заказа: {context[0]['content']}")
+        return make_response("Цены от 1000 рублей")
+
+
+class TestArtemAgentResponseCache:
+    """Тесты кеша ответов в ArtemAgent"""
+
+    @pytest.mark.asyncio
+    async def test_answer_with_context_not_served_to_other_users(self):
+        from bot.core.agent import ArtemAgent
+        from bot.services.memory_manager import InMemoryManager
+
+        agent = ArtemAgent()
+        agent.memory_manager = InMemoryManager(max_turns=0, max_bytes=0)
+        agent.response_generator = ContextGenerator()
+        agent.response_cache = make_cache()
+        agent.instructions_version = VERSION
+        agent.quick_replies = None
+
+        def message(user_id: int, text: str) -> Message:
+            user = User(id=user_id, username=f"client{user_id}", first_name="Клиент", last_name=None)
+            return Message(id=1, user=user, chat_id=user_id, text=text, type=MessageType.TEXT, timestamp=datetime.now())
+
+        await agent.memory_manager.add_message(1, message(1, "Нужно сшить 200 курток"), make_response("Принято"))
+
+        first = await agent.process_message(message(1, "Какая цена?"))
+        second = await agent.process_message(message(2, "Какая цена?"))
+        third = await agent.process_message(message(3, "Какая цена?"))
+
+        assert first.text == "С учетом вашего заказа: Нужно сшить 200 курток"
+        assert second.text == "Цены от 1000 рублей"
+        assert not second.metadata.get("cached")
+        assert third.text == "Цены от 1000 рублей" and third.metadata["cached"] is True
+        assert agent.response_generator.calls == 2
@@ -0,0 +1,123 @@
+"""
+Тесты планировщика исходящих сообщений Telegram
+"""
+import asyncio
+import time
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.send_scheduler import SendScheduler, TokenBucket
+from bot.telegram_client import TelegramAPIError
+
+
+class FakeClient:
+    """Заглушка TelegramClient, записывающая вызовы"""
+
+    def __init__(self, delay: float = 0.0, flood_chats=None):
+        self.calls = []
+        self.delay = delay
+        self.flood_chats = dict(flood_chats or {})
+
+    async def call(self, method, params):
+        chat_id = params.get("chat_id")
+        if self.flood_chats.get(chat_id):
+            self.flood_chats[chat_id] -= 1
+            raise TelegramAPIError(method, error_code=429, description="Too Many Requests", retry_after=0.05)
+        await asyncio.sleep(self.delay)
+        self.calls.append((time.monotonic(), chat_id, params.get("text")))
+        return {"message_id": len(self.calls), "chat": {"id": chat_id}}
+
+
+class TestTokenBucket:
+    """Тесты TokenBucket"""
+
+    def test_burst_then_delay(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        now = time.monotonic()
+        for _ in range(2):
+            assert bucket.delay(now) == 0
+            bucket.consume(now)
+        assert bucket.delay(now) == pytest.approx(0.1, abs=0.01)
+
+
+class TestSendScheduler:
+    """Тесты SendScheduler"""
+
+    @pytest.mark.asyncio
+    async def test_send_message_returns_result(self):
+        client = FakeClient()
+        scheduler = SendScheduler(client)
+        result = await scheduler.send_message(1, "hi", parse_mode="HTML")
+        await scheduler.stop()
+
+        assert result["chat"]["id"] == 1
+        assert scheduler.get_stats()["sent"] == 1
+
+    @pytest.mark.asyncio
+    async def test_per_chat_rate_and_order(self):
+        """Сообщения одного чата уходят по порядку и не быстрее лимита"""
+        client = FakeClient()
+        scheduler = SendScheduler(client, global_rate=1000, chat_rate=20, chat_burst=1)
+        await asyncio.gather(*[scheduler.send_message(1, str(i)) for i in range(5)])
+        await scheduler.stop()
+
+        assert [text for _, _, text in client.calls] == ["0", "1", "2", "3", "4"]
+        elapsed = client.calls[-1][0] - client.calls[0][0]
+        assert elapsed >= 4 / 20 * 0.9
+
+    @pytest.mark.asyncio
+    async def test_global_rate_limit(self):
+        client = FakeClient()
+        scheduler = SendScheduler(client, global_rate=50, chat_rate=1000)
+        started = time.monotonic()
+        # Первые 50 уходят всплеском, следующие 25 - со скоростью 50/с
+        await scheduler.broadcast(list(range(75)), "hello")
+        await scheduler.stop()
+
+        assert len(client.calls) == 75
+        assert time.monotonic() - started >= 25 / 50 * 0.9
+
+    @pytest.mark.asyncio
+    async def test_interactive_overtakes_broadcast(self):
+        """Ответ в диалоге не ждет окончания рассылки"""
+        client = FakeClient()
+        scheduler = SendScheduler(client, global_rate=20, chat_rate=1000, max_in_flight=1)
+        broadcast = asyncio.create_task(scheduler.broadcast(list(range(100, 160)), "news"))
+        await asyncio.sleep(0.05)
+
+        await scheduler.send_message(1, "reply")
+        reply_position = [chat for _, chat, _ in client.calls].index(1)
+        await broadcast
+        await scheduler.stop()
+
+        assert reply_position < 40
+        assert scheduler.get_stats()["pending"]["broadcast"] == 0
+
+    @pytest.mark.asyncio
+    async def test_retry_after_backoff(self):
+        client = FakeClient(flood_chats={1: 1})
+        scheduler = SendScheduler(client, global_rate=1000, chat_rate=1000)
+        started = time.monotonic()
+        result = await scheduler.send_message(1, "hi")
+        await scheduler.stop()
+
+        assert result["chat"]["id"] == 1
+        assert time.monotonic() - started >= 0.05
+        stats = scheduler.get_stats()
+        assert stats["rate_limited"] == 1
+        assert stats["retried"] == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self):
+        client = FakeClient(flood_chats={1: 10})
+        scheduler = SendScheduler(client, global_rate=1000, chat_rate=1000, max_attempts=2)
+        with pytest.raises(TelegramAPIError):
+            await scheduler.send_message(1, "hi")
+        await scheduler.stop()
+
+        assert scheduler.get_stats()["failed"] == 1
@@ -0,0 +1,181 @@
+"""
+Тесты объединения одинаковых одновременных вызовов (single-flight)
+"""
+import asyncio
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.single_flight import SingleFlight, single_flight, get_single_flight_stats
+
+
+class SlowService:
+    """Сервис, считающий реальные вызовы"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.executions = 0
+        self.started = asyncio.Event()
+
+    async def fetch(self, value):
+        self.executions += 1
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        if value == "boom":
+            raise RuntimeError("upstream error")
+        return {"value": value, "execution": self.executions}
+
+
+class TestSingleFlight:
+    """Тесты SingleFlight"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_share_one_execution(self):
+        flight = SingleFlight("test")
+        service = SlowService()
+
+        results = await asyncio.gather(*(flight.do("apps", service.fetch, "apps") for _ in range(5)))
+
+        assert service.executions == 1
+        assert all(result is results[0] for result in results)
+        stats = flight.get_stats()
+        assert stats["calls"] == 5
+        assert stats["executions"] == 1
+        assert stats["shared"] == 4
+        assert stats["max_waiters"] == 5
+        assert stats["inflight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_different_keys_and_sequential_calls_execute(self):
+        flight = SingleFlight("test")
+        service = SlowService(delay=0.01)
+
+        await asyncio.gather(flight.do("a", service.fetch, "a"), flight.do("b", service.fetch, "b"))
+        # Результат не кешируется после завершения
+        await flight.do("a", service.fetch, "a")
+
+        assert service.executions == 3
+        assert flight.get_stats()["shared"] == 0
+
+    @pytest.mark.asyncio
+    async def test_error_is_shared(self):
+        flight = SingleFlight("test")
+        service = SlowService()
+
+        results = await asyncio.gather(
+            *(flight.do("boom", service.fetch, "boom") for _ in range(3)), return_exceptions=True
+        )
+
+        assert service.executions == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.get_stats()["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        flight = SingleFlight("test")
+        service = SlowService()
+
+        first = asyncio.create_task(flight.do("apps", service.fetch, "apps"))
+        second = asyncio.create_task(flight.do("apps", service.fetch, "apps"))
+        await service.started.wait()
+        first.cancel()
+
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        assert result["value"] == "apps"
+        assert service.executions == 1
+        stats = flight.get_stats()
+        assert stats["cancelled_waiters"] == 1
+        assert stats["abandoned"] == 0
+
+    @pytest.mark.asyncio
+    async def test_call_abandoned_when_all_waiters_cancelled(self):
+        flight = SingleFlight("test")
+        service = SlowService(delay=10)
+
+        waiters = [asyncio.create_task(flight.do("apps", service.fetch, "apps")) for _ in range(2)]
+        await service.started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        stats = flight.get_stats()
+        assert stats["abandoned"] == 1
+        assert stats["inflight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancel_key_cancels_all_waiters(self):
+        flight = SingleFlight("test")
+        service = SlowService(delay=10)
+
+        waiters = [asyncio.create_task(flight.do("apps", service.fetch, "apps")) for _ in range(3)]
+        await service.started.wait()
+
+        assert flight.cancel("apps")
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+        assert not flight.cancel("apps")
+
+    @pytest.mark.asyncio
+    async def test_forget_starts_fresh_call(self):
+        flight = SingleFlight("test")
+        service = SlowService()
+
+        stale = asyncio.create_task(flight.do(("user", 1), service.fetch, "old"))
+        await service.started.wait()
+        flight.forget_matching(lambda key: key[0] == "user")
+        fresh = await flight.do(("user", 1), service.fetch, "new")
+
+        assert (await stale)["value"] == "old"
+        assert fresh["value"] == "new"
+        assert service.executions == 2
+
+
+class TestSingleFlightDecorator:
+    """Тесты декоратора single_flight"""
+
+    @pytest.mark.asyncio
+    async def test_decorator_normalizes_key(self):
+        class Service:
+            def __init__(self):
+                self.executions = 0
+
+            @single_flight("test_mcp", key=lambda self, command, user_id=None: " ".join(command.lower().split()))
+            async def execute(self, command, user_id=None):
+                self.executions += 1
+                await asyncio.sleep(0.05)
+                return {"success": True, "command": command}
+
+        service = Service()
+        await asyncio.gather(
+            service.execute("Покажи приложения", "1"),
+            service.execute("  покажи   ПРИЛОЖЕНИЯ", "2"),
+            service.execute("покажи базы данных", "3")
+        )
+
+        assert service.executions == 2
+        assert Service.execute.flight.name == "test_mcp"
+        assert get_single_flight_stats()["test_mcp"]["shared"] == 1
+
+    @pytest.mark.asyncio
+    async def test_none_key_bypasses(self):
+        calls = []
+
+        @single_flight("test_bypass", key=lambda value: None)
+        async def fetch(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        await asyncio.gather(fetch(1), fetch(1))
+
+        assert calls == [1, 1]
+        assert get_single_flight_stats()["test_bypass"]["calls"] == 0
@@ -0,0 +1,103 @@
+"""
+Тесты SQLite хранилища памяти (WAL + FTS5)
+"""
+import asyncio
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.config import MemoryStoreConfig
+from bot.services.sqlite_memory import SqliteMemoryManager, build_match_query
+
+
+def make_store(tmp_path, **settings) -> SqliteMemoryManager:
+    return SqliteMemoryManager(MemoryStoreConfig(**settings), path=str(tmp_path / "memory.db"))
+
+
+def contents(context):
+    return [item["content"] for item in context]
+
+
+class TestSqliteMemory:
+    """Тесты контекста, поиска, хранения и групповой записи"""
+
+    @pytest.mark.asyncio
+    async def test_context_survives_restart(self, tmp_path, add_turn):
+        store = make_store(tmp_path)
+        await add_turn(store, 1, "Привет", "Здравствуйте")
+        await add_turn(store, 1, "Сколько стоит бот?", "От 50 000")
+        await add_turn(store, 2, "Чужое", "сообщение")
+        await store.close()
+
+        store = make_store(tmp_path)
+        context = await store.get_context(1, limit=3)
+        assert contents(context) == ["Здравствуйте", "Сколько стоит бот?", "От 50 000"]
+        assert [item["role"] for item in context] == ["assistant", "user", "assistant"]
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_search_ranked_and_per_user(self, tmp_path, add_turn):
+        store = make_store(tmp_path)
+        await add_turn(store, 1, "Нужен бот для заказов", "Сделаем")
+        await add_turn(store, 1, "Какие сроки?", "Две недели")
+        await add_turn(store, 1, "Заказ доставки через бота, заказ оплаты", "Хорошо")
+        await add_turn(store, 2, "Заказ пиццы", "Это другой пользователь")
+
+        results = await store.search_memory(1, "заказ")
+        assert contents(results) == ["Заказ доставки через бота, заказ оплаты", "Нужен бот для заказов"]
+        assert results[0]["score"] > results[1]["score"]
+
+        assert await store.search_memory(1, '"; DROP TABLE messages; --') == []
+        assert await store.search_memory(1, "   ") == []
+        await store.close()
+
+    def test_match_query_escapes_syntax(self):
+        assert build_match_query(7, 'Цена AND "бот" NEAR(x) snake_case') == (
+            '"u7xцена"* OR "u7xand"* OR "u7xбот"* OR "u7xnear"* OR "u7xx"* OR "u7xsnake"* OR "u7xcase"*'
+        )
+        assert build_match_query(7, "?!") is None
+
+    @pytest.mark.asyncio
+    async def test_retention_and_clear(self, tmp_path, add_turn):
+        store = make_store(tmp_path, max_messages_per_user=4)
+        for word in ["альфа", "бета", "гамма", "дельта"]:
+            await add_turn(store, 3, f"вопрос {word}", f"ответ {word}")
+
+        assert contents(await store.get_context(3, limit=10)) == ["вопрос гамма", "ответ гамма", "вопрос дельта", "ответ дельта"]
+        assert await store.search_memory(3, "альфа") == []
+        assert store.get_stats()["pruned_messages"] == 4
+
+        await store.clear_memory(3)
+        assert await store.get_context(3) == []
+        assert await store.search_memory(3, "вопрос") == []
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_share_transactions(self, tmp_path, add_turn):
+        store = make_store(tmp_path)
+
+        await asyncio.gather(*(add_turn(store, user_id, f"сообщение {user_id}") for user_id in range(50)))
+
+        stats = store.get_stats()
+        assert stats["written_messages"] == 100
+        assert stats["transactions"] < 50
+        assert stats["avg_ops_per_transaction"] > 1
+        assert contents(await store.get_context(49)) == ["сообщение 49", "ок"]
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_transaction_reported_to_writers(self, tmp_path, add_turn):
+        store = make_store(tmp_path)
+        await add_turn(store, 4, "до сбоя")
+
+        store._write_db.execute("CREATE TRIGGER fail_insert AFTER INSERT ON messages BEGIN SELECT RAISE(ABORT, 'диск'); END")
+        with pytest.raises(Exception):
+            await add_turn(store, 4, "при сбое")
+
+        assert contents(await store.get_context(4)) == ["до сбоя", "ок"]
+        assert store.get_stats()["write_errors"] == 1
+        await store.close()
@@ -0,0 +1,107 @@
+"""
+Тесты асинхронного клиента Telegram Bot API
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.telegram_client import TelegramClient, TelegramAPIError
+
+
+def _make_client(handler):
+    return TelegramClient("123:abc", transport=httpx.MockTransport(handler))
+
+
+class TestTelegramClient:
+    """Тесты TelegramClient"""
+
+    @pytest.mark.asyncio
+    async def test_send_message_with_business_connection(self):
+        requests = []
+
+        def handler(request: httpx.Request):
+            requests.append(request)
+            return httpx.Response(200, json={"ok": True, "result": {"message_id": 7}})
+
+        client = _make_client(handler)
+        result = await client.send_message(42, "hi", parse_mode="HTML", business_connection_id="bc1")
+        await client.close()
+
+        assert result == {"message_id": 7}
+        assert requests[0].url.path == "/bot123:abc/sendMessage"
+        payload = json.loads(requests[0].content)
+        assert payload == {"chat_id": 42, "text": "hi", "parse_mode": "HTML", "business_connection_id": "bc1"}
+
+    @pytest.mark.asyncio
+    async def test_api_error_carries_retry_after(self):
+        def handler(request: httpx.Request):
+            return httpx.Response(429, json={
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 3",
+                "parameters": {"retry_after": 3}
+            })
+
+        client = _make_client(handler)
+        with pytest.raises(TelegramAPIError) as exc_info:
+            await client.send_message(42, "hi")
+        await client.close()
+
+        assert exc_info.value.error_code == 429
+        assert exc_info.value.retry_after == 3
+        assert client.get_stats()["errors"] == {"sendMessage": 1}
+
+    @pytest.mark.asyncio
+    async def test_get_file_and_download(self):
+        def handler(request: httpx.Request):
+            if request.url.path.endswith("/getFile"):
+                return httpx.Response(200, json={"ok": True, "result": {"file_path": "voice/file_1.oga"}})
+            assert request.url.path == "/file/bot123:abc/voice/file_1.oga"
+            return httpx.Response(200, content=b"audio-bytes")
+
+        client = _make_client(handler)
+        file_info = await client.get_file("file_1")
+        content = await client.download_file(file_info["file_path"])
+        await client.close()
+
+        assert content == b"audio-bytes"
+
+    @pytest.mark.asyncio
+    async def test_connection_pool_is_shared(self):
+        def handler(request: httpx.Request):
+            return httpx.Response(200, json={"ok": True, "result": True})
+
+        client = _make_client(handler)
+        for _ in range(5):
+            await client.send_chat_action(42)
+        stats = client.get_stats()
+        await client.close()
+
+        assert stats["clients_created"] == 1
+        assert stats["requests"] == {"sendChatAction": 5}
+
+    def test_client_of_previous_loop_is_closed(self):
+        def handler(request: httpx.Request):
+            return httpx.Response(200, json={"ok": True, "result": True})
+
+        client = _make_client(handler)
+        clients = []
+
+        async def send():
+            await client.send_chat_action(42)
+            clients.append(client._client)
+
+        asyncio.run(send())
+        asyncio.run(send())
+        asyncio.run(client.close())
+
+        assert clients[0] is not clients[1]
+        assert all(http_client.is_closed for http_client in clients)
+        assert client.get_stats()["clients_created"] == 2
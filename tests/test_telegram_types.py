@@ -0,0 +1,105 @@
+"""
+Тесты типизированной схемы Telegram updates
+"""
+import json
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.telegram_types import (
+    Update, Message, decode_update, to_update, from_dict, to_builtins,
+    encode, json_loads, UpdateDecodeError
+)
+from bot.webhook.dispatcher import ChatDispatcher
+from bot.webhook.dedup import UpdateDeduplicator
+
+RAW_MESSAGE = {
+    "update_id": 5,
+    "message": {
+        "message_id": 10,
+        "date": 1735689600,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 7, "is_bot": False, "first_name": "Иван", "username": "ivan"},
+        "text": "привет",
+        "photo": [{"file_id": "x", "width": 90}]
+    }
+}
+
+RAW_BUSINESS_VOICE = {
+    "update_id": 6,
+    "business_message": {
+        "business_connection_id": "bc1",
+        "message_id": 11,
+        "chat": {"id": 42},
+        "voice": {"file_id": "voice-file", "duration": 3}
+    }
+}
+
+
+class TestDecodeUpdate:
+    """Тесты декодирования"""
+
+    def test_decode_message(self):
+        update = decode_update(json.dumps(RAW_MESSAGE).encode())
+
+        assert isinstance(update, Update)
+        assert update.kind == "message"
+        assert update.message.chat.id == 42
+        assert update.message.from_user.username == "ivan"
+        assert update.message.text == "привет"
+
+    def test_decode_business_voice(self):
+        update = decode_update(json.dumps(RAW_BUSINESS_VOICE))
+
+        assert update.kind == "business_message"
+        assert update.business_message.business_connection_id == "bc1"
+        assert update.business_message.voice.file_id == "voice-file"
+
+    @pytest.mark.parametrize("payload", [b"not json", b"[1, 2]", b'{"update_id": 1, "message": {}}'])
+    def test_invalid_payload(self, payload):
+        with pytest.raises(UpdateDecodeError):
+            decode_update(payload)
+
+    def test_fallback_matches_fast_decoder(self):
+        """Универсальный from_dict дает тот же результат, что и быстрый декодер"""
+        for raw in (RAW_MESSAGE, RAW_BUSINESS_VOICE):
+            assert from_dict(Update, raw) == decode_update(json.dumps(raw))
+
+    def test_to_update_passthrough(self):
+        update = to_update(RAW_MESSAGE)
+        assert to_update(update) is update
+
+
+class TestEncoding:
+    """Тесты кодирования"""
+
+    def test_round_trip_keeps_telegram_keys(self):
+        update = decode_update(json.dumps(RAW_MESSAGE))
+        data = json_loads(encode(update))
+
+        assert data["message"]["from"]["id"] == 7
+        assert "from_user" not in data["message"]
+        # Неизвестные поля отброшены при декодировании
+        assert "photo" not in data["message"]
+        assert decode_update(encode(update)) == update
+
+    def test_to_builtins(self):
+        message = decode_update(json.dumps(RAW_BUSINESS_VOICE)).business_message
+        assert isinstance(message, Message)
+        assert to_builtins(message.voice) == {"file_id": "voice-file", "duration": 3}
+
+
+class TestPipelineKeys:
+    """Ключи диспетчера и дедупликации работают с типизированным update"""
+
+    def test_dispatch_key(self):
+        assert ChatDispatcher.dispatch_key(to_update(RAW_MESSAGE)) == "chat:42"
+        assert ChatDispatcher.dispatch_key(to_update(RAW_BUSINESS_VOICE)) == "biz:bc1:42"
+
+    def test_dedup_keys(self):
+        keys = UpdateDeduplicator.keys_for(to_update(RAW_BUSINESS_VOICE))
+        assert keys == ["update:6", "business:bc1:42:11"]
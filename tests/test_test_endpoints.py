@@ -0,0 +1,68 @@
+"""
+Тесты тестовых endpoints /test/*
+"""
+import httpx
+import pytest
+from fastapi import FastAPI
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.webhook.handlers import webhook_handler
+from bot.webhook.routers import test as test_router
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    """Updates, переданные в webhook_handler"""
+    updates = []
+
+    async def handle_update(update):
+        updates.append(update)
+        return {"ok": True}
+
+    monkeypatch.setattr(webhook_handler, "handle_update", handle_update)
+    return updates
+
+
+async def post(path: str, **params) -> httpx.Response:
+    app = FastAPI()
+    app.include_router(test_router.router, prefix="/test")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(path, params=params)
+
+
+class TestTestEndpoints:
+    """Тесты создания тестовых updates"""
+
+    @pytest.mark.asyncio
+    async def test_message(self, handled):
+        response = await post("/test/message", chat_id=42, text="привет")
+
+        assert response.status_code == 200
+        assert response.json() == {"ok": True}
+        message = handled[0]["message"]
+        assert message["text"] == "привет"
+        assert message["chat"]["id"] == 42
+        assert handled[0]["update_id"] > 0
+
+    @pytest.mark.asyncio
+    async def test_voice(self, handled):
+        response = await post("/test/voice", chat_id=42, file_id="file-1", duration=3)
+
+        assert response.status_code == 200
+        voice = handled[0]["message"]["voice"]
+        assert voice["file_id"] == "file-1"
+        assert voice["duration"] == 3
+
+    @pytest.mark.asyncio
+    async def test_business_message(self, handled):
+        response = await post("/test/business-message", chat_id=42, text="заказ", business_connection_id="bc-1")
+
+        assert response.status_code == 200
+        message = handled[0]["business_message"]
+        assert message["business_connection_id"] == "bc-1"
+        assert message["text"] == "заказ"
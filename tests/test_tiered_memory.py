@@ -0,0 +1,128 @@
+"""
+Тесты горячего уровня памяти перед Zep
+"""
+import asyncio
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.core.config import MemoryTierConfig
+from bot.core.interfaces import Response
+from bot.services.memory_manager import InMemoryManager
+from bot.services.tiered_memory import TieredMemoryManager
+
+
+class CountingRemote(InMemoryManager):
+    """Удаленная память: считает чтения, может задерживать чтение и ронять запись"""
+
+    def __init__(self, read_delay: float = 0.0):
+        super().__init__()
+        self.reads = []
+        self.read_delay = read_delay
+        self.fail_writes = False
+
+    async def add_message(self, user_id, message, response=None):
+        if self.fail_writes:
+            raise RuntimeError("Zep недоступен")
+        await super().add_message(user_id, message, response)
+
+    async def get_context(self, user_id, limit=10):
+        self.reads.append((user_id, limit))
+        await asyncio.sleep(self.read_delay)
+        history = list(self.memory.get(user_id, ()))
+        return [turn.to_dict() for turn in history[-limit:]]
+
+
+def make_memory(max_messages: int = 20, max_users: int = 100, **remote_settings):
+    remote = CountingRemote(**remote_settings)
+    return TieredMemoryManager(remote, MemoryTierConfig(max_messages=max_messages, max_users=max_users)), remote
+
+
+def contents(context):
+    return [item["content"] for item in context]
+
+
+class TestTieredMemory:
+    """Тесты чтения и записи через горячий уровень"""
+
+    @pytest.mark.asyncio
+    async def test_context_served_locally_after_warm_up(self, add_turn, make_message):
+        memory, remote = make_memory()
+        await remote.add_message(1, make_message("из Zep"), Response(text="старый ответ"))
+
+        assert contents(await memory.get_context(1, limit=5)) == ["из Zep", "старый ответ"]
+        await add_turn(memory, 1, "новое", "свежий ответ")
+        assert contents(await memory.get_context(1, limit=3)) == ["старый ответ", "новое", "свежий ответ"]
+
+        assert remote.reads == [(1, 20)]
+        stats = memory.get_stats()
+        assert stats["hot_hits"] == 1
+        assert stats["remote_reads"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_new_user_warms_up_after_first_write(self, add_turn):
+        memory, remote = make_memory()
+
+        assert await memory.get_context(2) == []
+        await add_turn(memory, 2, "привет")
+        assert contents(await memory.get_context(2)) == ["привет", "ок"]
+        assert contents(await memory.get_context(2)) == ["привет", "ок"]
+
+        assert len(remote.reads) == 2
+        assert memory.get_stats()["warmups_discarded"] == 1
+
+    @pytest.mark.asyncio
+    async def test_hot_tier_bounded(self, add_turn):
+        memory, remote = make_memory(max_messages=4, max_users=2)
+
+        for user_id in (1, 2):
+            await add_turn(memory, user_id, "начало")
+            await memory.get_context(user_id, limit=4)
+        for index in range(3):
+            await add_turn(memory, 1, f"сообщение {index}")
+
+        assert contents(await memory.get_context(1, limit=4)) == ["сообщение 1", "ок", "сообщение 2", "ок"]
+        assert contents(await memory.get_context(1, limit=20)) == [turn.content for turn in remote.memory[1]]
+
+        await add_turn(memory, 3, "третий")
+        await memory.get_context(3, limit=4)
+        stats = memory.get_stats()
+        assert stats["users"] == 2
+        assert stats["evictions"] == 1
+        assert stats["resident_messages"] == 6
+        assert stats["oversized_reads"] == 1
+
+    @pytest.mark.asyncio
+    async def test_write_during_warm_up_not_lost(self, add_turn):
+        memory, remote = make_memory(read_delay=0.02)
+        await add_turn(memory, 4, "раньше")
+
+        read = asyncio.ensure_future(memory.get_context(4))
+        await asyncio.sleep(0.005)
+        await add_turn(memory, 4, "во время чтения")
+        await read
+
+        assert contents(await memory.get_context(4)) == ["раньше", "ок", "во время чтения", "ок"]
+        assert memory.get_stats()["warmups_discarded"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_write_drops_hot_entry(self, add_turn):
+        memory, remote = make_memory()
+        await add_turn(memory, 5, "первое")
+        await memory.get_context(5)
+
+        remote.fail_writes = True
+        with pytest.raises(RuntimeError):
+            await add_turn(memory, 5, "не записано")
+        remote.fail_writes = False
+
+        assert contents(await memory.get_context(5)) == ["первое", "ок"]
+        assert memory.get_stats()["write_failures"] == 1
+
+        await memory.clear_memory(5)
+        assert await memory.get_context(5) == []
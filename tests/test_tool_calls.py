@@ -0,0 +1,125 @@
+"""
+Тесты параллельного выполнения инструментов IntelligentAgent
+"""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agent.core.tool_stats import ToolCallStats, get_tool_call_stats
+from bot.core.logging import RequestLog
+
+
+def tool_calls_message(*calls):
+    return SimpleNamespace(content=None, tool_calls=[
+        SimpleNamespace(
+            id=f"call_{index}",
+            function=SimpleNamespace(name=name, arguments=json.dumps(arguments, ensure_ascii=False))
+        )
+        for index, (name, arguments) in enumerate(calls)
+    ])
+
+
+class SlowClaudeCodeService:
+    """MCP команды с задержкой по тексту команды"""
+
+    def __init__(self, delays):
+        self.delays = delays
+
+    async def execute_mcp_command(self, command, user_id=None):
+        delay = self.delays[command]
+        if delay is None:
+            raise RuntimeError("MCP сервер недоступен")
+        await asyncio.sleep(delay)
+        return {"success": True, "response": f"📁 {command}"}
+
+
+class TestConcurrentToolCalls:
+    """Тесты выполнения нескольких вызовов из одного ответа модели"""
+
+    @pytest.mark.asyncio
+    async def test_all_calls_run_concurrently(self, make_agent):
+        agent = make_agent(tool_calls_message(
+            ("claude_code_direct", {"message": "приложения"}),
+            ("claude_code_direct", {"message": "проекты supabase"})
+        ))
+        agent.claude_code_service = SlowClaudeCodeService({"приложения": 0.2, "проекты supabase": 0.2})
+
+        started = time.perf_counter()
+        with RequestLog(update_id=1) as request_log:
+            response = await agent.process_message("покажи приложения и проекты supabase", "42")
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.35
+        assert len(response.tool_responses) == 2
+        # Оба результата готовы для пользователя - выводятся подряд без второго запроса
+        assert response.message == "📁 приложения\n\n📁 проекты supabase"
+        assert request_log.fields["tool_calls"] == 2
+        assert request_log.fields["tool_critical_path_ms"] < 350
+
+    @pytest.mark.asyncio
+    async def test_every_call_gets_tool_message(self, make_agent):
+        agent = make_agent(
+            tool_calls_message(
+                ("echo_tool", {"message": "раз"}),
+                ("generate_image", {"prompt": "кот"})
+            )
+        )
+
+        response = await agent.process_message("эхо и картинка", "42")
+
+        assert response.message == "Ответ от LLM"
+        final_messages = agent.client.chat.completions.calls[1]["messages"]
+        tool_messages = [message for message in final_messages if message["role"] == "tool"]
+        assert [message["tool_call_id"] for message in tool_messages] == ["call_0", "call_1"]
+        assert json.loads(tool_messages[0]["content"])["data"]["echo"] == "раз"
+
+    @pytest.mark.asyncio
+    async def test_timeout_and_error_are_isolated(self, make_agent):
+        agent = make_agent(
+            tool_calls_message(
+                ("claude_code_direct", {"message": "медленно"}),
+                ("claude_code_direct", {"message": "сломано"}),
+                ("echo_tool", {"message": "работает"})
+            ),
+            tool_timeouts={"claude_code_direct": 0.05}
+        )
+        agent.claude_code_service = SlowClaudeCodeService({"медленно": 10, "сломано": None})
+
+        response = await agent.process_message("три инструмента", "42")
+
+        slow, broken, echo = response.tool_responses
+        assert not slow.success and slow.metadata["timeout"]
+        assert not broken.success and "недоступен" in broken.error
+        assert echo.success and echo.data["echo"] == "работает"
+        # Ошибки не выводятся напрямую - ответ формулирует LLM по всем результатам
+        assert response.message == "Ответ от LLM"
+
+        tools = get_tool_call_stats()["tools"]
+        assert tools["claude_code_direct"]["timeouts"] >= 1
+        assert tools["claude_code_direct"]["errors"] >= 1
+
+
+class TestToolCallStats:
+    """Тесты метрик инструментов"""
+
+    def test_critical_path_and_parallel_savings(self):
+        stats = ToolCallStats()
+        stats.record_call("a", 300.0, True)
+        stats.record_call("b", 100.0, False, timed_out=True)
+        stats.record_batch([("a", 300.0), ("b", 100.0)], 305.0)
+
+        result = stats.get_stats()
+        assert result["multi_tool_batches"] == 1
+        assert result["max_batch_size"] == 2
+        assert result["critical_path_p50_ms"] == 305.0
+        assert result["parallel_saved_ms"] == 95.0
+        assert result["tools"]["b"]["timeouts"] == 1
+        assert result["tools"]["b"]["errors"] == 0
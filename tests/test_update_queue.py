@@ -0,0 +1,328 @@
+"""
+Тесты фоновой очереди updates (режим быстрого подтверждения webhook)
+"""
+import asyncio
+import json
+
+import pytest
+
+# Добавляем путь к корню проекта
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bot.telegram_types import to_update
+from bot.webhook.dispatcher import ChatDispatcher
+from bot.webhook.update_queue import UpdateQueue, OverflowPolicy
+
+
+class TestUpdateQueue:
+    """Тесты UpdateQueue"""
+
+    @pytest.mark.asyncio
+    async def test_updates_processed_by_workers(self):
+        """Все поставленные updates обрабатываются воркерами"""
+        processed = []
+
+        async def handler(update):
+            await asyncio.sleep(0.01)
+            processed.append(update["update_id"])
+
+        queue = UpdateQueue(handler, max_size=10, workers=3)
+        await queue.start()
+        for i in range(5):
+            assert queue.enqueue({"update_id": i})
+        await queue.stop()
+
+        assert sorted(processed) == [0, 1, 2, 3, 4]
+        stats = queue.get_stats()
+        assert stats["enqueued"] == 5
+        assert stats["processed"] == 5
+        assert stats["depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_are_counted(self):
+        """Ошибка обработчика не останавливает воркера"""
+        async def handler(update):
+            if update["update_id"] == 1:
+                raise RuntimeError("boom")
+
+        queue = UpdateQueue(handler, max_size=10, workers=1)
+        await queue.start()
+        for i in range(3):
+            queue.enqueue({"update_id": i})
+        await queue.stop()
+
+        stats = queue.get_stats()
+        assert stats["failed"] == 1
+        assert stats["processed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_reject_policy(self):
+        """При политике reject лишние updates отклоняются"""
+        release = asyncio.Event()
+
+        async def handler(update):
+            await release.wait()
+
+        queue = UpdateQueue(handler, max_size=1, workers=1, overflow_policy="reject")
+        await queue.start()
+        assert queue.enqueue({"update_id": 1})
+        await asyncio.sleep(0)  # воркер забирает первый update
+        assert queue.enqueue({"update_id": 2})
+        assert not queue.enqueue({"update_id": 3})
+
+        release.set()
+        await queue.stop()
+        assert queue.get_stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_policy(self):
+        """При политике drop_oldest выбрасывается самый старый update"""
+        release = asyncio.Event()
+        processed = []
+
+        async def handler(update):
+            await release.wait()
+            processed.append(update["update_id"])
+
+        queue = UpdateQueue(handler, max_size=1, workers=1, overflow_policy="drop_oldest")
+        await queue.start()
+        queue.enqueue({"update_id": 1})
+        await asyncio.sleep(0)
+        queue.enqueue({"update_id": 2})
+        assert queue.enqueue({"update_id": 3})
+
+        release.set()
+        await queue.stop()
+        assert processed == [1, 3]
+        assert queue.get_stats()["dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_spill_policy_restores_updates(self, tmp_path):
+        """При политике spill лишние updates уходят на диск и потом обрабатываются"""
+        release = asyncio.Event()
+        processed = []
+        spill_path = tmp_path / "spill.jsonl"
+
+        async def handler(update):
+            await release.wait()
+            processed.append(update["update_id"])
+
+        queue = UpdateQueue(
+            handler, max_size=2, workers=1,
+            overflow_policy=OverflowPolicy.SPILL.value, spill_path=str(spill_path)
+        )
+        await queue.start()
+        queue.enqueue({"update_id": 1})
+        await asyncio.sleep(0)
+        for i in range(2, 6):
+            assert queue.enqueue({"update_id": i})
+
+        assert queue.get_stats()["spilled"] == 2
+        release.set()
+        await queue.stop()
+
+        assert sorted(processed) == [1, 2, 3, 4, 5]
+        assert queue.get_stats()["restored"] == 2
+
+    @pytest.mark.asyncio
+    async def test_restore_when_queue_refills_during_read(self, tmp_path):
+        """Updates, не поместившиеся после чтения spill файла, возвращаются на диск"""
+        release = asyncio.Event()
+        processed = []
+
+        async def handler(update):
+            await release.wait()
+            processed.append(update["update_id"])
+
+        queue = UpdateQueue(
+            handler, max_size=2, workers=1,
+            overflow_policy="spill", spill_path=str(tmp_path / "spill.jsonl")
+        )
+        loop = asyncio.get_running_loop()
+        take_spilled = queue._take_spilled
+        refilled = []
+
+        def take_and_refill(limit):
+            # Пока поток читает файл, webhook заполняет очередь новыми updates
+            result = take_spilled(limit)
+            if not refilled:
+                refilled.append(True)
+                for update_id in (7, 8):
+                    loop.call_soon_threadsafe(queue.enqueue, {"update_id": update_id})
+            return result
+
+        queue._take_spilled = take_and_refill
+        await queue.start()
+        queue.enqueue({"update_id": 1})
+        await asyncio.sleep(0)
+        for i in range(2, 7):
+            assert queue.enqueue({"update_id": i})
+
+        release.set()
+        for _ in range(200):
+            if len(processed) == 8:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+        assert refilled
+        assert sorted(processed) == [1, 2, 3, 4, 5, 6, 7, 8]
+        assert processed.index(4) < processed.index(5) < processed.index(6)
+        assert queue.get_stats()["spilled_pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_spill_on_shutdown(self, tmp_path):
+        """Необработанные и прерванные updates сохраняются на диск при остановке"""
+        spill_path = tmp_path / "spill.jsonl"
+
+        async def handler(update):
+            await asyncio.sleep(10)
+
+        queue = UpdateQueue(
+            handler, max_size=5, workers=1,
+            overflow_policy="spill", spill_path=str(spill_path)
+        )
+        await queue.start()
+        for i in range(3):
+            queue.enqueue({"update_id": i})
+        await asyncio.sleep(0)
+        await queue.stop(timeout=0.05)
+
+        saved = [json.loads(line) for line in spill_path.read_text().splitlines()]
+        assert [u["update_id"] for u in saved] == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_workers_wait_for_dispatcher(self):
+        """Воркер ждет обработки в диспетчере - параллельность ограничена числом воркеров"""
+        active = {"count": 0, "max": 0}
+
+        async def handler(update):
+            active["count"] += 1
+            active["max"] = max(active["max"], active["count"])
+            await asyncio.sleep(0.02)
+            active["count"] -= 1
+
+        dispatcher = ChatDispatcher(max_concurrency=8)
+        queue = UpdateQueue(
+            lambda update: dispatcher.run(ChatDispatcher.dispatch_key(update), handler, update),
+            max_size=10, workers=2
+        )
+        await queue.start()
+        for i in range(6):
+            queue.enqueue({"update_id": i})
+        await queue.stop()
+
+        assert active["max"] == 2
+        assert queue.get_stats()["processed"] == 6
+        assert queue.get_stats()["processing_time_ms"]["p50"] >= 15
+
+    @pytest.mark.asyncio
+    async def test_dispatcher_pending_spilled_on_shutdown(self, tmp_path):
+        """Updates, ожидающие в диспетчере, сохраняются на диск и не выполняются"""
+        spill_path = tmp_path / "spill.jsonl"
+        release = asyncio.Event()
+        processed = []
+
+        async def handler(update):
+            await release.wait()
+            processed.append(update["update_id"])
+
+        dispatcher = ChatDispatcher(max_concurrency=1)
+        queue = UpdateQueue(
+            lambda update: dispatcher.run(ChatDispatcher.dispatch_key(update), handler, update),
+            max_size=10, workers=2,
+            overflow_policy="spill", spill_path=str(spill_path)
+        )
+        await queue.start()
+        for i in range(4):
+            queue.enqueue({"update_id": i})
+        await asyncio.sleep(0.01)
+        await queue.stop(timeout=0.05)
+
+        release.set()
+        await dispatcher.join()
+
+        saved = [json.loads(line) for line in spill_path.read_text().splitlines()]
+        assert [u["update_id"] for u in saved] == [0, 1, 2, 3]
+        # Выполнявшийся update дорабатывает, ожидавший семафора - снят
+        assert processed == [0]
+        assert dispatcher.get_stats()["cancelled"] == 1
+
+    def test_spill_requires_path(self):
+        """Политика spill без пути к файлу - ошибка конфигурации"""
+        async def handler(update):
+            pass
+
+        with pytest.raises(ValueError):
+            UpdateQueue(handler, overflow_policy="spill")
+
+    def test_enqueue_before_start(self):
+        """До запуска очередь не принимает updates"""
+        async def handler(update):
+            pass
+
+        queue = UpdateQueue(handler)
+        assert not queue.enqueue({"update_id": 1})
+
+
+class TestUpdateQueueTypedUpdates:
+    """Очередь получает типизированные Update (to_update / decode_update)"""
+
+    @pytest.mark.asyncio
+    async def test_reject_policy(self):
+        release = asyncio.Event()
+
+        async def handler(update):
+            await release.wait()
+
+        queue = UpdateQueue(handler, max_size=1, workers=1, overflow_policy="reject")
+        await queue.start()
+        assert queue.enqueue(to_update({"update_id": 1}))
+        await asyncio.sleep(0)
+        assert queue.enqueue(to_update({"update_id": 2}))
+        assert not queue.enqueue(to_update({"update_id": 3}))
+
+        release.set()
+        await queue.stop()
+        assert queue.get_stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_policy(self):
+        release = asyncio.Event()
+        processed = []
+
+        async def handler(update):
+            await release.wait()
+            processed.append(update.update_id)
+
+        queue = UpdateQueue(handler, max_size=1, workers=1, overflow_policy="drop_oldest")
+        await queue.start()
+        queue.enqueue(to_update({"update_id": 1}))
+        await asyncio.sleep(0)
+        queue.enqueue(to_update({"update_id": 2}))
+        assert queue.enqueue(to_update({"update_id": 3}))
+
+        release.set()
+        await queue.stop()
+        assert processed == [1, 3]
+        assert queue.get_stats()["dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failing_handler_keeps_worker_alive(self):
+        processed = []
+
+        async def handler(update):
+            if update.update_id == 1:
+                raise RuntimeError("boom")
+            processed.append(update.update_id)
+
+        queue = UpdateQueue(handler, max_size=10, workers=1)
+        await queue.start()
+        for i in range(3):
+            queue.enqueue(to_update({"update_id": i}))
+        await queue.stop()
+
+        assert processed == [0, 2]
+        assert queue.get_stats()["failed"] == 1
@@ -5,14 +5,14 @@ Telegram Audio Downloader - скачивание голосовых сообще
 import os
 import asyncio
 import logging
-import aiohttp
 import aiofiles
 from pathlib import Path
 from typing import Optional, Dict, Any
 from datetime import datetime
 
+from bot.telegram_client import TelegramClient, TelegramAPIError, get_telegram_client
+
 from .config import (
-    TELEGRAM_API_BASE_URL, TELEGRAM_FILE_BASE_URL, 
     TEMP_AUDIO_DIR, MAX_AUDIO_SIZE_BYTES, 
     DOWNLOAD_TIMEOUT_SECONDS, ensure_temp_dir
 )
@@ -23,43 +23,29 @@ logger = logging.getLogger(__name__)
 class TelegramAudioDownloader:
     """Класс для скачивания аудио файлов из Telegram"""
     
-    def __init__(self, bot_token: str):
+    def __init__(self, bot_token: str, client: Optional[TelegramClient] = None):
         self.bot_token = bot_token
-        self.session: Optional[aiohttp.ClientSession] = None
+        # Общий клиент Bot API - соединения переиспользуются между скачиваниями
+        self.client = client or get_telegram_client(bot_token)
         ensure_temp_dir()
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT_SECONDS)
-        )
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # Пул соединений общий, закрывать его здесь не нужно
+        pass
     
     async def get_file_info(self, file_id: str) -> Optional[Dict[str, Any]]:
         """Получает информацию о файле через Telegram Bot API"""
         try:
-            url = TELEGRAM_API_BASE_URL.format(
-                token=self.bot_token, 
-                method="getFile"
-            )
-            
-            async with self.session.post(url, json={"file_id": file_id}) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("ok"):
-                        file_info = data.get("result", {})
-                        logger.info(f"✅ Получена информация о файле {file_id}: {file_info.get('file_size')} bytes")
-                        return file_info
-                    else:
-                        logger.error(f"❌ Telegram API ошибка: {data.get('description')}")
-                        return None
-                else:
-                    logger.error(f"❌ HTTP ошибка при получении файла: {response.status}")
-                    return None
+            file_info = await self.client.get_file(file_id)
+            logger.info(f"✅ Получена информация о файле {file_id}: {file_info.get('file_size')} bytes")
+            return file_info
                     
+        except TelegramAPIError as e:
+            logger.error(f"❌ Telegram API ошибка: {e.description}")
+            return None
         except Exception as e:
             logger.error(f"❌ Ошибка при получении информации о файле {file_id}: {e}")
             return None
@@ -86,12 +72,6 @@ class TelegramAudioDownloader:
                 logger.error("❌ file_path не найден в ответе Telegram API")
                 return None
             
-            # Формируем URL для скачивания
-            download_url = TELEGRAM_FILE_BASE_URL.format(
-                token=self.bot_token,
-                file_path=file_path
-            )
-            
             # Создаем уникальное имя файла
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             duration = voice_data.get('duration', 0)
@@ -99,24 +79,23 @@ class TelegramAudioDownloader:
             local_filename = f"voice_{timestamp}_{duration}s_{file_id[:8]}.{file_extension}"
             local_path = os.path.join(TEMP_AUDIO_DIR, local_filename)
             
-            # Скачиваем файл
-            logger.info(f"📥 Скачиваем голосовой файл: {download_url}")
-            async with self.session.get(download_url) as response:
-                if response.status == 200:
-                    async with aiofiles.open(local_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            await f.write(chunk)
-                    
-                    # Проверяем что файл скачался
-                    if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
-                        logger.info(f"✅ Файл скачан: {local_path} ({os.path.getsize(local_path)} bytes)")
-                        return local_path
-                    else:
-                        logger.error(f"❌ Файл не скачался или пустой: {local_path}")
-                        return None
-                else:
-                    logger.error(f"❌ Ошибка скачивания файла: HTTP {response.status}")
-                    return None
+            # Скачиваем файл потоково через общий пул соединений
+            logger.info(f"📥 Скачиваем голосовой файл: {file_path}")
+            
+            async def _download():
+                async with aiofiles.open(local_path, 'wb') as f:
+                    async for chunk in self.client.iter_file(file_path):
+                        await f.write(chunk)
+            
+            await asyncio.wait_for(_download(), timeout=DOWNLOAD_TIMEOUT_SECONDS)
+            
+            # Проверяем что файл скачался
+            if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
+                logger.info(f"✅ Файл скачан: {local_path} ({os.path.getsize(local_path)} bytes)")
+                return local_path
+            else:
+                logger.error(f"❌ Файл не скачался или пустой: {local_path}")
+                return None
                     
         except Exception as e:
             logger.error(f"❌ Ошибка при скачивании файла {file_id}: {e}")
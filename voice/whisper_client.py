@@ -10,6 +10,8 @@ from pathlib import Path
 import openai
 from openai import AsyncOpenAI
 
+from bot.llm_clients import llm_clients
+
 from .config import (
     WHISPER_MODEL, WHISPER_RESPONSE_FORMAT, WHISPER_LANGUAGE,
     WHISPER_TIMEOUT_SECONDS, SUPPORTED_AUDIO_FORMATS
@@ -25,10 +27,8 @@ class WhisperTranscriber:
         if not api_key:
             raise ValueError("OpenAI API key is required for Whisper transcription")
         
-        self.client = AsyncOpenAI(
-            api_key=api_key,
-            timeout=WHISPER_TIMEOUT_SECONDS
-        )
+        # Общий пул соединений с генераторами ответов, свой таймаут для загрузки аудио
+        self.client: AsyncOpenAI = llm_clients.openai(api_key, timeout=WHISPER_TIMEOUT_SECONDS)
     
     async def transcribe(self, audio_file_path: str, language: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """